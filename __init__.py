@@ -107,6 +107,9 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             "--- DEBUG INIT: SmartEVChargingCoordinator-objekt SKAPAT ---"
         )
 
+        # Läs in sparat tillstånd (t.ex. månadens effekttoppar) före första uppdateringen.
+        await coordinator.async_load_persisted_state()
+
         # Koordinatorn anropar _async_first_refresh internt via DataUpdateCoordinator.
         # Men vi måste vänta på att den första datan hämtas innan vi sätter upp plattformar
         # om de är beroende av data som koordinatorn tillhandahåller initialt.
@@ -0,0 +1,173 @@
+# File version: 2025-06-05 0.2.0
+"""Inlärd laddkurva: hur mycket effekt bilen tar emot vid olika SoC.
+
+Över ungefär 80 % SoC sänker de flesta bilar laddeffekten kraftigt, så en
+planering med konstant effekt underskattar tiden till målet. Under varje
+session registreras SoC och uppmätt laddeffekt tillsammans med den effekt
+laddaren erbjöd. Prover där bilen tog tydligt mindre än erbjudet visar bilens
+egen gräns vid den SoC:n. Prover där bilen tog allt som erbjöds visar bara att
+gränsen är minst så hög.
+
+När sessionen avslutas vägs sessionens medelvärden in i en tabell med 50
+SoC-intervall (2 procentenheter vardera) som sparas på disk. Ett uppslag är ett
+index i tabellen, och tiden till ett mål summeras över de intervall som
+passeras.
+"""
+
+import logging
+from collections.abc import Mapping
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    DOMAIN,
+    STORAGE_VERSION,
+    CONF_EV_SOC_SENSOR,
+    CONF_CHARGER_POWER_SENSOR,
+)
+
+_LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
+
+SAVE_DELAY_SECONDS = 60
+BIN_PERCENT = 2
+BINS = 100 // BIN_PERCENT
+# Tar bilen mindre än så här stor andel av den erbjudna effekten räknas provet
+# som bilens egen gräns.
+CAR_LIMITED_RATIO = 0.9
+# Hur stor vikt en ny sessions medelvärde får mot det inlärda värdet.
+LEARNING_RATE = 0.3
+
+
+def _bin(soc_percent: float) -> int:
+    return min(BINS - 1, max(0, int(soc_percent // BIN_PERCENT)))
+
+
+class ChargeCurve:
+    """Tabell över bilens högsta laddeffekt per SoC-intervall."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialisera laddkurvan."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.charge_curve"
+        )
+        # Inlärd gräns i kW per intervall. None där bilen inte har begränsat.
+        self.limit_kw: list[float | None] = [None] * BINS
+        # Räknas upp när tabellen ändras, så att laddplanen vet när den ska
+        # räknas om.
+        self.version = 0
+        self._session_sum_kw = [0.0] * BINS
+        self._session_count = [0] * BINS
+        self._session_floor_kw = [0.0] * BINS
+
+    @classmethod
+    def from_config(
+        cls, hass: HomeAssistant, entry_id: str, config: Mapping[str, Any]
+    ) -> "ChargeCurve | None":
+        """Skapar laddkurvan, eller None om SoC- eller effektsensor saknas."""
+        if not config.get(CONF_EV_SOC_SENSOR) or not config.get(
+            CONF_CHARGER_POWER_SENSOR
+        ):
+            return None
+        return cls(hass, entry_id)
+
+    async def async_load(self) -> None:
+        """Läser in den sparade tabellen."""
+        data = await self._store.async_load()
+        if not data:
+            return
+        try:
+            limits = [
+                float(value) if value is not None else None
+                for value in data.get("limit_kw", [])
+            ]
+        except (TypeError, ValueError) as e:
+            _LOGGER.warning("Kunde inte läsa sparad laddkurva: %s", e)
+            return
+        if len(limits) == BINS:
+            self.limit_kw = limits
+            self.version += 1
+
+    async def async_save(self) -> None:
+        """Skriver tabellen direkt, t.ex. vid avlastning."""
+        await self._store.async_save(self._data_to_save())
+
+    def _data_to_save(self) -> dict[str, Any]:
+        return {
+            "limit_kw": [
+                round(value, 2) if value is not None else None
+                for value in self.limit_kw
+            ]
+        }
+
+    def add_sample(self, soc_percent: float, power_w: float, offered_w: float) -> None:
+        """Registrerar uppmätt och erbjuden laddeffekt vid given SoC."""
+        if power_w <= 0 or offered_w <= 0:
+            return
+        index = _bin(soc_percent)
+        power_kw = power_w / 1000.0
+        if power_w < offered_w * CAR_LIMITED_RATIO:
+            self._session_sum_kw[index] += power_kw
+            self._session_count[index] += 1
+        else:
+            self._session_floor_kw[index] = max(
+                self._session_floor_kw[index], power_kw
+            )
+
+    def end_session(self) -> bool:
+        """
+        Väger in den avslutade sessionens prover i tabellen och schemalägger en
+        samlad skrivning. Returnerar True om tabellen ändrades.
+        """
+        changed = False
+        for index in range(BINS):
+            limit = self.limit_kw[index]
+            if count := self._session_count[index]:
+                mean_kw = self._session_sum_kw[index] / count
+                if limit is None:
+                    limit = mean_kw
+                else:
+                    limit += LEARNING_RATE * (mean_kw - limit)
+            # Tog bilen all erbjuden effekt över den inlärda gränsen var gränsen
+            # för låg.
+            floor_kw = self._session_floor_kw[index]
+            if limit is not None and floor_kw > limit:
+                limit = floor_kw
+            if limit != self.limit_kw[index]:
+                self.limit_kw[index] = limit
+                changed = True
+        self._session_sum_kw = [0.0] * BINS
+        self._session_count = [0] * BINS
+        self._session_floor_kw = [0.0] * BINS
+        if changed:
+            self.version += 1
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY_SECONDS)
+            _LOGGER.debug("Laddkurvan uppdaterad: %s", self._data_to_save())
+        return changed
+
+    def power_kw(self, soc_percent: float, charger_kw: float) -> float:
+        """Väntad laddeffekt vid given SoC, begränsad av laddarens effekt."""
+        limit = self.limit_kw[_bin(soc_percent)]
+        return charger_kw if limit is None else min(charger_kw, limit)
+
+    def hours_to_charge(
+        self,
+        from_percent: float,
+        to_percent: float,
+        charger_kw: float,
+        capacity_kwh: float,
+        efficiency: float = 1.0,
+    ) -> float | None:
+        """Tid i timmar att ladda från en SoC till en annan. None utan effekt."""
+        hours = 0.0
+        soc = max(0.0, from_percent)
+        to_percent = min(100.0, to_percent)
+        while soc < to_percent:
+            edge = min(to_percent, (_bin(soc) + 1) * BIN_PERCENT)
+            power_kw = self.power_kw(soc, charger_kw) * efficiency
+            if power_kw <= 0:
+                return None
+            hours += (edge - soc) / 100.0 * capacity_kwh / power_kw
+            soc = edge
+        return hours
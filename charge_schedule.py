@@ -0,0 +1,193 @@
+# File version: 2025-06-05 0.2.0
+"""Laddschema i laddaren för Pris/Tid-laddningen.
+
+Utan schema styr koordinatorn laddaren från Home Assistant med start, paus
+och strömgräns. Varje kommando går via Easees moln, och går Home Assistant ned
+händer ingenting. Med uppladdat schema görs nästa sammanhängande fönster av
+intervall där Pris/Tid skulle ladda om till laddarens eget laddschema (för
+Easee den grundläggande laddplanen: en start- och en stopptid). Kräver att
+laddarens gränssnitt kan ta emot ett laddfönster. Schemat skickas bara när
+fönstret ändras, t.ex. vid nya priser, nytt maxpris eller ny laddplan.
+
+Koordinatorn kontrollerar sedan bara att laddaren följer schemat. Har
+laddaren inte börjat ladda en kort stund efter fönstrets början (eller efter
+att bilen blev redo) styrs den direkt som tidigare. Ett schema som ännu inte
+har passerats tas bort när integrationen avlastas, och efter omstart om
+uppladdningen har stängts av.
+"""
+
+import logging
+from collections.abc import Callable, Mapping
+from datetime import datetime, timedelta
+from typing import Any
+
+from .charger_backend import ChargerBackend
+from .const import (
+    DOMAIN,
+    CONF_EASEE_SCHEDULE_UPLOAD,
+)
+from .price_cache import PriceSeries
+
+_LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
+
+# Så länge får laddaren på sig att själv börja eller sluta ladda vid fönstrets
+# gränser.
+GRACE = timedelta(minutes=3)
+# Laddarens grundläggande laddplan anges som klockslag och kan inte vara
+# längre än ett dygn.
+MAX_WINDOW = timedelta(hours=24)
+
+
+class ChargeScheduleUploader:
+    """Håller laddarens laddschema i takt med Pris/Tid-fönstren."""
+
+    def __init__(self, backend: ChargerBackend) -> None:
+        """Initialisera med laddarens gränssnitt."""
+        self._backend = backend
+        # Sätts när ett anrop misslyckats, så att schemat skickas igen.
+        self._dirty = False
+        self._key: tuple | None = None
+        self._series: PriceSeries | None = None
+        self.window: tuple[datetime, datetime] | None = None
+        # Fönstret som senast skickades till laddaren. None = inget schema.
+        self.uploaded: tuple[datetime, datetime] | None = None
+        # Sluttiden för fönstret som fanns i laddaren innan det senaste skickades.
+        self._previous_stop: datetime | None = None
+
+    @classmethod
+    def from_config(
+        cls, backend: ChargerBackend, config: Mapping[str, Any]
+    ) -> "ChargeScheduleUploader | None":
+        """
+        Skapar uppladdaren, eller None om läget inte är aktiverat eller
+        laddaren inte kan ta emot ett laddfönster.
+        """
+        if not config.get(CONF_EASEE_SCHEDULE_UPLOAD):
+            return None
+        if not backend.supports_charge_schedule:
+            _LOGGER.warning(
+                "Laddaren (%s) kan inte ta emot ett laddschema. Pris/Tid styrs "
+                "med kommandon.",
+                backend.name,
+            )
+            return None
+        return cls(backend)
+
+    def update(
+        self,
+        now: datetime,
+        series: PriceSeries,
+        key: tuple,
+        slot_allowed: Callable[[int], bool],
+    ) -> None:
+        """
+        Räknar om nästa fönster när prisserien eller någon av Pris/Tid-villkoren
+        har ändrats. Annars används det beräknade fönstret.
+        """
+        index = series.slot_index(now)
+        key = (index, *key)
+        if series is self._series and key == self._key:
+            return
+        self._key = key
+        self._series = series
+        self.window = None
+        if index is None:
+            return
+        start: datetime | None = None
+        end: datetime | None = None
+        for i in range(index, len(series)):
+            if slot_allowed(i):
+                if start is None:
+                    start = series.starts[i]
+                elif series.starts[i] != end:
+                    break
+                end = series.ends[i]
+                if end - start >= MAX_WINDOW:
+                    break
+            elif start is not None:
+                break
+        if start is None or end is None:
+            return
+        # Ett pågående fönster behåller sin början, så att det inte skickas om
+        # vid varje nytt intervall.
+        if (
+            start <= now
+            and self.uploaded is not None
+            and self.uploaded[0] <= now < self.uploaded[1]
+        ):
+            start = self.uploaded[0]
+        self.window = (start, min(end, start + MAX_WINDOW))
+
+    def clear(self) -> None:
+        """Tar bort fönstret, t.ex. när Pris/Tid inte kan ladda."""
+        self._key = None
+        self._series = None
+        self.window = None
+
+    def sync(self, now: datetime) -> bool:
+        """
+        Skickar fönstret till laddaren om det skiljer sig från det som redan
+        finns där, eller tar bort schemat när inget fönster återstår. Ett schema
+        vars fönster redan har passerats upprepas inte och behöver inte tas bort.
+        Returnerar True om ett kommando skickades.
+        """
+        if self.window == self.uploaded and not self._dirty:
+            return False
+        if (
+            self.window is None
+            and self.uploaded is not None
+            and self.uploaded[1] <= now
+        ):
+            self._previous_stop = self.uploaded[1]
+            self.uploaded = None
+            return False
+        if self.window is None:
+            sent = self._backend.clear_charge_schedule(self._handle_result)
+        else:
+            sent = self._backend.set_charge_schedule(
+                self.window[0], self.window[1], self._handle_result
+            )
+        if not sent:
+            return False
+        self._dirty = False
+        self._previous_stop = self.uploaded[1] if self.uploaded else None
+        self.uploaded = self.window
+        return True
+
+    def remove(self, now: datetime) -> bool:
+        """
+        Tar bort ett schema som ännu inte har passerats, t.ex. när integrationen
+        avlastas och ingen längre följer upp det. Returnerar True om ett
+        kommando skickades.
+        """
+        self.clear()
+        self._dirty = False
+        return self.sync(now)
+
+    def _handle_result(self, success: bool) -> None:
+        if not success:
+            _LOGGER.warning("Kunde inte skicka laddschema till laddaren.")
+            self._dirty = True
+
+    def awaiting_scheduled_start(
+        self, now: datetime, ready_since: datetime | None
+    ) -> bool:
+        """
+        Om laddaren ska få starta själv enligt schemat: nu är inom det uppladdade
+        fönstret och varken fönstret eller bilen har varit redo längre än
+        en kort stund.
+        """
+        if self.uploaded is None or not self.uploaded[0] <= now < self.uploaded[1]:
+            return False
+        since = max(self.uploaded[0], ready_since or self.uploaded[0])
+        return now - since < GRACE
+
+    def awaiting_scheduled_stop(self, now: datetime) -> bool:
+        """Om laddaren precis har nått ett fönsters slut och ska sluta själv."""
+        return any(
+            stop is not None and stop <= now < stop + GRACE
+            for stop in (
+                self._previous_stop,
+                self.uploaded[1] if self.uploaded else None,
+            )
+        )
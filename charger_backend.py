@@ -0,0 +1,436 @@
+# File version: 2025-06-05 0.2.0
+"""Gränssnitt mot laddaren.
+
+Koordinatorn styr laddaren med strömgräns, start och paus och läser dess
+status. Hur det görs beror på laddaren, så varje laddare har ett gränssnitt:
+
+* Easee: tjänsterna i Easee-integrationen via Easees moln.
+* Generisk: en number-entitet för strömgränsen, en switch för start/paus och
+  valfritt en switch för 1/3-fas och en select-entitet för vilken fas en
+  1-fasbil laddar på. Statussensorns värden översätts till
+  Easees statusar, som koordinatorn använder internt.
+* OCPP: laddpunkter som är anslutna till det lokala centralsystemet
+  (ocpp_central), styrda med laddprofiler.
+* Fejkad: registrerar kommandona och uppdaterar sensorerna direkt. Används i
+  tester.
+
+Varje gränssnitt anger också hur lång tid det tar innan ett kommando syns i
+sensorerna och hur ofta strömgränsen får ändras, så att uppföljningen av
+kommandon och styrningen kan anpassas efter laddaren.
+"""
+
+import logging
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable, Mapping
+from datetime import datetime, timedelta
+from typing import Any
+
+from homeassistant.const import (
+    ATTR_ENTITY_ID,
+    SERVICE_TURN_OFF,
+    SERVICE_TURN_ON,
+    STATE_UNAVAILABLE,
+)
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.util.dt as dt_util
+
+from .circuit_breaker import ServiceCallRunner
+from .const import (
+    DOMAIN,
+    CONF_CHARGER_BACKEND,
+    CONF_CHARGER_DEVICE,
+    CONF_GENERIC_CURRENT_NUMBER,
+    CONF_GENERIC_CHARGE_SWITCH,
+    CONF_GENERIC_PHASE_SWITCH,
+    CONF_GENERIC_PHASE_SELECT,
+    CONF_OCPP_CHARGE_POINT_ID,
+    CHARGER_BACKEND_GENERIC,
+    EASEE_SERVICE_ACTION_COMMAND,
+    EASEE_SERVICE_SET_DYNAMIC_CURRENT,
+    EASEE_STATUS_AWAITING_START,
+    EASEE_STATUS_CHARGING,
+    EASEE_STATUS_COMPLETED,
+    EASEE_STATUS_DISCONNECTED,
+    EASEE_STATUS_ERROR,
+    EASEE_STATUS_OFFLINE,
+    EASEE_STATUS_PAUSED,
+)
+from .ocpp_central import ChargePoint, OcppCentralSystem, OcppError
+from .phase_balancer import PHASE_NAMES
+
+_LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
+
+OnDone = Callable[[bool], None] | None
+
+EASEE_SERVICE_SET_PLAN = "set_charger_basic_charge_plan"
+EASEE_SERVICE_DELETE_PLAN = "delete_charger_basic_charge_plan"
+
+# Vanliga statusvärden hos andra laddare (bl.a. OCPP:s connector-status)
+# översatta till Easees statusar.
+GENERIC_STATUS_MAP = {
+    "available": EASEE_STATUS_DISCONNECTED[0],
+    "unplugged": EASEE_STATUS_DISCONNECTED[0],
+    "preparing": EASEE_STATUS_AWAITING_START,
+    "connected": EASEE_STATUS_AWAITING_START,
+    "plugged_in": EASEE_STATUS_AWAITING_START,
+    "suspendedev": EASEE_STATUS_PAUSED,
+    "suspended_ev": EASEE_STATUS_PAUSED,
+    "suspendedevse": EASEE_STATUS_PAUSED,
+    "suspended_evse": EASEE_STATUS_PAUSED,
+    "finishing": EASEE_STATUS_COMPLETED,
+    "complete": EASEE_STATUS_COMPLETED,
+    "faulted": EASEE_STATUS_ERROR,
+    STATE_UNAVAILABLE: EASEE_STATUS_OFFLINE,
+}
+
+
+class ChargerBackend(ABC):
+    """Basklass för laddarens gränssnitt. Kommandona returnerar om de skickades."""
+
+    name = "base"
+    # Typisk tid innan ett kommandos effekt syns i laddarens sensorer.
+    command_latency = timedelta(seconds=20)
+    # Kortaste tid mellan två ändringar av strömgränsen under laddning.
+    min_current_interval = timedelta(0)
+    supports_phase_switching = False
+    # Om laddaren kan välja vilken fas en 1-fasbil laddar på (fasrotation).
+    supports_phase_rotation = False
+    # Om laddaren kan ta emot ett helt laddfönster på en gång.
+    supports_charge_schedule = False
+
+    def map_status(self, raw_status: str) -> str:
+        """Laddarens status översatt till Easees statusar."""
+        return raw_status.lower()
+
+    @abstractmethod
+    def set_current(self, current: float, on_done: OnDone = None) -> bool:
+        """Sätter laddarens dynamiska strömgräns (A)."""
+
+    @abstractmethod
+    def start(self, on_done: OnDone = None) -> bool:
+        """Startar eller återupptar laddningen."""
+
+    @abstractmethod
+    def pause(self, on_done: OnDone = None) -> bool:
+        """Pausar laddningen."""
+
+    def set_phases(self, phases: int, on_done: OnDone = None) -> bool:
+        """Växlar mellan 1- och 3-fasladdning. Stöds inte av alla laddare."""
+        return False
+
+    def select_phase(self, phase: int, on_done: OnDone = None) -> bool:
+        """Väljer nätets fas (0-2) för 1-fasladdning. Stöds inte av alla laddare."""
+        return False
+
+    def set_charge_schedule(
+        self, start: datetime, stop: datetime, on_done: OnDone = None
+    ) -> bool:
+        """Skickar ett laddfönster till laddaren."""
+        return False
+
+    def clear_charge_schedule(self, on_done: OnDone = None) -> bool:
+        """Tar bort laddfönstret i laddaren."""
+        return False
+
+
+class EaseeBackend(ChargerBackend):
+    """Easee-laddare via Easee-integrationens tjänster."""
+
+    name = "easee"
+    # Kommandona går via Easees moln, och statusen uppdateras med fördröjning.
+    command_latency = timedelta(seconds=20)
+    # Easees moln begränsar hur ofta strömgränsen får ändras, så under laddning
+    # ändras den högst en gång per minut.
+    min_current_interval = timedelta(seconds=60)
+    supports_charge_schedule = True
+
+    def __init__(self, runner: ServiceCallRunner, device_id: str | None) -> None:
+        """Initialisera med tjänstekörningen och laddarens enhets-ID."""
+        self._runner = runner
+        self._device_id = device_id
+
+    def set_current(self, current: float, on_done: OnDone = None) -> bool:
+        return self._runner.async_call(
+            "easee",
+            EASEE_SERVICE_SET_DYNAMIC_CURRENT,
+            {"device_id": self._device_id, "current": current},
+            on_done,
+        )
+
+    def _action(self, command: str, on_done: OnDone) -> bool:
+        return self._runner.async_call(
+            "easee",
+            EASEE_SERVICE_ACTION_COMMAND,
+            {"device_id": self._device_id, "action_command": command},
+            on_done,
+        )
+
+    def start(self, on_done: OnDone = None) -> bool:
+        return self._action("start", on_done)
+
+    def pause(self, on_done: OnDone = None) -> bool:
+        return self._action("pause", on_done)
+
+    def set_charge_schedule(
+        self, start: datetime, stop: datetime, on_done: OnDone = None
+    ) -> bool:
+        # Easees grundläggande laddplan anges som lokala klockslag.
+        local_start, local_stop = dt_util.as_local(start), dt_util.as_local(stop)
+        data = {
+            "device_id": self._device_id,
+            "charge_start_time": local_start.strftime("%H:%M:%S"),
+            "charge_stop_time": local_stop.strftime("%H:%M:%S"),
+            "repeat": False,
+        }
+        _LOGGER.info("Laddschema till laddaren: %s %s", EASEE_SERVICE_SET_PLAN, data)
+        return self._runner.async_call("easee", EASEE_SERVICE_SET_PLAN, data, on_done)
+
+    def clear_charge_schedule(self, on_done: OnDone = None) -> bool:
+        _LOGGER.info("Tar bort laddschemat i laddaren.")
+        return self._runner.async_call(
+            "easee", EASEE_SERVICE_DELETE_PLAN, {"device_id": self._device_id}, on_done
+        )
+
+
+class GenericEntityBackend(ChargerBackend):
+    """Laddare som styrs med en number-entitet och en switch."""
+
+    name = "generic"
+    # Lokalt styrda laddare brukar rapportera ändringar inom några sekunder.
+    command_latency = timedelta(seconds=10)
+
+    def __init__(
+        self,
+        runner: ServiceCallRunner,
+        current_entity_id: str | None,
+        charge_switch_id: str | None,
+        phase_switch_id: str | None = None,
+        phase_select_id: str | None = None,
+    ) -> None:
+        """Initialisera med entiteterna för strömgräns, start/paus och faser."""
+        self._runner = runner
+        self._current_entity_id = current_entity_id
+        self._charge_switch_id = charge_switch_id
+        self._phase_switch_id = phase_switch_id
+        self.supports_phase_switching = bool(phase_switch_id)
+        self._phase_select_id = phase_select_id
+        self.supports_phase_rotation = bool(phase_select_id)
+
+    def map_status(self, raw_status: str) -> str:
+        status = raw_status.lower()
+        return GENERIC_STATUS_MAP.get(status, status)
+
+    def set_current(self, current: float, on_done: OnDone = None) -> bool:
+        if not self._current_entity_id:
+            return False
+        return self._runner.async_call(
+            "number",
+            "set_value",
+            {ATTR_ENTITY_ID: self._current_entity_id, "value": current},
+            on_done,
+        )
+
+    def _switch(self, entity_id: str | None, turn_on: bool, on_done: OnDone) -> bool:
+        if not entity_id:
+            return False
+        return self._runner.async_call(
+            "switch",
+            SERVICE_TURN_ON if turn_on else SERVICE_TURN_OFF,
+            {ATTR_ENTITY_ID: entity_id},
+            on_done,
+        )
+
+    def start(self, on_done: OnDone = None) -> bool:
+        return self._switch(self._charge_switch_id, True, on_done)
+
+    def pause(self, on_done: OnDone = None) -> bool:
+        return self._switch(self._charge_switch_id, False, on_done)
+
+    def set_phases(self, phases: int, on_done: OnDone = None) -> bool:
+        # Switchen är på vid 3-fas och av vid 1-fas.
+        return self._switch(self._phase_switch_id, phases >= 3, on_done)
+
+    def select_phase(self, phase: int, on_done: OnDone = None) -> bool:
+        if not self._phase_select_id:
+            return False
+        return self._runner.async_call(
+            "select",
+            "select_option",
+            {ATTR_ENTITY_ID: self._phase_select_id, "option": PHASE_NAMES[phase]},
+            on_done,
+        )
+
+
+class OcppBackend(ChargerBackend):
+    """Laddpunkt ansluten till det lokala OCPP-centralsystemet."""
+
+    name = "ocpp"
+    # Laddpunkten är ansluten direkt på det lokala nätverket.
+    command_latency = timedelta(seconds=5)
+    # Antalet faser anges i laddprofilen.
+    supports_phase_switching = True
+
+    def __init__(
+        self,
+        runner: ServiceCallRunner,
+        central: OcppCentralSystem,
+        charge_point_id: str | None,
+    ) -> None:
+        """
+        Initialisera med tjänstekörningen, centralsystemet och laddpunkten som
+        styrs. Kommandona körs bakom tjänstekörningens kretsbrytare.
+        """
+        self._runner = runner
+        self._central = central
+        self._charge_point_id = charge_point_id
+        self._phases: int | None = None
+        # Senaste gränsen över 0A, som används när laddningen återupptas.
+        self._resume_limit_a: float | None = None
+
+    def map_status(self, raw_status: str) -> str:
+        status = raw_status.lower()
+        return GENERIC_STATUS_MAP.get(status, status)
+
+    def _dispatch(
+        self,
+        action: str,
+        command: Callable[[ChargePoint], Awaitable[bool]],
+        on_done: OnDone,
+    ) -> bool:
+        charge_point = self._central.charge_point(self._charge_point_id)
+        if charge_point is None:
+            _LOGGER.debug("Ingen OCPP-laddpunkt är ansluten. Kommandot skickas inte.")
+            return False
+
+        async def _async_command() -> bool:
+            try:
+                return await command(charge_point)
+            except (OcppError, ConnectionError) as e:
+                # Räknas av kretsbrytaren som andra misslyckade anrop.
+                raise HomeAssistantError(
+                    f"OCPP-laddpunkten {charge_point.id}: {str(e) or type(e).__name__}"
+                ) from e
+
+        return self._runner.async_run(f"ocpp.{action}", _async_command, on_done)
+
+    def set_current(self, current: float, on_done: OnDone = None) -> bool:
+        if current > 0:
+            self._resume_limit_a = current
+        phases = self._phases
+        return self._dispatch(
+            "set_current",
+            lambda cp: cp.async_set_current_limit(current, phases),
+            on_done,
+        )
+
+    def start(self, on_done: OnDone = None) -> bool:
+        async def _async_start(charge_point: ChargePoint) -> bool:
+            if charge_point.transaction_id is None:
+                return await charge_point.async_remote_start()
+            # En pausad transaktion återupptas genom att gränsen höjs igen.
+            if self._resume_limit_a is not None and not charge_point.limit_a:
+                return await charge_point.async_set_current_limit(
+                    self._resume_limit_a, self._phases
+                )
+            return True
+
+        return self._dispatch("start", _async_start, on_done)
+
+    def pause(self, on_done: OnDone = None) -> bool:
+        phases = self._phases
+        return self._dispatch(
+            "pause", lambda cp: cp.async_set_current_limit(0.0, phases), on_done
+        )
+
+    def set_phases(self, phases: int, on_done: OnDone = None) -> bool:
+        self._phases = phases
+        if self._resume_limit_a is None:
+            return True
+        return self.set_current(self._resume_limit_a, on_done)
+
+
+class FakeChargerBackend(ChargerBackend):
+    """
+    Lokal laddare för tester. Registrerar kommandona och sätter status- och
+    strömsensorerna direkt, som en laddare utan fördröjning.
+    """
+
+    name = "fake"
+    command_latency = timedelta(seconds=5)
+    supports_phase_switching = True
+    supports_phase_rotation = True
+    supports_charge_schedule = True
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        status_entity_id: str | None = None,
+        current_entity_id: str | None = None,
+    ) -> None:
+        """Initialisera med sensorerna som ska följa kommandona."""
+        self._hass = hass
+        self._status_entity_id = status_entity_id
+        self._current_entity_id = current_entity_id
+        self.commands: list[tuple[str, Any]] = []
+        self.phases = 3
+        self.phase: int | None = None
+        self.schedule: tuple[datetime, datetime] | None = None
+
+    def _record(
+        self, command: str, value: Any, on_done: OnDone, status: str | None = None
+    ) -> bool:
+        self.commands.append((command, value))
+        if status is not None and self._status_entity_id:
+            self._hass.states.async_set(self._status_entity_id, status)
+        if on_done is not None:
+            on_done(True)
+        return True
+
+    def set_current(self, current: float, on_done: OnDone = None) -> bool:
+        if self._current_entity_id:
+            self._hass.states.async_set(self._current_entity_id, str(current))
+        return self._record("current", current, on_done)
+
+    def start(self, on_done: OnDone = None) -> bool:
+        return self._record("start", True, on_done, EASEE_STATUS_CHARGING)
+
+    def pause(self, on_done: OnDone = None) -> bool:
+        return self._record("pause", True, on_done, EASEE_STATUS_PAUSED)
+
+    def set_phases(self, phases: int, on_done: OnDone = None) -> bool:
+        self.phases = phases
+        return self._record("phases", phases, on_done)
+
+    def select_phase(self, phase: int, on_done: OnDone = None) -> bool:
+        self.phase = phase
+        return self._record("phase", PHASE_NAMES[phase], on_done)
+
+    def set_charge_schedule(
+        self, start: datetime, stop: datetime, on_done: OnDone = None
+    ) -> bool:
+        self.schedule = (start, stop)
+        return self._record("schedule", (start, stop), on_done)
+
+    def clear_charge_schedule(self, on_done: OnDone = None) -> bool:
+        self.schedule = None
+        return self._record("schedule", None, on_done)
+
+
+def create_backend(
+    runner: ServiceCallRunner,
+    config: Mapping[str, Any],
+    central: OcppCentralSystem | None = None,
+) -> ChargerBackend:
+    """Skapar gränssnittet som valts i konfigurationen. Easee är standard."""
+    if central is not None:
+        return OcppBackend(runner, central, config.get(CONF_OCPP_CHARGE_POINT_ID))
+    if config.get(CONF_CHARGER_BACKEND) == CHARGER_BACKEND_GENERIC:
+        return GenericEntityBackend(
+            runner,
+            config.get(CONF_GENERIC_CURRENT_NUMBER),
+            config.get(CONF_GENERIC_CHARGE_SWITCH),
+            config.get(CONF_GENERIC_PHASE_SWITCH),
+            config.get(CONF_GENERIC_PHASE_SELECT),
+        )
+    return EaseeBackend(runner, config.get(CONF_CHARGER_DEVICE))
@@ -0,0 +1,105 @@
+# File version: 2025-06-05 0.2.0
+"""Förväntat tillstånd hos laddaren medan molnets status släpar efter.
+
+Easees status uppdateras sekunder till minuter efter ett kommando. Under tiden
+ser styrningen fortfarande t.ex. 'ready_to_charge' eller 'paused' och skulle
+skicka start och strömgräns igen. Direkt efter ett kommando används därför
+det förväntade tillståndet: laddar efter start, pausad efter paus och den
+skickade strömgränsen.
+
+Förväntningen gäller så länge kommandot väntar på bekräftelse (se
+command_tracker). Den släpps när sensorn bekräftar effekten, när sensorn
+ändras till något annat efter kommandot (förväntningen motsägs) eller när
+tidsgränsen för bekräftelse har passerats.
+"""
+
+import logging
+from datetime import datetime
+
+from .command_tracker import (
+    COMMAND_CURRENT,
+    COMMAND_PAUSE,
+    COMMAND_START,
+    CURRENT_TOLERANCE_A,
+    CommandTracker,
+    PendingCommand,
+)
+from .const import (
+    DOMAIN,
+    EASEE_STATUS_CHARGING,
+    EASEE_STATUS_PAUSED,
+)
+
+_LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
+
+# Status som laddaren förväntas gå över till efter kommandot.
+PREDICTED_STATUS = {
+    COMMAND_START: EASEE_STATUS_CHARGING,
+    COMMAND_PAUSE: EASEE_STATUS_PAUSED,
+}
+
+
+class ChargerStateModel:
+    """Lägger förväntade övergångar ovanpå laddarens rapporterade tillstånd."""
+
+    def __init__(self, tracker: CommandTracker) -> None:
+        """Initialisera med uppföljningen av skickade kommandon."""
+        self._tracker = tracker
+        self.predicted_status: str | None = None
+        self.predicted_current: float | None = None
+        self.contradictions = 0
+
+    def _active(
+        self, command: str, changed_at: datetime | None, matches: bool, now: datetime
+    ) -> PendingCommand | None:
+        """
+        Det väntande kommandot om dess förväntning fortfarande gäller. En
+        sensor som ändrats efter kommandot utan att visa effekten motsäger den.
+        """
+        pending = self._tracker.pending.get(command)
+        if pending is None or pending.contradicted or now >= pending.deadline:
+            return None
+        if changed_at is not None and changed_at > pending.last_sent and not matches:
+            pending.contradicted = True
+            self.contradictions += 1
+            _LOGGER.info(
+                "Laddarens sensor motsäger det förväntade tillståndet efter "
+                "kommandot %s. Använder det rapporterade tillståndet.",
+                command,
+            )
+            return None
+        return pending
+
+    def status(
+        self, reported: str, changed_at: datetime | None, now: datetime
+    ) -> str:
+        """Status att fatta beslut på: den förväntade om en sådan gäller."""
+        self.predicted_status = None
+        for command, predicted in PREDICTED_STATUS.items():
+            if self._active(command, changed_at, reported == predicted, now):
+                self.predicted_status = predicted
+                if reported != predicted:
+                    _LOGGER.debug(
+                        "Laddaren rapporterar '%s', förväntas vara '%s' efter %s.",
+                        reported,
+                        predicted,
+                        command,
+                    )
+                return predicted
+        return reported
+
+    def current(
+        self, reported: float | None, changed_at: datetime | None, now: datetime
+    ) -> float | None:
+        """Strömgräns att fatta beslut på: den skickade om den väntar på bekräftelse."""
+        self.predicted_current = None
+        pending = self._tracker.pending.get(COMMAND_CURRENT)
+        matches = (
+            reported is not None
+            and pending is not None
+            and abs(reported - pending.value) <= CURRENT_TOLERANCE_A
+        )
+        if self._active(COMMAND_CURRENT, changed_at, matches, now) is None:
+            return reported
+        self.predicted_current = float(pending.value)
+        return self.predicted_current
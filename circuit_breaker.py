@@ -0,0 +1,252 @@
+# File version: 2025-06-05 0.2.0
+"""Kretsbrytare och bakgrundskörning för tjänsteanrop till laddaren.
+
+När Easee-integrationen är otillgänglig misslyckas varje tjänsteanrop, och
+koordinatorn försökte tidigare igen varje cykel hur länge som helst. Varje
+tjänst har därför en kretsbrytare:
+
+* Stängd: anropen går igenom. Efter ett antal fel i följd öppnas brytaren.
+* Öppen: anropen stoppas direkt, tills vilotiden har gått.
+* Halvöppen: ett provanrop släpps igenom. Lyckas det stängs brytaren, annars
+  öppnas den igen.
+
+Anropen körs som bakgrundsuppgifter med tidsgräns, så att ett långsamt anrop
+till molnet aldrig förlänger koordinatorns cykel. Anrop som inte är tjänster,
+t.ex. till en OCPP-laddpunkt, körs på samma sätt med async_run.
+"""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Mapping
+from datetime import datetime, timedelta
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.util.dt as dt_util
+
+from .const import (
+    DOMAIN,
+    CONF_BREAKER_FAILURE_THRESHOLD,
+    CONF_BREAKER_RESET_SECONDS,
+    DEFAULT_BREAKER_FAILURE_THRESHOLD,
+    DEFAULT_BREAKER_RESET_SECONDS,
+)
+
+_LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# Längsta tid ett anrop får ta innan det räknas som misslyckat.
+CALL_TIMEOUT_SECONDS = 15
+
+
+class CircuitBreaker:
+    """Kretsbrytare för en tjänst."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: timedelta) -> None:
+        """Initialisera med antal fel i följd som öppnar brytaren och vilotiden."""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened_at: datetime | None = None
+        self.last_error: str | None = None
+        self._trial_in_flight = False
+
+    def allow(self, now: datetime) -> bool:
+        """Om ett anrop får göras nu. En öppen brytare blir halvöppen efter vilotid."""
+        if self.state == STATE_OPEN:
+            if self.opened_at is not None and now - self.opened_at < self.reset_timeout:
+                return False
+            self.state = STATE_HALF_OPEN
+            self._trial_in_flight = False
+        if self.state == STATE_HALF_OPEN:
+            # Bara ett provanrop åt gången.
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        """Ett lyckat anrop stänger brytaren."""
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self, now: datetime, error: str) -> None:
+        """Ett misslyckat anrop. Öppnar brytaren vid tröskeln eller efter provanrop."""
+        self.failures += 1
+        self.last_error = error
+        self._trial_in_flight = False
+        if self.state == STATE_HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = STATE_OPEN
+            self.opened_at = now
+
+    def release_trial(self) -> None:
+        """Ett avbrutet provanrop räknas varken som fel eller lyckat."""
+        self._trial_in_flight = False
+
+    def as_dict(self) -> dict[str, Any]:
+        """Brytarens tillstånd för diagnostiksensorn."""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "opened_at": self.opened_at.isoformat() if self.opened_at else None,
+            "last_error": self.last_error,
+        }
+
+
+class ServiceCallRunner:
+    """Kör tjänsteanrop i bakgrunden bakom en kretsbrytare per tjänst."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        failure_threshold: int = DEFAULT_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: timedelta = timedelta(seconds=DEFAULT_BREAKER_RESET_SECONDS),
+        call_timeout: float = CALL_TIMEOUT_SECONDS,
+    ) -> None:
+        """Initialisera med brytarnas tröskel och vilotid."""
+        self._hass = hass
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._call_timeout = call_timeout
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    @classmethod
+    def from_config(
+        cls, hass: HomeAssistant, config: Mapping[str, Any]
+    ) -> "ServiceCallRunner":
+        """Skapar körningen med tröskel och vilotid från konfigurationen."""
+        threshold = config.get(CONF_BREAKER_FAILURE_THRESHOLD)
+        reset_seconds = config.get(CONF_BREAKER_RESET_SECONDS)
+        return cls(
+            hass,
+            int(threshold) if threshold else DEFAULT_BREAKER_FAILURE_THRESHOLD,
+            timedelta(
+                seconds=float(reset_seconds)
+                if reset_seconds
+                else DEFAULT_BREAKER_RESET_SECONDS
+            ),
+        )
+
+    def breaker(self, domain: str, service: str) -> CircuitBreaker:
+        """Brytaren för tjänsten. Skapas vid första anropet."""
+        return self._breaker(f"{domain}.{service}")
+
+    def _breaker(self, name: str) -> CircuitBreaker:
+        if name not in self.breakers:
+            self.breakers[name] = CircuitBreaker(
+                self._failure_threshold, self._reset_timeout
+            )
+        return self.breakers[name]
+
+    def async_call(
+        self,
+        domain: str,
+        service: str,
+        data: dict[str, Any],
+        on_done: Callable[[bool], None] | None = None,
+    ) -> bool:
+        """
+        Startar anropet i bakgrunden om brytaren tillåter det. Returnerar False
+        om brytaren är öppen. Anropets utfall rapporteras till on_done.
+        """
+
+        async def _async_call_service() -> None:
+            await self._hass.services.async_call(domain, service, data, blocking=True)
+
+        return self.async_run(f"{domain}.{service}", _async_call_service, on_done)
+
+    def async_run(
+        self,
+        name: str,
+        call: Callable[[], Awaitable[bool | None]],
+        on_done: Callable[[bool], None] | None = None,
+    ) -> bool:
+        """
+        Startar ett anrop i bakgrunden bakom brytaren med namnet, på samma sätt
+        som ett tjänsteanrop. Om anropet returnerar False har mottagaren avvisat
+        det. Det rapporteras som misslyckat men räknas inte som fel i brytaren.
+        """
+        breaker = self._breaker(name)
+        if not breaker.allow(dt_util.utcnow()):
+            _LOGGER.debug(
+                "Kretsbrytaren för %s är öppen. Anropet skickas inte.", name
+            )
+            return False
+        task = self._hass.async_create_task(
+            self._async_run(breaker, name, call, on_done), f"{DOMAIN} {name}"
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _async_run(
+        self,
+        breaker: CircuitBreaker,
+        name: str,
+        call: Callable[[], Awaitable[bool | None]],
+        on_done: Callable[[bool], None] | None,
+    ) -> None:
+        try:
+            async with asyncio.timeout(self._call_timeout):
+                accepted = await call() is not False
+        except asyncio.CancelledError:
+            # Ett avbrutet provanrop får inte låsa brytaren i halvöppet läge.
+            breaker.release_trial()
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            was_open = breaker.state == STATE_OPEN
+            breaker.record_failure(dt_util.utcnow(), error)
+            if not isinstance(e, (HomeAssistantError, TimeoutError)):
+                _LOGGER.warning(
+                    "Oväntat fel i anropet %s: %s", name, error, exc_info=True
+                )
+            if breaker.state == STATE_OPEN and not was_open:
+                _LOGGER.warning(
+                    "Kretsbrytaren för %s öppnas efter %d fel i följd: %s",
+                    name,
+                    breaker.failures,
+                    error,
+                )
+            else:
+                _LOGGER.debug("Anropet %s misslyckades: %s", name, error)
+            if on_done is not None:
+                on_done(False)
+            return
+        if breaker.state != STATE_CLOSED:
+            _LOGGER.info("Kretsbrytaren för %s stängs igen.", name)
+        breaker.record_success()
+        if on_done is not None:
+            on_done(accepted)
+
+    @property
+    def in_flight(self) -> int:
+        """Antal anrop som pågår i bakgrunden."""
+        return len(self._tasks)
+
+    def overall_state(self) -> str:
+        """Sämsta tillståndet bland brytarna."""
+        states = {breaker.state for breaker in self.breakers.values()}
+        for state in (STATE_OPEN, STATE_HALF_OPEN):
+            if state in states:
+                return state
+        return STATE_CLOSED
+
+    async def async_wait(self) -> None:
+        """Väntar tills pågående anrop är klara (högst anropens tidsgräns)."""
+        if self._tasks:
+            await asyncio.wait(list(self._tasks))
+
+    def async_cancel(self) -> None:
+        """Avbryter pågående anrop, t.ex. vid avlastning."""
+        for task in list(self._tasks):
+            task.cancel()
+        self._tasks.clear()
@@ -0,0 +1,229 @@
+# File version: 2025-06-05 0.2.0
+"""Bekräftelse av kommandon till laddaren med omsändning och backoff.
+
+Kommandona till Easee skickas utan att vänta på svar, och molnet kan tappa
+dem. Utan uppföljning väntar koordinatorn antingen en hel cykel eller skickar
+samma kommando varje cykel. Varje kommando registreras därför med sin
+förväntade effekt: en strömgräns ska synas i sensorn för dynamisk ström, start
+ska ge status laddar och paus en status som inte är laddar.
+
+Så länge bekräftelsen dröjer skickas samma kommando inte igen. Har effekten
+inte synts inom tidsgränsen får kommandot skickas om, och tidsgränsen
+fördubblas för varje försök (med slumpmässig spridning, så att flera laddare
+inte skickar om samtidigt). Tiden till bekräftelse samlas i ett histogram per
+kommando.
+"""
+
+import logging
+import random
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from typing import Any
+
+from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, State, callback
+from homeassistant.helpers.event import async_track_state_change_event
+import homeassistant.util.dt as dt_util
+
+from .const import (
+    DOMAIN,
+    EASEE_STATUS_CHARGING,
+    EASEE_STATUS_COMPLETED,
+    EASEE_STATUS_OFFLINE,
+)
+
+_LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
+
+COMMAND_CURRENT = "current"
+COMMAND_START = "start"
+COMMAND_PAUSE = "pause"
+
+# Första tidsgränsen för bekräftelse. Fördubblas per försök upp till taket.
+ACK_TIMEOUT = timedelta(seconds=20)
+MAX_ACK_TIMEOUT = timedelta(minutes=5)
+# Tidsgränsen sprids slumpmässigt med ±20 %.
+JITTER = 0.2
+# Övre gränser (sekunder) för histogrammets intervall. Det sista är öppet.
+LATENCY_BUCKETS_S = (2, 5, 10, 30, 60, 120)
+# Tillåten skillnad (A) mellan begärd och rapporterad strömgräns.
+CURRENT_TOLERANCE_A = 0.5
+
+
+class PendingCommand:
+    """Ett skickat kommando som väntar på bekräftelse."""
+
+    def __init__(self, value: Any, first_sent: datetime) -> None:
+        """Initialisera med kommandots värde och när det först skickades."""
+        self.value = value
+        self.first_sent = first_sent
+        self.last_sent = first_sent
+        self.deadline = first_sent
+        self.attempts = 1
+        # Sätts när sensorn ändrats till något annat än den förväntade effekten.
+        self.contradicted = False
+
+
+class CommandTracker:
+    """Följer upp kommandon till laddaren mot statussensorn och strömsensorn."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        status_entity_id: str | None,
+        current_entity_id: str | None,
+        jitter: float = JITTER,
+        ack_timeout: timedelta = ACK_TIMEOUT,
+        map_status: Callable[[str], str] = str.lower,
+    ) -> None:
+        """
+        Initialisera med sensorerna som visar kommandonas effekt, laddarens
+        första tidsgräns för bekräftelse och översättningen av dess status.
+        """
+        self._hass = hass
+        self._status_entity_id = status_entity_id
+        self._current_entity_id = current_entity_id
+        self._jitter = jitter
+        self._ack_timeout = ack_timeout
+        self._map_status = map_status
+        self._unsub: CALLBACK_TYPE | None = None
+        self.pending: dict[str, PendingCommand] = {}
+        self.latency_histogram: dict[str, list[int]] = {}
+        self.retries = 0
+        self.last_ack_latency_s: float | None = None
+
+    @callback
+    def async_start(self) -> None:
+        """Börjar följa sensorerna så att bekräftelser registreras direkt."""
+        self.async_stop()
+        entity_ids = [
+            entity_id
+            for entity_id in (self._status_entity_id, self._current_entity_id)
+            if entity_id
+        ]
+        if entity_ids:
+            self._unsub = async_track_state_change_event(
+                self._hass, entity_ids, self._handle_state_change
+            )
+
+    @callback
+    def async_stop(self) -> None:
+        """Slutar följa sensorerna."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+
+    @callback
+    def _handle_state_change(self, event: Event) -> None:
+        if self.pending:
+            self.confirm(dt_util.utcnow())
+
+    def tracks(self, command: str) -> bool:
+        """Om kommandots effekt kan läsas av, dvs. om sensorn är konfigurerad."""
+        if command == COMMAND_CURRENT:
+            return bool(self._current_entity_id)
+        return bool(self._status_entity_id)
+
+    def should_send(self, command: str, value: Any, now: datetime) -> bool:
+        """
+        Om kommandot ska skickas. Samma kommando med samma värde skickas inte
+        igen så länge bekräftelsen väntas, utan först när tidsgränsen passerats.
+        """
+        if not self.tracks(command):
+            return True
+        self.confirm(now)
+        pending = self.pending.get(command)
+        if pending is None or pending.value != value:
+            return True
+        if now < pending.deadline:
+            return False
+        _LOGGER.warning(
+            "Laddaren har inte bekräftat kommandot %s (%s) efter %.0f s. "
+            "Skickar igen (försök %d).",
+            command,
+            value,
+            (now - pending.first_sent).total_seconds(),
+            pending.attempts + 1,
+        )
+        return True
+
+    def record_sent(self, command: str, value: Any, now: datetime) -> None:
+        """Registrerar ett skickat kommando och dess tidsgräns för bekräftelse."""
+        if not self.tracks(command):
+            return
+        # Start och paus ersätter varandra.
+        for opposite in {
+            COMMAND_START: (COMMAND_PAUSE,),
+            COMMAND_PAUSE: (COMMAND_START,),
+        }.get(command, ()):
+            self.pending.pop(opposite, None)
+        pending = self.pending.get(command)
+        if pending is not None and pending.value == value:
+            pending.attempts += 1
+            pending.last_sent = now
+            pending.contradicted = False
+            self.retries += 1
+        else:
+            pending = self.pending[command] = PendingCommand(value, now)
+        pending.deadline = now + self._timeout(pending.attempts)
+
+    def _timeout(self, attempts: int) -> timedelta:
+        timeout = min(self._ack_timeout * 2 ** (attempts - 1), MAX_ACK_TIMEOUT)
+        return timeout * random.uniform(1 - self._jitter, 1 + self._jitter)
+
+    def confirm(self, now: datetime) -> None:
+        """Bekräftar de väntande kommandon vars effekt syns i sensorerna."""
+        for command, pending in list(self.pending.items()):
+            if self._effect_visible(command, pending.value):
+                del self.pending[command]
+                self._record_latency(command, now - pending.first_sent)
+
+    def _state(self, entity_id: str | None) -> State | None:
+        return self._hass.states.get(entity_id) if entity_id else None
+
+    def _effect_visible(self, command: str, value: Any) -> bool:
+        if command == COMMAND_CURRENT:
+            state = self._state(self._current_entity_id)
+            try:
+                current = float(state.state) if state is not None else None
+            except (TypeError, ValueError):
+                return False
+            return current is not None and abs(current - value) <= CURRENT_TOLERANCE_A
+        state = self._state(self._status_entity_id)
+        if state is None:
+            return False
+        status = self._map_status(state.state)
+        if command == COMMAND_START:
+            return status in (EASEE_STATUS_CHARGING, EASEE_STATUS_COMPLETED)
+        return status not in (
+            EASEE_STATUS_CHARGING,
+            EASEE_STATUS_OFFLINE,
+            STATE_UNAVAILABLE,
+            STATE_UNKNOWN,
+        )
+
+    def _record_latency(self, command: str, latency: timedelta) -> None:
+        seconds = max(0.0, latency.total_seconds())
+        self.last_ack_latency_s = seconds
+        buckets = self.latency_histogram.setdefault(
+            command, [0] * (len(LATENCY_BUCKETS_S) + 1)
+        )
+        index = next(
+            (i for i, edge in enumerate(LATENCY_BUCKETS_S) if seconds <= edge),
+            len(LATENCY_BUCKETS_S),
+        )
+        buckets[index] += 1
+        _LOGGER.debug("Kommandot %s bekräftat efter %.1f s.", command, seconds)
+
+    def clear(self) -> None:
+        """Glömmer väntande kommandon, t.ex. när bilen kopplas ur."""
+        self.pending.clear()
+
+    def histogram_data(self) -> dict[str, dict[str, int]]:
+        """Histogrammet per kommando med intervallen som nycklar."""
+        labels = [f"<={edge}s" for edge in LATENCY_BUCKETS_S] + [
+            f">{LATENCY_BUCKETS_S[-1]}s"
+        ]
+        return {
+            command: dict(zip(labels, buckets))
+            for command, buckets in self.latency_histogram.items()
+        }
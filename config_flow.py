@@ -21,6 +21,13 @@ from homeassistant.helpers.selector import (
     NumberSelectorMode,
     BooleanSelector,
     BooleanSelectorConfig,
+    SelectSelector,
+    SelectSelectorConfig,
+    SelectSelectorMode,
+    TextSelector,
+    TextSelectorConfig,
+    TimeSelector,
+    TimeSelectorConfig,
 )
 from homeassistant.components.sensor import SensorDeviceClass
 import homeassistant.helpers.config_validation as cv
@@ -36,14 +43,65 @@ from .const import (
     CONF_SOLAR_SCHEDULE_ENTITY,
     CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
     CONF_CHARGER_DYNAMIC_CURRENT_SENSOR,
+    CONF_CHARGER_POWER_SENSOR,
     CONF_SCAN_INTERVAL,
     CONF_CHARGER_ENABLED_SWITCH_ID,
     CONF_EV_SOC_SENSOR,
     CONF_TARGET_SOC_LIMIT,
     CONF_DEBUG_LOGGING,
+    CONF_PEAK_SHAVING_ENABLED,
+    CONF_PEAK_SHAVING_TOP_N,
+    CONF_PEAK_SHAVING_CEILING_KW,
+    CONF_PRICE_THRESHOLD_MODE,
+    PRICE_THRESHOLD_MODE_ABSOLUTE,
+    PRICE_THRESHOLD_MODES,
+    CONF_TARIFF_ENERGY_TAX,
+    CONF_TARIFF_GRID_FEE,
+    CONF_TARIFF_VAT_PERCENT,
+    CONF_TARIFF_TIME_OF_USE,
+    CONF_EXPORT_PRICE_SENSOR,
+    CONF_EXPORT_PRICE_FACTOR,
+    CONF_EXPORT_PRICE_OFFSET,
+    CONF_DEPARTURE_TIME,
+    CONF_SOLAR_FORECAST_SENSORS,
+    CONF_HOUSE_BASE_LOAD_W,
+    CONF_EV_BATTERY_CAPACITY_KWH,
+    CONF_LOCAL_SOLAR_MODEL,
+    CONF_CHARGING_EFFICIENCY_PERCENT,
+    CONF_EV_SOC_REFRESH_ENTITY,
+    CONF_DEPARTURE_OVERRIDE_ENTITY,
+    CONF_DEADLINE_SOC_PERCENT,
+    CONF_DEADLINE_ENERGY_KWH,
+    CONF_EASEE_SCHEDULE_UPLOAD,
+    CONF_BREAKER_FAILURE_THRESHOLD,
+    CONF_BREAKER_RESET_SECONDS,
+    CONF_CHARGER_BACKEND,
+    CHARGER_BACKEND_EASEE,
+    CHARGER_BACKENDS,
+    CONF_GENERIC_CURRENT_NUMBER,
+    CONF_GENERIC_CHARGE_SWITCH,
+    CONF_GENERIC_PHASE_SWITCH,
+    CONF_OCPP_PORT,
+    CONF_OCPP_CHARGE_POINT_ID,
+    CONF_MODBUS_HOST,
+    CONF_MODBUS_PORT,
+    CONF_MODBUS_UNIT_ID,
+    CONF_MODBUS_INPUT_REGISTERS,
+    CONF_MODBUS_SOLAR_REGISTER,
+    CONF_MODBUS_GRID_REGISTER,
+    CONF_MODBUS_POLL_INTERVAL,
+    CONF_METER_INGEST,
+    CONF_METER_PHASE_SENSORS,
+    CONF_GENERIC_PHASE_SELECT,
+    CONF_MAIN_FUSE_A,
+    CONF_CHARGER_PHASE_MAPPING,
+    CONF_EV_CHARGING_PHASES,
     DEFAULT_NAME,
     DEFAULT_SCAN_INTERVAL_SECONDS,
 )
+from .modbus_reader import parse_register
+from .phase_balancer import format_phase_mapping, parse_phase_mapping
+from .tariff import parse_time_of_use_windows
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -58,12 +116,93 @@ ALL_CONF_KEYS = [
     CONF_SOLAR_SCHEDULE_ENTITY,
     CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
     CONF_CHARGER_DYNAMIC_CURRENT_SENSOR,
+    CONF_CHARGER_POWER_SENSOR,
     CONF_SCAN_INTERVAL,
     CONF_EV_SOC_SENSOR,
     CONF_TARGET_SOC_LIMIT,
     CONF_DEBUG_LOGGING,
+    CONF_PEAK_SHAVING_ENABLED,
+    CONF_PEAK_SHAVING_TOP_N,
+    CONF_PEAK_SHAVING_CEILING_KW,
+    CONF_PRICE_THRESHOLD_MODE,
+    CONF_TARIFF_ENERGY_TAX,
+    CONF_TARIFF_GRID_FEE,
+    CONF_TARIFF_VAT_PERCENT,
+    CONF_TARIFF_TIME_OF_USE,
+    CONF_EXPORT_PRICE_SENSOR,
+    CONF_EXPORT_PRICE_FACTOR,
+    CONF_EXPORT_PRICE_OFFSET,
+    CONF_DEPARTURE_TIME,
+    CONF_SOLAR_FORECAST_SENSORS,
+    CONF_HOUSE_BASE_LOAD_W,
+    CONF_EV_BATTERY_CAPACITY_KWH,
+    CONF_LOCAL_SOLAR_MODEL,
+    CONF_CHARGING_EFFICIENCY_PERCENT,
+    CONF_EV_SOC_REFRESH_ENTITY,
+    CONF_DEPARTURE_OVERRIDE_ENTITY,
+    CONF_DEADLINE_SOC_PERCENT,
+    CONF_DEADLINE_ENERGY_KWH,
+    CONF_EASEE_SCHEDULE_UPLOAD,
+    CONF_BREAKER_FAILURE_THRESHOLD,
+    CONF_BREAKER_RESET_SECONDS,
+    CONF_CHARGER_BACKEND,
+    CONF_GENERIC_CURRENT_NUMBER,
+    CONF_GENERIC_CHARGE_SWITCH,
+    CONF_GENERIC_PHASE_SWITCH,
+    CONF_OCPP_PORT,
+    CONF_OCPP_CHARGE_POINT_ID,
+    CONF_MODBUS_HOST,
+    CONF_MODBUS_PORT,
+    CONF_MODBUS_UNIT_ID,
+    CONF_MODBUS_INPUT_REGISTERS,
+    CONF_MODBUS_SOLAR_REGISTER,
+    CONF_MODBUS_GRID_REGISTER,
+    CONF_MODBUS_POLL_INTERVAL,
+    CONF_METER_INGEST,
+    CONF_METER_PHASE_SENSORS,
+    CONF_GENERIC_PHASE_SELECT,
+    CONF_MAIN_FUSE_A,
+    CONF_CHARGER_PHASE_MAPPING,
+    CONF_EV_CHARGING_PHASES,
 ]
 
+BOOLEAN_CONF_KEYS = [
+    CONF_DEBUG_LOGGING,
+    CONF_PEAK_SHAVING_ENABLED,
+    CONF_LOCAL_SOLAR_MODEL,
+    CONF_EASEE_SCHEDULE_UPLOAD,
+    CONF_MODBUS_INPUT_REGISTERS,
+    CONF_METER_INGEST,
+]
+
+# Valfria numeriska fält: nyckel -> (min, max, felkod vid ogiltigt värde)
+OPTIONAL_NUMBER_CONF_RANGES = {
+    CONF_TARGET_SOC_LIMIT: (0, 100, "invalid_target_soc"),
+    CONF_PEAK_SHAVING_TOP_N: (1, 10, "invalid_peak_shaving_top_n"),
+    CONF_PEAK_SHAVING_CEILING_KW: (0, 100, "invalid_peak_shaving_ceiling"),
+    CONF_TARIFF_ENERGY_TAX: (0, 10, "invalid_tariff_energy_tax"),
+    CONF_TARIFF_GRID_FEE: (0, 10, "invalid_tariff_grid_fee"),
+    CONF_TARIFF_VAT_PERCENT: (0, 100, "invalid_tariff_vat_percent"),
+    CONF_EXPORT_PRICE_FACTOR: (0, 2, "invalid_export_price_factor"),
+    CONF_EXPORT_PRICE_OFFSET: (-5, 5, "invalid_export_price_offset"),
+    CONF_HOUSE_BASE_LOAD_W: (0, 50000, "invalid_house_base_load"),
+    CONF_EV_BATTERY_CAPACITY_KWH: (1, 250, "invalid_battery_capacity"),
+    CONF_CHARGING_EFFICIENCY_PERCENT: (50, 100, "invalid_charging_efficiency"),
+    CONF_DEADLINE_SOC_PERCENT: (1, 100, "invalid_deadline_soc"),
+    CONF_DEADLINE_ENERGY_KWH: (0.5, 250, "invalid_deadline_energy"),
+    CONF_BREAKER_FAILURE_THRESHOLD: (1, 20, "invalid_breaker_threshold"),
+    CONF_BREAKER_RESET_SECONDS: (10, 3600, "invalid_breaker_reset"),
+    CONF_OCPP_PORT: (1024, 65535, "invalid_ocpp_port"),
+    CONF_MODBUS_PORT: (1, 65535, "invalid_modbus_port"),
+    CONF_MODBUS_UNIT_ID: (0, 247, "invalid_modbus_unit_id"),
+    CONF_MODBUS_POLL_INTERVAL: (0.5, 10, "invalid_modbus_poll_interval"),
+    CONF_MAIN_FUSE_A: (6, 250, "invalid_main_fuse"),
+    CONF_EV_CHARGING_PHASES: (1, 3, "invalid_ev_charging_phases"),
+}
+
+# Modbus-register som textfält, se modbus_reader.parse_register.
+MODBUS_REGISTER_CONF_KEYS = [CONF_MODBUS_SOLAR_REGISTER, CONF_MODBUS_GRID_REGISTER]
+
 OPTIONAL_ENTITY_CONF_KEYS = [
     CONF_TIME_SCHEDULE_ENTITY,
     CONF_HOUSE_POWER_SENSOR,
@@ -71,9 +210,30 @@ OPTIONAL_ENTITY_CONF_KEYS = [
     CONF_SOLAR_SCHEDULE_ENTITY,
     CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
     CONF_CHARGER_DYNAMIC_CURRENT_SENSOR,
+    CONF_CHARGER_POWER_SENSOR,
     CONF_EV_SOC_SENSOR,
+    CONF_EXPORT_PRICE_SENSOR,
+    CONF_SOLAR_FORECAST_SENSORS,
+    CONF_EV_SOC_REFRESH_ENTITY,
+    CONF_DEPARTURE_OVERRIDE_ENTITY,
+    CONF_GENERIC_CURRENT_NUMBER,
+    CONF_GENERIC_CHARGE_SWITCH,
+    CONF_GENERIC_PHASE_SWITCH,
+    CONF_METER_PHASE_SENSORS,
+    CONF_GENERIC_PHASE_SELECT,
 ]
-MAYBE_SELECTOR_CONF_KEYS = OPTIONAL_ENTITY_CONF_KEYS + [CONF_TARGET_SOC_LIMIT]
+MAYBE_SELECTOR_CONF_KEYS = (
+    OPTIONAL_ENTITY_CONF_KEYS
+    + list(OPTIONAL_NUMBER_CONF_RANGES)
+    + MODBUS_REGISTER_CONF_KEYS
+    + [
+        CONF_TARIFF_TIME_OF_USE,
+        CONF_DEPARTURE_TIME,
+        CONF_OCPP_CHARGE_POINT_ID,
+        CONF_MODBUS_HOST,
+        CONF_CHARGER_PHASE_MAPPING,
+    ]
+)
 
 REQUIRED_CONF_SETUP_KEYS = [
     CONF_CHARGER_DEVICE,
@@ -94,6 +254,53 @@ def coerce_empty_string_to_none(value):
     return value
 
 
+def _parse_optional_number(conf_key: str, value: Any) -> tuple[float | None, str | None]:
+    """Tolkar ett valfritt numeriskt fält. Returnerar (värde, felkod)."""
+    if value is None or value == "" or str(value).strip() == "":
+        return None, None
+    min_val, max_val, error_key = OPTIONAL_NUMBER_CONF_RANGES[conf_key]
+    try:
+        number_val = float(value)
+    except (ValueError, TypeError):
+        return None, error_key
+    if not (min_val <= number_val <= max_val):
+        return None, error_key
+    return number_val, None
+
+
+def _parse_time_of_use(value: Any) -> tuple[str | None, str | None]:
+    """Validerar tidsfönstren för överföringsavgiften. Returnerar (text, felkod)."""
+    if value is None or str(value).strip() == "":
+        return None, None
+    try:
+        parse_time_of_use_windows(str(value))
+    except ValueError:
+        return None, "invalid_tariff_time_of_use"
+    return str(value).strip(), None
+
+
+def _parse_modbus_register(value: Any) -> tuple[str | None, str | None]:
+    """Validerar ett Modbus-register. Returnerar (text, felkod)."""
+    if value is None or str(value).strip() == "":
+        return None, None
+    try:
+        parse_register(str(value))
+    except ValueError:
+        return None, "invalid_modbus_register"
+    return str(value).strip(), None
+
+
+def _parse_phase_mapping(value: Any) -> tuple[str | None, str | None]:
+    """Validerar laddarens fasmappning. Returnerar (text, felkod)."""
+    if value is None or str(value).strip() == "":
+        return None, None
+    try:
+        mapping = parse_phase_mapping(str(value))
+    except ValueError:
+        return None, "invalid_charger_phase_mapping"
+    return format_phase_mapping(mapping), None
+
+
 def _build_common_schema(
     current_settings: dict[str, Any],
     user_input_for_repopulating: dict | None = None,
@@ -112,7 +319,45 @@ def _build_common_schema(
     defined_fields_with_selectors = OrderedDict()
     defined_fields_with_selectors[CONF_CHARGER_DEVICE] = (
         _get_current_or_repop_value(CONF_CHARGER_DEVICE),
-        DeviceSelector(DeviceSelectorConfig(integration="easee")),
+        DeviceSelector(DeviceSelectorConfig()),
+    )
+    defined_fields_with_selectors[CONF_CHARGER_BACKEND] = (
+        _get_current_or_repop_value(CONF_CHARGER_BACKEND, CHARGER_BACKEND_EASEE),
+        SelectSelector(
+            SelectSelectorConfig(
+                options=CHARGER_BACKENDS,
+                mode=SelectSelectorMode.DROPDOWN,
+                translation_key=CONF_CHARGER_BACKEND,
+            )
+        ),
+    )
+    defined_fields_with_selectors[CONF_GENERIC_CURRENT_NUMBER] = (
+        _get_current_or_repop_value(CONF_GENERIC_CURRENT_NUMBER),
+        EntitySelector(EntitySelectorConfig(domain="number", multiple=False)),
+    )
+    defined_fields_with_selectors[CONF_GENERIC_CHARGE_SWITCH] = (
+        _get_current_or_repop_value(CONF_GENERIC_CHARGE_SWITCH),
+        EntitySelector(EntitySelectorConfig(domain="switch", multiple=False)),
+    )
+    defined_fields_with_selectors[CONF_GENERIC_PHASE_SWITCH] = (
+        _get_current_or_repop_value(CONF_GENERIC_PHASE_SWITCH),
+        EntitySelector(EntitySelectorConfig(domain="switch", multiple=False)),
+    )
+    defined_fields_with_selectors[CONF_GENERIC_PHASE_SELECT] = (
+        _get_current_or_repop_value(CONF_GENERIC_PHASE_SELECT),
+        EntitySelector(EntitySelectorConfig(domain="select", multiple=False)),
+    )
+    defined_fields_with_selectors[CONF_OCPP_PORT] = (
+        _get_current_or_repop_value(CONF_OCPP_PORT),
+        NumberSelector(
+            NumberSelectorConfig(
+                min=1024, max=65535, step=1, mode=NumberSelectorMode.BOX
+            )
+        ),
+    )
+    defined_fields_with_selectors[CONF_OCPP_CHARGE_POINT_ID] = (
+        _get_current_or_repop_value(CONF_OCPP_CHARGE_POINT_ID),
+        TextSelector(TextSelectorConfig()),
     )
     defined_fields_with_selectors[CONF_STATUS_SENSOR] = (
         _get_current_or_repop_value(CONF_STATUS_SENSOR),
@@ -138,6 +383,36 @@ def _build_common_schema(
             )
         ),
     )
+    defined_fields_with_selectors[CONF_METER_INGEST] = (
+        _get_current_or_repop_value(CONF_METER_INGEST, False),
+        BooleanSelector(BooleanSelectorConfig()),
+    )
+    defined_fields_with_selectors[CONF_METER_PHASE_SENSORS] = (
+        _get_current_or_repop_value(CONF_METER_PHASE_SENSORS),
+        EntitySelector(EntitySelectorConfig(domain="sensor", multiple=True)),
+    )
+    defined_fields_with_selectors[CONF_MAIN_FUSE_A] = (
+        _get_current_or_repop_value(CONF_MAIN_FUSE_A),
+        NumberSelector(
+            NumberSelectorConfig(
+                min=6,
+                max=250,
+                step=1,
+                mode=NumberSelectorMode.BOX,
+                unit_of_measurement="A",
+            )
+        ),
+    )
+    defined_fields_with_selectors[CONF_CHARGER_PHASE_MAPPING] = (
+        _get_current_or_repop_value(CONF_CHARGER_PHASE_MAPPING),
+        TextSelector(TextSelectorConfig()),
+    )
+    defined_fields_with_selectors[CONF_EV_CHARGING_PHASES] = (
+        _get_current_or_repop_value(CONF_EV_CHARGING_PHASES),
+        NumberSelector(
+            NumberSelectorConfig(min=1, max=3, step=1, mode=NumberSelectorMode.BOX)
+        ),
+    )
     defined_fields_with_selectors[CONF_SOLAR_PRODUCTION_SENSOR] = (
         _get_current_or_repop_value(CONF_SOLAR_PRODUCTION_SENSOR),
         EntitySelector(
@@ -158,6 +433,14 @@ def _build_common_schema(
         _get_current_or_repop_value(CONF_CHARGER_DYNAMIC_CURRENT_SENSOR),
         EntitySelector(EntitySelectorConfig(domain="sensor", multiple=False)),
     )
+    defined_fields_with_selectors[CONF_CHARGER_POWER_SENSOR] = (
+        _get_current_or_repop_value(CONF_CHARGER_POWER_SENSOR),
+        EntitySelector(
+            EntitySelectorConfig(
+                domain="sensor", device_class=SensorDeviceClass.POWER, multiple=False
+            )
+        ),
+    )
     defined_fields_with_selectors[CONF_EV_SOC_SENSOR] = (
         _get_current_or_repop_value(CONF_EV_SOC_SENSOR),
         EntitySelector(
@@ -194,6 +477,251 @@ def _build_common_schema(
         _get_current_or_repop_value(CONF_DEBUG_LOGGING, False),
         BooleanSelector(BooleanSelectorConfig()),
     )
+    defined_fields_with_selectors[CONF_PEAK_SHAVING_ENABLED] = (
+        _get_current_or_repop_value(CONF_PEAK_SHAVING_ENABLED, False),
+        BooleanSelector(BooleanSelectorConfig()),
+    )
+    defined_fields_with_selectors[CONF_PEAK_SHAVING_TOP_N] = (
+        _get_current_or_repop_value(CONF_PEAK_SHAVING_TOP_N),
+        NumberSelector(
+            NumberSelectorConfig(min=1, max=10, step=1, mode=NumberSelectorMode.BOX)
+        ),
+    )
+    defined_fields_with_selectors[CONF_PEAK_SHAVING_CEILING_KW] = (
+        _get_current_or_repop_value(CONF_PEAK_SHAVING_CEILING_KW),
+        NumberSelector(
+            NumberSelectorConfig(
+                min=0,
+                max=100,
+                step=0.1,
+                mode=NumberSelectorMode.BOX,
+                unit_of_measurement="kW",
+            )
+        ),
+    )
+    defined_fields_with_selectors[CONF_PRICE_THRESHOLD_MODE] = (
+        _get_current_or_repop_value(
+            CONF_PRICE_THRESHOLD_MODE, PRICE_THRESHOLD_MODE_ABSOLUTE
+        ),
+        SelectSelector(
+            SelectSelectorConfig(
+                options=PRICE_THRESHOLD_MODES,
+                mode=SelectSelectorMode.DROPDOWN,
+                translation_key=CONF_PRICE_THRESHOLD_MODE,
+            )
+        ),
+    )
+    defined_fields_with_selectors[CONF_TARIFF_ENERGY_TAX] = (
+        _get_current_or_repop_value(CONF_TARIFF_ENERGY_TAX),
+        NumberSelector(
+            NumberSelectorConfig(
+                min=0,
+                max=10,
+                step=0.001,
+                mode=NumberSelectorMode.BOX,
+                unit_of_measurement="kr/kWh",
+            )
+        ),
+    )
+    defined_fields_with_selectors[CONF_TARIFF_GRID_FEE] = (
+        _get_current_or_repop_value(CONF_TARIFF_GRID_FEE),
+        NumberSelector(
+            NumberSelectorConfig(
+                min=0,
+                max=10,
+                step=0.001,
+                mode=NumberSelectorMode.BOX,
+                unit_of_measurement="kr/kWh",
+            )
+        ),
+    )
+    defined_fields_with_selectors[CONF_TARIFF_VAT_PERCENT] = (
+        _get_current_or_repop_value(CONF_TARIFF_VAT_PERCENT),
+        NumberSelector(
+            NumberSelectorConfig(
+                min=0,
+                max=100,
+                step=0.1,
+                mode=NumberSelectorMode.BOX,
+                unit_of_measurement="%",
+            )
+        ),
+    )
+    defined_fields_with_selectors[CONF_TARIFF_TIME_OF_USE] = (
+        _get_current_or_repop_value(CONF_TARIFF_TIME_OF_USE),
+        TextSelector(TextSelectorConfig()),
+    )
+    defined_fields_with_selectors[CONF_EXPORT_PRICE_SENSOR] = (
+        _get_current_or_repop_value(CONF_EXPORT_PRICE_SENSOR),
+        EntitySelector(EntitySelectorConfig(domain="sensor", multiple=False)),
+    )
+    defined_fields_with_selectors[CONF_EXPORT_PRICE_FACTOR] = (
+        _get_current_or_repop_value(CONF_EXPORT_PRICE_FACTOR),
+        NumberSelector(
+            NumberSelectorConfig(min=0, max=2, step=0.01, mode=NumberSelectorMode.BOX)
+        ),
+    )
+    defined_fields_with_selectors[CONF_EXPORT_PRICE_OFFSET] = (
+        _get_current_or_repop_value(CONF_EXPORT_PRICE_OFFSET),
+        NumberSelector(
+            NumberSelectorConfig(
+                min=-5,
+                max=5,
+                step=0.001,
+                mode=NumberSelectorMode.BOX,
+                unit_of_measurement="kr/kWh",
+            )
+        ),
+    )
+    defined_fields_with_selectors[CONF_DEPARTURE_TIME] = (
+        _get_current_or_repop_value(CONF_DEPARTURE_TIME),
+        TimeSelector(TimeSelectorConfig()),
+    )
+    defined_fields_with_selectors[CONF_SOLAR_FORECAST_SENSORS] = (
+        _get_current_or_repop_value(CONF_SOLAR_FORECAST_SENSORS),
+        EntitySelector(EntitySelectorConfig(domain="sensor", multiple=True)),
+    )
+    defined_fields_with_selectors[CONF_HOUSE_BASE_LOAD_W] = (
+        _get_current_or_repop_value(CONF_HOUSE_BASE_LOAD_W),
+        NumberSelector(
+            NumberSelectorConfig(
+                min=0,
+                max=50000,
+                step=50,
+                mode=NumberSelectorMode.BOX,
+                unit_of_measurement="W",
+            )
+        ),
+    )
+    defined_fields_with_selectors[CONF_EV_BATTERY_CAPACITY_KWH] = (
+        _get_current_or_repop_value(CONF_EV_BATTERY_CAPACITY_KWH),
+        NumberSelector(
+            NumberSelectorConfig(
+                min=1,
+                max=250,
+                step=0.1,
+                mode=NumberSelectorMode.BOX,
+                unit_of_measurement="kWh",
+            )
+        ),
+    )
+    defined_fields_with_selectors[CONF_LOCAL_SOLAR_MODEL] = (
+        _get_current_or_repop_value(CONF_LOCAL_SOLAR_MODEL, False),
+        BooleanSelector(BooleanSelectorConfig()),
+    )
+    defined_fields_with_selectors[CONF_CHARGING_EFFICIENCY_PERCENT] = (
+        _get_current_or_repop_value(CONF_CHARGING_EFFICIENCY_PERCENT),
+        NumberSelector(
+            NumberSelectorConfig(
+                min=50,
+                max=100,
+                step=1,
+                mode=NumberSelectorMode.BOX,
+                unit_of_measurement="%",
+            )
+        ),
+    )
+    defined_fields_with_selectors[CONF_EV_SOC_REFRESH_ENTITY] = (
+        _get_current_or_repop_value(CONF_EV_SOC_REFRESH_ENTITY),
+        EntitySelector(
+            EntitySelectorConfig(domain=["button", "script", "sensor"], multiple=False)
+        ),
+    )
+    defined_fields_with_selectors[CONF_DEPARTURE_OVERRIDE_ENTITY] = (
+        _get_current_or_repop_value(CONF_DEPARTURE_OVERRIDE_ENTITY),
+        EntitySelector(
+            EntitySelectorConfig(
+                domain=["input_datetime", "datetime", "time", "sensor"],
+                multiple=False,
+            )
+        ),
+    )
+    defined_fields_with_selectors[CONF_DEADLINE_SOC_PERCENT] = (
+        _get_current_or_repop_value(CONF_DEADLINE_SOC_PERCENT),
+        NumberSelector(
+            NumberSelectorConfig(
+                min=1,
+                max=100,
+                step=1,
+                mode=NumberSelectorMode.BOX,
+                unit_of_measurement="%",
+            )
+        ),
+    )
+    defined_fields_with_selectors[CONF_DEADLINE_ENERGY_KWH] = (
+        _get_current_or_repop_value(CONF_DEADLINE_ENERGY_KWH),
+        NumberSelector(
+            NumberSelectorConfig(
+                min=0.5,
+                max=250,
+                step=0.5,
+                mode=NumberSelectorMode.BOX,
+                unit_of_measurement="kWh",
+            )
+        ),
+    )
+    defined_fields_with_selectors[CONF_EASEE_SCHEDULE_UPLOAD] = (
+        _get_current_or_repop_value(CONF_EASEE_SCHEDULE_UPLOAD, False),
+        BooleanSelector(BooleanSelectorConfig()),
+    )
+    defined_fields_with_selectors[CONF_BREAKER_FAILURE_THRESHOLD] = (
+        _get_current_or_repop_value(CONF_BREAKER_FAILURE_THRESHOLD),
+        NumberSelector(
+            NumberSelectorConfig(min=1, max=20, step=1, mode=NumberSelectorMode.BOX)
+        ),
+    )
+    defined_fields_with_selectors[CONF_BREAKER_RESET_SECONDS] = (
+        _get_current_or_repop_value(CONF_BREAKER_RESET_SECONDS),
+        NumberSelector(
+            NumberSelectorConfig(
+                min=10,
+                max=3600,
+                step=1,
+                mode=NumberSelectorMode.BOX,
+                unit_of_measurement="s",
+            )
+        ),
+    )
+    defined_fields_with_selectors[CONF_MODBUS_HOST] = (
+        _get_current_or_repop_value(CONF_MODBUS_HOST),
+        TextSelector(TextSelectorConfig()),
+    )
+    defined_fields_with_selectors[CONF_MODBUS_PORT] = (
+        _get_current_or_repop_value(CONF_MODBUS_PORT),
+        NumberSelector(
+            NumberSelectorConfig(min=1, max=65535, step=1, mode=NumberSelectorMode.BOX)
+        ),
+    )
+    defined_fields_with_selectors[CONF_MODBUS_UNIT_ID] = (
+        _get_current_or_repop_value(CONF_MODBUS_UNIT_ID),
+        NumberSelector(
+            NumberSelectorConfig(min=0, max=247, step=1, mode=NumberSelectorMode.BOX)
+        ),
+    )
+    defined_fields_with_selectors[CONF_MODBUS_INPUT_REGISTERS] = (
+        _get_current_or_repop_value(CONF_MODBUS_INPUT_REGISTERS, False),
+        BooleanSelector(BooleanSelectorConfig()),
+    )
+    defined_fields_with_selectors[CONF_MODBUS_SOLAR_REGISTER] = (
+        _get_current_or_repop_value(CONF_MODBUS_SOLAR_REGISTER),
+        TextSelector(TextSelectorConfig()),
+    )
+    defined_fields_with_selectors[CONF_MODBUS_GRID_REGISTER] = (
+        _get_current_or_repop_value(CONF_MODBUS_GRID_REGISTER),
+        TextSelector(TextSelectorConfig()),
+    )
+    defined_fields_with_selectors[CONF_MODBUS_POLL_INTERVAL] = (
+        _get_current_or_repop_value(CONF_MODBUS_POLL_INTERVAL),
+        NumberSelector(
+            NumberSelectorConfig(
+                min=0.5,
+                max=10,
+                step=0.5,
+                mode=NumberSelectorMode.BOX,
+                unit_of_measurement="s",
+            )
+        ),
+    )
 
     final_schema_dict = OrderedDict()
     is_initial_setup_display = (
@@ -217,7 +745,7 @@ def _build_common_schema(
                     else val_for_ui_default
                 )
 
-            if conf_key == CONF_DEBUG_LOGGING:
+            if conf_key in BOOLEAN_CONF_KEYS:
                 final_schema_dict[
                     vol.Optional(conf_key, default=bool(val_for_ui_default))
                 ] = selector_instance_final
@@ -251,7 +779,7 @@ def _build_common_schema(
                     final_schema_dict[
                         vol.Optional(conf_key, default=DEFAULT_SCAN_INTERVAL_SECONDS)
                     ] = selector_instance_orig
-                elif conf_key == CONF_DEBUG_LOGGING:
+                elif conf_key in BOOLEAN_CONF_KEYS:
                     final_schema_dict[vol.Optional(conf_key, default=False)] = (
                         selector_instance_orig
                     )
@@ -297,7 +825,7 @@ class SmartEVChargingOptionsFlowHandler(OptionsFlow):
             for conf_key in ALL_CONF_KEYS:
                 value_from_form = user_input.get(conf_key)
 
-                if conf_key == CONF_DEBUG_LOGGING:
+                if conf_key in BOOLEAN_CONF_KEYS:
                     options_to_save[conf_key] = (
                         isinstance(value_from_form, bool) and value_from_form
                     )
@@ -307,24 +835,36 @@ class SmartEVChargingOptionsFlowHandler(OptionsFlow):
                         if value_from_form == "" or value_from_form is None
                         else value_from_form
                     )
-                elif conf_key == CONF_TARGET_SOC_LIMIT:
-                    if (
-                        value_from_form is None
-                        or value_from_form == ""
-                        or str(value_from_form).strip() == ""
-                    ):
-                        options_to_save[conf_key] = None
+                elif conf_key in OPTIONAL_NUMBER_CONF_RANGES:
+                    number_val, error_key = _parse_optional_number(
+                        conf_key, value_from_form
+                    )
+                    if error_key:
+                        errors[conf_key] = error_key
+                        validation_ok = False
                     else:
-                        try:
-                            soc_val = float(value_from_form)
-                            if not (0 <= soc_val <= 100):
-                                errors[conf_key] = "invalid_target_soc"
-                                validation_ok = False
-                            else:
-                                options_to_save[conf_key] = soc_val
-                        except (ValueError, TypeError):
-                            errors[conf_key] = "invalid_target_soc"
-                            validation_ok = False
+                        options_to_save[conf_key] = number_val
+                elif conf_key == CONF_TARIFF_TIME_OF_USE:
+                    text_val, error_key = _parse_time_of_use(value_from_form)
+                    if error_key:
+                        errors[conf_key] = error_key
+                        validation_ok = False
+                    else:
+                        options_to_save[conf_key] = text_val
+                elif conf_key in MODBUS_REGISTER_CONF_KEYS:
+                    text_val, error_key = _parse_modbus_register(value_from_form)
+                    if error_key:
+                        errors[conf_key] = error_key
+                        validation_ok = False
+                    else:
+                        options_to_save[conf_key] = text_val
+                elif conf_key == CONF_CHARGER_PHASE_MAPPING:
+                    text_val, error_key = _parse_phase_mapping(value_from_form)
+                    if error_key:
+                        errors[conf_key] = error_key
+                        validation_ok = False
+                    else:
+                        options_to_save[conf_key] = text_val
                 elif conf_key == CONF_SCAN_INTERVAL:
                     if (
                         value_from_form is None
@@ -395,26 +935,40 @@ class SmartEVChargingConfigFlow(ConfigFlow, domain=DOMAIN):
             for conf_key in ALL_CONF_KEYS:
                 value = user_input.get(conf_key)
 
-                if conf_key == CONF_DEBUG_LOGGING:
+                if conf_key in BOOLEAN_CONF_KEYS:
                     data_to_save[conf_key] = isinstance(value, bool) and value
                 elif conf_key in OPTIONAL_ENTITY_CONF_KEYS:
                     data_to_save[conf_key] = (
                         None if value == "" or value is None else value
                     )
-                elif conf_key == CONF_TARGET_SOC_LIMIT:
-                    if value is None or value == "" or str(value).strip() == "":
-                        data_to_save[conf_key] = None
+                elif conf_key in OPTIONAL_NUMBER_CONF_RANGES:
+                    number_val, error_key = _parse_optional_number(conf_key, value)
+                    if error_key:
+                        errors[conf_key] = error_key
+                        validation_ok = False
                     else:
-                        try:
-                            soc_val = float(value)
-                            if not (0 <= soc_val <= 100):
-                                errors[conf_key] = "invalid_target_soc"
-                                validation_ok = False
-                            else:
-                                data_to_save[conf_key] = soc_val
-                        except (ValueError, TypeError):
-                            errors[conf_key] = "invalid_target_soc"
-                            validation_ok = False
+                        data_to_save[conf_key] = number_val
+                elif conf_key == CONF_TARIFF_TIME_OF_USE:
+                    text_val, error_key = _parse_time_of_use(value)
+                    if error_key:
+                        errors[conf_key] = error_key
+                        validation_ok = False
+                    else:
+                        data_to_save[conf_key] = text_val
+                elif conf_key in MODBUS_REGISTER_CONF_KEYS:
+                    text_val, error_key = _parse_modbus_register(value)
+                    if error_key:
+                        errors[conf_key] = error_key
+                        validation_ok = False
+                    else:
+                        data_to_save[conf_key] = text_val
+                elif conf_key == CONF_CHARGER_PHASE_MAPPING:
+                    text_val, error_key = _parse_phase_mapping(value)
+                    if error_key:
+                        errors[conf_key] = error_key
+                        validation_ok = False
+                    else:
+                        data_to_save[conf_key] = text_val
                 elif conf_key == CONF_SCAN_INTERVAL:
                     if value is None or value == "" or str(value).strip() == "":
                         data_to_save[conf_key] = DEFAULT_SCAN_INTERVAL_SECONDS
@@ -13,6 +13,7 @@ CONF_SOLAR_PRODUCTION_SENSOR = "solar_production_sensor_id"
 CONF_SOLAR_SCHEDULE_ENTITY = "solar_schedule_entity_id"
 CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR = "charger_max_current_limit_sensor_id"
 CONF_CHARGER_DYNAMIC_CURRENT_SENSOR = "charger_dynamic_current_sensor_id"
+CONF_CHARGER_POWER_SENSOR = "charger_power_sensor_id"
 CONF_SCAN_INTERVAL = "scan_interval_seconds"
 CONF_CHARGER_ENABLED_SWITCH_ID = "charger_enabled_switch_id"
 
@@ -21,16 +22,133 @@ CONF_TARGET_SOC_LIMIT = "target_soc_limit"
 
 CONF_DEBUG_LOGGING = "debug_logging_enabled"
 
+# Effekttoppsbegränsning (effekttariff)
+CONF_PEAK_SHAVING_ENABLED = "peak_shaving_enabled"
+CONF_PEAK_SHAVING_TOP_N = "peak_shaving_top_n"
+CONF_PEAK_SHAVING_CEILING_KW = "peak_shaving_ceiling_kw"
+
+# Relativ prisgräns för Pris/Tid (i stället för enbart ett fast maxpris)
+CONF_PRICE_THRESHOLD_MODE = "price_threshold_mode"
+PRICE_THRESHOLD_MODE_ABSOLUTE = "absolute"
+PRICE_THRESHOLD_MODE_CHEAPEST_HOURS = "cheapest_hours"
+PRICE_THRESHOLD_MODE_PERCENTILE = "percentile"
+PRICE_THRESHOLD_MODES = [
+    PRICE_THRESHOLD_MODE_ABSOLUTE,
+    PRICE_THRESHOLD_MODE_CHEAPEST_HOURS,
+    PRICE_THRESHOLD_MODE_PERCENTILE,
+]
+
+# Tariffmodell: totalkostnad = (spotpris + överföringsavgift + energiskatt) * moms
+CONF_TARIFF_ENERGY_TAX = "tariff_energy_tax"
+CONF_TARIFF_GRID_FEE = "tariff_grid_fee"
+CONF_TARIFF_VAT_PERCENT = "tariff_vat_percent"
+CONF_TARIFF_TIME_OF_USE = "tariff_time_of_use"
+
+# Alternativkostnad för solöverskott: exportersättning mot nätpris före avresa.
+# Exportpriset tas från en sensor, eller som spotpris * faktor + påslag.
+CONF_EXPORT_PRICE_SENSOR = "export_price_sensor_id"
+CONF_EXPORT_PRICE_FACTOR = "export_price_factor"
+CONF_EXPORT_PRICE_OFFSET = "export_price_offset"
+CONF_DEPARTURE_TIME = "departure_time"
+
+# Solprognos för laddplanen: prognossensorer, husets typiska last och bilens
+# batterikapacitet (för att räkna om SoC till energibehov).
+CONF_SOLAR_FORECAST_SENSORS = "solar_forecast_sensor_ids"
+CONF_HOUSE_BASE_LOAD_W = "house_base_load_w"
+CONF_EV_BATTERY_CAPACITY_KWH = "ev_battery_capacity_kwh"
+# Lokal solmodell tränad på produktionssensorns historik, för anläggningar
+# utan prognosintegration.
+CONF_LOCAL_SOLAR_MODEL = "local_solar_model_enabled"
+# Uppskattning av SoC mellan avläsningar: laddningens verkningsgrad och en
+# valfri entitet (knapp, skript eller sensorn själv) som begär ny avläsning.
+CONF_CHARGING_EFFICIENCY_PERCENT = "charging_efficiency_percent"
+CONF_EV_SOC_REFRESH_ENTITY = "ev_soc_refresh_entity_id"
+# Entitet (t.ex. input_datetime) vars tid ersätter den inlärda avresetiden.
+CONF_DEPARTURE_OVERRIDE_ENTITY = "departure_override_entity_id"
+# Laddning mot avresan: nå en SoC eller ladda en energimängd före avresetiden,
+# i de billigaste intervallen oavsett maxpris.
+CONF_DEADLINE_SOC_PERCENT = "deadline_target_soc"
+CONF_DEADLINE_ENERGY_KWH = "deadline_energy_kwh"
+# Pris/Tid-fönstren laddas upp som laddarens eget laddschema i stället för att
+# styras med kommandon varje cykel.
+CONF_EASEE_SCHEDULE_UPLOAD = "easee_schedule_upload_enabled"
+# Kretsbrytare för tjänsteanrop till laddaren: antal fel i följd som öppnar
+# brytaren och vilotid (s) innan ett nytt anrop provas.
+CONF_BREAKER_FAILURE_THRESHOLD = "breaker_failure_threshold"
+CONF_BREAKER_RESET_SECONDS = "breaker_reset_seconds"
+# Laddarens gränssnitt. Den generiska laddaren styrs med en number-entitet för
+# strömgränsen, en switch för start/paus och valfritt en switch för 3-fas.
+CONF_CHARGER_BACKEND = "charger_backend"
+CHARGER_BACKEND_EASEE = "easee"
+CHARGER_BACKEND_GENERIC = "generic"
+CHARGER_BACKEND_OCPP = "ocpp"
+CHARGER_BACKENDS = [
+    CHARGER_BACKEND_EASEE,
+    CHARGER_BACKEND_GENERIC,
+    CHARGER_BACKEND_OCPP,
+]
+CONF_GENERIC_CURRENT_NUMBER = "generic_current_number_entity_id"
+CONF_GENERIC_CHARGE_SWITCH = "generic_charge_switch_entity_id"
+CONF_GENERIC_PHASE_SWITCH = "generic_phase_switch_entity_id"
+# Valfri select-entitet (L1/L2/L3) för laddare som kan välja fas vid 1-fasladdning.
+CONF_GENERIC_PHASE_SELECT = "generic_phase_select_entity_id"
+# Lokalt OCPP 1.6J-centralsystem: port för laddpunkternas WebSocket och vilken
+# laddpunkt som styrs (tom = den första som ansluter).
+CONF_OCPP_PORT = "ocpp_port"
+CONF_OCPP_CHARGE_POINT_ID = "ocpp_charge_point_id"
+# Snabb avläsning av växelriktare och elmätare via Modbus TCP. Registren anges
+# som 'adress:typ[:skala][@enhet]', se modbus_reader.py.
+CONF_MODBUS_HOST = "modbus_host"
+CONF_MODBUS_PORT = "modbus_port"
+CONF_MODBUS_UNIT_ID = "modbus_unit_id"
+CONF_MODBUS_INPUT_REGISTERS = "modbus_input_registers"
+CONF_MODBUS_SOLAR_REGISTER = "modbus_solar_register"
+CONF_MODBUS_GRID_REGISTER = "modbus_grid_register"
+CONF_MODBUS_POLL_INTERVAL = "modbus_poll_interval_seconds"
+# Högfrekvent elmätare (P1/HAN): hussensorn och fassensorerna (ström i A eller
+# effekt i W per fas, L1-L3) läses in i ringbuffertar, se meter_ingest.py.
+CONF_METER_INGEST = "meter_ingest_enabled"
+CONF_METER_PHASE_SENSORS = "meter_phase_sensor_ids"
+# Fasbalansering mot huvudsäkringen, se phase_balancer.py. Fasmappningen anger
+# vilken av nätets faser laddarens faser är kopplade till, t.ex. 'L2,L3,L1'.
+CONF_MAIN_FUSE_A = "main_fuse_a"
+CONF_CHARGER_PHASE_MAPPING = "charger_phase_mapping"
+CONF_EV_CHARGING_PHASES = "ev_charging_phases"
+
 DEFAULT_NAME = "Avancerad Elbilsladdning"
 DEFAULT_SCAN_INTERVAL_SECONDS = 30
+DEFAULT_PEAK_SHAVING_TOP_N = 3
+DEFAULT_DEPARTURE_TIME = "07:00:00"
+DEFAULT_HOUSE_BASE_LOAD_W = 500
+DEFAULT_CHARGING_EFFICIENCY_PERCENT = 90
+DEFAULT_BREAKER_FAILURE_THRESHOLD = 3
+DEFAULT_BREAKER_RESET_SECONDS = 120
+DEFAULT_OCPP_PORT = 9000
+DEFAULT_MODBUS_PORT = 502
+DEFAULT_MODBUS_UNIT_ID = 1
+DEFAULT_MODBUS_POLL_INTERVAL_SECONDS = 1.0
+
+# Version för data som sparas med Home Assistants Store-hjälpare
+STORAGE_VERSION = 1
 
 ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH = "smart_charging_enabled"
 ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER = "max_charging_price"
 ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH = "solar_surplus_charging_enabled"
 ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER = "solar_charging_buffer"
 ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER = "min_solar_charging_current"
+ENTITY_ID_SUFFIX_ENABLE_HYBRID_CHARGING_SWITCH = "hybrid_charging_enabled"
+ENTITY_ID_SUFFIX_HYBRID_MAX_GRID_PRICE_NUMBER = "hybrid_max_grid_price"
+ENTITY_ID_SUFFIX_HYBRID_TARGET_POWER_NUMBER = "hybrid_target_power"
+ENTITY_ID_SUFFIX_RELATIVE_PRICE_THRESHOLD_NUMBER = "relative_price_threshold"
 
 ENTITY_ID_SUFFIX_ACTIVE_CONTROL_MODE_SENSOR = "active_control_mode"
+ENTITY_ID_SUFFIX_PEAK_SHAVING_SENSOR = "peak_shaving_projected_hour"
+ENTITY_ID_SUFFIX_OPPORTUNITY_SENSOR = "opportunity_savings"
+ENTITY_ID_SUFFIX_SOC_ESTIMATE_SENSOR = "soc_estimate"
+ENTITY_ID_SUFFIX_DEPARTURE_SENSOR = "expected_departure"
+ENTITY_ID_SUFFIX_SERVICE_BREAKER_SENSOR = "service_breaker"
+ENTITY_ID_SUFFIX_OCPP_SENSOR_PREFIX = "ocpp"
+ENTITY_ID_SUFFIX_HOUSE_LOAD_SENSOR = "house_load"
 
 # Exempel på statusvärden från Easee
 EASEE_STATUS_DISCONNECTED = ["disconnected", "car_disconnected"]
@@ -57,7 +175,9 @@ EASEE_SERVICE_SET_DYNAMIC_CURRENT = "set_charger_dynamic_limit"
 # Kontrollägen
 CONTROL_MODE_PRICE_TIME = "PRIS_TID"
 CONTROL_MODE_SOLAR_SURPLUS = "SOLENERGI"
+CONTROL_MODE_HYBRID = "HYBRID"  # Solöverskott + nätel upp till minimiström/måleffekt
 CONTROL_MODE_MANUAL = "AV"
+CONTROL_MODE_DEADLINE = "AVRESA"  # Billigaste intervallen före avresan
 
 # Andra konstanter
 MIN_CHARGE_CURRENT_A = 6
@@ -67,5 +187,5 @@ POWER_MARGIN_W = 300
 SOLAR_SURPLUS_DELAY_SECONDS = 60
 
 # Fysiska konstanter för beräkningar
-PHASES = 3  # Antal faser som normalt används för laddning (kan behöva justeras om 1-fas är vanligt)
+PHASES = 3  # Antal faser vid laddning när fasbalanseringen inte anger bilens faser
 VOLTAGE_PHASE_NEUTRAL = 230  # Standard fasspänning i Sverige
@@ -1,7 +1,7 @@
 # File version: 2025-06-05 0.2.0 // ÄNDRA HÄR
 
 import logging
-from datetime import timedelta, datetime
+from datetime import date, timedelta, datetime, time
 from typing import Any, cast, Callable
 import math
 import asyncio
@@ -9,11 +9,9 @@ import asyncio
 from homeassistant.core import HomeAssistant, Event, CALLBACK_TYPE, callback
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
-from homeassistant.helpers.entity_registry import (
-    async_get as async_get_entity_registry,
-    EntityRegistry,
-)
 from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.helpers.storage import Store
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.const import (
     STATE_ON,
     STATE_OFF,
@@ -28,7 +26,6 @@ import homeassistant.util.dt as dt_util
 
 from .const import (
     DOMAIN,
-    CONF_CHARGER_DEVICE,
     CONF_STATUS_SENSOR,
     CONF_PRICE_SENSOR,
     CONF_TIME_SCHEDULE_ENTITY,
@@ -37,6 +34,7 @@ from .const import (
     CONF_SOLAR_SCHEDULE_ENTITY,
     CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
     CONF_CHARGER_DYNAMIC_CURRENT_SENSOR,
+    CONF_CHARGER_POWER_SENSOR,
     CONF_SCAN_INTERVAL,
     CONF_CHARGER_ENABLED_SWITCH_ID,
     CONF_EV_SOC_SENSOR,
@@ -46,6 +44,9 @@ from .const import (
     ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
     ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER,
     ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER,
+    ENTITY_ID_SUFFIX_ENABLE_HYBRID_CHARGING_SWITCH,
+    ENTITY_ID_SUFFIX_HYBRID_MAX_GRID_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_HYBRID_TARGET_POWER_NUMBER,
     ENTITY_ID_SUFFIX_ACTIVE_CONTROL_MODE_SENSOR,
     EASEE_STATUS_DISCONNECTED,
     EASEE_STATUS_AWAITING_START,
@@ -57,17 +58,89 @@ from .const import (
     EASEE_STATUS_OFFLINE,
     CONTROL_MODE_PRICE_TIME,
     CONTROL_MODE_SOLAR_SURPLUS,
+    CONTROL_MODE_HYBRID,
     CONTROL_MODE_MANUAL,
+    CONTROL_MODE_DEADLINE,
     MIN_CHARGE_CURRENT_A,
     MAX_CHARGE_CURRENT_A_HW_DEFAULT,
     POWER_MARGIN_W,
     PHASES,
     VOLTAGE_PHASE_NEUTRAL,
     CONF_DEBUG_LOGGING,
+    CONF_PEAK_SHAVING_ENABLED,
+    CONF_PEAK_SHAVING_TOP_N,
+    CONF_PEAK_SHAVING_CEILING_KW,
+    CONF_EXPORT_PRICE_SENSOR,
+    CONF_SOLAR_FORECAST_SENSORS,
+    CONF_HOUSE_BASE_LOAD_W,
+    CONF_EV_BATTERY_CAPACITY_KWH,
+    CONF_EV_SOC_REFRESH_ENTITY,
+    CONF_CHARGING_EFFICIENCY_PERCENT,
+    CONF_DEPARTURE_OVERRIDE_ENTITY,
+    DEFAULT_HOUSE_BASE_LOAD_W,
+    DEFAULT_CHARGING_EFFICIENCY_PERCENT,
+    CONF_PRICE_THRESHOLD_MODE,
+    PRICE_THRESHOLD_MODE_ABSOLUTE,
+    PRICE_THRESHOLD_MODE_CHEAPEST_HOURS,
+    PRICE_THRESHOLD_MODE_PERCENTILE,
+    ENTITY_ID_SUFFIX_RELATIVE_PRICE_THRESHOLD_NUMBER,
+    DEFAULT_PEAK_SHAVING_TOP_N,
+    STORAGE_VERSION,
+)
+from .peak_shaving import PeakShavingTracker
+from .opportunity import OpportunityEvaluator
+from .planner import ChargePlanner
+from .solar_forecast import SolarForecast
+from .solar_model import LocalSolarModel
+from .soc_estimator import SocEstimator
+from .charge_curve import ChargeCurve
+from .departure import DepartureLearner, WEEKDAY_NAMES
+from .deadline import DeadlinePlanner
+from .charge_schedule import ChargeScheduleUploader
+from .circuit_breaker import ServiceCallRunner
+from .charger_backend import create_backend
+from .ocpp_central import OcppCentralSystem
+from .modbus_reader import SOURCE_GRID, SOURCE_SOLAR, ModbusPowerReader
+from .meter_ingest import MeterIngest
+from .phase_balancer import PHASE_BALANCER, PHASE_NAMES, ChargerPhases
+from .charger_state import ChargerStateModel
+from .command_tracker import (
+    CommandTracker,
+    COMMAND_CURRENT,
+    COMMAND_PAUSE,
+    COMMAND_START,
 )
+from .session_store import SessionStore, build_session_record
+from .price_cache import PriceCache, price_unit_divisor
+from .tariff import TariffModel
+from .price_scheduler import PriceBoundaryScheduler
 
 _LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
 
+# Sessionstillståndet skrivs till disk med kort fördröjning när det ändras, och
+# medan en session pågår högst en gång per intervall (för energiräknarna).
+STATE_SAVE_DELAY_SECONDS = 5
+STATE_ENERGY_SAVE_INTERVAL = timedelta(minutes=5)
+# Äldre sparat tillstånd än så här återställs inte efter omstart.
+MAX_RESTORED_STATE_AGE = timedelta(hours=12)
+# Styrvärden som måste ha rapporterats av de interna entiteterna innan
+# laddningslogiken körs. Övriga har säkra standardvärden.
+REQUIRED_CONTROL_KEYS = (
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+)
+# Effektsensorer som ersätts av Modbus-värden när de är färska.
+MODBUS_SOURCES = {
+    CONF_SOLAR_PRODUCTION_SENSOR: SOURCE_SOLAR,
+    CONF_HOUSE_POWER_SENSOR: SOURCE_GRID,
+}
+# Så stor ändring av ett Modbus-värde eller av husets medeleffekt från
+# elmätaren (en ampere på en fas) omvärderas direkt.
+POWER_REFRESH_DELTA_W = 230.0
+# Så stor ändring av en fas högsta ström omvärderas direkt.
+PHASE_REFRESH_DELTA_A = 1.0
+
 
 class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
     """Huvudkoordinator för Smart EV Charging."""
@@ -92,6 +165,18 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             self.update_interval,
         )
 
+        # Uppdateringsintervallet pausas när bara Pris/Tid-vägen kan agera, se
+        # _schedule_next_evaluation. Det konfigurerade intervallet sparas här.
+        self._scan_interval = timedelta(seconds=scan_interval_seconds)
+        self.price_scheduler = PriceBoundaryScheduler(hass, self._handle_price_boundary)
+        # Prisserien från prissensorn, tolkad en gång per tillståndsändring.
+        # Med tariff räknas totalkostnaden per intervall ut i samma veva.
+        try:
+            tariff = TariffModel.from_config(self.config)
+        except ValueError as e:
+            _LOGGER.warning("Ogiltig tariff, räknar med enbart spotpris: %s", e)
+            tariff = None
+        self.price_cache = PriceCache(tariff)
         self.listeners: list[CALLBACK_TYPE] = []
         self.active_control_mode: str = CONTROL_MODE_MANUAL
         self.should_charge_flag: bool = False
@@ -106,12 +191,318 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         self._solar_session_active: bool = False
         self._price_time_eligible_for_charging: bool = False
         self._last_price_check_time: datetime | None = None
-        self.smart_enable_switch_entity_id: str | None = None
-        self.max_price_entity_id: str | None = None
-        self.solar_enable_switch_entity_id: str | None = None
-        self.solar_buffer_entity_id: str | None = None
-        self.min_solar_charge_current_entity_id: str | None = None
-        self._internal_entities_resolved: bool = False
+        # Typade värden från integrationens egna switch- och nummer-entiteter,
+        # med ENTITY_ID_SUFFIX_* som nyckel. Entiteterna skriver hit direkt.
+        self.control_values: dict[str, Any] = {}
+        # Energiuppdelning för pågående session (sol vs nät), integreras per cykel.
+        self.session_solar_energy_kwh: float = 0.0
+        self.session_grid_energy_kwh: float = 0.0
+        self._last_tick_charging_power_w: float = 0.0
+        self._last_tick_solar_surplus_w: float = 0.0
+        self._last_energy_update_time: datetime | None = None
+        # Kostnad och styrningslägen för pågående session, samt historik över avslutade.
+        self.session_cost_kr: float = 0.0
+        self.session_modes: list[str] = []
+        self._last_tick_price_kr: float | None = None
+        self.session_store = SessionStore(hass, entry.entry_id)
+        # Senast skickad dynamisk ström. Sparas så att den kan användas efter omstart.
+        self._last_commanded_current_a: float | None = None
+        # Efter omstart antas laddaren ha den senast skickade strömmen tills ett nytt
+        # strömkommando skickas. Används bara när laddarens ström inte kan läsas.
+        self._restored_charger_current_a: float | None = None
+        # Antal kommandon till laddaren under dygnet, för att jämföra direkt
+        # styrning med laddschema i laddaren.
+        self.charger_commands_today = 0
+        self._commands_day: date | None = None
+        # Anrop till laddarens tjänster körs i bakgrunden bakom kretsbrytare.
+        self.service_runner = ServiceCallRunner.from_config(hass, self.config)
+        # Lokalt OCPP-centralsystem när laddaren styrs med OCPP.
+        self.ocpp = OcppCentralSystem.acquire(hass, entry.entry_id, self.config)
+        # Laddarens gränssnitt: Easee, en generisk laddare eller OCPP.
+        self.charger_backend = create_backend(
+            self.service_runner, self.config, self.ocpp
+        )
+        self._last_current_command_time: datetime | None = None
+        # Snabb avläsning av solproduktion och nätets effekt via Modbus TCP.
+        self.modbus = ModbusPowerReader.from_config(hass, self.config)
+        # Modbus-värdena som senaste utvärderingen använde.
+        self._modbus_evaluated: dict[str, float] = {}
+        if self.modbus is not None:
+            self.modbus.async_add_listener(self._handle_modbus_values)
+        # Högfrekvent elmätare (P1/HAN) som läses in utan att ge en utvärdering
+        # per värde.
+        self.meter_ingest = MeterIngest.from_config(hass, self.config)
+        self._meter_snapshot: dict[str, Any] = {}
+        self._meter_evaluated: dict[str, Any] = {}
+        if self.meter_ingest is not None:
+            self.meter_ingest.async_add_listener(self._handle_meter_snapshot)
+        # Fasbalansering mot huvudsäkringen. Kräver elmätarens fassensorer.
+        self.charger_phases = (
+            ChargerPhases.from_config(
+                entry.entry_id,
+                self.config,
+                self.charger_backend.supports_phase_rotation,
+            )
+            if self.meter_ingest is not None
+            else None
+        )
+        self._phase_limit: tuple[float, int] | None = None
+        self._phase_house_loads_a: list[float | None] = [None, None, None]
+        # Uppföljning av att kommandona till laddaren syns i dess sensorer.
+        self.command_tracker = CommandTracker(
+            hass,
+            self.config.get(CONF_STATUS_SENSOR),
+            self.config.get(CONF_CHARGER_DYNAMIC_CURRENT_SENSOR),
+            ack_timeout=self.charger_backend.command_latency,
+            map_status=self.charger_backend.map_status,
+        )
+        # Förväntat tillstånd direkt efter ett kommando, innan molnet rapporterat det.
+        self.charger_state = ChargerStateModel(self.command_tracker)
+        self._state_store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.state"
+        )
+        self._persisted_session_state: dict[str, Any] | None = None
+        self._last_state_save_time: datetime | None = None
+        # Effekttoppsbegränsning (effekttariff). Kräver en sensor för husets effekt.
+        self.peak_shaving: PeakShavingTracker | None = None
+        self.peak_shaving_max_charging_power_w: float | None = None
+        self._peak_shaving_projected_hour_w: float | None = None
+        if self.config.get(CONF_PEAK_SHAVING_ENABLED) and self.config.get(
+            CONF_HOUSE_POWER_SENSOR
+        ):
+            ceiling_kw = self.config.get(CONF_PEAK_SHAVING_CEILING_KW)
+            self.peak_shaving = PeakShavingTracker(
+                hass,
+                entry.entry_id,
+                int(self.config.get(CONF_PEAK_SHAVING_TOP_N) or DEFAULT_PEAK_SHAVING_TOP_N),
+                ceiling_w=float(ceiling_kw) * 1000.0 if ceiling_kw else None,
+            )
+        # Alternativkostnad för solöverskott. Kräver ett exportpris (sensor eller formel).
+        self.opportunity = OpportunityEvaluator.from_config(self.config)
+        # Inlärd avresetid per veckodag från när bilen kopplas ur.
+        self.departure_learner = DepartureLearner.from_config(
+            hass, entry.entry_id, self.config, self.charger_backend.map_status
+        )
+        if self.opportunity is not None:
+            self.opportunity.departures = self.departure_learner
+        # Pris/Tid-fönstren som laddschema i laddaren i stället för kommandon.
+        self.charge_schedule = ChargeScheduleUploader.from_config(
+            self.charger_backend, self.config
+        )
+        # Laddning mot avresan. Kräver ett SoC- eller energimål och avresetiden.
+        self.deadline_planner = (
+            DeadlinePlanner.from_config(self.config)
+            if self.departure_learner is not None
+            else None
+        )
+        # Uppskattad SoC mellan avläsningar. Kräver SoC-sensor och batterikapacitet.
+        self.soc_estimator = SocEstimator.from_config(self.config)
+        efficiency_percent = self.config.get(CONF_CHARGING_EFFICIENCY_PERCENT)
+        self.charging_efficiency = (
+            float(efficiency_percent)
+            if efficiency_percent is not None
+            else DEFAULT_CHARGING_EFFICIENCY_PERCENT
+        ) / 100.0
+        # Inlärd laddkurva (effekt per SoC). Kräver SoC-sensor och effektsensor.
+        self.charge_curve = ChargeCurve.from_config(hass, entry.entry_id, self.config)
+        if self.deadline_planner is not None:
+            self.deadline_planner.charge_curve = self.charge_curve
+        self.charge_time_to_target_h: float | None = None
+        # Laddplan med solprognos. Kräver prognossensorer eller den lokala
+        # solmodellen, samt batterikapacitet.
+        self.solar_forecast = SolarForecast()
+        self.solar_model = (
+            None
+            if self.config.get(CONF_SOLAR_FORECAST_SENSORS)
+            else LocalSolarModel.from_config(hass, entry.entry_id, self.config)
+        )
+        self.charge_planner: ChargePlanner | None = None
+        if (
+            self.config.get(CONF_SOLAR_FORECAST_SENSORS)
+            or self.solar_model is not None
+        ) and self.config.get(CONF_EV_BATTERY_CAPACITY_KWH):
+            base_load_w = self.config.get(CONF_HOUSE_BASE_LOAD_W)
+            self.charge_planner = ChargePlanner(
+                float(base_load_w)
+                if base_load_w is not None
+                else DEFAULT_HOUSE_BASE_LOAD_W,
+                charge_curve=self.charge_curve,
+                capacity_kwh=float(self.config[CONF_EV_BATTERY_CAPACITY_KWH]),
+                efficiency=self.charging_efficiency,
+            )
+
+    async def async_load_persisted_state(self) -> None:
+        """Läser in tillstånd som sparats på disk. Anropas före första uppdateringen."""
+        await self.session_store.async_load()
+        if self.peak_shaving is not None:
+            await self.peak_shaving.async_load()
+        if self.charge_curve is not None:
+            await self.charge_curve.async_load()
+        if self.departure_learner is not None:
+            await self.departure_learner.async_load()
+            self.departure_learner.async_start()
+        if self.solar_model is not None:
+            await self.solar_model.async_load()
+            self.solar_model.async_start()
+        self.command_tracker.async_start()
+        if self.ocpp is not None:
+            await self.ocpp.async_start()
+        if self.modbus is not None:
+            self.modbus.async_start()
+        if self.meter_ingest is not None:
+            self.meter_ingest.async_start()
+        if self.charger_phases is not None:
+            PHASE_BALANCER.add(self.charger_phases)
+        # Utan pågående session körs inga periodiska cykler, så en inkopplad
+        # bil eller ett nytt pris måste ge en utvärdering själv.
+        self._setup_listeners()
+        if data := await self._state_store.async_load():
+            self._restore_charge_schedule(data)
+            self._restore_session_state(data)
+
+    async def async_save_persisted_state(self) -> None:
+        """Skriver allt sparat tillstånd direkt, t.ex. vid avlastning."""
+        await self._state_store.async_save(self._state_data_to_save())
+        await self.session_store.async_save()
+        if self.peak_shaving is not None:
+            await self.peak_shaving.async_save()
+        if self.charge_curve is not None:
+            await self.charge_curve.async_save()
+        if self.departure_learner is not None:
+            await self.departure_learner.async_save()
+
+    def _session_state_snapshot(self) -> dict[str, Any]:
+        """Tillståndsmaskinen som avgör hur nästa cykel beter sig."""
+        return {
+            "active_control_mode": self.active_control_mode,
+            "solar_session_active": self._solar_session_active,
+            "price_time_eligible_for_charging": self._price_time_eligible_for_charging,
+            "session_start_time_utc": self.session_start_time_utc.isoformat()
+            if self.session_start_time_utc
+            else None,
+            "last_commanded_current_a": self._last_commanded_current_a,
+            "charge_schedule_window": [
+                moment.isoformat() for moment in self.charge_schedule.uploaded
+            ]
+            if self.charge_schedule is not None and self.charge_schedule.uploaded
+            else None,
+        }
+
+    def _state_data_to_save(self) -> dict[str, Any]:
+        return {
+            **self._session_state_snapshot(),
+            "session_modes": self.session_modes,
+            "session_solar_energy_kwh": round(self.session_solar_energy_kwh, 4),
+            "session_grid_energy_kwh": round(self.session_grid_energy_kwh, 4),
+            "session_cost_kr": round(self.session_cost_kr, 4),
+            "saved_at": dt_util.utcnow().isoformat(),
+        }
+
+    def _schedule_state_save(self, now: datetime) -> None:
+        """
+        Schemalägger en fördröjd skrivning om tillståndsmaskinen ändrats, eller
+        om en session pågår och energiräknarna inte sparats på ett tag.
+        """
+        snapshot = self._session_state_snapshot()
+        energy_save_due = self.session_start_time_utc is not None and (
+            self._last_state_save_time is None
+            or now - self._last_state_save_time >= STATE_ENERGY_SAVE_INTERVAL
+        )
+        if snapshot == self._persisted_session_state and not energy_save_due:
+            return
+        self._persisted_session_state = snapshot
+        self._last_state_save_time = now
+        self._state_store.async_delay_save(
+            self._state_data_to_save, STATE_SAVE_DELAY_SECONDS
+        )
+
+    def _restore_charge_schedule(self, data: dict[str, Any]) -> None:
+        """
+        Återställer laddschemat som skickades till laddaren före omstart. Är
+        uppladdningen avstängd tas ett schema som ännu inte har passerats bort,
+        så att laddaren inte laddar efter ett schema som ingen följer upp.
+        """
+        window = data.get("charge_schedule_window")
+        if not window or len(window) != 2:
+            return
+        start, stop = (dt_util.parse_datetime(str(moment)) for moment in window)
+        if start is None or stop is None or stop <= dt_util.utcnow():
+            return
+        if self.charge_schedule is not None:
+            self.charge_schedule.uploaded = (start, stop)
+        elif self.charger_backend.supports_charge_schedule:
+            _LOGGER.info(
+                "Laddschema i laddaren är avstängt. Tar bort kvarvarande schema."
+            )
+            if self.charger_backend.clear_charge_schedule():
+                self._count_charger_command()
+
+    def _restore_session_state(self, data: dict[str, Any]) -> None:
+        """
+        Återställer tillståndsmaskinen efter omstart och stämmer av den mot
+        laddarens aktuella status, så att första cykeln inte skickar onödiga kommandon.
+        """
+        saved_at = dt_util.parse_datetime(data.get("saved_at") or "")
+        if saved_at is None or dt_util.utcnow() - saved_at > MAX_RESTORED_STATE_AGE:
+            _LOGGER.info("Sparat sessionstillstånd är för gammalt, återställs inte.")
+            return
+
+        status_sensor_id = self.config.get(CONF_STATUS_SENSOR)
+        status_state = (
+            self.hass.states.get(str(status_sensor_id)) if status_sensor_id else None
+        )
+        charger_status = (
+            self.charger_backend.map_status(status_state.state)
+            if status_state and isinstance(status_state.state, str)
+            else STATE_UNKNOWN
+        )
+        if (
+            charger_status in EASEE_STATUS_DISCONNECTED
+            or charger_status == EASEE_STATUS_OFFLINE
+        ):
+            _LOGGER.info(
+                "Laddaren är frånkopplad/offline (%s). Sparad session återställs inte.",
+                charger_status,
+            )
+            return
+
+        # Laddaren är fortfarande ansluten, så den senast skickade strömmen gäller.
+        self._last_commanded_current_a = data.get("last_commanded_current_a")
+        self._restored_charger_current_a = self._last_commanded_current_a
+        try:
+            session_start = data.get("session_start_time_utc")
+            self.session_start_time_utc = (
+                dt_util.parse_datetime(session_start) if session_start else None
+            )
+            self.active_control_mode = (
+                data.get("active_control_mode") or CONTROL_MODE_MANUAL
+            )
+            self.active_control_mode_internal = self.active_control_mode
+            self._solar_session_active = bool(data.get("solar_session_active"))
+            self._price_time_eligible_for_charging = bool(
+                data.get("price_time_eligible_for_charging")
+            )
+            self.session_modes = list(data.get("session_modes", []))
+            self.session_solar_energy_kwh = float(
+                data.get("session_solar_energy_kwh", 0.0)
+            )
+            self.session_grid_energy_kwh = float(
+                data.get("session_grid_energy_kwh", 0.0)
+            )
+            self.session_cost_kr = float(data.get("session_cost_kr", 0.0))
+        except (TypeError, ValueError) as e:
+            _LOGGER.warning("Kunde inte återställa sparat sessionstillstånd: %s", e)
+            self.session_start_time_utc = None
+            self._solar_session_active = False
+            self._price_time_eligible_for_charging = False
+            return
+        self._persisted_session_state = self._session_state_snapshot()
+        _LOGGER.info(
+            "Sessionstillstånd återställt efter omstart (läge: %s, session startad: %s, laddarstatus: %s).",
+            self.active_control_mode,
+            self.session_start_time_utc,
+            charger_status,
+        )
 
     # Lägg till denna nya metod i SmartEVChargingCoordinator-klassen i coordinator.py
     # (t.ex. före _control_charger eller _async_update_data)
@@ -219,65 +610,85 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
 
         return reason_for_action
 
-    async def _resolve_internal_entities(self) -> bool:
-        if self._internal_entities_resolved:
-            return True
-        if self._debug_logging:
-            _LOGGER.debug("Koordinator: _resolve_internal_entities STARTAR.")
-        try:
-            ent_reg: EntityRegistry = async_get_entity_registry(self.hass)
-            self.smart_enable_switch_entity_id = ent_reg.async_get_entity_id(
-                "switch",
-                DOMAIN,
-                f"{self.entry.entry_id}_{ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH}",
-            )
-            self.max_price_entity_id = ent_reg.async_get_entity_id(
-                "number",
-                DOMAIN,
-                f"{self.entry.entry_id}_{ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER}",
-            )
-            self.solar_enable_switch_entity_id = ent_reg.async_get_entity_id(
-                "switch",
-                DOMAIN,
-                f"{self.entry.entry_id}_{ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH}",
-            )
-            self.solar_buffer_entity_id = ent_reg.async_get_entity_id(
-                "number",
-                DOMAIN,
-                f"{self.entry.entry_id}_{ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER}",
-            )
-            self.min_solar_charge_current_entity_id = ent_reg.async_get_entity_id(
-                "number",
-                DOMAIN,
-                f"{self.entry.entry_id}_{ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER}",
+    async def _calculate_hybrid_charging_action(
+        self,
+        calculated_solar_current_a: float,
+        available_solar_surplus_w: float,
+        hybrid_target_power_w: float,
+        charger_hw_max_amps: float,
+    ) -> str:
+        """
+        Bestämmer laddningsåtgärd för hybridläget (sol + billig nätel).
+        Solöverskottet täcker vad det kan, nätel fyller upp till laddarens
+        minimiström eller till den konfigurerade måleffekten.
+        Uppdaterar self.should_charge_flag, self.target_charge_current_a, etc.
+        Returnerar reason_for_action.
+        """
+        calculated_solar_current_a = max(0.0, calculated_solar_current_a)
+        watts_per_amp = self._watts_per_amp()
+
+        # Lägsta ström som nätel får fylla upp till.
+        grid_floor_a = float(MIN_CHARGE_CURRENT_A)
+        if hybrid_target_power_w > 0:
+            grid_floor_a = max(
+                grid_floor_a, float(math.ceil(hybrid_target_power_w / watts_per_amp))
             )
 
-            if not all(
-                [
-                    self.smart_enable_switch_entity_id,
-                    self.max_price_entity_id,
-                    self.solar_enable_switch_entity_id,
-                    self.solar_buffer_entity_id,
-                    self.min_solar_charge_current_entity_id,
-                ]
+        self.active_control_mode_internal = CONTROL_MODE_HYBRID
+        self.should_charge_flag = True
+        self.target_charge_current_a = min(
+            max(calculated_solar_current_a, grid_floor_a), charger_hw_max_amps
+        )
+
+        charging_power_w = self.target_charge_current_a * watts_per_amp
+        solar_share_w = min(max(0.0, available_solar_surplus_w), charging_power_w)
+        grid_share_w = charging_power_w - solar_share_w
+        reason_for_action = f"Hybridladdning aktiv (Sol: {solar_share_w:.0f}W + Nät: {grid_share_w:.0f}W. Sätter till {self.target_charge_current_a:.1f}A)."
+
+        if not self._solar_session_active or self._price_time_eligible_for_charging:
+            _LOGGER.info("Startar hybridladdningssession. %s", reason_for_action)
+            if (
+                self.session_start_time_utc is not None
+                and self._price_time_eligible_for_charging
             ):
-                if self._debug_logging:
-                    _LOGGER.debug(
-                        "Ett eller flera interna ID:n ej redo under _resolve_internal_entities."
-                    )
-                self._internal_entities_resolved = False
-                return False
+                self._reset_session_data(reason_for_action)
 
-            self._internal_entities_resolved = True
-            if self._debug_logging:
-                _LOGGER.debug("Koordinator: Interna ID:n OK.")
-            return True
-        except Exception as e:
-            _LOGGER.error("Fel i _resolve_internal_entities: %s", e, exc_info=True)
-            self._internal_entities_resolved = False
+        # Markera solsessionen som aktiv så att ren solenergiladdning kan fortsätta
+        # om nätpriset stiger över hybridgränsen.
+        self._solar_session_active = True
+        self._price_time_eligible_for_charging = False
+        return reason_for_action
+
+    @callback
+    def set_control_value(self, key: str, value: Any) -> bool:
+        """
+        Sätter ett typat värde från en av integrationens egna switch- eller
+        nummer-entiteter. Returnerar True om värdet ändrades.
+        """
+        if key in self.control_values and self.control_values[key] == value:
             return False
+        self.control_values[key] = value
+        if self._debug_logging:
+            _LOGGER.debug("Styrvärde %s satt till %s.", key, value)
+        return True
+
+    async def async_set_control_value(self, key: str, value: Any) -> None:
+        """Sätter ett styrvärde och begär en omedelbar omvärdering om det ändrades."""
+        if self.set_control_value(key, value) and self.control_values_ready:
+            await self.async_request_refresh()
+
+    @property
+    def control_values_ready(self) -> bool:
+        """True när de styrvärden som logiken inte kan gissa har rapporterats."""
+        return all(key in self.control_values for key in REQUIRED_CONTROL_KEYS)
 
     def _setup_listeners(self) -> None:
+        """
+        Begär en utvärdering när en entitet som kan starta eller stoppa
+        laddningen ändras: laddarens status, priset, scheman, huvudströmbrytaren,
+        bilens SoC och avresan. Effekt- och strömsensorerna läses i varje cykel
+        medan en session pågår och ger ingen egen utvärdering.
+        """
         if self._debug_logging:
             _LOGGER.debug("Sätter upp lyssnare...")
         self._remove_listeners()
@@ -285,16 +696,19 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             self.config.get(CONF_STATUS_SENSOR),
             self.config.get(CONF_PRICE_SENSOR),
             self.config.get(CONF_TIME_SCHEDULE_ENTITY),
-            self.config.get(CONF_HOUSE_POWER_SENSOR),
-            self.config.get(CONF_SOLAR_PRODUCTION_SENSOR),
             self.config.get(CONF_SOLAR_SCHEDULE_ENTITY),
-            self.config.get(CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR),
-            self.config.get(CONF_CHARGER_DYNAMIC_CURRENT_SENSOR),
             self.config.get(CONF_CHARGER_ENABLED_SWITCH_ID),
             self.config.get(CONF_EV_SOC_SENSOR),
+            self.config.get(CONF_DEPARTURE_OVERRIDE_ENTITY),
         ]
+        # Elmätarens sensorer uppdateras i hög takt och läses in separat.
+        ingested = (
+            self.meter_ingest.entity_ids if self.meter_ingest is not None else []
+        )
         all_entities_to_listen = [
-            entity_id for entity_id in external_entities if entity_id
+            entity_id
+            for entity_id in external_entities
+            if entity_id and entity_id not in ingested
         ]
         if all_entities_to_listen:
             if self._debug_logging:
@@ -322,6 +736,9 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
 
     @callback
     def _handle_external_state_change(self, event: Event) -> None:
+        # Medan den periodiska uppdateringen körs tas ändringen med i nästa cykel.
+        if self.update_interval is not None:
+            return
         entity_id = event.data.get("entity_id")
         old_state_obj = event.data.get("old_state")
         new_state_obj = event.data.get("new_state")
@@ -339,6 +756,161 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         )
         self.hass.async_create_task(self.async_request_refresh())
 
+    @callback
+    def _handle_modbus_values(self, values: dict[str, float]) -> None:
+        changed = [
+            source
+            for source, value in values.items()
+            if source in self._modbus_evaluated
+            and abs(value - self._modbus_evaluated[source]) >= POWER_REFRESH_DELTA_W
+        ]
+        if not changed:
+            return
+        if self._debug_logging:
+            _LOGGER.debug(
+                "Modbus-värdet för %s har ändrats. Begär refresh.", changed
+            )
+        self.hass.async_create_task(self.async_request_refresh())
+
+    @callback
+    def _handle_meter_snapshot(self, snapshot: dict[str, Any]) -> None:
+        self._meter_snapshot = snapshot
+        if self._assign_charging_phase(snapshot["phase_current_max_a"]):
+            self.hass.async_create_task(self.async_request_refresh())
+            return
+        evaluated = self._meter_evaluated
+        if not evaluated:
+            return
+        mean_w, evaluated_w = (
+            snapshot["house_power_mean_w"],
+            evaluated.get("house_power_mean_w"),
+        )
+        changed = (
+            mean_w is not None
+            and evaluated_w is not None
+            and abs(mean_w - evaluated_w) >= POWER_REFRESH_DELTA_W
+        ) or any(
+            new is not None
+            and old is not None
+            and abs(new - old) >= PHASE_REFRESH_DELTA_A
+            for new, old in zip(
+                snapshot["phase_current_max_a"],
+                evaluated.get("phase_current_max_a", []),
+            )
+        )
+        if not changed:
+            return
+        if self._debug_logging:
+            _LOGGER.debug("Elmätarens underlag har ändrats. Begär refresh.")
+        self.hass.async_create_task(self.async_request_refresh())
+
+    def _assign_charging_phase(self, measured_a: list[float | None]) -> bool:
+        """
+        Tilldelar en 1-fasbil den minst belastade fasen när laddaren kan välja
+        fas. Returnerar True om fasen har bytts.
+        """
+        charger_phases = self.charger_phases
+        if charger_phases is None or not PHASE_BALANCER.assign_phase(
+            charger_phases, measured_a
+        ):
+            return False
+        phase = cast(int, charger_phases.assigned_phase)
+        _LOGGER.info(
+            "Fasbalansering: 1-fasladdningen flyttas till %s (last per fas: %s A).",
+            PHASE_NAMES[phase],
+            measured_a,
+        )
+        if self.charger_backend.select_phase(phase):
+            self._count_charger_command()
+        else:
+            _LOGGER.warning("Kunde inte välja %s i laddaren.", PHASE_NAMES[phase])
+        return True
+
+    def _watts_per_amp(self) -> float:
+        """Laddeffekt per ampere, med bilens faser när fasbalanseringen anger dem."""
+        phases = (
+            len(self.charger_phases.phases)
+            if self.charger_phases is not None
+            else PHASES
+        )
+        return phases * VOLTAGE_PHASE_NEUTRAL
+
+    @callback
+    def _handle_price_boundary(self, now: datetime) -> None:
+        if self._debug_logging:
+            _LOGGER.debug(
+                "Prisintervall eller tidsschema slår om (%s). Begär refresh.",
+                now.isoformat(),
+            )
+        self.hass.async_create_task(self.async_request_refresh())
+
+    @callback
+    def _schedule_next_evaluation(
+        self, now: datetime, price_path_possible: bool, needs_polling: bool
+    ) -> None:
+        """
+        Schemalägger nästa utvärdering. Pris/Tid-vägen omvärderas bara vid nästa
+        prisintervall eller schemaomslag. Periodiska uppdateringar behövs bara när
+        en session pågår eller när sol, hybrid eller effekttoppar måste följas.
+        """
+        update_interval = self._scan_interval if needs_polling else None
+        if update_interval != self.update_interval:
+            if self._debug_logging:
+                _LOGGER.debug(
+                    "Periodisk uppdatering %s.",
+                    "återupptas" if needs_polling else "pausas",
+                )
+            self.update_interval = update_interval
+        # Utan lyssnare körs inga uppdateringar, varken periodiska eller schemalagda.
+        if not price_path_possible or not self._listeners:
+            self.price_scheduler.async_cancel()
+            return
+        schedule_entity_ids = [
+            str(entity_id)
+            for entity_id in (
+                self.config.get(CONF_TIME_SCHEDULE_ENTITY),
+                self.config.get(CONF_SOLAR_SCHEDULE_ENTITY),
+            )
+            if entity_id
+        ]
+        price_boundary = (
+            self.price_cache.next_boundary(now)
+            if self.config.get(CONF_PRICE_SENSOR)
+            else None
+        )
+        self.price_scheduler.async_schedule(
+            self.price_scheduler.next_boundary(now, price_boundary, schedule_entity_ids)
+        )
+
+    def _relative_price_condition(self, now: datetime) -> tuple[bool, str] | None:
+        """
+        Utvärderar den relativa prisgränsen (billigaste N timmar eller percentil)
+        för intervallet som pågår. Returnerar (uppfyllt, beskrivning), eller None
+        om det absoluta maxpriset gäller eller prisserien saknas.
+        """
+        mode = self.config.get(CONF_PRICE_THRESHOLD_MODE)
+        threshold = self.control_values.get(
+            ENTITY_ID_SUFFIX_RELATIVE_PRICE_THRESHOLD_NUMBER
+        )
+        if mode in (None, PRICE_THRESHOLD_MODE_ABSOLUTE) or threshold is None:
+            return None
+        if mode == PRICE_THRESHOLD_MODE_CHEAPEST_HOURS:
+            in_window = self.price_cache.in_cheapest_hours(now, threshold)
+            description = f"bland de {threshold:g} billigaste timmarna"
+        elif mode == PRICE_THRESHOLD_MODE_PERCENTILE:
+            in_window = self.price_cache.is_cheapest_fraction(now, threshold / 100.0)
+            description = f"under dygnets {threshold:g}:e percentil"
+        else:
+            return None
+        if in_window is None:
+            if self._debug_logging:
+                _LOGGER.debug(
+                    "Prisserie saknas för relativ prisgräns (%s), använder maxpriset.",
+                    mode,
+                )
+            return None
+        return in_window, description
+
     async def _get_number_value(
         self,
         entity_id_or_key: str | None,
@@ -386,7 +958,8 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             )
             return default_value
 
-    async def _get_spot_price_in_kr(self) -> float | None:
+    async def _get_price_in_kr(self) -> float | None:
+        """Aktuell kostnad i kr/kWh: totalkostnad med tariff, annars spotpris."""
         entity_id = self.config.get(CONF_PRICE_SENSOR)
         if not entity_id:
             return None
@@ -394,23 +967,42 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         if state_obj is None or state_obj.state in [STATE_UNAVAILABLE, STATE_UNKNOWN]:
             _LOGGER.warning("Elprissensor %s är otillgänglig.", entity_id)
             return None
+        # Tolkar om prisserien och enheten bara när sensorns tillstånd har ändrats.
+        now = dt_util.utcnow()
+        self.price_cache.update(state_obj, now)
+        return self.price_cache.current_cost(now)
+
+    async def _get_export_price_in_kr(self) -> float | None:
+        """Exportersättning i kr/kWh från exportprissensorn, om den är konfigurerad."""
+        entity_id = self.config.get(CONF_EXPORT_PRICE_SENSOR)
+        if not entity_id:
+            return None
+        state_obj = self.hass.states.get(str(entity_id))
+        if state_obj is None or state_obj.state in [STATE_UNAVAILABLE, STATE_UNKNOWN]:
+            _LOGGER.warning("Exportprissensor %s är otillgänglig.", entity_id)
+            return None
         try:
-            price = float(state_obj.state)
-            unit = str(state_obj.attributes.get("unit_of_measurement", "")).lower()
-            if "öre" in unit or "/100kwh" in unit:
-                price /= 100
-            elif "mwh" in unit:
-                price /= 1000
-            return price
+            return float(state_obj.state) / price_unit_divisor(
+                state_obj.attributes.get("unit_of_measurement")
+            )
         except (ValueError, TypeError):
             _LOGGER.warning(
-                "Kunde inte konvertera elprisvärde '%s' från %s.",
+                "Kunde inte konvertera exportpris '%s' från %s.",
                 state_obj.state,
                 entity_id,
             )
             return None
 
     async def _get_power_value(self, entity_id_key: str) -> float | None:
+        if self.modbus is not None and (source := MODBUS_SOURCES.get(entity_id_key)):
+            value = self.modbus.power_w(source, dt_util.utcnow())
+            if value is not None:
+                self._modbus_evaluated[source] = value
+                return value
+        if entity_id_key == CONF_HOUSE_POWER_SENSOR and self.meter_ingest is not None:
+            value = self.meter_ingest.house_power_w(dt_util.utcnow())
+            if value is not None:
+                return value
         entity_id = self.config.get(entity_id_key)
         if not entity_id:
             return None
@@ -444,7 +1036,139 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
 
     def _reset_session_data(self, reason: str = "Okänd") -> None:
         _LOGGER.info("Återställer sessionsdata. Anledning: %s", reason)
+        # Spara den avslutade sessionen i historiken om den levererade energi.
+        if (
+            self.session_start_time_utc is not None
+            and self.session_solar_energy_kwh + self.session_grid_energy_kwh > 0
+        ):
+            self.session_store.add_session(
+                build_session_record(
+                    start=self.session_start_time_utc,
+                    end=dt_util.utcnow(),
+                    modes=self.session_modes,
+                    solar_energy_kwh=self.session_solar_energy_kwh,
+                    grid_energy_kwh=self.session_grid_energy_kwh,
+                    cost_kr=self.session_cost_kr,
+                )
+            )
+        if self.charge_curve is not None:
+            self.charge_curve.end_session()
         self.session_start_time_utc = None
+        self.session_solar_energy_kwh = 0.0
+        self.session_grid_energy_kwh = 0.0
+        self.session_cost_kr = 0.0
+        self.session_modes = []
+
+    def _accumulate_session_energy(self, now: datetime) -> None:
+        """
+        Integrerar föregående cykels laddeffekt och delar upp den i sol- och nätenergi.
+        Nätenergin prissätts med föregående cykels spotpris.
+        """
+        last_update = self._last_energy_update_time
+        self._last_energy_update_time = now
+        if last_update is None or self.session_start_time_utc is None:
+            return
+        elapsed_s = (now - last_update).total_seconds()
+        if elapsed_s <= 0:
+            return
+        # Begränsa integrationssteget så att långa avbrott inte krediteras som laddning.
+        if self.update_interval:
+            elapsed_s = min(elapsed_s, 3 * self.update_interval.total_seconds())
+        power_w = self._last_tick_charging_power_w
+        if power_w <= 0:
+            return
+        solar_w = min(max(0.0, self._last_tick_solar_surplus_w), power_w)
+        hours = elapsed_s / 3600.0
+        grid_energy_kwh = (power_w - solar_w) * hours / 1000.0
+        self.session_solar_energy_kwh += solar_w * hours / 1000.0
+        self.session_grid_energy_kwh += grid_energy_kwh
+        if self._last_tick_price_kr is not None:
+            self.session_cost_kr += grid_energy_kwh * self._last_tick_price_kr
+        if self.active_control_mode not in self.session_modes:
+            self.session_modes.append(self.active_control_mode)
+
+    def _apply_peak_shaving_limit(
+        self, now: datetime, house_power_w: float, reason: str
+    ) -> str:
+        """
+        Registrerar husets effekt och sänker vid behov målströmmen så att
+        innevarande timmes medeleffekt inte överstiger månadens effekttopp.
+        Returnerar (eventuellt utökad) anledning.
+        """
+        if self.peak_shaving is None:
+            return reason
+        self.peak_shaving.add_sample(now, house_power_w)
+        # Husets effekt inkluderar laddaren. Dra bort den effekt vi själva styr.
+        house_power_excl_charger_w = max(
+            0.0, house_power_w - self._last_tick_charging_power_w
+        )
+        self._peak_shaving_projected_hour_w = (
+            self.peak_shaving.projected_hour_average_w(now, house_power_w)
+        )
+        max_charging_power_w = self.peak_shaving.max_charging_power_w(
+            now, house_power_excl_charger_w
+        )
+        self.peak_shaving_max_charging_power_w = max_charging_power_w
+        if (
+            max_charging_power_w is None
+            or not self.should_charge_flag
+            or self.target_charge_current_a <= 0
+        ):
+            return reason
+
+        max_current_a = math.floor(
+            max_charging_power_w / self._watts_per_amp()
+        )
+        if max_current_a >= self.target_charge_current_a:
+            return reason
+        # Under minimiströmmen kan laddaren inte ladda, pausa med 0A i stället.
+        self.target_charge_current_a = (
+            float(max_current_a) if max_current_a >= MIN_CHARGE_CURRENT_A else 0.0
+        )
+        if self._debug_logging:
+            _LOGGER.debug(
+                "Effekttoppsbegränsning: max %.0f W kvar i timmen, ström begränsad till %.1fA.",
+                max_charging_power_w,
+                self.target_charge_current_a,
+            )
+        return f"{reason} Begränsad till {self.target_charge_current_a:.0f}A av effekttoppsbegränsning (max {max_charging_power_w:.0f} W)."
+
+    def _apply_phase_limit(self, now: datetime, reason: str) -> str:
+        """
+        Sänker vid behov målströmmen så att ingen av bilens faser överstiger
+        huvudsäkringen, med husets last och övriga laddare per fas.
+        Returnerar (eventuellt utökad) anledning.
+        """
+        if self.charger_phases is None or self.meter_ingest is None:
+            return reason
+        measured_a = self.meter_ingest.phase_currents_a(now)
+        self._phase_house_loads_a = PHASE_BALANCER.house_loads_a(measured_a)
+        self._phase_limit = PHASE_BALANCER.max_current_a(
+            self.charger_phases, measured_a
+        )
+        if (
+            self._phase_limit is None
+            or not self.should_charge_flag
+            or self.target_charge_current_a <= 0
+        ):
+            return reason
+
+        headroom_a, phase = self._phase_limit
+        max_current_a = math.floor(headroom_a)
+        if max_current_a >= self.target_charge_current_a:
+            return reason
+        # Under minimiströmmen kan laddaren inte ladda, pausa med 0A i stället.
+        self.target_charge_current_a = (
+            float(max_current_a) if max_current_a >= MIN_CHARGE_CURRENT_A else 0.0
+        )
+        if self._debug_logging:
+            _LOGGER.debug(
+                "Fasbalansering: %.1fA kvar på %s, ström begränsad till %.1fA.",
+                headroom_a,
+                PHASE_NAMES[phase],
+                self.target_charge_current_a,
+            )
+        return f"{reason} Begränsad till {self.target_charge_current_a:.0f}A av fasbalansering ({PHASE_NAMES[phase]} har {headroom_a:.1f}A kvar till huvudsäkringen)."
 
     # Definierar en asynkron metod (coroutine) som heter _control_charger.
     # Denna metod är en del av en klass (indikerat av 'self').
@@ -479,7 +1203,7 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         # Konverterar till gemener för enklare jämförelser.
         # Om inget giltigt tillstånd finns, sätts charger_status till STATE_UNKNOWN (en konstant, oftast "unknown").
         charger_status = (
-            charger_status_state.state.lower()
+            self.charger_backend.map_status(charger_status_state.state)
             if charger_status_state and isinstance(charger_status_state.state, str)
             else STATE_UNKNOWN
         )
@@ -518,6 +1242,27 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             current_dynamic_limit_on_charger = await self._get_number_value(
                 current_dynamic_limit_entity_id, is_config_key=False
             )
+
+        # Kommandon vars effekt nu syns i laddarens sensorer är bekräftade.
+        # För obekräftade kommandon används det förväntade tillståndet, så att
+        # samma start eller ström inte skickas igen medan molnets status släpar.
+        now = dt_util.utcnow()
+        self.command_tracker.confirm(now)
+        charger_status = self.charger_state.status(
+            charger_status,
+            charger_status_state.last_changed if charger_status_state else None,
+            now,
+        )
+        dynamic_limit_state = (
+            self.hass.states.get(current_dynamic_limit_entity_id)
+            if current_dynamic_limit_entity_id
+            else None
+        )
+        current_dynamic_limit_on_charger = self.charger_state.current(
+            current_dynamic_limit_on_charger,
+            dynamic_limit_state.last_changed if dynamic_limit_state else None,
+            now,
+        )
         # Initierar variabeln för nuvarande dynamisk gräns till None.
         # Loggar ett debug-meddelande med aktuella parametrar och tillstånd för styrningen.
         # Detta är användbart för felsökning för att se vilka beslut som fattas.
@@ -569,7 +1314,7 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                 )
                 # Tolka den nya statusen.
                 charger_status = (
-                    charger_status_state.state.lower()
+                    self.charger_backend.map_status(charger_status_state.state)
                     if charger_status_state
                     and isinstance(charger_status_state.state, str)
                     else STATE_UNKNOWN
@@ -581,6 +1326,17 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                 async def set_dynamic_current_on_charger(effective_current: float):
                     # Justering: Säkerställ att strömmen inte är negativ
                     current_to_send = max(0.0, effective_current)
+                    sent_at = dt_util.utcnow()
+                    # Samma ström skickas inte igen medan bekräftelsen väntas.
+                    if not self.command_tracker.should_send(
+                        COMMAND_CURRENT, current_to_send, sent_at
+                    ):
+                        if self._debug_logging:
+                            _LOGGER.debug(
+                                "Strömgränsen %.1fA väntar på bekräftelse från laddaren.",
+                                current_to_send,
+                            )
+                        return
 
                     _LOGGER.info(
                         "Sätter dynamisk strömgräns på laddaren till %.1fA (ursprungligt begärt: %.1fA).",
@@ -588,36 +1344,41 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                         effective_current,  # Logga även det ursprungliga värdet för felsökning
                     )
 
-                    await self.hass.services.async_call(
-                        "easee",
-                        "set_charger_dynamic_limit",
-                        {
-                            "device_id": self.config.get(CONF_CHARGER_DEVICE),
-                            "current": current_to_send,
-                        },
-                        blocking=False,
+                    if not self.charger_backend.set_current(current_to_send):
+                        return
+                    self._count_charger_command()
+                    self.command_tracker.record_sent(
+                        COMMAND_CURRENT, current_to_send, sent_at
                     )
+                    self._last_current_command_time = sent_at
+                    self._last_commanded_current_a = current_to_send
+                    self._restored_charger_current_a = None
 
                 async def send_start_command_to_charger():
+                    sent_at = dt_util.utcnow()
+                    if not self.command_tracker.should_send(
+                        COMMAND_START, True, sent_at
+                    ):
+                        if self._debug_logging:
+                            _LOGGER.debug(
+                                "Startkommandot väntar på bekräftelse från laddaren."
+                            )
+                        return
                     _LOGGER.info("Skickar explicit 'start'-kommando till laddaren.")
-                    await self.hass.services.async_call(
-                        "easee",
-                        "action_command",
-                        {
-                            "device_id": self.config.get(CONF_CHARGER_DEVICE),
-                            "action_command": "start",
-                        },
-                        blocking=False,
-                    )
+                    if not self.charger_backend.start():
+                        return
+                    self._count_charger_command()
+                    self.command_tracker.record_sent(COMMAND_START, True, sent_at)
 
                 # Bestäm vilken ström som faktiskt ska sättas baserat på aktivt läge
                 current_to_set_on_charger: float
                 if self.active_control_mode_internal == CONTROL_MODE_PRICE_TIME:
-                    # För Pris/Tid, säkerställ ALLTID HW max.
-                    current_to_set_on_charger = _charger_hw_max_amps
+                    # För Pris/Tid är målströmmen HW max, om den inte begränsats
+                    # av effekttoppsbegränsningen.
+                    current_to_set_on_charger = current_a
                     if self._debug_logging:
                         _LOGGER.debug(
-                            "Pris/Tid aktivt. Målström satt till HW max: %.1fA.",
+                            "Pris/Tid aktivt. Målström satt till: %.1fA.",
                             current_to_set_on_charger,
                         )
                 else:  # För Solenergi (eller andra framtida lägen)
@@ -631,14 +1392,35 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                         )
 
                 # Kontrollera om strömmen på laddaren behöver uppdateras
+                # Utan sensor för dynamisk ström används strömmen som återställts efter omstart.
+                known_current_on_charger = (
+                    current_dynamic_limit_on_charger
+                    if current_dynamic_limit_on_charger is not None
+                    else self._restored_charger_current_a
+                )
                 needs_current_update_on_charger = (
-                    current_dynamic_limit_on_charger is None
-                    or round(current_dynamic_limit_on_charger, 1)
+                    known_current_on_charger is None
+                    or round(known_current_on_charger, 1)
                     != round(current_to_set_on_charger, 1)
                 )
 
                 is_paused_manually = await self._is_manually_paused()
 
+                # Med laddschema i laddaren startar laddaren själv i Pris/Tid-
+                # fönstret. Startar den inte inom en kort stund styrs den direkt.
+                awaiting_scheduled_start = (
+                    self.charge_schedule is not None
+                    and self.active_control_mode_internal == CONTROL_MODE_PRICE_TIME
+                    and charger_status != EASEE_STATUS_CHARGING
+                    and not is_paused_manually
+                    and self.charge_schedule.awaiting_scheduled_start(
+                        dt_util.utcnow(),
+                        charger_status_state.last_changed
+                        if charger_status_state
+                        else None,
+                    )
+                )
+
                 # # Definierar en inre asynkron funktion för att sätta strömmen om det behövs.
                 # # Detta görs för att undvika kodupprepning.
                 # async def set_current_if_needed_locally():
@@ -691,15 +1473,25 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                 #             current_a,
                 #         )
 
+                if awaiting_scheduled_start:
+                    if self._debug_logging:
+                        _LOGGER.debug(
+                            "Pris/Tid enligt laddschemat i laddaren (status: %s). Inväntar att laddaren startar själv.",
+                            charger_status,
+                        )
+
                 # Fall 1: Laddaren är manuellt pausad, men vi vill ladda. Ta över!
-                if is_paused_manually:
+                elif is_paused_manually:
                     _LOGGER.info(
                         "Laddaren är manuellt pausad. Tar över kontrollen (Mode: %s). Sätter ström till %.1fA.",
                         self.active_control_mode_internal,
                         current_to_set_on_charger,
                     )
                     await set_dynamic_current_on_charger(current_to_set_on_charger)
-                    if self.active_control_mode_internal == CONTROL_MODE_PRICE_TIME:
+                    if (
+                        self.active_control_mode_internal == CONTROL_MODE_PRICE_TIME
+                        and current_to_set_on_charger > 0
+                    ):
                         await send_start_command_to_charger()
 
                 # Fall 2: Laddaren är redo/pausad av systemet/precis klar. Starta/återuppta.
@@ -714,12 +1506,24 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                         current_to_set_on_charger,
                     )
                     await set_dynamic_current_on_charger(current_to_set_on_charger)
-                    if self.active_control_mode_internal == CONTROL_MODE_PRICE_TIME:
+                    if (
+                        self.active_control_mode_internal == CONTROL_MODE_PRICE_TIME
+                        and current_to_set_on_charger > 0
+                    ):
                         await send_start_command_to_charger()
 
                 # Fall 3: Laddaren redan laddar. Justera bara strömmen vid behov.
                 elif charger_status == EASEE_STATUS_CHARGING:
-                    if needs_current_update_on_charger:
+                    if needs_current_update_on_charger and self._current_change_limited(
+                        dt_util.utcnow(), current_to_set_on_charger
+                    ):
+                        if self._debug_logging:
+                            _LOGGER.debug(
+                                "Strömgränsen ändrades nyligen. Laddaren (%s) tillåter högst en höjning per %s.",
+                                self.charger_backend.name,
+                                self.charger_backend.min_current_interval,
+                            )
+                    elif needs_current_update_on_charger:
                         if self._debug_logging:
                             _LOGGER.debug(
                                 "Laddning pågår (Mode: %s). Justerar ström till %.1fA.",
@@ -747,7 +1551,10 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                     await set_dynamic_current_on_charger(current_to_set_on_charger)
 
                     # För Pris/Tid, skicka även ett startkommando för att säkerställa initiering.
-                    if self.active_control_mode_internal == CONTROL_MODE_PRICE_TIME:
+                    if (
+                        self.active_control_mode_internal == CONTROL_MODE_PRICE_TIME
+                        and current_to_set_on_charger > 0
+                    ):
                         await send_start_command_to_charger()
 
                 elif (
@@ -876,7 +1683,27 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             else:
                 # Om laddaren just nu laddar, eller om den är pausad och det inte är manuellt läge:
                 # (Logiken här är att om den är pausad och vi är i manuellt läge, ska vi inte skicka ett nytt pauskommando).
-                if charger_status == EASEE_STATUS_CHARGING or (
+                if (
+                    charger_status == EASEE_STATUS_CHARGING
+                    and self.charge_schedule is not None
+                    and self.charge_schedule.awaiting_scheduled_stop(dt_util.utcnow())
+                ):
+                    if self._debug_logging:
+                        _LOGGER.debug(
+                            "Laddschemats fönster har slutat. Inväntar att laddaren slutar själv."
+                        )
+                # Pauskommandot skickas inte igen medan bekräftelsen väntas.
+                elif (
+                    charger_status in (EASEE_STATUS_CHARGING, EASEE_STATUS_PAUSED)
+                    and not self.command_tracker.should_send(
+                        COMMAND_PAUSE, True, dt_util.utcnow()
+                    )
+                ):
+                    if self._debug_logging:
+                        _LOGGER.debug(
+                            "Pauskommandot väntar på bekräftelse från laddaren."
+                        )
+                elif charger_status == EASEE_STATUS_CHARGING or (
                     charger_status == EASEE_STATUS_PAUSED
                     and self.active_control_mode_internal != CONTROL_MODE_MANUAL
                 ):
@@ -893,19 +1720,13 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                     #     {"charger_id": self.config.get(CONF_CHARGER_DEVICE)},
                     #     blocking=False,
                     # )
-                    # Anropar Easee-tjänsten för att pausa laddningen.
-                    # Detta är den aktiva koden, baserat på användarens tidigare input.
-                    await self.hass.services.async_call(
-                        "easee",  # Domänen för Easee.
-                        "action_command",  # Tjänstenamn för generiska kommandon.
-                        {
-                            "device_id": self.config.get(
-                                CONF_CHARGER_DEVICE
-                            ),  # Enhets-ID.
-                            "action_command": "pause",  # Kommando för att pausa.
-                        },
-                        blocking=False,  # Kör asynkront.
-                    )
+                    # Pausar laddningen via laddarens gränssnitt.
+                    # Anropet körs i bakgrunden och stoppas av en öppen kretsbrytare.
+                    if self.charger_backend.pause():
+                        self._count_charger_command()
+                        self.command_tracker.record_sent(
+                            COMMAND_PAUSE, True, dt_util.utcnow()
+                        )
                     # Om en session var aktiv, återställ sessionsdata.
                     if self.session_start_time_utc is not None:
                         self._reset_session_data(f"Laddning stoppad/pausad ({reason})")
@@ -950,29 +1771,32 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         # Loggar ett debug-meddelande som indikerar att uppdateringscykeln har startat.
         if self._debug_logging:
             _LOGGER.debug("Koordinatorn kör _async_update_data")
+        # Elmätarens underlag som denna utvärdering bygger på.
+        self._meter_evaluated = self._meter_snapshot
 
-        # Kontrollerar om de interna entiteterna (switchar, nummer etc. som skapas av denna integration) har blivit lösta (deras entity_id har hittats).
-        if not self._internal_entities_resolved:
-            # Om de inte är lösta, försök att lösa dem nu genom att anropa _resolve_internal_entities.
-            if not await self._resolve_internal_entities():
-                # Om de fortfarande inte kunde lösas, logga en varning.
-                _LOGGER.warning(
-                    "Interna entiteter kunde inte lösas, avbryter uppdateringscykeln."
-                )
-                # Avbryt uppdateringscykeln och returnera befintlig data (om någon finns),
-                # annars returnera ett standardobjekt som indikerar manuellt läge och väntan.
-                # Detta förhindrar fel om integrationen inte är fullständigt initialiserad.
-                return (
-                    self.data  # Returnera tidigare data om den finns.
-                    if self.data  # Kontrollera om self.data har ett värde.
-                    else {  # Annars, returnera ett standardobjekt.
-                        "active_control_mode": CONTROL_MODE_MANUAL,  # Sätt aktivt läge till manuellt.
-                        "should_charge_reason": "Väntar på interna entiteter.",  # Ange anledning.
-                    }
+        # Kontrollerar om de interna entiteterna (switchar, nummer etc. som skapas av denna integration)
+        # har rapporterat sina värden. Vid uppstart sker första uppdateringen innan plattformarna är uppsatta.
+        if not self.control_values_ready:
+            if self._debug_logging:
+                _LOGGER.debug(
+                    "Interna entiteter har inte rapporterat sina värden än, avbryter uppdateringscykeln."
                 )
+            # Avbryt uppdateringscykeln och returnera befintlig data (om någon finns),
+            # annars returnera ett standardobjekt som indikerar manuellt läge och väntan.
+            # Detta förhindrar fel om integrationen inte är fullständigt initialiserad.
+            return (
+                self.data  # Returnera tidigare data om den finns.
+                if self.data  # Kontrollera om self.data har ett värde.
+                else {  # Annars, returnera ett standardobjekt.
+                    "active_control_mode": CONTROL_MODE_MANUAL,  # Sätt aktivt läge till manuellt.
+                    "should_charge_reason": "Väntar på interna entiteter.",  # Ange anledning.
+                }
+            )
 
         # Hämtar den nuvarande tiden i UTC-format. Används för tidsbaserade jämförelser.
         current_time = dt_util.utcnow()
+        # Kreditera energin som levererats sedan föregående cykel till sessionen.
+        self._accumulate_session_energy(current_time)
         # Hämtar entity_id för laddarens statussensor från konfigurationen.
         charger_status_sensor_id = self.config.get(CONF_STATUS_SENSOR)
         # Hämtar tillståndsobjektet för statussensorn från Home Assistant.
@@ -988,7 +1812,9 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         # Konverterar till gemener för konsekventa jämförelser.
         # Om inget giltigt tillstånd finns (t.ex. sensorn är otillgänglig), sätts status till STATE_UNKNOWN.
         charger_status = (
-            charger_status_state.state.lower()  # Hämta state och konvertera till gemener.
+            self.charger_backend.map_status(
+                charger_status_state.state
+            )  # Hämta state och översätt till Easees statusar.
             if charger_status_state
             and isinstance(
                 charger_status_state.state, str
@@ -1014,32 +1840,29 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             else True  # Är switchen PÅ? True om ej konfad.
         )
 
+        # Läser de värden som integrationens egna entiteter har skrivit till koordinatorn.
+        control = self.control_values
         # Kontrollerar om switchen för smart laddning (Pris/Tid) är PÅ.
-        # self.smart_enable_switch_entity_id är ID:t för den switch som denna integration skapar.
-        smart_charging_enabled = self.hass.states.is_state(
-            self.smart_enable_switch_entity_id,
-            STATE_ON,  # Jämför tillståndet med STATE_ON ("on").
+        smart_charging_enabled = bool(
+            control.get(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH)
         )
         # Kontrollerar om switchen för solenergiladdning är PÅ.
-        # self.solar_enable_switch_entity_id är ID:t för den switch som denna integration skapar.
-        solar_charging_enabled = self.hass.states.is_state(
-            self.solar_enable_switch_entity_id,
-            STATE_ON,  # Jämför tillståndet med STATE_ON.
+        solar_charging_enabled = bool(
+            control.get(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH)
+        )
+        # Kontrollerar om switchen för hybridladdning (sol + billig nätel) är PÅ.
+        hybrid_charging_enabled = bool(
+            control.get(ENTITY_ID_SUFFIX_ENABLE_HYBRID_CHARGING_SWITCH)
         )
 
-        # Hämtar det aktuella spotpriset i kr/kWh via en hjälpmetod.
-        current_price_kr = await self._get_spot_price_in_kr()
+        # Hämtar det aktuella elpriset i kr/kWh via en hjälpmetod. Med en
+        # tariffmodell är det totalkostnaden inklusive avgifter, skatt och moms.
+        current_price_kr = await self._get_price_in_kr()
         # Hämtar det maximalt accepterade priset från nummer-entiteten som skapats av denna integration.
-        # Om värdet inte kan hämtas, används 999.0 som ett högt defaultvärde (laddning tillåts prismässigt).
-        # is_config_key=False betyder att self.max_price_entity_id redan är ett fullständigt entity_id.
-        max_accepted_price_kr = (
-            await self._get_number_value(
-                self.max_price_entity_id,
-                999.0,
-                is_config_key=False,  # Standardvärde om inget kan läsas.
-            )
-            or 999.0  # Säkerställer att det inte blir None om _get_number_value returnerar None (t.ex. om entiteten är ny).
-        )
+        # Om värdet saknas, används 999.0 som ett högt defaultvärde (laddning tillåts prismässigt).
+        max_accepted_price_kr = control.get(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER)
+        if max_accepted_price_kr is None:
+            max_accepted_price_kr = 999.0
 
         # Hämtar entity_id för tidsschemat (för Pris/Tid-laddning) från konfigurationen.
         time_schedule_entity_id = self.config.get(CONF_TIME_SCHEDULE_ENTITY)
@@ -1102,6 +1925,15 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             current_soc_percent = await self._get_number_value(
                 ev_soc_sensor_entity_id, is_config_key=False
             )
+            # Mellan avläsningarna används uppskattningen från levererad energi.
+            if self.soc_estimator is not None:
+                current_soc_percent = self._estimated_soc(
+                    current_time, str(ev_soc_sensor_entity_id), current_soc_percent
+                )
+
+        # En tid från override-entiteten har företräde framför inlärd avresetid.
+        if self.departure_learner is not None:
+            self.departure_learner.set_override(self._departure_override())
 
         # Hämtar den konfigurerade övre SoC-gränsen från konfigurationen.
         target_soc_limit_config = self.config.get(CONF_TARGET_SOC_LIMIT)
@@ -1113,10 +1945,8 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         )
 
         # Hämtar värdet från nummer-entiteten för minsta laddström vid solenergiladdning.
-        _min_solar_current_from_sensor = await self._get_number_value(
-            self.min_solar_charge_current_entity_id,  # ID för den interna nummer-entiteten.
-            default_value=None,  # Inget default här, hanteras nedan.
-            is_config_key=False,  # Detta är redan ett entity_id.
+        _min_solar_current_from_sensor = control.get(
+            ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER
         )
         # Sätter minsta solenergiladdström. Använder värdet från nummer-entiteten om det finns,
         # annars används en global konstant (MIN_CHARGE_CURRENT_A).
@@ -1128,9 +1958,7 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         )
 
         # Hämtar värdet från nummer-entiteten för solenergi-bufferten.
-        _solar_buffer_from_sensor = await self._get_number_value(
-            self.solar_buffer_entity_id, default_value=None, is_config_key=False
-        )
+        _solar_buffer_from_sensor = control.get(ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER)
         # Sätter solenergi-bufferten. Använder värdet från nummer-entiteten om det finns,
         # annars används en global konstant (POWER_MARGIN_W).
         solar_buffer_w = (
@@ -1139,6 +1967,51 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             else POWER_MARGIN_W  # Annars, använd standardbuffert.
         )
 
+        # Hämtar det högsta nätpris som hybridläget får fylla upp med.
+        hybrid_max_grid_price_kr = control.get(
+            ENTITY_ID_SUFFIX_HYBRID_MAX_GRID_PRICE_NUMBER
+        )
+        # Hämtar hybridlägets måleffekt (0 = fyll bara upp till minimiströmmen).
+        hybrid_target_power_w = (
+            control.get(ENTITY_ID_SUFFIX_HYBRID_TARGET_POWER_NUMBER) or 0.0
+        )
+
+        # Tillgängligt solöverskott. Används av sol- och hybridlogiken samt för
+        # att kreditera solenergi i sessionens energiuppdelning.
+        available_solar_surplus_w = current_solar_production_w - solar_buffer_w
+
+        # Avgör om överskottet är mer värt att sälja nu än att ladda med, dvs. om
+        # exportersättningen överstiger det billigaste nätpriset före avresa.
+        sell_surplus = False
+        if self.opportunity is not None and (
+            solar_charging_enabled or hybrid_charging_enabled
+        ):
+            sell_surplus = bool(
+                self.opportunity.should_sell_surplus(
+                    self.price_cache.series,
+                    current_time,
+                    await self._get_export_price_in_kr(),
+                )
+            )
+
+        # Laddplanen räknas bara om när prisserien, solprognosen eller behovet
+        # har ändrats. Beslutet nedan är ett uppslag på det aktuella intervallet.
+        if self.charge_planner is not None:
+            self._update_charge_plan(
+                current_time,
+                current_soc_percent,
+                target_soc_limit,
+                charger_hw_max_amps,
+                min_solar_charge_current_a,
+            )
+
+        # Planen mot avresan räknas om vid nya priser, ny avresa eller ny
+        # SoC-avläsning, eller när de valda intervallen inte längre räcker.
+        if self.deadline_planner is not None:
+            self._update_deadline_plan(
+                current_time, current_soc_percent, charger_hw_max_amps
+            )
+
         # Initierar flaggan för om laddning ska ske till False (standard).
         self.should_charge_flag = False
         # Sätter målladdströmmen initialt till laddarens hårdvarumaximum.
@@ -1148,6 +2021,8 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         reason_for_action = "Ingen styrning aktiv."
         # Sätter det interna styrningsläget initialt till manuellt (AV).
         self.active_control_mode_internal = CONTROL_MODE_MANUAL
+        # Sätts när laddaren inte kan ladda alls (frånkopplad, avstängd, SoC-mål nått).
+        charging_blocked = False
 
         # Start på huvudlogiken för att avgöra om och hur laddning ska ske.
         # Kontrollerar först blockerande tillstånd.
@@ -1160,6 +2035,7 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             # Sätt läget till manuellt och ingen laddning.
             self.active_control_mode_internal = CONTROL_MODE_MANUAL
             self.should_charge_flag = False
+            charging_blocked = True
             # Sätt anledningen.
             reason_for_action = (
                 f"Laddaren är frånkopplad/offline (status: {charger_status})."
@@ -1169,11 +2045,17 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                 self._reset_session_data(reason_for_action)
             # Återställ flagga för om Pris/Tid var det som senast initierade laddning.
             self._price_time_eligible_for_charging = False
+            # Energimålet mot avresan räknas från nästa inkoppling.
+            if self.deadline_planner is not None:
+                self.deadline_planner.reset_period()
+            # Kommandon som inte bekräftats gäller inte nästa inkoppling.
+            self.command_tracker.clear()
         # Om huvudströmbrytaren för laddboxen är AV:
         elif not self.charger_main_switch_state:
             # Sätt läget till manuellt och ingen laddning.
             self.active_control_mode_internal = CONTROL_MODE_MANUAL
             self.should_charge_flag = False
+            charging_blocked = True
             reason_for_action = "Huvudströmbrytare för laddbox är AV."
             if self.session_start_time_utc is not None:
                 self._reset_session_data(reason_for_action)
@@ -1188,6 +2070,7 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         ):
             self.active_control_mode_internal = CONTROL_MODE_MANUAL
             self.should_charge_flag = False
+            charging_blocked = True
             reason_for_action = (
                 f"SoC ({current_soc_percent}%) har nått målet ({target_soc_limit}%)."
             )
@@ -1203,6 +2086,11 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         else:
             # Initiera flagga för om Pris/Tid-villkoren är uppfyllda.
             price_time_conditions_met = False
+            # Sätts när planen mot avresan kräver laddning nu.
+            deadline_charge = False
+            relative_condition: tuple[bool, str] | None = None
+            # Sätts när priset är OK men laddplanen låter solöverskottet ta behovet.
+            deferred_to_solar = False
             # Om Pris/Tid-switchen är PÅ:
             if smart_charging_enabled:
                 # Kontrollera om priset är OK (spotpris <= max accepterat pris).
@@ -1211,10 +2099,33 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                     and current_price_kr
                     <= max_accepted_price_kr  # Är det lägre än eller lika med maxpriset?
                 )
+                # Med relativ prisgräns måste intervallet dessutom höra till de
+                # billigaste. Maxpriset gäller fortfarande som ett tak.
+                relative_condition = self._relative_price_condition(current_time)
+                if relative_condition is not None:
+                    price_ok = price_ok and relative_condition[0]
+                # Med solprognos laddas bara i intervallen som laddplanen valt för
+                # den del av behovet som solöverskottet inte väntas täcka.
+                plan_allows = (
+                    self.charge_planner.grid_charge_allowed(current_time)
+                    if self.charge_planner is not None
+                    else None
+                )
+                if plan_allows is not None:
+                    deferred_to_solar = (
+                        price_ok and time_schedule_active and not plan_allows
+                    )
+                    price_ok = price_ok and plan_allows
                 # Om priset är OK och tidsschemat är aktivt:
                 if price_ok and time_schedule_active:
                     # Då är alla villkor för Pris/Tid-laddning uppfyllda.
                     price_time_conditions_met = True
+                # Planen mot avresan laddar i sina intervall oavsett maxpris och
+                # tidsschema.
+                deadline_charge = (
+                    self.deadline_planner is not None
+                    and self.deadline_planner.charge_now(current_time)
+                )
 
             # Om villkoren för Pris/Tid-laddning är uppfyllda:
             if price_time_conditions_met:
@@ -1226,6 +2137,8 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                 self.target_charge_current_a = charger_hw_max_amps
                 # Sätt anledningen.
                 reason_for_action = f"Pris/Tid-laddning aktiv (Pris: {current_price_kr:.2f} <= {max_accepted_price_kr:.2f} kr, Tidsschema PÅ)."
+                if relative_condition is not None:
+                    reason_for_action = f"Pris/Tid-laddning aktiv (Pris: {current_price_kr:.2f} kr {relative_condition[1]}, Tidsschema PÅ)."
                 # Återställ eventuell pågående solenergi-timer och session.
                 self._solar_surplus_start_time = None
                 self._solar_session_active = False
@@ -1255,12 +2168,66 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                 # Markera att den nuvarande sessionen (om den startas) är en Pris/Tid-session.
                 self._price_time_eligible_for_charging = True
 
+            # Om Pris/Tid-villkoren INTE är uppfyllda men planen mot avresan kräver
+            # laddning nu: ladda med full ström.
+            elif deadline_charge:
+                self.active_control_mode_internal = CONTROL_MODE_DEADLINE
+                self.should_charge_flag = True
+                self.target_charge_current_a = charger_hw_max_amps
+                reason_for_action = self._deadline_reason()
+                self._solar_surplus_start_time = None
+                self._solar_session_active = False
+                if (
+                    self.session_start_time_utc is None
+                    or not self._price_time_eligible_for_charging
+                ):
+                    if self.session_start_time_utc is not None:
+                        self._reset_session_data("Avslutar session för avresa")
+                    _LOGGER.info("Startar ny session mot avresan.")
+                    self.session_start_time_utc = dt_util.utcnow()
+                self._price_time_eligible_for_charging = True
+
+            # Om Pris/Tid-villkoren INTE är uppfyllda och överskottet är mer värt att
+            # sälja än att ladda med: ingen sol- eller hybridladdning.
+            elif (
+                sell_surplus
+                and (solar_charging_enabled or hybrid_charging_enabled)
+                and solar_schedule_active
+                and available_solar_surplus_w > 0
+            ):
+                self.active_control_mode_internal = CONTROL_MODE_MANUAL
+                self.should_charge_flag = False
+                reason_for_action = self._sell_surplus_reason()
+                if self.session_start_time_utc is not None:
+                    self._reset_session_data(reason_for_action)
+                self._solar_surplus_start_time = None
+                self._solar_session_active = False
+                self._price_time_eligible_for_charging = False
+
+            # Om Pris/Tid-villkoren INTE är uppfyllda, men hybridladdning är PÅ, det finns
+            # solöverskott och nätpriset understiger hybridgränsen: blanda sol och nätel.
+            elif (
+                hybrid_charging_enabled
+                and solar_schedule_active
+                and available_solar_surplus_w > 0
+                and current_price_kr is not None
+                and hybrid_max_grid_price_kr is not None
+                and current_price_kr <= hybrid_max_grid_price_kr
+            ):
+                reason_for_action = await self._calculate_hybrid_charging_action(
+                    calculated_solar_current_a=math.floor(
+                        available_solar_surplus_w / self._watts_per_amp()
+                    ),
+                    available_solar_surplus_w=available_solar_surplus_w,
+                    hybrid_target_power_w=hybrid_target_power_w,
+                    charger_hw_max_amps=charger_hw_max_amps,
+                )
+
             # Om Pris/Tid-villkoren INTE är uppfyllda, OCH solenergiladdning är aktiverad (switch PÅ) OCH solenergi-schemat är aktivt:
             elif solar_charging_enabled and solar_schedule_active:
-                # Beräkna tillgängligt solöverskott och potentiell ström
-                available_solar_surplus_w = current_solar_production_w - solar_buffer_w
+                # Beräkna potentiell ström från solöverskottet
                 calculated_solar_current_a = math.floor(
-                    available_solar_surplus_w / (PHASES * VOLTAGE_PHASE_NEUTRAL)
+                    available_solar_surplus_w / self._watts_per_amp()
                 )
                 # Anropa den nya hjälpmetoden för solenergilogik
                 reason_for_action = await self._calculate_solar_charging_action(
@@ -1313,6 +2280,11 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                 )
                 self.should_charge_flag = False  # Ingen laddning.
                 reason_for_action = "Inga aktiva smarta laddningsvillkor uppfyllda."
+                if deferred_to_solar:
+                    reason_for_action = (
+                        "Nätladdning väntar: solprognosen täcker "
+                        f"{self.charge_planner.deferred_kwh:.1f} kWh av behovet."
+                    )
                 # Om en session pågick, återställ den.
                 if self.session_start_time_utc is not None:
                     self._reset_session_data(reason_for_action)
@@ -1321,12 +2293,81 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
                 self._solar_session_active = False
                 self._price_time_eligible_for_charging = False
 
+        # Begränsa laddströmmen så att månadens effekttopp inte höjs.
+        if self.peak_shaving is not None and current_house_power_w is not None:
+            reason_for_action = self._apply_peak_shaving_limit(
+                current_time, current_house_power_w, reason_for_action
+            )
+
+        # Begränsa laddströmmen efter den mest belastade fasen.
+        reason_for_action = self._apply_phase_limit(current_time, reason_for_action)
+
+        # Med laddschema i laddaren skickas Pris/Tid-fönstret dit när det ändras.
+        if self.charge_schedule is not None:
+            await self._sync_charge_schedule(
+                current_time,
+                max_accepted_price_kr,
+                smart_charging_enabled
+                and time_schedule_active
+                and not charging_blocked,
+            )
+
+        # Den ström laddaren erbjöd bilen fram till den här cykeln, för laddkurvan.
+        offered_current_a = self._last_commanded_current_a
         # Anropa metoden som faktiskt skickar kommandon till laddaren,
         # baserat på de beslut som fattats ovan.
         await self._control_charger(
             self.should_charge_flag, self.target_charge_current_a, reason_for_action
         )
 
+        # Spara effekten som förväntas flöda fram till nästa cykel, för energiintegrationen.
+        # Uppmätt laddeffekt används om en sensor finns, annars den begärda strömmen.
+        charger_power_w = await self._get_power_value(CONF_CHARGER_POWER_SENSOR)
+        if charger_power_w is not None:
+            self._last_tick_charging_power_w = max(0.0, charger_power_w)
+        elif self.should_charge_flag and charger_status == EASEE_STATUS_CHARGING:
+            self._last_tick_charging_power_w = (
+                self.target_charge_current_a * self._watts_per_amp()
+            )
+        else:
+            self._last_tick_charging_power_w = 0.0
+        if self.charger_phases is not None:
+            self.charger_phases.draw_a = (
+                self._last_tick_charging_power_w / self._watts_per_amp()
+            )
+        self._last_tick_solar_surplus_w = max(0.0, available_solar_surplus_w)
+        self._last_tick_price_kr = current_price_kr
+        if self.charge_curve is not None:
+            self._update_charge_curve(
+                charger_status,
+                current_soc_percent,
+                target_soc_limit,
+                charger_power_w,
+                offered_current_a,
+                charger_hw_max_amps,
+            )
+        if self.soc_estimator is not None:
+            self.soc_estimator.record_power(
+                current_time, self._last_tick_charging_power_w
+            )
+            if self.config.get(
+                CONF_EV_SOC_REFRESH_ENTITY
+            ) and self.soc_estimator.should_refresh(current_time, target_soc_limit):
+                await self._request_soc_refresh()
+        if self.deadline_planner is not None:
+            self.deadline_planner.record_power(
+                current_time, self._last_tick_charging_power_w
+            )
+        if self.opportunity is not None:
+            # Överskott som säljs på grund av alternativkostnaden ger en beräknad
+            # besparing jämfört med att ha laddat bilen med det.
+            self.opportunity.record_sold_surplus(
+                current_time,
+                available_solar_surplus_w
+                if sell_surplus and not self.should_charge_flag
+                else 0.0,
+            )
+
         # Sätter det "officiella" aktiva styrningsläget som exponeras utåt.
         # Om self.active_control_mode_internal är None (vilket det inte borde vara här), fall tillbaka till MANUELL.
         self.active_control_mode = (
@@ -1334,6 +2375,31 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
         )
         # Uppdaterar tidsstämpeln för den senaste uppdateringen.
         self.last_update_time = current_time
+        # Spara tillståndsmaskinen (fördröjt) så att den överlever en omstart.
+        self._schedule_state_save(current_time)
+        # Planera nästa utvärdering. En frånkopplad eller blockerad laddare
+        # omvärderas först när någon av de bevakade entiteterna ändras.
+        self._schedule_next_evaluation(
+            current_time,
+            price_path_possible=smart_charging_enabled and not charging_blocked,
+            needs_polling=(
+                self.session_start_time_utc is not None
+                or self.should_charge_flag
+                or self.peak_shaving is not None
+                # Väntande kommandon följs upp och skickas om vid behov.
+                or bool(self.command_tracker.pending)
+                or (
+                    self.deadline_planner is not None
+                    and smart_charging_enabled
+                    and not charging_blocked
+                )
+                or (
+                    not charging_blocked
+                    and (solar_charging_enabled or hybrid_charging_enabled)
+                    and solar_schedule_active
+                )
+            ),
+        )
 
         # Loggar en sammanfattning av uppdateringscykelns resultat.
         if self._debug_logging:
@@ -1359,11 +2425,462 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
             "session_start_time_utc": self.session_start_time_utc.isoformat()
             if self.session_start_time_utc
             else None,
+            "session_solar_energy_kwh": round(self.session_solar_energy_kwh, 3),
+            "session_grid_energy_kwh": round(self.session_grid_energy_kwh, 3),
+            "session_energy_kwh": round(
+                self.session_solar_energy_kwh + self.session_grid_energy_kwh, 3
+            ),
+            "session_cost_kr": round(self.session_cost_kr, 2),
+            "last_session": self.session_store.last_session,
+            **self._peak_shaving_data(),
+            **self._phase_balance_data(),
+            **self._opportunity_data(),
+            **self._charge_plan_data(),
+            **self._soc_estimate_data(),
+            **self._charge_curve_data(),
+            **self._departure_data(),
+            **self._deadline_data(),
+            **self._charge_schedule_data(),
+            **self._command_ack_data(),
+            **self._service_breaker_data(),
+            **self._meter_snapshot,
+        }
+
+    def _count_charger_command(self) -> None:
+        """Räknar ett kommando till laddaren. Räknaren nollställs vid midnatt."""
+        today = dt_util.as_local(dt_util.utcnow()).date()
+        if today != self._commands_day:
+            self._commands_day = today
+            self.charger_commands_today = 0
+        self.charger_commands_today += 1
+
+    async def _sync_charge_schedule(
+        self, now: datetime, max_accepted_price_kr: float, enabled: bool
+    ) -> None:
+        """
+        Räknar om nästa Pris/Tid-fönster med samma villkor som styrningen (maxpris,
+        relativ prisgräns och laddplan) och skickar det till laddaren vid ändring.
+        Tidsschemat kan inte förutses och gäller därför bara det aktuella läget.
+        """
+        schedule = self.charge_schedule
+        if not enabled:
+            schedule.clear()
+        else:
+            series = self.price_cache.series
+            planner = self.charge_planner
+
+            def slot_allowed(index: int) -> bool:
+                start = series.starts[index]
+                if series.costs[index] > max_accepted_price_kr:
+                    return False
+                relative = self._relative_price_condition(start)
+                if relative is not None and not relative[0]:
+                    return False
+                return (
+                    planner is None or planner.grid_charge_allowed(start) is not False
+                )
+
+            schedule.update(
+                now,
+                series,
+                (
+                    max_accepted_price_kr,
+                    self.config.get(CONF_PRICE_THRESHOLD_MODE),
+                    self.control_values.get(
+                        ENTITY_ID_SUFFIX_RELATIVE_PRICE_THRESHOLD_NUMBER
+                    ),
+                    planner.version if planner is not None else None,
+                ),
+                slot_allowed,
+            )
+        if schedule.sync(now):
+            self._count_charger_command()
+
+    def _service_breaker_data(self) -> dict[str, Any]:
+        runner = self.service_runner
+        return {
+            "service_breaker_state": runner.overall_state(),
+            "service_breakers": {
+                name: breaker.as_dict() for name, breaker in runner.breakers.items()
+            },
+            "service_calls_in_flight": runner.in_flight,
+        }
+
+    def _current_change_limited(self, now: datetime, current: float) -> bool:
+        """
+        Om laddaren inte tål en höjning av strömgränsen ännu under pågående
+        laddning. Bara höjningar begränsas. En sänkning skickas alltid direkt,
+        så att huvudsäkringen och effekttaket inte överskrids i väntan på
+        intervallet.
+        """
+        last_current = self._last_commanded_current_a
+        return (
+            last_current is not None
+            and current > last_current
+            and self._last_current_command_time is not None
+            and now - self._last_current_command_time
+            < self.charger_backend.min_current_interval
+        )
+
+    def _command_ack_data(self) -> dict[str, Any]:
+        tracker = self.command_tracker
+        return {
+            "command_pending": sorted(tracker.pending),
+            "command_retries": tracker.retries,
+            "command_last_ack_latency_s": round(tracker.last_ack_latency_s, 1)
+            if tracker.last_ack_latency_s is not None
+            else None,
+            "command_ack_latency": tracker.histogram_data(),
+            "charger_status_predicted": self.charger_state.predicted_status,
+            "charger_state_contradictions": self.charger_state.contradictions,
+        }
+
+    def _charge_schedule_data(self) -> dict[str, Any]:
+        data: dict[str, Any] = {"charger_commands_today": self.charger_commands_today}
+        if self.charge_schedule is not None:
+            window = self.charge_schedule.uploaded
+            data["charge_schedule_window"] = (
+                f"{window[0].isoformat()}/{window[1].isoformat()}" if window else None
+            )
+        return data
+
+    def _update_charge_plan(
+        self,
+        now: datetime,
+        current_soc_percent: float | None,
+        target_soc_limit: float | None,
+        charger_hw_max_amps: float,
+        min_solar_charge_current_a: float,
+    ) -> None:
+        """Uppdaterar solprognosen och laddplanen med bilens energibehov."""
+        if self.solar_model is not None:
+            self.solar_forecast.update_hourly(self.solar_model.hourly_kwh)
+        else:
+            self.solar_forecast.update(
+                self.hass.states.get(str(entity_id))
+                for entity_id in self.config.get(CONF_SOLAR_FORECAST_SENSORS) or []
+            )
+        needed_kwh = None
+        if current_soc_percent is not None:
+            target = target_soc_limit if target_soc_limit is not None else 100.0
+            capacity_kwh = float(self.config[CONF_EV_BATTERY_CAPACITY_KWH])
+            needed_kwh = max(0.0, target - current_soc_percent) / 100.0 * capacity_kwh
+        kw_per_ampere = self._watts_per_amp() / 1000.0
+        self.charge_planner.update(
+            now,
+            self.price_cache.series,
+            self.solar_forecast,
+            needed_kwh,
+            charger_hw_max_amps * kw_per_ampere,
+            min_solar_charge_current_a * kw_per_ampere,
+            current_soc_percent,
+            (
+                self.departure_learner.next_departure(now)[0]
+                if self.departure_learner is not None
+                else None
+            ),
+        )
+
+    def _update_charge_curve(
+        self,
+        charger_status: str,
+        current_soc_percent: float | None,
+        target_soc_limit: float | None,
+        charger_power_w: float | None,
+        offered_current_a: float | None,
+        charger_hw_max_amps: float,
+    ) -> None:
+        """Registrerar ett prov till laddkurvan och räknar om tiden till målet."""
+        if current_soc_percent is None:
+            self.charge_time_to_target_h = None
+            return
+        if (
+            charger_status == EASEE_STATUS_CHARGING
+            and charger_power_w is not None
+            and offered_current_a
+        ):
+            self.charge_curve.add_sample(
+                current_soc_percent,
+                charger_power_w,
+                min(offered_current_a, charger_hw_max_amps) * self._watts_per_amp(),
+            )
+        capacity_kwh = self.config.get(CONF_EV_BATTERY_CAPACITY_KWH)
+        self.charge_time_to_target_h = (
+            self.charge_curve.hours_to_charge(
+                current_soc_percent,
+                target_soc_limit if target_soc_limit is not None else 100.0,
+                charger_hw_max_amps * self._watts_per_amp() / 1000.0,
+                float(capacity_kwh),
+                self.charging_efficiency,
+            )
+            if capacity_kwh
+            else None
+        )
+
+    def _estimated_soc(
+        self, now: datetime, entity_id: str, reading: float | None
+    ) -> float | None:
+        """
+        Registrerar en ny avläsning från SoC-sensorn och returnerar uppskattad SoC.
+        Utan underlag för en uppskattning returneras avläsningen som den är.
+        """
+        state = self.hass.states.get(entity_id)
+        if reading is not None and state is not None:
+            self.soc_estimator.add_reading(state.last_updated, reading)
+        estimate = self.soc_estimator.estimate(now)
+        return estimate if estimate is not None else reading
+
+    async def _request_soc_refresh(self) -> None:
+        """Begär en ny SoC-avläsning via den konfigurerade entiteten."""
+        entity_id = str(self.config[CONF_EV_SOC_REFRESH_ENTITY])
+        domain = entity_id.split(".", 1)[0]
+        if domain == "button":
+            service_domain, service = "button", "press"
+        elif domain == "script":
+            service_domain, service = "script", "turn_on"
+        else:
+            service_domain, service = "homeassistant", "update_entity"
+        _LOGGER.info("Begär ny SoC-avläsning via %s.", entity_id)
+        try:
+            await self.hass.services.async_call(
+                service_domain, service, {"entity_id": entity_id}, blocking=False
+            )
+        except HomeAssistantError as e:
+            _LOGGER.warning("Kunde inte begära ny SoC-avläsning: %s", e)
+
+    def _soc_estimate_data(self) -> dict[str, Any]:
+        if self.soc_estimator is None:
+            return {}
+        estimator = self.soc_estimator
+        now = dt_util.utcnow()
+        estimate = estimator.estimate(now)
+        confidence = estimator.confidence(now)
+        return {
+            "soc_estimate_percent": round(estimate, 1)
+            if estimate is not None
+            else None,
+            "soc_estimate_confidence": round(confidence, 2)
+            if confidence is not None
+            else None,
+            "soc_last_reading_percent": estimator.reading_percent,
+            "soc_last_reading_time": estimator.reading_time.isoformat()
+            if estimator.reading_time
+            else None,
+            "soc_energy_since_reading_kwh": round(
+                estimator.energy_since_reading_kwh, 2
+            ),
+        }
+
+    def _update_deadline_plan(
+        self,
+        now: datetime,
+        current_soc_percent: float | None,
+        charger_hw_max_amps: float,
+    ) -> None:
+        """Uppdaterar planen mot nästa avresa med laddarens högsta effekt."""
+        soc_entity_id = self.config.get(CONF_EV_SOC_SENSOR)
+        soc_state = self.hass.states.get(str(soc_entity_id)) if soc_entity_id else None
+        capacity_kwh = self.config.get(CONF_EV_BATTERY_CAPACITY_KWH)
+        self.deadline_planner.update(
+            now,
+            self.price_cache.series,
+            self.departure_learner.next_departure(now)[0],
+            charger_hw_max_amps * self._watts_per_amp() / 1000.0,
+            current_soc_percent,
+            float(capacity_kwh) if capacity_kwh else None,
+            self.charging_efficiency,
+            # En ny avläsning från SoC-sensorn ger en ny plan.
+            reading_key=soc_state.last_updated if soc_state is not None else None,
+        )
+
+    def _deadline_reason(self) -> str:
+        planner = self.deadline_planner
+        departure = dt_util.as_local(planner.deadline).strftime("%H:%M")
+        if planner.escalated:
+            return (
+                f"Laddning mot avresa {departure}: {planner.remaining_kwh:.1f} kWh "
+                "hinns inte med annars, laddar direkt."
+            )
+        return (
+            f"Laddning mot avresa {departure}: {planner.remaining_kwh:.1f} kWh i "
+            "billigaste intervallen."
+        )
+
+    def _deadline_data(self) -> dict[str, Any]:
+        if self.deadline_planner is None:
+            return {}
+        planner = self.deadline_planner
+        next_slot = planner.next_slot(dt_util.utcnow())
+        return {
+            "deadline_time": planner.deadline.isoformat()
+            if planner.deadline
+            else None,
+            "deadline_remaining_kwh": round(planner.remaining_kwh, 2)
+            if planner.remaining_kwh is not None
+            else None,
+            "deadline_required_min": round(planner.required_hours * 60),
+            "deadline_next_slot": next_slot.isoformat() if next_slot else None,
+            "deadline_escalated": planner.escalated,
+        }
+
+    def _departure_override(self) -> time | datetime | None:
+        """
+        Läser override-entiteten. Ett datum med tid ger en enstaka avresa, en tid
+        utan datum gäller varje dag.
+        """
+        entity_id = self.config.get(CONF_DEPARTURE_OVERRIDE_ENTITY)
+        state = self.hass.states.get(str(entity_id)) if entity_id else None
+        if state is None or state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN, ""):
+            return None
+        if (moment := dt_util.parse_datetime(state.state)) is not None:
+            if moment.tzinfo is None:
+                moment = moment.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+            return dt_util.as_utc(moment)
+        return dt_util.parse_time(state.state)
+
+    def _departure_data(self) -> dict[str, Any]:
+        if self.departure_learner is None:
+            return {}
+        learner = self.departure_learner
+        departure, source = learner.next_departure(dt_util.utcnow())
+        return {
+            "departure_expected": departure.isoformat(),
+            "departure_source": source,
+            "departure_learned": {
+                WEEKDAY_NAMES[weekday]: learned.strftime("%H:%M")
+                if (learned := learner.learned(weekday)) is not None
+                else None
+                for weekday in range(len(WEEKDAY_NAMES))
+            },
+        }
+
+    def _charge_curve_data(self) -> dict[str, Any]:
+        if self.charge_curve is None:
+            return {}
+        return {
+            "charge_time_to_target_min": round(self.charge_time_to_target_h * 60)
+            if self.charge_time_to_target_h is not None
+            else None,
+        }
+
+    def _charge_plan_data(self) -> dict[str, Any]:
+        if self.charge_planner is None:
+            return {}
+        plan = self.charge_planner
+        return {
+            "charge_plan_needed_kwh": round(plan.needed_kwh, 1)
+            if plan.needed_kwh is not None
+            else None,
+            "charge_plan_solar_kwh": round(plan.deferred_kwh, 1),
+            "charge_plan_grid_kwh": round(plan.grid_kwh, 1),
+            "charge_plan_expected_surplus_kwh": round(plan.expected_surplus_kwh, 1),
+            "charge_plan_first_grid_slot": plan.first_grid_slot.isoformat()
+            if plan.first_grid_slot
+            else None,
+            "charge_plan_forecast_source": "local_model"
+            if self.solar_model is not None
+            else "forecast_sensors",
+        }
+
+    def _sell_surplus_reason(self) -> str:
+        opportunity = self.opportunity
+        best_start = dt_util.as_local(opportunity.best_grid_start)
+        return (
+            f"Solöverskottet säljs (Exportpris: {opportunity.export_price_kr:.2f} kr > "
+            f"nätpris {opportunity.best_grid_cost_kr:.2f} kr kl. "
+            f"{best_start:%H:%M} före avresa)."
+        )
+
+    def _opportunity_data(self) -> dict[str, Any]:
+        if self.opportunity is None:
+            return {}
+        opportunity = self.opportunity
+        return {
+            "opportunity_projected_savings_kr": round(
+                opportunity.projected_savings_kr, 2
+            ),
+            "opportunity_sell_surplus": opportunity.sell_surplus,
+            "opportunity_export_price_kr": round(opportunity.export_price_kr, 4)
+            if opportunity.export_price_kr is not None
+            else None,
+            "opportunity_best_grid_cost_kr": round(opportunity.best_grid_cost_kr, 4)
+            if opportunity.best_grid_cost_kr is not None
+            else None,
+            "opportunity_best_grid_start": opportunity.best_grid_start.isoformat()
+            if opportunity.best_grid_start
+            else None,
+            "opportunity_departure": opportunity.departure_utc.isoformat()
+            if opportunity.departure_utc
+            else None,
+            "opportunity_savings_kr_per_kwh": round(opportunity.savings_kr_per_kwh, 4)
+            if opportunity.savings_kr_per_kwh is not None
+            else None,
+        }
+
+    def _peak_shaving_data(self) -> dict[str, Any]:
+        if self.peak_shaving is None:
+            return {}
+        threshold_w = self.peak_shaving.threshold_w
+        return {
+            "peak_shaving_projected_hour_w": round(self._peak_shaving_projected_hour_w)
+            if self._peak_shaving_projected_hour_w is not None
+            else None,
+            "peak_shaving_threshold_w": round(threshold_w)
+            if threshold_w is not None
+            else None,
+            "peak_shaving_max_charging_power_w": round(
+                self.peak_shaving_max_charging_power_w
+            )
+            if self.peak_shaving_max_charging_power_w is not None
+            else None,
+            "peak_shaving_peaks_w": [round(p) for p in self.peak_shaving.peaks_w],
+        }
+
+    def _phase_balance_data(self) -> dict[str, Any]:
+        if self.charger_phases is None:
+            return {}
+        return {
+            "phase_house_load_a": [
+                round(current, 1) if current is not None else None
+                for current in self._phase_house_loads_a
+            ],
+            "phase_charging": ",".join(
+                PHASE_NAMES[phase] for phase in self.charger_phases.phases
+            ),
+            "phase_most_loaded": PHASE_NAMES[self._phase_limit[1]]
+            if self._phase_limit is not None
+            else None,
+            "phase_max_charging_current_a": max(0, math.floor(self._phase_limit[0]))
+            if self._phase_limit is not None
+            else None,
         }
 
     async def cleanup(self) -> None:
         _LOGGER.info("Rensar upp SmartEVChargingCoordinator...")
         self._remove_listeners()
+        # En begärd men ännu inte körd utvärdering ska inte köras efter detta.
+        await self.async_shutdown()
+        self.price_scheduler.async_cancel()
+        if self.solar_model is not None:
+            self.solar_model.async_stop()
+        if self.departure_learner is not None:
+            self.departure_learner.async_stop()
+        self.command_tracker.async_stop()
+        if self.charge_schedule is not None and self.charge_schedule.remove(
+            dt_util.utcnow()
+        ):
+            # Laddaren ska inte ladda efter ett schema som ingen följer upp.
+            await self.service_runner.async_wait()
+        self.service_runner.async_cancel()
+        if self.ocpp is not None:
+            await self.ocpp.async_release(self.hass, self.entry.entry_id)
+        if self.modbus is not None:
+            await self.modbus.async_stop()
+        if self.meter_ingest is not None:
+            self.meter_ingest.async_stop()
+        if self.charger_phases is not None:
+            PHASE_BALANCER.remove(self.charger_phases)
+        await self.async_save_persisted_state()
 
     # Ny hjälpmetod i SmartEVChargingCoordinator
     async def _is_manually_paused(self) -> bool:
@@ -1376,7 +2893,7 @@ class SmartEVChargingCoordinator(DataUpdateCoordinator[dict[str, Any]]):
 
         charger_status_state = self.hass.states.get(str(status_sensor_id))
         charger_status = (
-            charger_status_state.state.lower()
+            self.charger_backend.map_status(charger_status_state.state)
             if charger_status_state
             else STATE_UNKNOWN
         )
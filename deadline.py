@@ -0,0 +1,285 @@
+# File version: 2025-06-05 0.2.0
+"""Laddning mot en tidsgräns: nå en SoC eller ladda en energimängd före avresa.
+
+Pris/Tid-laddningen laddar bara när priset understiger maxpriset, så vissa
+morgnar är bilen inte laddad. Med en tidsgräns räknas laddtiden ut från
+behovet och laddarens högsta effekt, och de billigaste prisintervallen före
+avresan väljs så att behovet täcks, oavsett maxpris. Med en inlärd laddkurva
+räknas laddtiden mot SoC-målet över kurvan, så att den lägre effekten nära
+fullt batteri räknas med.
+
+Planen räknas om när prisserien, avresan eller laddarens effekt ändras, vid en
+ny SoC-avläsning och när de valda intervallen som återstår inte längre räcker
+(t.ex. för att bilen inte laddade i ett av dem). Varje cykel är annars ett
+uppslag. Räcker tiden till avresan inte längre för behovet laddas det direkt.
+"""
+
+import logging
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+from typing import Any
+
+from .const import (
+    DOMAIN,
+    CONF_EV_SOC_SENSOR,
+    CONF_EV_BATTERY_CAPACITY_KWH,
+    CONF_DEADLINE_SOC_PERCENT,
+    CONF_DEADLINE_ENERGY_KWH,
+)
+from .charge_curve import ChargeCurve
+from .power_integrator import PowerIntegrator
+from .price_cache import PriceSeries
+
+_LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
+
+# Planen räknas om när de återstående valda intervallen saknar mer än så här
+# mycket laddtid (timmar).
+REPLAN_TOLERANCE_H = 1 / 60
+
+
+def _hours(delta: timedelta) -> float:
+    return max(0.0, delta.total_seconds() / 3600.0)
+
+
+class DeadlinePlanner:
+    """Väljer de billigaste intervallen som hinner täcka behovet före avresan."""
+
+    def __init__(
+        self, target_soc_percent: float | None, target_energy_kwh: float | None
+    ) -> None:
+        """Initialisera med SoC-mål i procent eller energimängd i kWh."""
+        self.target_soc_percent = target_soc_percent
+        self.target_energy_kwh = target_energy_kwh
+        # Laddkurvan sätts av koordinatorn när den är aktiverad.
+        self.charge_curve: ChargeCurve | None = None
+        self.deadline: datetime | None = None
+        self.remaining_kwh: float | None = None
+        self.required_hours = 0.0
+        self.delivered_kwh = 0.0
+        self.escalated = False
+        self.infeasible = False
+        self._key: tuple | None = None
+        self._series: PriceSeries | None = None
+        self._slot_hours: list[float] = []
+        self._suffix_hours: list[float] = []
+        self._unknown_hours = 0.0
+        self._period_deadline: datetime | None = None
+        self._power = PowerIntegrator()
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> "DeadlinePlanner | None":
+        """
+        Skapar planeraren, eller None utan mål. SoC-målet kräver SoC-sensor och
+        batterikapacitet.
+        """
+        soc = config.get(CONF_DEADLINE_SOC_PERCENT)
+        if not config.get(CONF_EV_SOC_SENSOR) or not config.get(
+            CONF_EV_BATTERY_CAPACITY_KWH
+        ):
+            soc = None
+        energy = config.get(CONF_DEADLINE_ENERGY_KWH)
+        if not soc and not energy:
+            return None
+        return cls(float(soc) if soc else None, float(energy) if energy else None)
+
+    def _needed_kwh(
+        self,
+        soc_percent: float | None,
+        capacity_kwh: float | None,
+        efficiency: float,
+    ) -> float | None:
+        """
+        Energi från nätet som återstår före avresan. SoC-målet har företräde när
+        SoC är känd, annars räknas den energi som laddats sedan förra avresan.
+        """
+        if (
+            self.target_soc_percent is not None
+            and soc_percent is not None
+            and capacity_kwh
+        ):
+            return (
+                max(0.0, self.target_soc_percent - soc_percent)
+                / 100.0
+                * capacity_kwh
+                / efficiency
+            )
+        if self.target_energy_kwh is not None:
+            return max(0.0, self.target_energy_kwh - self.delivered_kwh)
+        return None
+
+    def _required_hours(
+        self,
+        remaining_kwh: float,
+        charger_kw: float,
+        soc_percent: float | None,
+        capacity_kwh: float | None,
+        efficiency: float,
+    ) -> float:
+        """
+        Laddtid för behovet. Mot SoC-målet räknas tiden över laddkurvan när den
+        finns, annars med laddarens högsta effekt.
+        """
+        if (
+            self.charge_curve is not None
+            and self.target_soc_percent is not None
+            and soc_percent is not None
+            and capacity_kwh
+        ):
+            hours = self.charge_curve.hours_to_charge(
+                soc_percent,
+                self.target_soc_percent,
+                charger_kw,
+                capacity_kwh,
+                efficiency,
+            )
+            if hours is not None:
+                return hours
+        return remaining_kwh / charger_kw
+
+    def record_power(self, now: datetime, power_w: float) -> None:
+        """
+        Integrerar laddeffekten mot energimålet. Effekten gäller fram till nästa
+        anrop.
+        """
+        self.delivered_kwh += self._power.add_energy_kwh(now, power_w)
+
+    def reset_period(self) -> None:
+        """Börjar en ny period mot nästa avresa, t.ex. när bilen kopplas ur."""
+        self.delivered_kwh = 0.0
+        self._period_deadline = None
+        self._key = None
+
+    def update(
+        self,
+        now: datetime,
+        series: PriceSeries,
+        deadline: datetime,
+        charger_kw: float,
+        soc_percent: float | None = None,
+        capacity_kwh: float | None = None,
+        efficiency: float = 1.0,
+        reading_key: Any = None,
+    ) -> None:
+        """
+        Räknar om planen om indata har ändrats eller de valda intervallen inte
+        längre räcker. Avgör varje gång om behovet kräver laddning direkt. När
+        förra avresan har passerats börjar en ny period.
+        """
+        if self._period_deadline is not None and now >= self._period_deadline:
+            self.reset_period()
+        self.deadline = self._period_deadline = deadline
+        remaining_kwh = self._needed_kwh(soc_percent, capacity_kwh, efficiency)
+        self.remaining_kwh = remaining_kwh
+        if remaining_kwh is None or charger_kw <= 0:
+            self.required_hours = 0.0
+            self.escalated = False
+            return
+        self.required_hours = self._required_hours(
+            remaining_kwh, charger_kw, soc_percent, capacity_kwh, efficiency
+        )
+        key = (
+            deadline,
+            round(charger_kw, 2),
+            reading_key,
+            self.charge_curve.version if self.charge_curve is not None else None,
+        )
+        if (
+            series is not self._series
+            or key != self._key
+            or (
+                not self.infeasible
+                and self._planned_hours(now)
+                < self.required_hours - REPLAN_TOLERANCE_H
+            )
+        ):
+            self._key = key
+            self._plan(now, series, deadline)
+        # Hinns behovet inte med före avresan laddas det direkt.
+        self.escalated = self.required_hours > 0 and (
+            self.infeasible or _hours(deadline - now) <= self.required_hours
+        )
+
+    def _plan(self, now: datetime, series: PriceSeries, deadline: datetime) -> None:
+        """Väljer de billigaste intervallen mellan nu och avresan."""
+        self._series = series
+        self._slot_hours = [0.0] * len(series)
+        start_index = series.slot_index(now)
+        # Tid före avresan som prisserien inte täcker än (morgondagens priser).
+        # Den antas kunna användas, så bara resten måste tas från kända intervall.
+        horizon_end = series.ends[-1] if len(series) else now
+        self._unknown_hours = _hours(deadline - max(horizon_end, now))
+        remaining_hours = self.required_hours - self._unknown_hours
+        window = (
+            [
+                index
+                for index in range(start_index, len(series))
+                if series.starts[index] < deadline
+            ]
+            if start_index is not None
+            else []
+        )
+        for index in sorted(window, key=lambda i: (series.costs[i], series.starts[i])):
+            if remaining_hours <= 0:
+                break
+            hours = _hours(
+                min(series.ends[index], deadline) - max(series.starts[index], now)
+            )
+            self._slot_hours[index] = hours
+            remaining_hours -= hours
+        self.infeasible = remaining_hours > REPLAN_TOLERANCE_H
+        # Summan av valda timmar från och med varje intervall, så att kontrollen
+        # av om planen fortfarande räcker blir ett uppslag.
+        self._suffix_hours = [0.0] * (len(series) + 1)
+        for index in reversed(range(len(series))):
+            self._suffix_hours[index] = (
+                self._suffix_hours[index + 1] + self._slot_hours[index]
+            )
+        _LOGGER.debug(
+            "Avresplan: %.1f h laddning före %s, %s intervall valda%s.",
+            self.required_hours,
+            deadline.isoformat(),
+            sum(1 for hours in self._slot_hours if hours > 0),
+            ", hinns inte med" if self.infeasible else "",
+        )
+
+    def _planned_hours(self, now: datetime) -> float:
+        """Vald laddtid som återstår från och med nu."""
+        if self._series is None:
+            return 0.0
+        index = self._series.slot_index(now)
+        if index is None:
+            return self._unknown_hours
+        current = 0.0
+        if self._slot_hours[index] > 0:
+            end = self._series.ends[index]
+            if self.deadline is not None:
+                end = min(end, self.deadline)
+            current = _hours(end - now)
+        return current + self._suffix_hours[index + 1] + self._unknown_hours
+
+    def charge_now(self, now: datetime) -> bool:
+        """Om bilen ska laddas nu för att hinna före avresan."""
+        if not self.remaining_kwh or self.remaining_kwh <= 0:
+            return False
+        if self.escalated:
+            return True
+        if self._series is None:
+            return False
+        index = self._series.slot_index(now)
+        return index is not None and self._slot_hours[index] > 0
+
+    def next_slot(self, now: datetime) -> datetime | None:
+        """Början på nästa valda intervall från och med nu."""
+        if self._series is None:
+            return None
+        index = self._series.slot_index(now)
+        if index is None:
+            return None
+        return next(
+            (
+                max(self._series.starts[i], now)
+                for i in range(index, len(self._series))
+                if self._slot_hours[i] > 0
+            ),
+            None,
+        )
@@ -0,0 +1,246 @@
+# File version: 2025-06-05 0.2.0
+"""Inlärd avresetid från historiken över när bilen kopplas ur.
+
+Laddning mot en tidsgräns behöver en avresetid, och ingen ställer in den varje
+dag. Varje dygns första urkoppling (laddarens status går över till
+frånkopplad) registreras i ett histogram per veckodag med 96 kvartar. Vid varje
+ny avresa skrivs veckodagens äldre avresor ned, så att ändrade vanor slår
+igenom efter några veckor. Lagringen är därmed lika stor oavsett hur länge
+integrationen körts.
+
+Den förväntade avresan är en försiktig kvantil (10 %) av histogrammet: bilen
+ska hellre vara klar för tidigt än för sent. Saknas tillräcklig historik för
+veckodagen används den konfigurerade avresetiden. En tid från en
+override-entitet har alltid företräde.
+"""
+
+import logging
+from collections.abc import Callable, Mapping
+from datetime import date, datetime, time, timedelta
+from typing import Any
+
+from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.helpers.storage import Store
+import homeassistant.util.dt as dt_util
+
+from .const import (
+    DOMAIN,
+    STORAGE_VERSION,
+    CONF_STATUS_SENSOR,
+    CONF_DEPARTURE_TIME,
+    DEFAULT_DEPARTURE_TIME,
+    EASEE_STATUS_DISCONNECTED,
+)
+
+_LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
+
+SAVE_DELAY_SECONDS = 60
+BIN_MINUTES = 15
+BINS = 24 * 60 // BIN_MINUTES
+WEEKDAYS = 7
+# Andel av avresorna som får ligga före den förväntade avresan.
+DEPARTURE_QUANTILE = 0.1
+# Vikten på veckodagens tidigare avresor när en ny registreras.
+DECAY = 0.9
+# Minsta samlade vikt för att veckodagens histogram ska användas (ungefär tre
+# avresor).
+MIN_WEIGHT = 2.5
+
+WEEKDAY_NAMES = (
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+)
+
+SOURCE_OVERRIDE = "override"
+SOURCE_LEARNED = "learned"
+SOURCE_CONFIGURED = "configured"
+
+
+class DepartureLearner:
+    """Histogram över avresor per veckodag och förväntad nästa avresa."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry_id: str,
+        status_entity_id: str,
+        default: time,
+        map_status: Callable[[str], str] = str.lower,
+    ) -> None:
+        """
+        Initialisera inlärningen med den konfigurerade avresetiden som reserv.
+        map_status översätter laddarens status till Easees statusar.
+        """
+        self._hass = hass
+        self._status_entity_id = status_entity_id
+        self._map_status = map_status
+        self._unsub: CALLBACK_TYPE | None = None
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.departures"
+        )
+        self.default = default
+        self.histogram: list[list[float]] = [
+            [0.0] * BINS for _ in range(WEEKDAYS)
+        ]
+        self.last_recorded_day: date | None = None
+        # Tid eller tidpunkt från override-entiteten.
+        self.override: time | datetime | None = None
+        # Räknas upp när den förväntade avresan kan ha ändrats, så att
+        # beräkningar som bygger på den vet när de ska göras om.
+        self.version = 0
+        self._learned: list[time | None] = [None] * WEEKDAYS
+
+    @classmethod
+    def from_config(
+        cls,
+        hass: HomeAssistant,
+        entry_id: str,
+        config: Mapping[str, Any],
+        map_status: Callable[[str], str] = str.lower,
+    ) -> "DepartureLearner | None":
+        """Skapar inlärningen, eller None om statussensor saknas."""
+        if not config.get(CONF_STATUS_SENSOR):
+            return None
+        default = dt_util.parse_time(
+            str(config.get(CONF_DEPARTURE_TIME) or DEFAULT_DEPARTURE_TIME)
+        ) or dt_util.parse_time(DEFAULT_DEPARTURE_TIME)
+        return cls(
+            hass, entry_id, str(config[CONF_STATUS_SENSOR]), default, map_status
+        )
+
+    async def async_load(self) -> None:
+        """Läser in det sparade histogrammet."""
+        data = await self._store.async_load()
+        if not data:
+            return
+        try:
+            histogram = [
+                [float(value) for value in row] for row in data.get("histogram", [])
+            ]
+        except (TypeError, ValueError) as e:
+            _LOGGER.warning("Kunde inte läsa sparade avresor: %s", e)
+            return
+        if len(histogram) != WEEKDAYS or any(len(row) != BINS for row in histogram):
+            return
+        self.histogram = histogram
+        last_day = data.get("last_recorded_day")
+        self.last_recorded_day = date.fromisoformat(last_day) if last_day else None
+        self._learned = [self._quantile(weekday) for weekday in range(WEEKDAYS)]
+        self.version += 1
+
+    async def async_save(self) -> None:
+        """Skriver histogrammet direkt, t.ex. vid avlastning."""
+        await self._store.async_save(self._data_to_save())
+
+    def _data_to_save(self) -> dict[str, Any]:
+        return {
+            "histogram": [[round(value, 4) for value in row] for row in self.histogram],
+            "last_recorded_day": self.last_recorded_day.isoformat()
+            if self.last_recorded_day
+            else None,
+        }
+
+    @callback
+    def async_start(self) -> None:
+        """Börjar följa laddarens status för att registrera urkopplingar."""
+        self.async_stop()
+        self._unsub = async_track_state_change_event(
+            self._hass, [self._status_entity_id], self._handle_status_change
+        )
+
+    @callback
+    def async_stop(self) -> None:
+        """Slutar följa laddarens status."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+
+    @callback
+    def _handle_status_change(self, event: Event) -> None:
+        old_state = event.data.get("old_state")
+        new_state = event.data.get("new_state")
+        if old_state is None or new_state is None:
+            return
+        # Från okänd eller otillgänglig status är det ingen urkoppling, bara
+        # laddaren som kommer tillbaka.
+        if (
+            self._map_status(new_state.state) in EASEE_STATUS_DISCONNECTED
+            and self._map_status(old_state.state) not in EASEE_STATUS_DISCONNECTED
+            and old_state.state not in (STATE_UNAVAILABLE, STATE_UNKNOWN)
+        ):
+            self.record_departure(new_state.last_changed)
+
+    def record_departure(self, moment: datetime) -> bool:
+        """
+        Registrerar en urkoppling. Bara dygnets första räknas som avresa.
+        Returnerar True om den registrerades.
+        """
+        local = dt_util.as_local(moment)
+        if local.date() == self.last_recorded_day:
+            return False
+        self.last_recorded_day = local.date()
+        weekday = local.weekday()
+        row = [value * DECAY for value in self.histogram[weekday]]
+        row[(local.hour * 60 + local.minute) // BIN_MINUTES] += 1.0
+        self.histogram[weekday] = row
+        self._learned[weekday] = self._quantile(weekday)
+        self.version += 1
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY_SECONDS)
+        _LOGGER.debug(
+            "Avresa registrerad %s. Förväntad avresa på veckodag %s: %s.",
+            local.isoformat(),
+            weekday,
+            self._learned[weekday],
+        )
+        return True
+
+    def _quantile(self, weekday: int) -> time | None:
+        row = self.histogram[weekday]
+        total = sum(row)
+        if total < MIN_WEIGHT:
+            return None
+        cumulative = 0.0
+        for index, weight in enumerate(row):
+            cumulative += weight
+            if cumulative >= total * DEPARTURE_QUANTILE:
+                minutes = index * BIN_MINUTES
+                return time(minutes // 60, minutes % 60)
+        return None
+
+    def learned(self, weekday: int) -> time | None:
+        """Inlärd förväntad avresa för veckodagen (0 = måndag), eller None."""
+        return self._learned[weekday]
+
+    def set_override(self, value: time | datetime | None) -> None:
+        """Sätter tiden från override-entiteten. None tar bort den."""
+        if value != self.override:
+            self.override = value
+            self.version += 1
+
+    def departure_for(self, day: date) -> tuple[time, str]:
+        """Avresetid och dess källa för ett datum, utan tidpunkts-override."""
+        if isinstance(self.override, time):
+            return self.override, SOURCE_OVERRIDE
+        if (learned := self._learned[day.weekday()]) is not None:
+            return learned, SOURCE_LEARNED
+        return self.default, SOURCE_CONFIGURED
+
+    def next_departure(self, moment: datetime) -> tuple[datetime, str]:
+        """Nästa förväntade avresa efter tidpunkten, i UTC, och dess källa."""
+        if isinstance(self.override, datetime) and self.override > moment:
+            return dt_util.as_utc(self.override), SOURCE_OVERRIDE
+        local = dt_util.as_local(moment)
+        departure, source = self.departure_for(local.date())
+        candidate = datetime.combine(local.date(), departure, tzinfo=local.tzinfo)
+        if candidate <= local:
+            day = local.date() + timedelta(days=1)
+            departure, source = self.departure_for(day)
+            candidate = datetime.combine(day, departure, tzinfo=local.tzinfo)
+        return dt_util.as_utc(candidate), source
@@ -0,0 +1,326 @@
+# File version: 2025-06-05 0.2.0
+"""Inläsning av högfrekventa mätarvärden från elmätarens P1/HAN-port.
+
+Elmätarens P1/HAN-port skickar ett telegram var 1–10 s, och sensorer från en
+HAN-läsare uppdateras lika ofta. Koordinatorn läser annars bara sensorns
+senaste värde i varje cykel. I stället läggs värdena i förallokerade
+ringbuffertar, en för husets totala effekt och en per fas, och medel och max
+över ett glidande fönster räknas inkrementellt. Inläsningen ger bara
+koordinatorn ett underlag, högst en gång per intervall. En ny utvärdering
+begärs bara när underlaget har ändrats märkbart. Annars används det i nästa
+cykel.
+
+Fasvärdena lagras som ström (A). Sensorer i W eller kW räknas om med
+fasspänningen. Ett telegram kan också läggas in direkt med add_telegram, t.ex.
+från en läsare som är ansluten till P1-porten.
+"""
+
+import logging
+import re
+from array import array
+from collections.abc import Callable, Mapping
+from datetime import datetime
+from typing import Any, cast
+
+from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN, UnitOfPower
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_state_change_event
+
+from .const import (
+    DOMAIN,
+    CONF_HOUSE_POWER_SENSOR,
+    CONF_METER_INGEST,
+    CONF_METER_PHASE_SENSORS,
+    VOLTAGE_PHASE_NEUTRAL,
+)
+
+_LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
+
+# Fönstret som medel och max räknas över.
+METER_WINDOW_SECONDS = 30.0
+# Längsta tid mellan två underlag till koordinatorn.
+METER_EMIT_INTERVAL_SECONDS = 5.0
+# Buffertarna rymmer ett helt fönster upp till denna takt. Vid högre takt
+# kortas fönstret, men minnet växer inte.
+MAX_SAMPLE_RATE_HZ = 20.0
+
+# OBIS-koder i P1-telegrammet (DSMR/HAN). Effekt i kW och ström i A.
+OBIS_POWER_IMPORT = "1-0:1.7.0"
+OBIS_POWER_EXPORT = "1-0:2.7.0"
+OBIS_PHASE_POWER_IMPORT = ("1-0:21.7.0", "1-0:41.7.0", "1-0:61.7.0")
+OBIS_PHASE_POWER_EXPORT = ("1-0:22.7.0", "1-0:42.7.0", "1-0:62.7.0")
+OBIS_PHASE_CURRENT = ("1-0:31.7.0", "1-0:51.7.0", "1-0:71.7.0")
+
+_OBIS_LINE = re.compile(r"^(\d+-\d+:\d+\.\d+\.\d+)\(([-\d.]+)(?:\*[^)]*)?\)")
+
+
+def parse_p1_telegram(text: str) -> dict[str, float]:
+    """Tolkar de numeriska raderna i ett P1-telegram till OBIS-kod -> värde."""
+    values: dict[str, float] = {}
+    for line in text.splitlines():
+        match = _OBIS_LINE.match(line.strip())
+        if match is None:
+            continue
+        try:
+            values[match[1]] = float(match[2])
+        except ValueError:
+            continue
+    return values
+
+
+class WindowedRing:
+    """
+    Förallokerad ringbuffert med medel och max över ett glidande tidsfönster.
+    Summan och en monoton kö för max uppdateras vid varje värde, så varken
+    tillägg eller avläsning behöver gå igenom bufferten.
+    """
+
+    def __init__(self, capacity: int, window_s: float) -> None:
+        """Initialisera med buffertens storlek och fönstrets längd."""
+        self.capacity = capacity
+        self.window_s = window_s
+        self._times = array("d", bytes(8 * capacity))
+        self._values = array("d", bytes(8 * capacity))
+        # Sekvensnumren för möjliga max, i fallande värdeordning.
+        self._max_queue = array("q", bytes(8 * capacity))
+        self._max_head = 0
+        self._max_size = 0
+        self._next = 0
+        self._size = 0
+        self._sum = 0.0
+
+    def __len__(self) -> int:
+        """Antal värden i fönstret."""
+        return self._size
+
+    def add(self, timestamp: float, value: float) -> None:
+        """Lägger till ett värde och tar bort de som fallit ur fönstret."""
+        self.expire(timestamp)
+        if self._size == self.capacity:
+            self._drop_oldest()
+        slot = self._next % self.capacity
+        self._times[slot] = timestamp
+        self._values[slot] = value
+        self._sum += value
+        while self._max_size:
+            last = (self._max_head + self._max_size - 1) % self.capacity
+            if self._values[self._max_queue[last] % self.capacity] > value:
+                break
+            self._max_size -= 1
+        self._max_queue[(self._max_head + self._max_size) % self.capacity] = (
+            self._next
+        )
+        self._max_size += 1
+        self._next += 1
+        self._size += 1
+
+    def expire(self, now: float) -> None:
+        """Tar bort värden äldre än fönstret."""
+        cutoff = now - self.window_s
+        while self._size and self._times[self._oldest_slot] < cutoff:
+            self._drop_oldest()
+
+    @property
+    def _oldest_slot(self) -> int:
+        return (self._next - self._size) % self.capacity
+
+    def _drop_oldest(self) -> None:
+        oldest = self._next - self._size
+        self._sum -= self._values[oldest % self.capacity]
+        self._size -= 1
+        if self._max_size and self._max_queue[self._max_head] == oldest:
+            self._max_head = (self._max_head + 1) % self.capacity
+            self._max_size -= 1
+        if not self._size:
+            # Undvik att avrundningsfel i summan ackumuleras.
+            self._sum = 0.0
+
+    def mean(self) -> float | None:
+        """Medelvärdet i fönstret."""
+        return self._sum / self._size if self._size else None
+
+    def max(self) -> float | None:
+        """Största värdet i fönstret."""
+        if not self._max_size:
+            return None
+        return self._values[self._max_queue[self._max_head] % self.capacity]
+
+
+def _to_float(value: Any) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _round(value: float | None, digits: int = 0) -> float | None:
+    return round(value, digits) if value is not None else None
+
+
+class MeterIngest:
+    """Tar emot mätarvärden i hög takt och lämnar underlag i kontrollerad takt."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        power_entity_id: str | None,
+        phase_entity_ids: list[str],
+        window_s: float = METER_WINDOW_SECONDS,
+        emit_interval_s: float = METER_EMIT_INTERVAL_SECONDS,
+    ) -> None:
+        """Initialisera med hussensorn, fassensorerna och fönstret."""
+        self._hass = hass
+        self._power_entity_id = power_entity_id
+        self._phase_entity_ids = phase_entity_ids
+        self._emit_interval_s = emit_interval_s
+        capacity = int(window_s * MAX_SAMPLE_RATE_HZ) + 1
+        self.total = WindowedRing(capacity, window_s)
+        self.phases = [WindowedRing(capacity, window_s) for _ in range(3)]
+        self._listeners: list[Callable[[dict[str, Any]], None]] = []
+        self._unsub: CALLBACK_TYPE | None = None
+        self._last_emit: float | None = None
+        self._first_sample: float | None = None
+        self.samples = 0
+
+    @classmethod
+    def from_config(
+        cls, hass: HomeAssistant, config: Mapping[str, Any]
+    ) -> "MeterIngest | None":
+        """Skapar inläsningen, eller None om den inte är aktiverad."""
+        if not config.get(CONF_METER_INGEST):
+            return None
+        power_entity_id = config.get(CONF_HOUSE_POWER_SENSOR)
+        phase_entity_ids = list(config.get(CONF_METER_PHASE_SENSORS) or [])[:3]
+        if not power_entity_id and not phase_entity_ids:
+            _LOGGER.warning(
+                "Högfrekvent elmätare är aktiverad men varken hussensor eller "
+                "fassensorer är valda."
+            )
+            return None
+        return cls(hass, power_entity_id, phase_entity_ids)
+
+    @property
+    def entity_ids(self) -> list[str]:
+        """Sensorerna som läses in här i stället för att ge en utvärdering."""
+        return [
+            entity_id
+            for entity_id in (self._power_entity_id, *self._phase_entity_ids)
+            if entity_id
+        ]
+
+    def async_add_listener(
+        self, listener: Callable[[dict[str, Any]], None]
+    ) -> Callable[[], None]:
+        """Anropas med underlaget högst en gång per intervall."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    @callback
+    def async_start(self) -> None:
+        """Börjar läsa in sensorernas värden."""
+        self.async_stop()
+        self._unsub = async_track_state_change_event(
+            self._hass, self.entity_ids, self._handle_state_change
+        )
+
+    @callback
+    def async_stop(self) -> None:
+        """Slutar läsa in sensorernas värden."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+
+    @callback
+    def _handle_state_change(self, event: Event) -> None:
+        new_state = event.data.get("new_state")
+        if new_state is None or new_state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN):
+            return
+        value = _to_float(new_state.state)
+        if value is None:
+            return
+        unit = cast(str, new_state.attributes.get("unit_of_measurement", "")).lower()
+        if unit in (UnitOfPower.KILO_WATT.lower(), "kw"):
+            value *= 1000.0
+        timestamp = new_state.last_updated.timestamp()
+        entity_id = event.data.get("entity_id")
+        if entity_id == self._power_entity_id:
+            self.add_power(timestamp, value)
+        elif entity_id in self._phase_entity_ids:
+            # Fassensorer i W räknas om till ström.
+            current = value if unit == "a" else value / VOLTAGE_PHASE_NEUTRAL
+            self.add_phase_current(
+                self._phase_entity_ids.index(entity_id), timestamp, current
+            )
+
+    def add_power(self, timestamp: float, watts: float) -> None:
+        """Lägger till husets totala effekt (W, positiv vid import)."""
+        self.total.add(timestamp, watts)
+        self._sampled(timestamp)
+
+    def add_phase_current(self, phase: int, timestamp: float, amps: float) -> None:
+        """Lägger till strömmen på en fas (0 = L1)."""
+        self.phases[phase].add(timestamp, amps)
+        self._sampled(timestamp)
+
+    def add_telegram(self, text: str, timestamp: float) -> None:
+        """Lägger till värdena i ett P1-telegram."""
+        values = parse_p1_telegram(text)
+        if OBIS_POWER_IMPORT in values:
+            net_kw = values[OBIS_POWER_IMPORT] - values.get(OBIS_POWER_EXPORT, 0.0)
+            self.total.add(timestamp, net_kw * 1000.0)
+        for phase in range(3):
+            if OBIS_PHASE_POWER_IMPORT[phase] in values:
+                net_kw = values[OBIS_PHASE_POWER_IMPORT[phase]] - values.get(
+                    OBIS_PHASE_POWER_EXPORT[phase], 0.0
+                )
+                current = net_kw * 1000.0 / VOLTAGE_PHASE_NEUTRAL
+            elif OBIS_PHASE_CURRENT[phase] in values:
+                current = values[OBIS_PHASE_CURRENT[phase]]
+            else:
+                continue
+            self.phases[phase].add(timestamp, current)
+        self._sampled(timestamp)
+
+    def _sampled(self, timestamp: float) -> None:
+        self.samples += 1
+        if self._first_sample is None:
+            self._first_sample = timestamp
+        if (
+            self._last_emit is not None
+            and timestamp - self._last_emit < self._emit_interval_s
+        ):
+            return
+        self._last_emit = timestamp
+        if self._listeners:
+            snapshot = self.snapshot(timestamp)
+            for listener in list(self._listeners):
+                listener(snapshot)
+
+    def snapshot(self, now: float) -> dict[str, Any]:
+        """Medel och max i fönstret för huset och per fas."""
+        for ring in (self.total, *self.phases):
+            ring.expire(now)
+        elapsed = now - self._first_sample if self._first_sample is not None else 0.0
+        return {
+            "house_power_mean_w": _round(self.total.mean()),
+            "house_power_max_w": _round(self.total.max()),
+            "phase_current_mean_a": [_round(ring.mean(), 1) for ring in self.phases],
+            "phase_current_max_a": [_round(ring.max(), 1) for ring in self.phases],
+            "meter_samples_per_second": round(self.samples / elapsed, 1)
+            if elapsed > 0
+            else None,
+        }
+
+    def house_power_w(self, now: datetime) -> float | None:
+        """Husets medeleffekt i fönstret, eller None om inga färska värden finns."""
+        self.total.expire(now.timestamp())
+        return self.total.mean()
+
+    def phase_currents_a(self, now: datetime) -> list[float | None]:
+        """Högsta strömmen per fas i fönstret, eller None för faser utan värden."""
+        timestamp = now.timestamp()
+        currents: list[float | None] = []
+        for ring in self.phases:
+            ring.expire(timestamp)
+            currents.append(ring.max())
+        return currents
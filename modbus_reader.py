@@ -0,0 +1,434 @@
+# File version: 2025-06-05 0.2.0
+"""Snabb avläsning av växelriktare och elmätare via Modbus TCP.
+
+Solöverskottet beräknas från sensorer i Home Assistant, och vissa
+växelriktarintegrationer uppdaterar dem bara var 30–60 s. Med Modbus TCP läses
+växelriktarens produktion och nätets effekt direkt, en till två gånger per
+sekund, och värdena används i överskottsberäkningen i stället för sensorernas
+tillstånd så länge de är färska.
+
+Ett register anges som 'adress:typ[:skala][@enhet]', t.ex. '30775:int32' eller
+'40087:int16:-1@2'. Typen är int16, uint16, int32 eller uint32 (32 bitar är två
+register med det höga ordet först). Värdet multipliceras med skalan, så en
+negativ skala vänder tecknet. Nätets effekt ska vara positiv vid import.
+
+Register för samma enhet som ligger intill varandra läses med ett enda anrop.
+Anslutningen till en adress och port delas av alla som läser från den.
+"""
+
+import asyncio
+import contextlib
+import logging
+import re
+import struct
+from collections.abc import Callable, Mapping
+from datetime import datetime, timedelta
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+import homeassistant.util.dt as dt_util
+
+from .const import (
+    DOMAIN,
+    CONF_MODBUS_HOST,
+    CONF_MODBUS_PORT,
+    CONF_MODBUS_UNIT_ID,
+    CONF_MODBUS_INPUT_REGISTERS,
+    CONF_MODBUS_SOLAR_REGISTER,
+    CONF_MODBUS_GRID_REGISTER,
+    CONF_MODBUS_POLL_INTERVAL,
+    DEFAULT_MODBUS_PORT,
+    DEFAULT_MODBUS_UNIT_ID,
+    DEFAULT_MODBUS_POLL_INTERVAL_SECONDS,
+)
+
+_LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
+
+SOURCE_SOLAR = "solar"
+SOURCE_GRID = "grid"
+# Funktionskoder för att läsa holding- respektive input-register.
+FUNCTION_READ_HOLDING = 3
+FUNCTION_READ_INPUT = 4
+# Protokollets gräns för antal register i ett läsanrop.
+MAX_REGISTERS_PER_READ = 125
+# Längsta tid för anslutning plus ett anrop.
+REQUEST_TIMEOUT_SECONDS = 2.0
+# Äldre värden än så används inte, utan sensorerna gäller igen.
+MAX_VALUE_AGE = timedelta(seconds=10)
+
+# (antal register, med tecken)
+REGISTER_TYPES: dict[str, tuple[int, bool]] = {
+    "int16": (1, True),
+    "uint16": (1, False),
+    "int32": (2, True),
+    "uint32": (2, False),
+}
+
+_REGISTER_PATTERN = re.compile(
+    r"^\s*(?P<address>\d+)\s*:\s*(?P<type>[a-z0-9]+)"
+    r"(?:\s*:\s*(?P<scale>-?\d+(?:[.,]\d+)?))?"
+    r"(?:\s*@\s*(?P<unit>\d+))?\s*$"
+)
+
+
+class ModbusError(Exception):
+    """Enheten svarade med ett Modbus-undantag eller ett ogiltigt svar."""
+
+
+class ModbusRegister:
+    """Ett värde i ett eller två register."""
+
+    def __init__(
+        self,
+        address: int,
+        data_type: str,
+        scale: float = 1.0,
+        unit_id: int = DEFAULT_MODBUS_UNIT_ID,
+    ) -> None:
+        """Initialisera med adress, typ, skala och enhetens id."""
+        self.address = address
+        self.data_type = data_type
+        self.count, self.signed = REGISTER_TYPES[data_type]
+        self.scale = scale
+        self.unit_id = unit_id
+
+    @property
+    def end(self) -> int:
+        """Adressen efter registrets sista ord."""
+        return self.address + self.count
+
+    def decode(self, words: list[int], block_start: int) -> float:
+        """Avkodar värdet ur ett läst block som börjar på block_start."""
+        offset = self.address - block_start
+        raw = 0
+        for word in words[offset : offset + self.count]:
+            raw = (raw << 16) | word
+        bits = 16 * self.count
+        if self.signed and raw >= 1 << (bits - 1):
+            raw -= 1 << bits
+        return raw * self.scale
+
+
+def parse_register(
+    text: str, default_unit_id: int = DEFAULT_MODBUS_UNIT_ID
+) -> ModbusRegister:
+    """Tolkar 'adress:typ[:skala][@enhet]'. Kastar ValueError vid ogiltig text."""
+    match = _REGISTER_PATTERN.match(text.lower())
+    if match is None or match["type"] not in REGISTER_TYPES:
+        raise ValueError(f"Ogiltigt register '{text.strip()}'.")
+    address = int(match["address"])
+    scale = float(match["scale"].replace(",", ".")) if match["scale"] else 1.0
+    unit_id = int(match["unit"]) if match["unit"] else default_unit_id
+    if address + REGISTER_TYPES[match["type"]][0] > 0x10000:
+        raise ValueError(f"Registeradressen {address} är för stor.")
+    if scale == 0:
+        raise ValueError(f"Skalan i '{text.strip()}' får inte vara 0.")
+    if not 0 <= unit_id <= 247:
+        raise ValueError(f"Ogiltigt enhets-id {unit_id}.")
+    return ModbusRegister(address, match["type"], scale, unit_id)
+
+
+def build_read_blocks(
+    registers: Mapping[str, ModbusRegister],
+) -> list[tuple[int, int, int, list[tuple[str, ModbusRegister]]]]:
+    """
+    Grupperar registren i läsanrop: (enhet, första adress, antal register,
+    registren i blocket). Register som ligger intill eller överlappar varandra
+    läses i samma anrop, så länge blocket ryms i ett anrop.
+    """
+    blocks: list[tuple[int, int, int, list[tuple[str, ModbusRegister]]]] = []
+    ordered = sorted(registers.items(), key=lambda i: (i[1].unit_id, i[1].address))
+    for name, register in ordered:
+        if blocks:
+            unit_id, start, count, members = blocks[-1]
+            if (
+                unit_id == register.unit_id
+                and register.address <= start + count
+                and register.end - start <= MAX_REGISTERS_PER_READ
+            ):
+                members.append((name, register))
+                blocks[-1] = (
+                    unit_id,
+                    start,
+                    max(count, register.end - start),
+                    members,
+                )
+                continue
+        blocks.append(
+            (register.unit_id, register.address, register.count, [(name, register)])
+        )
+    return blocks
+
+
+class ModbusTcpClient:
+    """En TCP-anslutning till en Modbus-enhet eller -gateway. Anropen köas."""
+
+    def __init__(
+        self, host: str, port: int, timeout: float = REQUEST_TIMEOUT_SECONDS
+    ) -> None:
+        """Initialisera med adress och port. Ansluter vid första anropet."""
+        self.host = host
+        self.port = port
+        self._timeout = timeout
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._lock = asyncio.Lock()
+        self._transaction_id = 0
+        # Antal skickade läsanrop, för diagnostik.
+        self.requests = 0
+
+    def close(self) -> None:
+        """Stänger anslutningen. Den öppnas igen vid nästa anrop."""
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = None
+        self._writer = None
+
+    async def async_read_registers(
+        self, unit_id: int, function: int, address: int, count: int
+    ) -> list[int]:
+        """Läser count register från address och returnerar orden."""
+        async with self._lock:
+            try:
+                async with asyncio.timeout(self._timeout):
+                    if self._writer is None:
+                        self._reader, self._writer = await asyncio.open_connection(
+                            self.host, self.port
+                        )
+                    return await self._async_request(unit_id, function, address, count)
+            except (OSError, TimeoutError, EOFError):
+                self.close()
+                raise
+
+    async def _async_request(
+        self, unit_id: int, function: int, address: int, count: int
+    ) -> list[int]:
+        assert self._reader is not None and self._writer is not None
+        self._transaction_id = (self._transaction_id + 1) % 0x10000
+        transaction_id = self._transaction_id
+        pdu = struct.pack(">BHH", function, address, count)
+        self._writer.write(
+            struct.pack(">HHHB", transaction_id, 0, len(pdu) + 1, unit_id) + pdu
+        )
+        await self._writer.drain()
+        self.requests += 1
+        header = await self._reader.readexactly(7)
+        response_id, _, length, _ = struct.unpack(">HHHB", header)
+        if length < 2:
+            # Längden räknar enhetens id och funktionskoden. Resten av svaret
+            # går inte att läsa, så anslutningen öppnas på nytt.
+            self.close()
+            raise ModbusError(
+                f"Ogiltig längd {length} i svaret från enhet {unit_id}."
+            )
+        body = await self._reader.readexactly(length - 1)
+        if response_id != transaction_id:
+            # Svaren är ur takt med anropen, så anslutningen öppnas på nytt.
+            self.close()
+            raise ModbusError(
+                f"Svar med transaktions-id {response_id}, väntade {transaction_id}."
+            )
+        if body[0] == function | 0x80:
+            raise ModbusError(
+                f"Undantag {body[1] if len(body) > 1 else '?'} från enhet {unit_id} "
+                f"vid läsning av {count} register från {address}."
+            )
+        if body[0] != function or len(body) < 2 or body[1] != 2 * count:
+            raise ModbusError(f"Ogiltigt svar från enhet {unit_id}.")
+        return list(struct.unpack(f">{count}H", body[2 : 2 + 2 * count]))
+
+
+class ModbusConnectionPool:
+    """Delade anslutningar per adress och port."""
+
+    def __init__(self) -> None:
+        """Initialisera en tom pool."""
+        self._clients: dict[tuple[str, int], ModbusTcpClient] = {}
+        self._users: dict[tuple[str, int], int] = {}
+
+    def acquire(self, host: str, port: int) -> ModbusTcpClient:
+        """Returnerar den delade anslutningen till host:port."""
+        key = (host, port)
+        if key not in self._clients:
+            self._clients[key] = ModbusTcpClient(host, port)
+        self._users[key] = self._users.get(key, 0) + 1
+        return self._clients[key]
+
+    def release(self, client: ModbusTcpClient) -> None:
+        """Lämnar tillbaka anslutningen. Den stängs när ingen använder den."""
+        key = (client.host, client.port)
+        self._users[key] = self._users.get(key, 1) - 1
+        if self._users[key] <= 0:
+            self._users.pop(key)
+            if (pooled := self._clients.pop(key, None)) is not None:
+                pooled.close()
+
+
+CONNECTION_POOL = ModbusConnectionPool()
+
+
+class ModbusPowerReader:
+    """Läser solproduktion och nätets effekt via Modbus TCP med fast intervall."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        host: str,
+        port: int,
+        registers: Mapping[str, ModbusRegister],
+        function: int = FUNCTION_READ_HOLDING,
+        interval_s: float = DEFAULT_MODBUS_POLL_INTERVAL_SECONDS,
+        pool: ModbusConnectionPool = CONNECTION_POOL,
+    ) -> None:
+        """Initialisera med enhetens adress, registren och intervallet."""
+        self._hass = hass
+        self.host = host
+        self.port = port
+        self._function = function
+        self._interval_s = interval_s
+        self._pool = pool
+        self._blocks = build_read_blocks(registers)
+        self._client: ModbusTcpClient | None = None
+        self._task: asyncio.Task | None = None
+        self._listeners: list[Callable[[dict[str, float]], None]] = []
+        self.values: dict[str, float] = {}
+        self.updated_at: datetime | None = None
+        self.failures = 0
+
+    @classmethod
+    def from_config(
+        cls, hass: HomeAssistant, config: Mapping[str, Any]
+    ) -> "ModbusPowerReader | None":
+        """Skapar läsaren, eller None om Modbus inte är konfigurerat."""
+        host = config.get(CONF_MODBUS_HOST)
+        if not host:
+            return None
+        unit_id = config.get(CONF_MODBUS_UNIT_ID)
+        default_unit_id = (
+            int(unit_id) if unit_id is not None else DEFAULT_MODBUS_UNIT_ID
+        )
+        registers: dict[str, ModbusRegister] = {}
+        for source, conf_key in (
+            (SOURCE_SOLAR, CONF_MODBUS_SOLAR_REGISTER),
+            (SOURCE_GRID, CONF_MODBUS_GRID_REGISTER),
+        ):
+            if not (text := config.get(conf_key)):
+                continue
+            try:
+                registers[source] = parse_register(str(text), default_unit_id)
+            except ValueError as e:
+                _LOGGER.warning("Modbus-registret för %s ignoreras: %s", source, e)
+        if not registers:
+            _LOGGER.warning(
+                "Modbus-värd är angiven men inga giltiga register finns. "
+                "Sensorerna används."
+            )
+            return None
+        port = config.get(CONF_MODBUS_PORT)
+        interval = config.get(CONF_MODBUS_POLL_INTERVAL)
+        return cls(
+            hass,
+            str(host),
+            int(port) if port is not None else DEFAULT_MODBUS_PORT,
+            registers,
+            FUNCTION_READ_INPUT
+            if config.get(CONF_MODBUS_INPUT_REGISTERS)
+            else FUNCTION_READ_HOLDING,
+            float(interval) if interval else DEFAULT_MODBUS_POLL_INTERVAL_SECONDS,
+        )
+
+    @property
+    def read_requests(self) -> int:
+        """Antal läsanrop som skickats på den delade anslutningen."""
+        return self._client.requests if self._client is not None else 0
+
+    def async_add_listener(
+        self, listener: Callable[[dict[str, float]], None]
+    ) -> Callable[[], None]:
+        """Anropas med värdena efter varje lyckad avläsning."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def async_start(self) -> None:
+        """Börjar läsa registren i bakgrunden."""
+        if self._task is not None:
+            return
+        if self._client is None:
+            self._client = self._pool.acquire(self.host, self.port)
+        self._task = self._hass.async_create_background_task(
+            self._async_poll_loop(), f"{DOMAIN} modbus {self.host}:{self.port}"
+        )
+
+    async def async_stop(self) -> None:
+        """Slutar läsa och lämnar tillbaka anslutningen."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._client is not None:
+            self._pool.release(self._client)
+            self._client = None
+
+    async def _async_poll_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            try:
+                await self.async_poll()
+            except Exception:
+                # Ett oväntat fel får inte stoppa avläsningen.
+                self.failures += 1
+                if self._client is not None:
+                    self._client.close()
+                log = _LOGGER.warning if self.failures == 1 else _LOGGER.debug
+                log(
+                    "Oväntat fel i Modbus-avläsningen från %s:%s.",
+                    self.host,
+                    self.port,
+                    exc_info=True,
+                )
+            await asyncio.sleep(max(0.0, self._interval_s - (loop.time() - started)))
+
+    async def async_poll(self) -> bool:
+        """Läser alla register en gång. Returnerar True om avläsningen lyckades."""
+        if self._client is None:
+            self._client = self._pool.acquire(self.host, self.port)
+        values: dict[str, float] = {}
+        try:
+            for unit_id, address, count, members in self._blocks:
+                words = await self._client.async_read_registers(
+                    unit_id, self._function, address, count
+                )
+                for name, register in members:
+                    values[name] = register.decode(words, address)
+        except (OSError, TimeoutError, EOFError, ModbusError) as e:
+            self.failures += 1
+            # Bara första felet loggas som varning, avläsningen görs varje sekund.
+            log = _LOGGER.warning if self.failures == 1 else _LOGGER.debug
+            log(
+                "Modbus-avläsningen från %s:%s misslyckades: %s",
+                self.host,
+                self.port,
+                str(e) or type(e).__name__,
+            )
+            return False
+        if self.failures:
+            _LOGGER.info(
+                "Modbus-avläsningen från %s:%s fungerar igen efter %d fel.",
+                self.host,
+                self.port,
+                self.failures,
+            )
+            self.failures = 0
+        self.values = values
+        self.updated_at = dt_util.utcnow()
+        for listener in list(self._listeners):
+            listener(values)
+        return True
+
+    def power_w(self, source: str, now: datetime) -> float | None:
+        """Senaste värdet i W, eller None om det saknas eller är för gammalt."""
+        if self.updated_at is None or now - self.updated_at > MAX_VALUE_AGE:
+            return None
+        return self.values.get(source)
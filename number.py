@@ -12,8 +12,14 @@ from .const import (
     DOMAIN, DEFAULT_NAME,
     ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
     ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER,
-    ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER
+    ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER,
+    ENTITY_ID_SUFFIX_HYBRID_MAX_GRID_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_HYBRID_TARGET_POWER_NUMBER,
+    ENTITY_ID_SUFFIX_RELATIVE_PRICE_THRESHOLD_NUMBER,
+    CONF_PRICE_THRESHOLD_MODE,
+    PRICE_THRESHOLD_MODE_CHEAPEST_HOURS,
 )
+from .coordinator import SmartEVChargingCoordinator
 
 _LOGGER = logging.getLogger(f"custom_components.{DOMAIN}") # Använd komponent-specifik logger
 
@@ -32,6 +38,21 @@ MIN_SOLAR_CURRENT_A = 1 # Minsta möjliga för de flesta system är 6A, men till
 MAX_SOLAR_CURRENT_A = 16
 SOLAR_CURRENT_A_STEP = 1
 
+DEFAULT_HYBRID_MAX_GRID_PRICE = 0.5
+
+DEFAULT_HYBRID_TARGET_POWER = 0 # 0 = fyll bara upp till laddarens minimiström
+MIN_HYBRID_TARGET_POWER = 0
+MAX_HYBRID_TARGET_POWER = 11000
+HYBRID_TARGET_POWER_STEP = 100
+
+# Relativ prisgräns: antal billigaste timmar, eller percentil av dygnets priser.
+DEFAULT_CHEAPEST_HOURS = 4
+MAX_CHEAPEST_HOURS = 48
+CHEAPEST_HOURS_STEP = 0.25 # Prisintervall om 15 minuter
+DEFAULT_PRICE_PERCENTILE = 25
+MAX_PRICE_PERCENTILE = 100
+PRICE_PERCENTILE_STEP = 1
+
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
@@ -39,19 +60,40 @@ async def async_setup_entry(
 ) -> None:
     """Set up the number platform for Smart EV Charging."""
     _LOGGER.debug("NUMBER PLATFORM: async_setup_entry startar.")
+    coordinator: SmartEVChargingCoordinator | None = (
+        hass.data.get(DOMAIN, {}).get(config_entry.entry_id, {}).get("coordinator")
+    )
+    if not coordinator:
+        _LOGGER.error("NUMBER PLATFORM: Koordinator saknas för %s.", config_entry.entry_id)
+        return
     entities_to_add = [
-        MaxPriceNumberEntity(config_entry),
-        SolarSurplusBufferNumberEntity(config_entry),
-        MinSolarChargeCurrentNumberEntity(config_entry)
+        MaxPriceNumberEntity(config_entry, coordinator),
+        SolarSurplusBufferNumberEntity(config_entry, coordinator),
+        MinSolarChargeCurrentNumberEntity(config_entry, coordinator),
+        HybridMaxGridPriceNumberEntity(config_entry, coordinator),
+        HybridTargetPowerNumberEntity(config_entry, coordinator),
+        RelativePriceThresholdNumberEntity(config_entry, coordinator)
     ]
     async_add_entities(entities_to_add, True) # True för att indikera att entiteterna ska återställas
     _LOGGER.debug("NUMBER PLATFORM: %s entiteter tillagda.", len(entities_to_add))
 
-class MaxPriceNumberEntity(RestoreNumber, NumberEntity):
+class SmartChargingBaseNumber(RestoreNumber, NumberEntity):
+    """Base class for numbers that push their value to the coordinator."""
     _attr_should_poll = False
-    def __init__(self, config_entry: ConfigEntry) -> None:
+
+    def __init__(self, config_entry: ConfigEntry, coordinator: SmartEVChargingCoordinator, entity_id_suffix: str) -> None:
         self._config_entry = config_entry
-        self._attr_unique_id = f"{config_entry.entry_id}_{ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER}"
+        self._coordinator = coordinator
+        self._entity_id_suffix = entity_id_suffix # Nyckel för värdet i koordinatorn
+        self._attr_unique_id = f"{config_entry.entry_id}_{entity_id_suffix}"
+
+    async def _async_update_coordinator(self) -> None:
+        """Skickar det aktuella värdet till koordinatorn, som omvärderar direkt vid ändring."""
+        await self._coordinator.async_set_control_value(self._entity_id_suffix, self._attr_native_value)
+
+class MaxPriceNumberEntity(SmartChargingBaseNumber):
+    def __init__(self, config_entry: ConfigEntry, coordinator: SmartEVChargingCoordinator) -> None:
+        super().__init__(config_entry, coordinator, ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER)
         self._attr_name = f"{DEFAULT_NAME} Max Elpris"
         self._attr_native_min_value = MIN_PRICE
         self._attr_native_max_value = MAX_PRICE
@@ -75,6 +117,7 @@ class MaxPriceNumberEntity(RestoreNumber, NumberEntity):
             self._attr_native_value = DEFAULT_MAX_PRICE
             _LOGGER.debug("Inget sparat värde för %s, sätter till default: %s", self.unique_id, self._attr_native_value)
         # self.async_write_ha_state() # Behövs inte här, sker vid set_native_value eller om HA begär det
+        await self._async_update_coordinator()
 
     async def async_set_native_value(self, value: float) -> None:
         if value is None:
@@ -85,13 +128,12 @@ class MaxPriceNumberEntity(RestoreNumber, NumberEntity):
             self._attr_native_value = round(value, len(str(PRICE_STEP).split('.')[-1]) if '.' in str(PRICE_STEP) else 0) # Avrunda till stegprecision
             self.async_write_ha_state()
             _LOGGER.info("%s satt till: %s %s", self.name, self._attr_native_value, self._attr_native_unit_of_measurement)
+            await self._async_update_coordinator()
         else: _LOGGER.warning("Ogiltigt värde för %s: %s. Tillåtet intervall: %s-%s.", self.name, value, self._attr_native_min_value, self._attr_native_max_value)
 
-class SolarSurplusBufferNumberEntity(RestoreNumber, NumberEntity):
-    _attr_should_poll = False
-    def __init__(self, config_entry: ConfigEntry) -> None:
-        self._config_entry = config_entry
-        self._attr_unique_id = f"{config_entry.entry_id}_{ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER}"
+class SolarSurplusBufferNumberEntity(SmartChargingBaseNumber):
+    def __init__(self, config_entry: ConfigEntry, coordinator: SmartEVChargingCoordinator) -> None:
+        super().__init__(config_entry, coordinator, ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER)
         self._attr_name = f"{DEFAULT_NAME} Solenergi Buffer"
         self._attr_native_min_value = MIN_SOLAR_BUFFER
         self._attr_native_max_value = MAX_SOLAR_BUFFER
@@ -114,6 +156,7 @@ class SolarSurplusBufferNumberEntity(RestoreNumber, NumberEntity):
         elif self._attr_native_value is None:
             self._attr_native_value = DEFAULT_SOLAR_BUFFER
             _LOGGER.debug("Inget sparat värde för %s, sätter till default: %s", self.unique_id, self._attr_native_value)
+        await self._async_update_coordinator()
 
     async def async_set_native_value(self, value: float) -> None:
         if value is None:
@@ -123,13 +166,12 @@ class SolarSurplusBufferNumberEntity(RestoreNumber, NumberEntity):
             self._attr_native_value = round(value / SOLAR_BUFFER_STEP) * SOLAR_BUFFER_STEP # Säkerställ att det är en jämn multipel av steget
             self.async_write_ha_state()
             _LOGGER.info("%s satt till: %s %s", self.name, self._attr_native_value, self._attr_native_unit_of_measurement)
+            await self._async_update_coordinator()
         else: _LOGGER.warning("Ogiltigt värde för %s: %s. Tillåtet intervall: %s-%s.", self.name, value, self._attr_native_min_value, self._attr_native_max_value)
 
-class MinSolarChargeCurrentNumberEntity(RestoreNumber, NumberEntity):
-    _attr_should_poll = False
-    def __init__(self, config_entry: ConfigEntry) -> None:
-        self._config_entry = config_entry
-        self._attr_unique_id = f"{config_entry.entry_id}_{ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER}"
+class MinSolarChargeCurrentNumberEntity(SmartChargingBaseNumber):
+    def __init__(self, config_entry: ConfigEntry, coordinator: SmartEVChargingCoordinator) -> None:
+        super().__init__(config_entry, coordinator, ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER)
         self._attr_name = f"{DEFAULT_NAME} Minsta Laddström Solenergi"
         self._attr_native_min_value = MIN_SOLAR_CURRENT_A
         self._attr_native_max_value = MAX_SOLAR_CURRENT_A
@@ -152,6 +194,7 @@ class MinSolarChargeCurrentNumberEntity(RestoreNumber, NumberEntity):
         elif self._attr_native_value is None:
             self._attr_native_value = DEFAULT_MIN_SOLAR_CURRENT_A
             _LOGGER.debug("Inget sparat värde för %s, sätter till default: %s", self.unique_id, self._attr_native_value)
+        await self._async_update_coordinator()
 
     async def async_set_native_value(self, value: float) -> None:
         if value is None:
@@ -161,4 +204,133 @@ class MinSolarChargeCurrentNumberEntity(RestoreNumber, NumberEntity):
             self._attr_native_value = round(value / SOLAR_CURRENT_A_STEP) * SOLAR_CURRENT_A_STEP
             self.async_write_ha_state()
             _LOGGER.info("%s satt till: %s %s", self.name, self._attr_native_value, self._attr_native_unit_of_measurement)
-        else: _LOGGER.warning("Ogiltigt värde för %s: %s. Tillåtet intervall: %s-%s A.", self.name, value, self._attr_native_min_value, self._attr_native_max_value)
\ No newline at end of file
+            await self._async_update_coordinator()
+        else: _LOGGER.warning("Ogiltigt värde för %s: %s. Tillåtet intervall: %s-%s A.", self.name, value, self._attr_native_min_value, self._attr_native_max_value)
+
+class HybridMaxGridPriceNumberEntity(SmartChargingBaseNumber):
+    def __init__(self, config_entry: ConfigEntry, coordinator: SmartEVChargingCoordinator) -> None:
+        super().__init__(config_entry, coordinator, ENTITY_ID_SUFFIX_HYBRID_MAX_GRID_PRICE_NUMBER)
+        self._attr_name = f"{DEFAULT_NAME} Hybrid Max Nätpris"
+        self._attr_native_min_value = MIN_PRICE
+        self._attr_native_max_value = MAX_PRICE
+        self._attr_native_step = PRICE_STEP
+        self._attr_native_unit_of_measurement = "SEK/kWh"
+        self._attr_mode = NumberMode.BOX
+        self._attr_icon = "mdi:transmission-tower-import"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, config_entry.entry_id)}, name=DEFAULT_NAME, manufacturer="AllehJ Integrationer", model="Smart EV Charger Control", entry_type="service"
+        )
+        self._attr_native_value: float | None = None
+        _LOGGER.info("%s initialiserad", self.name)
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        last_number_data = await self.async_get_last_number_data()
+        if last_number_data is not None and last_number_data.native_value is not None:
+            self._attr_native_value = last_number_data.native_value
+            _LOGGER.debug("Återställt värde för %s till: %s", self.unique_id, self._attr_native_value)
+        elif self._attr_native_value is None:
+            self._attr_native_value = DEFAULT_HYBRID_MAX_GRID_PRICE
+            _LOGGER.debug("Inget sparat värde för %s, sätter till default: %s", self.unique_id, self._attr_native_value)
+        await self._async_update_coordinator()
+
+    async def async_set_native_value(self, value: float) -> None:
+        if value is None:
+            _LOGGER.warning("Försökte sätta None-värde för %s, ignorerar.", self.name)
+            return
+        if self._attr_native_min_value <= value <= self._attr_native_max_value:
+            self._attr_native_value = round(value, 2)
+            self.async_write_ha_state()
+            _LOGGER.info("%s satt till: %s %s", self.name, self._attr_native_value, self._attr_native_unit_of_measurement)
+            await self._async_update_coordinator()
+        else: _LOGGER.warning("Ogiltigt värde för %s: %s. Tillåtet intervall: %s-%s.", self.name, value, self._attr_native_min_value, self._attr_native_max_value)
+
+class HybridTargetPowerNumberEntity(SmartChargingBaseNumber):
+    def __init__(self, config_entry: ConfigEntry, coordinator: SmartEVChargingCoordinator) -> None:
+        super().__init__(config_entry, coordinator, ENTITY_ID_SUFFIX_HYBRID_TARGET_POWER_NUMBER)
+        self._attr_name = f"{DEFAULT_NAME} Hybrid Måleffekt"
+        self._attr_native_min_value = MIN_HYBRID_TARGET_POWER
+        self._attr_native_max_value = MAX_HYBRID_TARGET_POWER
+        self._attr_native_step = HYBRID_TARGET_POWER_STEP
+        self._attr_native_unit_of_measurement = "W"
+        self._attr_mode = NumberMode.BOX
+        self._attr_icon = "mdi:flash-outline"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, config_entry.entry_id)}, name=DEFAULT_NAME, manufacturer="AllehJ Integrationer", model="Smart EV Charger Control", entry_type="service"
+        )
+        self._attr_native_value: float | None = None
+        _LOGGER.info("%s initialiserad", self.name)
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        last_number_data = await self.async_get_last_number_data()
+        if last_number_data is not None and last_number_data.native_value is not None:
+            self._attr_native_value = last_number_data.native_value
+            _LOGGER.debug("Återställt värde för %s till: %s", self.unique_id, self._attr_native_value)
+        elif self._attr_native_value is None:
+            self._attr_native_value = DEFAULT_HYBRID_TARGET_POWER
+            _LOGGER.debug("Inget sparat värde för %s, sätter till default: %s", self.unique_id, self._attr_native_value)
+        await self._async_update_coordinator()
+
+    async def async_set_native_value(self, value: float) -> None:
+        if value is None:
+            _LOGGER.warning("Försökte sätta None-värde för %s, ignorerar.", self.name)
+            return
+        if self._attr_native_min_value <= value <= self._attr_native_max_value:
+            self._attr_native_value = round(value / HYBRID_TARGET_POWER_STEP) * HYBRID_TARGET_POWER_STEP
+            self.async_write_ha_state()
+            _LOGGER.info("%s satt till: %s %s", self.name, self._attr_native_value, self._attr_native_unit_of_measurement)
+            await self._async_update_coordinator()
+        else: _LOGGER.warning("Ogiltigt värde för %s: %s. Tillåtet intervall: %s-%s W.", self.name, value, self._attr_native_min_value, self._attr_native_max_value)
+
+class RelativePriceThresholdNumberEntity(SmartChargingBaseNumber):
+    """Antal billigaste timmar eller percentil, beroende på valt prisgränsläge."""
+    def __init__(self, config_entry: ConfigEntry, coordinator: SmartEVChargingCoordinator) -> None:
+        super().__init__(config_entry, coordinator, ENTITY_ID_SUFFIX_RELATIVE_PRICE_THRESHOLD_NUMBER)
+        mode = {**config_entry.data, **config_entry.options}.get(CONF_PRICE_THRESHOLD_MODE)
+        self._cheapest_hours = mode == PRICE_THRESHOLD_MODE_CHEAPEST_HOURS
+        self._attr_name = f"{DEFAULT_NAME} Relativ Prisgräns"
+        self._attr_native_min_value = 0
+        if self._cheapest_hours:
+            self._attr_native_max_value = MAX_CHEAPEST_HOURS
+            self._attr_native_step = CHEAPEST_HOURS_STEP
+            self._attr_native_unit_of_measurement = "h"
+            self._default_value = DEFAULT_CHEAPEST_HOURS
+        else:
+            self._attr_native_max_value = MAX_PRICE_PERCENTILE
+            self._attr_native_step = PRICE_PERCENTILE_STEP
+            self._attr_native_unit_of_measurement = "%"
+            self._default_value = DEFAULT_PRICE_PERCENTILE
+        self._attr_mode = NumberMode.BOX
+        self._attr_icon = "mdi:chart-bell-curve-cumulative"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, config_entry.entry_id)}, name=DEFAULT_NAME, manufacturer="AllehJ Integrationer", model="Smart EV Charger Control", entry_type="service"
+        )
+        self._attr_native_value: float | None = None
+        _LOGGER.info("%s initialiserad", self.name)
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        last_number_data = await self.async_get_last_number_data()
+        if (
+            last_number_data is not None
+            and last_number_data.native_value is not None
+            and last_number_data.native_unit_of_measurement == self._attr_native_unit_of_measurement
+        ):
+            self._attr_native_value = last_number_data.native_value
+            _LOGGER.debug("Återställt värde för %s till: %s", self.unique_id, self._attr_native_value)
+        elif self._attr_native_value is None: # Inget sparat värde, eller sparat i ett annat läge
+            self._attr_native_value = self._default_value
+            _LOGGER.debug("Inget sparat värde för %s, sätter till default: %s", self.unique_id, self._attr_native_value)
+        await self._async_update_coordinator()
+
+    async def async_set_native_value(self, value: float) -> None:
+        if value is None:
+            _LOGGER.warning("Försökte sätta None-värde för %s, ignorerar.", self.name)
+            return
+        if self._attr_native_min_value <= value <= self._attr_native_max_value:
+            self._attr_native_value = round(value / self._attr_native_step) * self._attr_native_step
+            self.async_write_ha_state()
+            _LOGGER.info("%s satt till: %s %s", self.name, self._attr_native_value, self._attr_native_unit_of_measurement)
+            await self._async_update_coordinator()
+        else: _LOGGER.warning("Ogiltigt värde för %s: %s. Tillåtet intervall: %s-%s %s.", self.name, value, self._attr_native_min_value, self._attr_native_max_value, self._attr_native_unit_of_measurement)
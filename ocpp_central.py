@@ -0,0 +1,464 @@
+# File version: 2025-06-05 0.2.0
+"""Lokalt OCPP 1.6J-centralsystem för laddare på det lokala nätverket.
+
+Via Easees moln tar varje ändring av strömgränsen sekunder, och molnet
+begränsar hur ofta den får ändras. Laddare med OCPP kan i stället ansluta
+direkt till Home Assistant. Centralsystemet är en WebSocket-server
+(underprotokoll 'ocpp1.6') där varje laddpunkt ansluter till
+ws://<home assistant>:<port>/<laddpunktens id>. Flera laddpunkter kan vara
+anslutna samtidigt till samma server. Alla poster som styr en OCPP-laddare
+delar servern i hass.data och väljer sin laddpunkt med id. Servern stoppas
+när den sista posten laddas ur.
+
+Strömgränsen styrs med SetChargingProfile: en TxProfile för den pågående
+transaktionen, eller en TxDefaultProfile när ingen transaktion pågår. Samma
+profil-ID används varje gång, så att en ny gräns ersätter den förra. Paus är
+gränsen 0A, så att transaktionen fortsätter. Återkopplingen kommer från
+StatusNotification och MeterValues (ström, effekt och energi).
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import uuid
+from collections.abc import Callable, Iterator, Mapping
+from typing import Any
+
+from aiohttp import WSMsgType, web
+from homeassistant.core import HomeAssistant
+import homeassistant.util.dt as dt_util
+
+from .const import (
+    DOMAIN,
+    CONF_CHARGER_BACKEND,
+    CONF_OCPP_PORT,
+    CONF_OCPP_CHARGE_POINT_ID,
+    CHARGER_BACKEND_OCPP,
+    DEFAULT_OCPP_PORT,
+)
+
+_LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
+
+SUBPROTOCOL = "ocpp1.6"
+# Nyckeln i hass.data[DOMAIN] för det gemensamma centralsystemet.
+DATA_OCPP_CENTRAL = "ocpp_central"
+# Meddelandetyper i OCPP-J.
+CALL = 2
+CALLRESULT = 3
+CALLERROR = 4
+# Längsta tid en laddpunkt får ta på sig att svara på ett anrop.
+CALL_TIMEOUT_SECONDS = 10
+# Intervall för laddpunktens Heartbeat, meddelas vid BootNotification.
+HEARTBEAT_INTERVAL_S = 300
+# idTag vid RemoteStartTransaction.
+DEFAULT_ID_TAG = "smart_ev_charging"
+# Profilen skrivs över vid varje ny strömgräns.
+CHARGING_PROFILE_ID = 1
+# Status när laddpunkten inte är ansluten.
+STATUS_UNAVAILABLE = "Unavailable"
+
+
+class OcppError(Exception):
+    """Laddpunkten svarade med CALLERROR."""
+
+    def __init__(self, code: str, description: str) -> None:
+        """Initialisera med felkoden och beskrivningen från laddpunkten."""
+        super().__init__(f"{code}: {description}")
+        self.code = code
+
+
+def _to_float(value: Any) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ChargePoint:
+    """En ansluten laddpunkt och dess senast rapporterade tillstånd."""
+
+    def __init__(
+        self,
+        charge_point_id: str,
+        ws: web.WebSocketResponse,
+        transaction_ids: Iterator[int],
+        on_change: Callable[["ChargePoint"], None],
+    ) -> None:
+        """Initialisera med laddpunktens id och dess WebSocket."""
+        self.id = charge_point_id
+        self._ws = ws
+        self._transaction_ids = transaction_ids
+        self._on_change = on_change
+        self._pending: dict[str, asyncio.Future] = {}
+        self.connected = True
+        self.vendor: str | None = None
+        self.model: str | None = None
+        self.connector_id = 1
+        self.status: str | None = None
+        self.error_code: str | None = None
+        self.transaction_id: int | None = None
+        self.limit_a: float | None = None
+        self.current_offered_a: float | None = None
+        self.current_import_a: float | None = None
+        self.power_w: float | None = None
+        self.energy_kwh: float | None = None
+        self._handlers: dict[str, Callable[[dict[str, Any]], dict[str, Any]]] = {
+            "BootNotification": self._on_boot_notification,
+            "Heartbeat": self._on_heartbeat,
+            "StatusNotification": self._on_status_notification,
+            "Authorize": self._on_authorize,
+            "StartTransaction": self._on_start_transaction,
+            "StopTransaction": self._on_stop_transaction,
+            "MeterValues": self._on_meter_values,
+        }
+
+    async def _send(self, message: list[Any]) -> None:
+        await self._ws.send_str(json.dumps(message))
+
+    async def async_handle_message(self, text: str) -> None:
+        """Hanterar ett meddelande från laddpunkten."""
+        try:
+            message = json.loads(text)
+            message_type, unique_id = message[0], str(message[1])
+        except (ValueError, TypeError, IndexError, KeyError):
+            _LOGGER.warning("Ogiltigt OCPP-meddelande från %s: %s", self.id, text)
+            return
+        if message_type == CALL:
+            await self._handle_call(unique_id, message)
+            return
+        future = self._pending.pop(unique_id, None)
+        if future is None or future.done():
+            return
+        if message_type == CALLRESULT:
+            payload = message[2] if len(message) > 2 else {}
+            if isinstance(payload, dict):
+                future.set_result(payload)
+            else:
+                future.set_exception(
+                    OcppError("FormationViolation", f"Ogiltigt svar: {payload!r}")
+                )
+        elif message_type == CALLERROR:
+            future.set_exception(
+                OcppError(str(message[2]), str(message[3]) if len(message) > 3 else "")
+            )
+
+    async def _handle_call(self, unique_id: str, message: list[Any]) -> None:
+        action = message[2] if len(message) > 2 else None
+        handler = self._handlers.get(action)
+        if handler is None:
+            await self._send(
+                [CALLERROR, unique_id, "NotImplemented", f"{action} stöds inte", {}]
+            )
+            return
+        try:
+            result = handler(message[3] if len(message) > 3 else {})
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            _LOGGER.warning("Ogiltigt %s från %s: %s", action, self.id, e)
+            await self._send([CALLERROR, unique_id, "FormationViolation", str(e), {}])
+            return
+        await self._send([CALLRESULT, unique_id, result])
+        self._on_change(self)
+
+    async def async_call(
+        self,
+        action: str,
+        payload: dict[str, Any],
+        timeout: float = CALL_TIMEOUT_SECONDS,
+    ) -> dict[str, Any]:
+        """Skickar ett anrop till laddpunkten och väntar på svaret."""
+        unique_id = uuid.uuid4().hex
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._pending[unique_id] = future
+        try:
+            await self._send([CALL, unique_id, action, payload])
+            async with asyncio.timeout(timeout):
+                return await future
+        finally:
+            self._pending.pop(unique_id, None)
+
+    def disconnected(self) -> None:
+        """Markerar laddpunkten som frånkopplad och avbryter väntande anrop."""
+        self.connected = False
+        self.status = STATUS_UNAVAILABLE
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionResetError(self.id))
+        self._pending.clear()
+        self._on_change(self)
+
+    async def async_close(self) -> None:
+        """Stänger anslutningen."""
+        await self._ws.close()
+
+    # Anrop från laddpunkten.
+
+    def _on_boot_notification(self, payload: dict[str, Any]) -> dict[str, Any]:
+        self.vendor = payload.get("chargePointVendor")
+        self.model = payload.get("chargePointModel")
+        _LOGGER.info(
+            "OCPP-laddpunkten %s har startat (%s %s).", self.id, self.vendor, self.model
+        )
+        return {
+            "status": "Accepted",
+            "currentTime": dt_util.utcnow().isoformat(),
+            "interval": HEARTBEAT_INTERVAL_S,
+        }
+
+    def _on_heartbeat(self, payload: dict[str, Any]) -> dict[str, Any]:
+        return {"currentTime": dt_util.utcnow().isoformat()}
+
+    def _on_status_notification(self, payload: dict[str, Any]) -> dict[str, Any]:
+        connector_id = int(payload["connectorId"])
+        # Anslutning 0 är hela laddpunkten. Dess status gäller bara vid fel.
+        if connector_id > 0:
+            self.connector_id = connector_id
+        if connector_id > 0 or payload["status"] in (STATUS_UNAVAILABLE, "Faulted"):
+            self.status = payload["status"]
+            self.error_code = payload.get("errorCode")
+        return {}
+
+    def _on_authorize(self, payload: dict[str, Any]) -> dict[str, Any]:
+        return {"idTagInfo": {"status": "Accepted"}}
+
+    def _on_start_transaction(self, payload: dict[str, Any]) -> dict[str, Any]:
+        self.connector_id = int(payload["connectorId"])
+        self.transaction_id = next(self._transaction_ids)
+        _LOGGER.info(
+            "OCPP-laddpunkten %s startade transaktion %d.", self.id, self.transaction_id
+        )
+        return {
+            "transactionId": self.transaction_id,
+            "idTagInfo": {"status": "Accepted"},
+        }
+
+    def _on_stop_transaction(self, payload: dict[str, Any]) -> dict[str, Any]:
+        if payload.get("transactionId") == self.transaction_id:
+            self.transaction_id = None
+        return {"idTagInfo": {"status": "Accepted"}}
+
+    def _on_meter_values(self, payload: dict[str, Any]) -> dict[str, Any]:
+        currents: dict[str, list[float]] = {}
+        for meter_value in payload["meterValue"]:
+            for sample in meter_value["sampledValue"]:
+                value = _to_float(sample.get("value"))
+                if value is None:
+                    continue
+                measurand = sample.get("measurand", "Energy.Active.Import.Register")
+                unit = sample.get("unit", "")
+                if measurand in ("Current.Import", "Current.Offered"):
+                    currents.setdefault(measurand, []).append(value)
+                elif measurand == "Power.Active.Import":
+                    self.power_w = value * 1000.0 if unit == "kW" else value
+                elif measurand == "Energy.Active.Import.Register":
+                    self.energy_kwh = value if unit == "kWh" else value / 1000.0
+        # Strömmen anges per fas. Gränsen gäller varje fas, så den högsta används.
+        if "Current.Import" in currents:
+            self.current_import_a = max(currents["Current.Import"])
+        if "Current.Offered" in currents:
+            self.current_offered_a = max(currents["Current.Offered"])
+        return {}
+
+    # Anrop till laddpunkten.
+
+    async def async_set_current_limit(
+        self, limit_a: float, phases: int | None = None
+    ) -> bool:
+        """
+        Sätter strömgränsen med en laddprofil. Under en transaktion används en
+        TxProfile, annars en TxDefaultProfile som gäller nästa transaktion.
+        """
+        period: dict[str, Any] = {"startPeriod": 0, "limit": round(limit_a, 1)}
+        if phases:
+            period["numberPhases"] = phases
+        profile: dict[str, Any] = {
+            "chargingProfileId": CHARGING_PROFILE_ID,
+            "stackLevel": 0,
+            "chargingProfilePurpose": "TxDefaultProfile",
+            "chargingProfileKind": "Relative",
+            "chargingSchedule": {
+                "chargingRateUnit": "A",
+                "chargingSchedulePeriod": [period],
+            },
+        }
+        if self.transaction_id is not None:
+            profile["chargingProfilePurpose"] = "TxProfile"
+            profile["transactionId"] = self.transaction_id
+        result = await self.async_call(
+            "SetChargingProfile",
+            {"connectorId": self.connector_id, "csChargingProfiles": profile},
+        )
+        if result.get("status") != "Accepted":
+            _LOGGER.warning(
+                "OCPP-laddpunkten %s avvisade strömgränsen %.1fA: %s",
+                self.id,
+                limit_a,
+                result.get("status"),
+            )
+            return False
+        self.limit_a = limit_a
+        # Utan mätvärde för erbjuden ström visas den accepterade gränsen.
+        self.current_offered_a = limit_a
+        self._on_change(self)
+        return True
+
+    async def async_remote_start(self) -> bool:
+        """Begär att laddpunkten startar en transaktion."""
+        result = await self.async_call(
+            "RemoteStartTransaction",
+            {"connectorId": self.connector_id, "idTag": DEFAULT_ID_TAG},
+        )
+        return result.get("status") == "Accepted"
+
+
+class OcppCentralSystem:
+    """WebSocket-server som laddpunkterna ansluter till."""
+
+    def __init__(self, host: str = "0.0.0.0", port: int = DEFAULT_OCPP_PORT) -> None:
+        """Initialisera med adressen som servern lyssnar på."""
+        self.host = host
+        self.port = port
+        self.charge_points: dict[str, ChargePoint] = {}
+        self._listeners: list[Callable[[ChargePoint], None]] = []
+        self._transaction_ids = itertools.count(1)
+        self._runner: web.AppRunner | None = None
+        self._start_lock = asyncio.Lock()
+        # Posterna som använder centralsystemet och deras laddpunkts-id.
+        self._users: dict[str, str | None] = {}
+
+    @classmethod
+    def acquire(
+        cls, hass: HomeAssistant, entry_id: str, config: Mapping[str, Any]
+    ) -> "OcppCentralSystem | None":
+        """
+        Det gemensamma centralsystemet för posten, eller None om laddaren inte
+        styrs med OCPP. Skapas av den första posten. Laddpunkterna ansluter
+        till en och samma port, så alla poster delar servern.
+        """
+        if config.get(CONF_CHARGER_BACKEND) != CHARGER_BACKEND_OCPP:
+            return None
+        port = config.get(CONF_OCPP_PORT)
+        port = int(port) if port is not None else DEFAULT_OCPP_PORT
+        domain_data = hass.data.setdefault(DOMAIN, {})
+        central: OcppCentralSystem | None = domain_data.get(DATA_OCPP_CENTRAL)
+        if central is None:
+            central = domain_data[DATA_OCPP_CENTRAL] = cls(port=port)
+        elif port not in (0, central.port):
+            _LOGGER.warning(
+                "OCPP-centralsystemet körs redan på port %s. Port %s används inte.",
+                central.port,
+                port,
+            )
+        central._users[entry_id] = config.get(CONF_OCPP_CHARGE_POINT_ID) or None
+        if len(central._users) > 1 and None in central._users.values():
+            _LOGGER.warning(
+                "Flera poster delar OCPP-centralsystemet. Varje post måste ange "
+                "laddpunktens id."
+            )
+        return central
+
+    async def async_release(self, hass: HomeAssistant, entry_id: str) -> None:
+        """
+        Släpper postens del av centralsystemet. När ingen post använder det
+        längre stoppas servern och tas bort ur hass.data.
+        """
+        self._users.pop(entry_id, None)
+        if self._users:
+            return
+        domain_data = hass.data.get(DOMAIN, {})
+        if domain_data.get(DATA_OCPP_CENTRAL) is self:
+            del domain_data[DATA_OCPP_CENTRAL]
+        await self.async_stop()
+
+    async def async_start(self) -> None:
+        """
+        Startar servern om den inte redan körs. Med port 0 väljs en ledig port.
+        """
+        async with self._start_lock:
+            if self._runner is None:
+                await self._async_start()
+
+    async def _async_start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/{path:.*}", self._handle_connection)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, self.host, self.port).start()
+        except OSError as e:
+            await runner.cleanup()
+            _LOGGER.error(
+                "Kunde inte starta OCPP-centralsystemet på port %s: %s", self.port, e
+            )
+            return
+        self._runner = runner
+        self.port = runner.addresses[0][1]
+        _LOGGER.info("OCPP-centralsystemet lyssnar på port %s.", self.port)
+
+    async def async_stop(self) -> None:
+        """Kopplar från laddpunkterna och stoppar servern."""
+        for charge_point in list(self.charge_points.values()):
+            await charge_point.async_close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle_connection(self, request: web.Request) -> web.StreamResponse:
+        # Laddpunktens id är sista delen av sökvägen, t.ex. /ocpp/CP_1.
+        charge_point_id = request.match_info["path"].rstrip("/").rsplit("/", 1)[-1]
+        if not charge_point_id:
+            raise web.HTTPNotFound()
+        ws = web.WebSocketResponse(protocols=(SUBPROTOCOL,))
+        await ws.prepare(request)
+        if ws.ws_protocol != SUBPROTOCOL:
+            _LOGGER.warning(
+                "Laddpunkten %s ansluter utan underprotokollet %s.",
+                charge_point_id,
+                SUBPROTOCOL,
+            )
+        charge_point = ChargePoint(
+            charge_point_id, ws, self._transaction_ids, self._notify
+        )
+        previous = self.charge_points.get(charge_point_id)
+        if previous is not None:
+            # En laddpunkt som ansluter igen ersätter den gamla anslutningen,
+            # men behåller den pågående transaktionen.
+            charge_point.transaction_id = previous.transaction_id
+            await previous.async_close()
+        self.charge_points[charge_point_id] = charge_point
+        _LOGGER.info("OCPP-laddpunkten %s är ansluten.", charge_point_id)
+        self._notify(charge_point)
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.TEXT:
+                    await charge_point.async_handle_message(msg.data)
+                elif msg.type == WSMsgType.ERROR:
+                    break
+        finally:
+            if self.charge_points.get(charge_point_id) is charge_point:
+                del self.charge_points[charge_point_id]
+            _LOGGER.info("OCPP-laddpunkten %s är frånkopplad.", charge_point_id)
+            charge_point.disconnected()
+        return ws
+
+    def charge_point(self, charge_point_id: str | None) -> ChargePoint | None:
+        """
+        Laddpunkten med id:t. Utan id används den första anslutna, men bara när
+        en enda post använder centralsystemet.
+        """
+        if charge_point_id:
+            return self.charge_points.get(charge_point_id)
+        if len(self._users) > 1:
+            return None
+        return next(iter(self.charge_points.values()), None)
+
+    def async_add_listener(
+        self, listener: Callable[[ChargePoint], None]
+    ) -> Callable[[], None]:
+        """Anropas när en laddpunkt ansluter, rapporterar eller kopplas från."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def _notify(self, charge_point: ChargePoint) -> None:
+        for listener in list(self._listeners):
+            listener(charge_point)
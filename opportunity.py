@@ -0,0 +1,183 @@
+# File version: 2025-06-05 0.2.0
+"""Alternativkostnad för solöverskott.
+
+Solenergiladdningen behandlar varje watt överskott som värd att ledas till
+bilen. Men om exportersättningen just nu är högre än det billigaste nätpriset
+före nästa avresa är det billigare att sälja överskottet och ladda från nätet
+senare. Denna modul jämför de två och avgör om överskottet ska säljas.
+
+När prisserien ändras räknas för varje prisintervall ut vilket intervall som
+är billigast från och med det fram till nästa avresa (och exportpriset, om det
+ges av en formel). Varje cykel blir sedan ett uppslag. Med inlärda avresetider
+räknas tabellen också om när den förväntade avresan ändras.
+"""
+
+import logging
+from collections.abc import Mapping
+from datetime import date, datetime, time, timedelta
+from typing import Any
+
+import homeassistant.util.dt as dt_util
+
+from .const import (
+    DOMAIN,
+    CONF_EXPORT_PRICE_SENSOR,
+    CONF_EXPORT_PRICE_FACTOR,
+    CONF_EXPORT_PRICE_OFFSET,
+    CONF_DEPARTURE_TIME,
+    DEFAULT_DEPARTURE_TIME,
+)
+from .departure import DepartureLearner
+from .power_integrator import PowerIntegrator
+from .price_cache import PriceSeries
+
+_LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
+
+
+def next_departure(moment: datetime, departure: time) -> datetime:
+    """Nästa avresa (lokal tid) efter tidpunkten, i UTC."""
+    local = dt_util.as_local(moment)
+    candidate = datetime.combine(local.date(), departure, tzinfo=local.tzinfo)
+    if candidate <= local:
+        candidate = datetime.combine(
+            local.date() + timedelta(days=1), departure, tzinfo=local.tzinfo
+        )
+    return dt_util.as_utc(candidate)
+
+
+class OpportunityEvaluator:
+    """Avgör om solöverskottet är mer värt att sälja nu än att ladda bilen med."""
+
+    def __init__(
+        self,
+        departure: time,
+        export_factor: float | None = None,
+        export_offset: float | None = None,
+    ) -> None:
+        """Initialisera utvärderaren. Utan faktor och påslag krävs exportsensor."""
+        self.departure = departure
+        # Inlärda avresetider per veckodag. Ersätter den fasta avresetiden.
+        self.departures: DepartureLearner | None = None
+        self._departures_version: int | None = None
+        self._formula = (
+            (export_factor if export_factor is not None else 1.0, export_offset or 0.0)
+            if export_factor is not None or export_offset is not None
+            else None
+        )
+        self._series: PriceSeries | None = None
+        self._deadlines: list[datetime] = []
+        self._best_index: list[int] = []
+        self._export: list[float] | None = None
+        self._sold_power = PowerIntegrator()
+        # Besparingen per kWh som gäller för det senaste effektvärdet.
+        self._last_savings_kr_per_kwh = 0.0
+        self._savings_day: date | None = None
+        self.export_price_kr: float | None = None
+        self.best_grid_cost_kr: float | None = None
+        self.best_grid_start: datetime | None = None
+        self.departure_utc: datetime | None = None
+        self.savings_kr_per_kwh: float | None = None
+        self.sell_surplus = False
+        self.projected_savings_kr = 0.0
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> "OpportunityEvaluator | None":
+        """Skapar utvärderaren, eller None om exportpris saknas i konfigurationen."""
+        factor = config.get(CONF_EXPORT_PRICE_FACTOR)
+        offset = config.get(CONF_EXPORT_PRICE_OFFSET)
+        if factor is None and offset is None:
+            if not config.get(CONF_EXPORT_PRICE_SENSOR):
+                return None
+        departure = dt_util.parse_time(
+            str(config.get(CONF_DEPARTURE_TIME) or DEFAULT_DEPARTURE_TIME)
+        ) or dt_util.parse_time(DEFAULT_DEPARTURE_TIME)
+        return cls(
+            departure,
+            float(factor) if factor is not None else None,
+            float(offset) if offset is not None else None,
+        )
+
+    def _build(self, series: PriceSeries) -> None:
+        """Räknar ut billigaste intervall före avresa för varje intervall."""
+        self._series = series
+        if self.departures is not None:
+            self._departures_version = self.departures.version
+            self._deadlines = [
+                self.departures.next_departure(start)[0] for start in series.starts
+            ]
+        else:
+            self._deadlines = [
+                next_departure(start, self.departure) for start in series.starts
+            ]
+        # Bakifrån: intervall med samma avresa bildar en följd, och det billigaste
+        # intervallet från och med i är antingen i självt eller det för i + 1.
+        self._best_index = list(range(len(series)))
+        for index in reversed(range(len(series) - 1)):
+            following = self._best_index[index + 1]
+            if (
+                self._deadlines[index + 1] == self._deadlines[index]
+                and series.costs[following] < series.costs[index]
+            ):
+                self._best_index[index] = following
+        self._export = (
+            [price * self._formula[0] + self._formula[1] for price in series.prices]
+            if self._formula is not None
+            else None
+        )
+        _LOGGER.debug(
+            "Alternativkostnad beräknad för %s prisintervall (avresa %s).",
+            len(series),
+            "inlärd" if self.departures is not None else self.departure.isoformat(),
+        )
+
+    def should_sell_surplus(
+        self,
+        series: PriceSeries,
+        now: datetime,
+        export_price_kr: float | None = None,
+    ) -> bool | None:
+        """
+        Om överskottet ska säljas i stället för att laddas. Exportpriset från en
+        sensor har företräde framför formeln. None om underlag saknas.
+        """
+        if series is not self._series or (
+            self.departures is not None
+            and self.departures.version != self._departures_version
+        ):
+            self._build(series)
+        index = series.slot_index(now)
+        if index is None:
+            export_price_kr = None
+        elif export_price_kr is None and self._export is not None:
+            export_price_kr = self._export[index]
+        if index is None or export_price_kr is None:
+            self.export_price_kr = self.best_grid_cost_kr = None
+            self.best_grid_start = self.departure_utc = None
+            self.savings_kr_per_kwh = None
+            self.sell_surplus = False
+            return None
+        best = self._best_index[index]
+        self.export_price_kr = export_price_kr
+        self.best_grid_cost_kr = series.costs[best]
+        self.best_grid_start = series.starts[best]
+        self.departure_utc = self._deadlines[index]
+        self.savings_kr_per_kwh = export_price_kr - self.best_grid_cost_kr
+        self.sell_surplus = self.savings_kr_per_kwh > 0
+        return self.sell_surplus
+
+    def record_sold_surplus(self, now: datetime, sold_w: float) -> None:
+        """
+        Integrerar den beräknade besparingen för överskott som säljs i stället för
+        att laddas. Effekten och besparingen per kWh gäller fram till nästa anrop.
+        Summan nollställs vid midnatt.
+        """
+        day = dt_util.as_local(now).date()
+        if day != self._savings_day:
+            self._savings_day = day
+            self.projected_savings_kr = 0.0
+        savings_kr_per_kwh = self._last_savings_kr_per_kwh
+        self._last_savings_kr_per_kwh = (
+            self.savings_kr_per_kwh if self.sell_surplus else 0.0
+        )
+        sold_kwh = self._sold_power.add_energy_kwh(now, sold_w)
+        self.projected_savings_kr += sold_kwh * savings_kr_per_kwh
@@ -0,0 +1,212 @@
+# File version: 2025-06-05 0.2.0
+"""Effekttoppsbegränsning (effekttariff) för Smart EV Charging.
+
+Många svenska nätbolag debiterar effektavgift baserat på medelvärdet av
+månadens N högsta timmedeleffekter. Denna modul integrerar husets effekt till
+timvisa energihinkar, håller månadens N högsta timmar i en liten min-heap och
+beräknar hur mycket laddeffekt som ryms i innevarande timme utan att timmens
+prognostiserade medeleffekt överstiger den N:te toppen (eller ett konfigurerat
+effekttak).
+"""
+
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+import homeassistant.util.dt as dt_util
+
+from .const import DOMAIN, STORAGE_VERSION
+from .power_integrator import PowerIntegrator
+
+_LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
+
+# Fördröjning innan tillståndet skrivs till disk. Flera ändringar inom
+# fönstret slås ihop till en skrivning.
+SAVE_DELAY_SECONDS = 60
+# Innevarande timmes energi sparas högst så här ofta. Avslutade timmar sparas direkt.
+SAVE_INTERVAL = timedelta(minutes=5)
+# Minsta återstående tid som används vid budgetberäkningen, för att undvika
+# division med nästan noll precis före timskiftet.
+MIN_REMAINING_HOUR_FRACTION = 1 / 60
+
+
+def _hour_start(moment: datetime) -> datetime:
+    """Returnerar början av den lokala timme som tidpunkten ligger i."""
+    return dt_util.as_local(moment).replace(minute=0, second=0, microsecond=0)
+
+
+def _month_key(moment: datetime) -> str:
+    local = dt_util.as_local(moment)
+    return f"{local.year:04d}-{local.month:02d}"
+
+
+class PeakShavingTracker:
+    """Spårar månadens timtoppar och begränsar laddeffekten i innevarande timme."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry_id: str,
+        top_n: int,
+        ceiling_w: float | None = None,
+    ) -> None:
+        """Initialisera spåraren."""
+        self.top_n = max(1, int(top_n))
+        self.ceiling_w = ceiling_w if ceiling_w and ceiling_w > 0 else None
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.peak_shaving"
+        )
+        self._month: str | None = None
+        self._peaks: list[float] = []  # Min-heap med timmedeleffekter i W
+        self._hour_start: datetime | None = None
+        self._hour_energy_wh: float = 0.0
+        self._power = PowerIntegrator()
+        self._last_save_request: datetime | None = None
+
+    async def async_load(self) -> None:
+        """Läser in sparat tillstånd så att månadens toppar överlever omstarter."""
+        data = await self._store.async_load()
+        if not data:
+            return
+        try:
+            self._month = data.get("month")
+            peaks = [float(p) for p in data.get("peaks", [])]
+            # Antalet toppar kan ha ändrats i alternativen sedan senaste sparning.
+            self._peaks = heapq.nlargest(self.top_n, peaks)
+            heapq.heapify(self._peaks)
+            if hour_start := data.get("hour_start"):
+                self._hour_start = dt_util.parse_datetime(hour_start)
+                self._hour_energy_wh = float(data.get("hour_energy_wh", 0.0))
+        except (TypeError, ValueError) as e:
+            _LOGGER.warning("Kunde inte läsa sparade effekttoppar: %s", e)
+            self._month, self._peaks, self._hour_start = None, [], None
+            self._hour_energy_wh = 0.0
+        _LOGGER.debug(
+            "Effekttoppar inlästa för %s: %s", self._month, sorted(self._peaks)
+        )
+
+    async def async_save(self) -> None:
+        """Skriver tillståndet direkt, t.ex. vid avlastning."""
+        await self._store.async_save(self._data_to_save())
+
+    def _data_to_save(self) -> dict[str, Any]:
+        return {
+            "month": self._month,
+            "peaks": sorted(self._peaks, reverse=True),
+            "hour_start": self._hour_start.isoformat() if self._hour_start else None,
+            "hour_energy_wh": round(self._hour_energy_wh, 3),
+        }
+
+    @property
+    def peaks_w(self) -> list[float]:
+        """Månadens registrerade timtoppar, högst först."""
+        return sorted(self._peaks, reverse=True)
+
+    @property
+    def threshold_w(self) -> float | None:
+        """
+        Timmedeleffekt som innevarande timme får nå utan att höja effektavgiften.
+        Den N:te högsta toppen gäller när månaden har N toppar. Effekttaket anger
+        en nivå som alltid accepteras.
+        """
+        nth_peak = self._peaks[0] if len(self._peaks) >= self.top_n else None
+        candidates = [v for v in (nth_peak, self.ceiling_w) if v is not None]
+        return max(candidates) if candidates else None
+
+    def add_sample(self, now: datetime, house_power_w: float) -> None:
+        """Integrerar föregående effektvärde fram till nu och registrerar det nya."""
+        month = _month_key(now)
+        if self._month != month:
+            if self._month is not None:
+                _LOGGER.info(
+                    "Ny månad (%s). Nollställer effekttoppar (föregående: %s).",
+                    month,
+                    self.peaks_w,
+                )
+            self._month = month
+            self._peaks = []
+            self._last_save_request = None
+
+        hour_start = _hour_start(now)
+        if self._hour_start is None:
+            self._hour_start = hour_start
+            self._hour_energy_wh = 0.0
+
+        segment = self._power.add(now, house_power_w)
+        if hour_start > self._hour_start:
+            if segment is not None:
+                # Den del av segmentet som ligger före timskiftet hör till förra timmen.
+                segment_start, last_power = segment
+                self._hour_energy_wh += (
+                    max(0.0, (hour_start - segment_start).total_seconds())
+                    * last_power
+                    / 3600.0
+                )
+                segment = (max(segment_start, hour_start), last_power)
+            self._close_hour()
+            self._hour_start = hour_start
+            self._hour_energy_wh = 0.0
+            self._last_save_request = None
+        if segment is not None:
+            segment_start, last_power = segment
+            self._hour_energy_wh += (
+                max(0.0, (now - segment_start).total_seconds()) * last_power / 3600.0
+            )
+
+        # async_delay_save skjuter upp skrivningen vid varje anrop, så anropet
+        # begränsas för att skrivningen faktiskt ska ske medan data strömmar in.
+        if (
+            self._last_save_request is None
+            or now - self._last_save_request >= SAVE_INTERVAL
+        ):
+            self._last_save_request = now
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY_SECONDS)
+
+    def _close_hour(self) -> None:
+        """Lägger den avslutade timmens medeleffekt i månadens topplista."""
+        if self._hour_start is None or _month_key(self._hour_start) != self._month:
+            return
+        hour_average_w = self._hour_energy_wh  # Wh under en timme = medeleffekt i W
+        if len(self._peaks) < self.top_n:
+            heapq.heappush(self._peaks, hour_average_w)
+        elif hour_average_w > self._peaks[0]:
+            heapq.heapreplace(self._peaks, hour_average_w)
+        _LOGGER.debug(
+            "Timme %s avslutad med %.0f W. Toppar: %s",
+            self._hour_start.isoformat(),
+            hour_average_w,
+            self.peaks_w,
+        )
+
+    def _remaining_hour_fraction(self, now: datetime) -> float:
+        if self._hour_start is None:
+            return 1.0
+        elapsed = (dt_util.as_local(now) - self._hour_start).total_seconds()
+        return max(MIN_REMAINING_HOUR_FRACTION, 1.0 - elapsed / 3600.0)
+
+    def projected_hour_average_w(self, now: datetime, house_power_w: float) -> float:
+        """Prognos för innevarande timmes medeleffekt om effekten ligger kvar."""
+        return self._hour_energy_wh + max(0.0, house_power_w) * (
+            self._remaining_hour_fraction(now)
+        )
+
+    def max_charging_power_w(
+        self, now: datetime, house_power_excl_charger_w: float
+    ) -> float | None:
+        """
+        Högsta laddeffekt som ryms resten av timmen utan att timmens medeleffekt
+        överstiger tröskeln. Returnerar None om ingen tröskel är känd än.
+        """
+        threshold_w = self.threshold_w
+        if threshold_w is None:
+            return None
+        remaining = self._remaining_hour_fraction(now)
+        budget_wh = (
+            threshold_w
+            - self._hour_energy_wh
+            - max(0.0, house_power_excl_charger_w) * remaining
+        )
+        return max(0.0, budget_wh / remaining)
@@ -0,0 +1,237 @@
+# File version: 2025-06-05 0.2.0
+"""Fasbalansering mot huvudsäkringen för Smart EV Charging.
+
+Effektmodellen räknar annars med tre jämnt belastade faser. En 1-fasbil på L1
+samtidigt som värmepumpen belastar L1 begränsas dock av säkringen på L1, medan
+L2 och L3 står oanvända. Här räknas husets last per fas fram från elmätarens
+fasströmmar minus laddarnas egen ström, och varje laddares ström begränsas av
+den mest belastade fasen som den laddar på.
+
+Fasmappningen anger vilken av nätets faser laddarens faser är kopplade till,
+t.ex. 'L2,L3,L1' för en laddare vars första fas är kopplad till L2. En
+1-fasbil laddar på laddarens första fas. Laddare som kan välja fas vid
+1-fasladdning (fasrotation) tilldelas i stället den minst belastade fasen.
+
+Alla laddare (konfigurationsposter) delar samma balansering, så att varje
+laddares ström räknas med på rätt fas när de andra begränsas eller tilldelas
+en fas.
+"""
+
+import logging
+from collections.abc import Mapping
+from typing import Any, cast
+
+from .const import (
+    DOMAIN,
+    CONF_MAIN_FUSE_A,
+    CONF_CHARGER_PHASE_MAPPING,
+    CONF_EV_CHARGING_PHASES,
+    CONF_METER_INGEST,
+    CONF_METER_PHASE_SENSORS,
+)
+
+_LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
+
+PHASE_NAMES = ("L1", "L2", "L3")
+DEFAULT_PHASE_MAPPING = (0, 1, 2)
+# En 1-fasbil flyttas bara till en fas som är minst så här mycket mindre
+# belastad, så att små variationer inte ger byte fram och tillbaka.
+PHASE_SWITCH_MARGIN_A = 2.0
+
+
+def parse_phase_mapping(text: str) -> tuple[int, ...]:
+    """
+    Tolkar en fasmappning som 'L1' eller 'L2,L3,L1' till nätets fasindex (0-2).
+    Kastar ValueError vid ogiltig mappning.
+    """
+    names = [part.strip().upper() for part in text.split(",") if part.strip()]
+    if (
+        not 1 <= len(names) <= 3
+        or len(set(names)) != len(names)
+        or any(name not in PHASE_NAMES for name in names)
+    ):
+        raise ValueError(f"Ogiltig fasmappning: {text!r}")
+    return tuple(PHASE_NAMES.index(name) for name in names)
+
+
+def format_phase_mapping(mapping: tuple[int, ...]) -> str:
+    """Fasmappningen som text, t.ex. 'L2,L3,L1'."""
+    return ",".join(PHASE_NAMES[phase] for phase in mapping)
+
+
+class ChargerPhases:
+    """En laddares faser, säkring och ström i fasbalanseringen."""
+
+    def __init__(
+        self,
+        charger_id: str,
+        fuse_a: float,
+        mapping: tuple[int, ...] = DEFAULT_PHASE_MAPPING,
+        car_phases: int | None = None,
+        supports_rotation: bool = False,
+    ) -> None:
+        """Initialisera med säkringen, fasmappningen och bilens antal faser."""
+        self.charger_id = charger_id
+        self.fuse_a = fuse_a
+        self.mapping = mapping
+        self.car_phases = min(car_phases or len(mapping), len(mapping))
+        self.supports_rotation = supports_rotation
+        # Fasen som en 1-fasbil har tilldelats, när laddaren kan välja fas.
+        self.assigned_phase: int | None = None
+        # Strömmen per fas som laddaren drar just nu (A).
+        self.draw_a = 0.0
+
+    @classmethod
+    def from_config(
+        cls,
+        charger_id: str,
+        config: Mapping[str, Any],
+        supports_rotation: bool = False,
+    ) -> "ChargerPhases | None":
+        """
+        Skapar laddarens del av fasbalanseringen, eller None om den inte är
+        konfigurerad. Kräver huvudsäkringen och elmätarens fassensorer.
+        """
+        fuse_a = config.get(CONF_MAIN_FUSE_A)
+        if not fuse_a:
+            return None
+        if not config.get(CONF_METER_INGEST) or not config.get(
+            CONF_METER_PHASE_SENSORS
+        ):
+            _LOGGER.warning(
+                "Huvudsäkringen är angiven men fasbalanseringen kräver den "
+                "högfrekventa elmätaren med fassensorer."
+            )
+            return None
+        mapping_text = config.get(CONF_CHARGER_PHASE_MAPPING)
+        try:
+            mapping = (
+                parse_phase_mapping(str(mapping_text))
+                if mapping_text
+                else DEFAULT_PHASE_MAPPING
+            )
+        except ValueError as e:
+            _LOGGER.warning("%s. Använder L1,L2,L3.", e)
+            mapping = DEFAULT_PHASE_MAPPING
+        car_phases = config.get(CONF_EV_CHARGING_PHASES)
+        return cls(
+            charger_id,
+            float(fuse_a),
+            mapping,
+            int(car_phases) if car_phases else None,
+            supports_rotation,
+        )
+
+    @property
+    def rotates(self) -> bool:
+        """Om laddaren väljer fas åt en 1-fasbil."""
+        return self.supports_rotation and self.car_phases == 1
+
+    @property
+    def phases(self) -> tuple[int, ...]:
+        """Nätets faser som bilen laddar på."""
+        if self.rotates and self.assigned_phase is not None:
+            return (self.assigned_phase,)
+        return self.mapping[: self.car_phases]
+
+
+class PhaseBalancer:
+    """Delad fasbalansering för alla laddare i huset."""
+
+    def __init__(self) -> None:
+        """Initialisera utan laddare."""
+        self._chargers: dict[str, ChargerPhases] = {}
+
+    def add(self, charger: ChargerPhases) -> None:
+        """Lägger till laddaren i balanseringen."""
+        self._chargers[charger.charger_id] = charger
+
+    def remove(self, charger: ChargerPhases) -> None:
+        """Tar bort laddaren ur balanseringen."""
+        if self._chargers.get(charger.charger_id) is charger:
+            del self._chargers[charger.charger_id]
+
+    def _charger_loads_a(self, exclude: ChargerPhases | None = None) -> list[float]:
+        """Laddarnas ström per fas, utom den angivna laddarens."""
+        loads = [0.0, 0.0, 0.0]
+        for charger in self._chargers.values():
+            if charger is exclude:
+                continue
+            for phase in charger.phases:
+                loads[phase] += charger.draw_a
+        return loads
+
+    def house_loads_a(self, measured_a: list[float | None]) -> list[float | None]:
+        """Husets ström per fas utan laddarna, eller None för faser utan värde."""
+        chargers = self._charger_loads_a()
+        return [
+            max(0.0, current - chargers[phase]) if current is not None else None
+            for phase, current in enumerate(measured_a)
+        ]
+
+    def loads_a(
+        self, charger: ChargerPhases, measured_a: list[float | None]
+    ) -> list[float | None]:
+        """Strömmen per fas bredvid laddaren: huset och övriga laddare."""
+        others = self._charger_loads_a(exclude=charger)
+        return [
+            house + others[phase] if house is not None else None
+            for phase, house in enumerate(self.house_loads_a(measured_a))
+        ]
+
+    def assign_phase(
+        self, charger: ChargerPhases, measured_a: list[float | None]
+    ) -> bool:
+        """
+        Tilldelar en 1-fasbil den minst belastade av laddarens faser när alla
+        har ett värde. Returnerar True om fasen har ändrats.
+        """
+        if not charger.rotates:
+            return False
+        loads = self.loads_a(charger, measured_a)
+        if any(loads[phase] is None for phase in charger.mapping):
+            return False
+        best = min(charger.mapping, key=lambda phase: cast(float, loads[phase]))
+        current = charger.assigned_phase
+        if current == best:
+            return False
+        if (
+            current is not None
+            and cast(float, loads[current]) - cast(float, loads[best])
+            < PHASE_SWITCH_MARGIN_A
+        ):
+            return False
+        charger.assigned_phase = best
+        # Bilens ström syns på den nya fasen först i kommande mätningar.
+        charger.draw_a = 0.0
+        return True
+
+    def headroom_a(
+        self, charger: ChargerPhases, measured_a: list[float | None]
+    ) -> list[float | None]:
+        """Ström kvar till huvudsäkringen per fas, eller None utan värde."""
+        return [
+            charger.fuse_a - load if load is not None else None
+            for load in self.loads_a(charger, measured_a)
+        ]
+
+    def max_current_a(
+        self, charger: ChargerPhases, measured_a: list[float | None]
+    ) -> tuple[float, int] | None:
+        """
+        Högsta ström som laddaren kan ge bilen utan att någon av dess faser
+        överstiger huvudsäkringen, och den mest belastade fasen. None om ingen
+        av bilens faser har ett värde.
+        """
+        headroom = self.headroom_a(charger, measured_a)
+        limits = [
+            (headroom[phase], phase)
+            for phase in charger.phases
+            if headroom[phase] is not None
+        ]
+        if not limits:
+            return None
+        return min(limits)
+
+
+PHASE_BALANCER = PhaseBalancer()
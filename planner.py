@@ -0,0 +1,185 @@
+# File version: 2025-06-05 0.2.0
+"""Laddplan som väger väntat solöverskott mot billig nätel.
+
+Utan solprognos kan Pris/Tid-laddningen fylla bilen med nätel natten före en
+dag med gott om solöverskott. Planen räknar ut hur mycket energi bilen
+behöver, hur mycket av det som väntat solöverskott (prognos minus husets
+typiska last) kan täcka inom prislistans horisont, och väljer de billigaste
+prisintervallen för resten.
+
+Med en inlärd laddkurva räknas nätdelens laddtid med bilens effekt per
+SoC-intervall i stället för med konstant effekt, eftersom bilen laddar
+långsammare nära full SoC.
+
+Planen räknas om bara när prisserien, solprognosen eller laddbehovet har
+ändrats. Beslutet varje cykel är ett uppslag på det aktuella intervallet.
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+from .charge_curve import ChargeCurve
+from .const import DOMAIN
+from .price_cache import PriceSeries
+from .solar_forecast import SolarForecast
+
+_LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
+
+ONE_HOUR = timedelta(hours=1)
+
+
+class ChargePlanner:
+    """Fördelar laddbehovet mellan väntat solöverskott och billigaste intervall."""
+
+    def __init__(
+        self,
+        base_load_w: float,
+        charge_curve: ChargeCurve | None = None,
+        capacity_kwh: float | None = None,
+        efficiency: float = 1.0,
+    ) -> None:
+        """Initialisera planeraren med husets typiska last i W."""
+        self.base_load_w = base_load_w
+        self.charge_curve = charge_curve
+        self.capacity_kwh = capacity_kwh
+        self.efficiency = efficiency
+        self._key: tuple | None = None
+        self._series: PriceSeries | None = None
+        self._grid_slots: list[bool] = []
+        self.needed_kwh: float | None = None
+        self.expected_surplus_kwh = 0.0
+        self.deferred_kwh = 0.0
+        self.grid_kwh = 0.0
+        self.first_grid_slot: datetime | None = None
+        # Räknas upp vid varje omräkning av planen.
+        self.version = 0
+
+    def update(
+        self,
+        now: datetime,
+        series: PriceSeries,
+        forecast: SolarForecast,
+        needed_kwh: float | None,
+        charge_power_kw: float,
+        min_solar_power_kw: float,
+        start_soc_percent: float | None = None,
+        departure: datetime | None = None,
+    ) -> None:
+        """
+        Räknar om planen om någon av indata har ändrats sedan förra gången. Med
+        en förväntad avresa planeras bara fram till den.
+        """
+        start_index = series.slot_index(now)
+        key = (
+            start_index,
+            forecast.version,
+            round(needed_kwh) if needed_kwh is not None else None,
+            round(charge_power_kw, 2),
+            round(min_solar_power_kw, 2),
+            round(start_soc_percent) if start_soc_percent is not None else None,
+            self.charge_curve.version if self.charge_curve is not None else None,
+            departure,
+        )
+        if series is self._series and key == self._key:
+            return
+        self._key = key
+        self._series = series
+        self.version += 1
+        self.needed_kwh = needed_kwh
+        self._grid_slots = [False] * len(series)
+        self.expected_surplus_kwh = self.deferred_kwh = self.grid_kwh = 0.0
+        self.first_grid_slot = None
+        if needed_kwh is None or start_index is None or charge_power_kw <= 0:
+            return
+
+        horizon_end = series.ends[-1]
+        if departure is not None:
+            horizon_end = min(horizon_end, departure)
+        self.expected_surplus_kwh = self._usable_surplus_kwh(
+            now, horizon_end, forecast, charge_power_kw, min_solar_power_kw
+        )
+        self.deferred_kwh = min(max(0.0, needed_kwh), self.expected_surplus_kwh)
+        self.grid_kwh = max(0.0, needed_kwh - self.deferred_kwh)
+
+        # De billigaste intervallen från och med det aktuella tills nätdelen
+        # av behovet hinner laddas.
+        remaining_hours = self._grid_hours(start_soc_percent, charge_power_kw)
+        window = [
+            i for i in range(start_index, len(series)) if series.starts[i] < horizon_end
+        ]
+        for index in sorted(window, key=lambda i: (series.costs[i], series.starts[i])):
+            if remaining_hours <= 0:
+                break
+            self._grid_slots[index] = True
+            start = max(series.starts[index], now)
+            end = min(series.ends[index], horizon_end)
+            remaining_hours -= (end - start).total_seconds() / 3600.0
+        self.first_grid_slot = next(
+            (series.starts[i] for i in window if self._grid_slots[i]), None
+        )
+        _LOGGER.debug(
+            "Laddplan: behov %.1f kWh, solöverskott %.1f kWh, nätel %.1f kWh.",
+            needed_kwh,
+            self.expected_surplus_kwh,
+            self.grid_kwh,
+        )
+
+    def _grid_hours(
+        self, start_soc_percent: float | None, charge_power_kw: float
+    ) -> float:
+        """
+        Laddtid för nätdelen av behovet. Nätdelen laddas från aktuell SoC, så med
+        laddkurva räknas tiden över SoC-intervallen därifrån. Verkningsgraden
+        räknas med på samma sätt med och utan laddkurva.
+        """
+        if (
+            self.charge_curve is not None
+            and start_soc_percent is not None
+            and self.capacity_kwh
+        ):
+            target_percent = (
+                start_soc_percent + self.grid_kwh / self.capacity_kwh * 100.0
+            )
+            hours = self.charge_curve.hours_to_charge(
+                start_soc_percent,
+                target_percent,
+                charge_power_kw,
+                self.capacity_kwh,
+                self.efficiency,
+            )
+            if hours is not None:
+                return hours
+        return self.grid_kwh / (charge_power_kw * self.efficiency)
+
+    def _usable_surplus_kwh(
+        self,
+        now: datetime,
+        horizon_end: datetime,
+        forecast: SolarForecast,
+        charge_power_kw: float,
+        min_solar_power_kw: float,
+    ) -> float:
+        """
+        Väntat solöverskott som bilen kan ta emot före horisontens slut. Timmar
+        där överskottet inte räcker till minsta solladdström räknas inte.
+        """
+        total_kwh = 0.0
+        hour = now.replace(minute=0, second=0, microsecond=0)
+        while hour < horizon_end:
+            surplus_kw = forecast.surplus_kw(hour, self.base_load_w)
+            if surplus_kw >= min_solar_power_kw:
+                start = max(hour, now)
+                end = min(hour + ONE_HOUR, horizon_end)
+                hours = (end - start).total_seconds() / 3600.0
+                total_kwh += min(surplus_kw, charge_power_kw) * hours
+            hour += ONE_HOUR
+        return total_kwh
+
+    def grid_charge_allowed(self, now: datetime) -> bool | None:
+        """Om planen laddar från nätet i det aktuella intervallet. None utan plan."""
+        if self._series is None or self.needed_kwh is None:
+            return None
+        index = self._series.slot_index(now)
+        if index is None:
+            return None
+        return self._grid_slots[index]
@@ -0,0 +1,53 @@
+# File version: 2025-06-05 0.2.0
+"""Integration av effektvärden till energi för Smart EV Charging.
+
+Effekten läses en gång per cykel och antas gälla fram till nästa värde. Längre
+luckor än MAX_SAMPLE_GAP mellan två värden (t.ex. en omstart) integreras inte.
+Effekttopparna, avresplaneringen, SoC-uppskattningen och alternativkostnaden
+integrerar alla på det här sättet.
+"""
+
+from datetime import datetime, timedelta
+
+# Längre luckor än så här mellan två cykler integreras inte (t.ex. omstart).
+MAX_SAMPLE_GAP = timedelta(minutes=15)
+
+
+class PowerIntegrator:
+    """Håller det senaste effektvärdet och ger segmentet fram till nästa."""
+
+    def __init__(self) -> None:
+        """Initialisera utan tidigare värde."""
+        self.last_time: datetime | None = None
+        self.last_power_w: float | None = None
+
+    def add(self, now: datetime, power_w: float) -> tuple[datetime, float] | None:
+        """
+        Registrerar effekten (negativ räknas som noll). Returnerar början och
+        effekten för segmentet fram till nu, eller None om det saknas ett
+        tidigare värde eller luckan är för lång.
+        """
+        last_time, last_power = self.last_time, self.last_power_w
+        self.last_time = now
+        self.last_power_w = max(0.0, power_w)
+        if last_time is None or last_power is None:
+            return None
+        if not timedelta(0) < now - last_time <= MAX_SAMPLE_GAP:
+            return None
+        return last_time, last_power
+
+    def add_energy_kwh(
+        self, now: datetime, power_w: float, since: datetime | None = None
+    ) -> float:
+        """
+        Registrerar effekten och returnerar energin i kWh sedan förra värdet,
+        eller sedan den angivna tidpunkten om den är senare.
+        """
+        segment = self.add(now, power_w)
+        if segment is None:
+            return 0.0
+        start, last_power = segment
+        if since is not None:
+            start = max(start, since)
+        hours = max(0.0, (now - start).total_seconds() / 3600.0)
+        return last_power / 1000.0 * hours
@@ -0,0 +1,289 @@
+# File version: 2025-06-05 0.2.0
+"""Cache för spotprisserien från prissensorn.
+
+Prissensorn (t.ex. Nordpool) anger dagens och morgondagens prisintervall i
+attributen raw_today/raw_tomorrow. När sensorns tillstånd ändras tolkas listan
+en gång, enheten normaliseras till kr/kWh och intervallens starttider och
+priser lagras i parallella, sorterade listor. Uppslag av aktuellt och framtida
+pris sker sedan med bisect, och varje intervalls rang inom sitt dygn räknas ut
+i förväg så att t.ex. "hör intervallet till dygnets billigaste 25 %" är en
+jämförelse. Urvalet av planeringsfönstrets billigaste N timmar räknas ut en
+gång per prisuppdatering och antal timmar.
+
+Med en tariffmodell räknas även totalkostnaden (avgifter, skatt och moms) per
+intervall ut när serien skapas. Rang och billigaste timmar bygger då på
+totalkostnaden, eftersom det är den som avgör vilka timmar som är billigast.
+"""
+
+import logging
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from datetime import date, datetime, timedelta
+from typing import Any
+
+from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN
+from homeassistant.core import State
+import homeassistant.util.dt as dt_util
+
+from .const import DOMAIN
+from .tariff import TariffModel
+
+_LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
+
+# Prissensorns attribut med intervallens start, slut och pris.
+PRICE_SLOT_ATTRIBUTES = ("raw_today", "raw_tomorrow")
+
+
+def price_unit_divisor(unit: str | None) -> float:
+    """Delare som omvandlar ett pris i sensorns enhet till kr/kWh."""
+    unit = str(unit or "").lower()
+    if "öre" in unit or "/100kwh" in unit:
+        return 100.0
+    if "mwh" in unit:
+        return 1000.0
+    return 1.0
+
+
+def parse_utc_datetime(value: Any) -> datetime | None:
+    """Tolkar en tidpunkt som datetime eller ISO-sträng och returnerar den i UTC."""
+    if isinstance(value, str):
+        value = dt_util.parse_datetime(value)
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    return dt_util.as_utc(value)
+
+
+def _next_full_hour(now: datetime) -> datetime:
+    local_hour = dt_util.as_local(now).replace(minute=0, second=0, microsecond=0)
+    return dt_util.as_utc(local_hour + timedelta(hours=1))
+
+
+class PriceSeries:
+    """Sorterade prisintervall med förberäknad rang inom respektive dygn."""
+
+    def __init__(
+        self,
+        slots: list[tuple[datetime, datetime, float]],
+        window_start: datetime | None = None,
+        tariff: TariffModel | None = None,
+    ) -> None:
+        """
+        Initialisera serien från (start, slut, pris i kr/kWh). Planeringsfönstret
+        för billigaste timmar börjar med intervallet som pågår vid window_start.
+        """
+        slots = sorted(slots)
+        self.starts: list[datetime] = [start for start, _, _ in slots]
+        self.ends: list[datetime] = [end for _, end, _ in slots]
+        self.prices: list[float] = [price for _, _, price in slots]
+        # Totalkostnad per intervall. Utan tariff är den lika med spotpriset.
+        self.costs: list[float] = (
+            [tariff.total_cost(s, p) for s, p in zip(self.starts, self.prices)]
+            if tariff is not None
+            else self.prices
+        )
+        self._window_first = (
+            bisect_right(self.ends, window_start) if window_start is not None else 0
+        )
+        self._cheapest: dict[float, list[bool]] = {}
+        self._last_index: int | None = None
+        # Dygnets kostnader sorterade, och varje intervalls andel av dygnets
+        # intervall som är strikt billigare (0.0 = dygnets billigaste).
+        self._daily_sorted: dict[date, list[float]] = {}
+        days = [dt_util.as_local(start).date() for start in self.starts]
+        for day, cost in zip(days, self.costs):
+            self._daily_sorted.setdefault(day, []).append(cost)
+        for day_costs in self._daily_sorted.values():
+            day_costs.sort()
+        self.ranks: list[float] = [
+            bisect_left(self._daily_sorted[day], cost) / len(self._daily_sorted[day])
+            for day, cost in zip(days, self.costs)
+        ]
+
+    @classmethod
+    def from_attributes(
+        cls,
+        attributes: Mapping[str, Any],
+        divisor: float = 1.0,
+        window_start: datetime | None = None,
+        tariff: TariffModel | None = None,
+    ) -> "PriceSeries":
+        """Tolkar prisintervallen i prissensorns attribut."""
+        slots: list[tuple[datetime, datetime, float]] = []
+        for key in PRICE_SLOT_ATTRIBUTES:
+            for slot in attributes.get(key) or []:
+                if not isinstance(slot, Mapping):
+                    continue
+                start = parse_utc_datetime(slot.get("start"))
+                end = parse_utc_datetime(slot.get("end"))
+                try:
+                    price = float(slot.get("value"))
+                except (TypeError, ValueError):
+                    continue
+                if start is not None and end is not None and end > start:
+                    slots.append((start, end, price / divisor))
+        return cls(slots, window_start, tariff)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def slot_index(self, moment: datetime) -> int | None:
+        """Index för intervallet som innehåller tidpunkten."""
+        # Oftast frågas samma intervall som förra gången, annars bisect.
+        index = self._last_index
+        if index is not None and self.starts[index] <= moment < self.ends[index]:
+            return index
+        index = bisect_right(self.starts, moment) - 1
+        if index < 0 or moment >= self.ends[index]:
+            return None
+        self._last_index = index
+        return index
+
+    def price_at(self, moment: datetime) -> float | None:
+        """Pris i kr/kWh för intervallet som innehåller tidpunkten."""
+        index = self.slot_index(moment)
+        return self.prices[index] if index is not None else None
+
+    def cost_at(self, moment: datetime) -> float | None:
+        """Totalkostnad i kr/kWh för intervallet som innehåller tidpunkten."""
+        index = self.slot_index(moment)
+        return self.costs[index] if index is not None else None
+
+    def rank_at(self, moment: datetime) -> float | None:
+        """Andel av dygnets intervall som är billigare än intervallet vid tidpunkten."""
+        index = self.slot_index(moment)
+        return self.ranks[index] if index is not None else None
+
+    def future_slots(self, moment: datetime) -> list[tuple[datetime, float]]:
+        """Pågående och kommande intervall som (start, totalkostnad)."""
+        index = self.slot_index(moment)
+        if index is None:
+            index = bisect_right(self.starts, moment)
+        return list(zip(self.starts[index:], self.costs[index:]))
+
+    def in_cheapest_hours(self, moment: datetime, hours: float) -> bool | None:
+        """Om intervallet vid tidpunkten hör till fönstrets billigaste timmar."""
+        index = self.slot_index(moment)
+        if index is None:
+            return None
+        selection = self._cheapest.get(hours)
+        if selection is None:
+            selection = self._cheapest[hours] = self._select_cheapest(hours)
+        return selection[index]
+
+    def _select_cheapest(self, hours: float) -> list[bool]:
+        """Väljer planeringsfönstrets billigaste intervall upp till angivet antal timmar."""
+        selection = [False] * len(self.starts)
+        remaining_s = hours * 3600.0
+        window = range(self._window_first, len(self.starts))
+        for index in sorted(window, key=lambda i: (self.costs[i], self.starts[i])):
+            if remaining_s <= 0:
+                break
+            selection[index] = True
+            remaining_s -= (self.ends[index] - self.starts[index]).total_seconds()
+        return selection
+
+    def daily_quantile(self, day: date, quantile: float) -> float | None:
+        """Dygnets kostnadskvantil (0.0 = lägsta kostnaden, 1.0 = högsta)."""
+        day_costs = self._daily_sorted.get(day)
+        if not day_costs:
+            return None
+        position = min(max(quantile, 0.0), 1.0) * (len(day_costs) - 1)
+        return day_costs[round(position)]
+
+    def next_boundary(self, now: datetime) -> datetime | None:
+        """Nästa start eller slut på ett intervall efter tidpunkten."""
+        index = bisect_right(self.starts, now)
+        candidates = []
+        if index < len(self.starts):
+            candidates.append(self.starts[index])
+        if index > 0 and self.ends[index - 1] > now:
+            candidates.append(self.ends[index - 1])
+        return min(candidates) if candidates else None
+
+
+class PriceCache:
+    """Tolkar prissensorn en gång per tillståndsändring och svarar på prisfrågor."""
+
+    def __init__(self, tariff: TariffModel | None = None) -> None:
+        """Initialisera cachen."""
+        self.tariff = tariff
+        self._state: State | None = None
+        self._state_price_kr: float | None = None
+        self._raw: tuple[Any, ...] | None = None
+        self.series = PriceSeries([])
+
+    def update(self, state: State | None, now: datetime | None = None) -> None:
+        """
+        Läser prissensorns pris om dess tillstånd har ändrats. Prisserien tolkas
+        bara om när prislistan eller enheten har ändrats, så att planerings-
+        fönstret och urvalet av billigaste timmar ligger fast mellan
+        prisuppdateringarna.
+        """
+        if state is self._state:
+            return
+        self._state = state
+        self._state_price_kr = None
+        if state is None:
+            self._raw = None
+            self.series = PriceSeries([])
+            return
+        unit = state.attributes.get("unit_of_measurement")
+        divisor = price_unit_divisor(unit)
+        if state.state not in (STATE_UNAVAILABLE, STATE_UNKNOWN):
+            try:
+                self._state_price_kr = float(state.state) / divisor
+            except (ValueError, TypeError):
+                _LOGGER.warning(
+                    "Kunde inte konvertera elprisvärde '%s' från %s.",
+                    state.state,
+                    state.entity_id,
+                )
+        raw = (unit, *(state.attributes.get(key) for key in PRICE_SLOT_ATTRIBUTES))
+        if raw == self._raw:
+            return
+        self._raw = raw
+        self.series = PriceSeries.from_attributes(
+            state.attributes, divisor, now or dt_util.utcnow(), self.tariff
+        )
+        _LOGGER.debug(
+            "Prisserie inläst från %s: %s intervall.",
+            state.entity_id,
+            len(self.series),
+        )
+
+    def current_price(self, now: datetime) -> float | None:
+        """
+        Aktuellt pris i kr/kWh. Intervallets pris används om serien täcker
+        tidpunkten, så att priset är rätt direkt vid en intervallgräns även om
+        sensorns tillstånd ännu inte hunnit uppdateras.
+        """
+        if self._state_price_kr is None:
+            return None
+        price = self.series.price_at(now)
+        return price if price is not None else self._state_price_kr
+
+    def current_cost(self, now: datetime) -> float | None:
+        """Aktuell totalkostnad i kr/kWh enligt tariffen, annars spotpriset."""
+        if self._state_price_kr is None:
+            return None
+        cost = self.series.cost_at(now)
+        if cost is not None:
+            return cost
+        if self.tariff is None:
+            return self._state_price_kr
+        return self.tariff.total_cost(now, self._state_price_kr)
+
+    def is_cheapest_fraction(self, now: datetime, fraction: float) -> bool | None:
+        """Om intervallet vid tidpunkten hör till dygnets billigaste andel."""
+        rank = self.series.rank_at(now)
+        return rank < fraction if rank is not None else None
+
+    def in_cheapest_hours(self, now: datetime, hours: float) -> bool | None:
+        """Om intervallet vid tidpunkten hör till planeringsfönstrets billigaste timmar."""
+        return self.series.in_cheapest_hours(now, hours)
+
+    def next_boundary(self, now: datetime) -> datetime:
+        """Nästa tidpunkt då priset kan ändras. Utan prisserie nästa hela timme."""
+        return self.series.next_boundary(now) or _next_full_hour(now)
@@ -0,0 +1,98 @@
+# File version: 2025-06-05 0.2.0
+"""Händelsestyrda omvärderingar för Pris/Tid-laddning.
+
+Pris/Tid-villkoren kan bara ändras när spotpriset byter intervall (varje timme
+eller var 15:e minut) eller när ett tidsschema slår om. I stället för att
+utvärdera villkoren vid varje uppdateringsintervall tas nästa sådan tidpunkt
+från priscachen och från schemaentiteternas attribut next_event, och en
+omvärdering schemaläggs exakt då.
+"""
+
+import logging
+from collections.abc import Callable, Iterable, Mapping
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, HassJob, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_utc_time
+
+from .const import DOMAIN
+from .price_cache import parse_utc_datetime
+
+_LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
+
+# Attribut där schemaentiteter (schedule) anger nästa omslag.
+SCHEDULE_NEXT_EVENT_ATTRIBUTE = "next_event"
+
+
+def next_schedule_event(
+    now: datetime, attributes: Mapping[str, Any]
+) -> datetime | None:
+    """Nästa omslag för en schemaentitet, om den anger det."""
+    moment = parse_utc_datetime(attributes.get(SCHEDULE_NEXT_EVENT_ATTRIBUTE))
+    return moment if moment is not None and moment > now else None
+
+
+class PriceBoundaryScheduler:
+    """Håller en enda schemalagd omvärdering vid nästa gräns för Pris/Tid-villkoren."""
+
+    def __init__(
+        self, hass: HomeAssistant, action: Callable[[datetime], None]
+    ) -> None:
+        """Initialisera schemaläggaren."""
+        self._hass = hass
+        self._job = HassJob(
+            self._handle_point_in_time,
+            f"{DOMAIN} price boundary",
+            cancel_on_shutdown=True,
+        )
+        self._action = action
+        self._unsub: CALLBACK_TYPE | None = None
+        self.next_refresh: datetime | None = None
+
+    def next_boundary(
+        self,
+        now: datetime,
+        price_boundary: datetime | None,
+        schedule_entity_ids: Iterable[str],
+    ) -> datetime | None:
+        """Tidigaste tidpunkten då spotpriset eller något av schemana kan ändras."""
+        candidates: list[datetime] = []
+        if price_boundary is not None:
+            candidates.append(price_boundary)
+        for entity_id in schedule_entity_ids:
+            if (state := self._hass.states.get(entity_id)) and (
+                moment := next_schedule_event(now, state.attributes)
+            ):
+                candidates.append(moment)
+        return min(candidates) if candidates else None
+
+    @callback
+    def async_schedule(self, point_in_time: datetime | None) -> None:
+        """Schemalägger omvärderingen till tidpunkten, eller avbryter den vid None."""
+        if point_in_time == self.next_refresh:
+            return
+        self.async_cancel()
+        if point_in_time is None:
+            return
+        self.next_refresh = point_in_time
+        self._unsub = async_track_point_in_utc_time(
+            self._hass, self._job, point_in_time
+        )
+        _LOGGER.debug(
+            "Nästa prisgräns schemalagd till %s.", point_in_time.isoformat()
+        )
+
+    @callback
+    def async_cancel(self) -> None:
+        """Avbryter en schemalagd omvärdering."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        self.next_refresh = None
+
+    @callback
+    def _handle_point_in_time(self, now: datetime) -> None:
+        self._unsub = None
+        self.next_refresh = None
+        self._action(now)
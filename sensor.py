@@ -1,5 +1,6 @@
 # File version: 2025-06-05 0.2.0
 import logging
+from datetime import datetime
 from typing import Any
 
 from homeassistant.components.sensor import (
@@ -9,11 +10,18 @@ from homeassistant.components.sensor import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from homeassistant.const import STATE_UNKNOWN
-# import homeassistant.util.dt as dt_util # Behövs inte längre här
+from homeassistant.const import (
+    PERCENTAGE,
+    STATE_UNKNOWN,
+    UnitOfElectricCurrent,
+    UnitOfEnergy,
+    UnitOfPower,
+)
+import homeassistant.util.dt as dt_util
 
 from .const import (
     DOMAIN,
@@ -21,11 +29,166 @@ from .const import (
     # ENTITY_ID_SUFFIX_SESSION_ENERGY_SENSOR, # Borttagen
     # ENTITY_ID_SUFFIX_SESSION_COST_SENSOR, # Borttagen
     ENTITY_ID_SUFFIX_ACTIVE_CONTROL_MODE_SENSOR,
+    ENTITY_ID_SUFFIX_PEAK_SHAVING_SENSOR,
+    ENTITY_ID_SUFFIX_OPPORTUNITY_SENSOR,
+    ENTITY_ID_SUFFIX_SOC_ESTIMATE_SENSOR,
+    ENTITY_ID_SUFFIX_DEPARTURE_SENSOR,
+    ENTITY_ID_SUFFIX_SERVICE_BREAKER_SENSOR,
+    ENTITY_ID_SUFFIX_OCPP_SENSOR_PREFIX,
+    ENTITY_ID_SUFFIX_HOUSE_LOAD_SENSOR,
+    CONF_OCPP_CHARGE_POINT_ID,
 )
 from .coordinator import SmartEVChargingCoordinator
+from .ocpp_central import STATUS_UNAVAILABLE, ChargePoint
 
 _LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
 
+# Nycklar i koordinatorns data som visas som attribut på styrningslägessensorn.
+SESSION_ATTRIBUTE_KEYS = (
+    "session_start_time_utc",
+    "session_solar_energy_kwh",
+    "session_grid_energy_kwh",
+    "session_energy_kwh",
+    "session_cost_kr",
+    "last_session",
+)
+
+# Laddplanens fördelning mellan solöverskott och nätel och laddkurvans tid till
+# målet, också som attribut på styrningslägessensorn.
+CHARGE_PLAN_ATTRIBUTE_KEYS = (
+    "charge_plan_needed_kwh",
+    "charge_plan_solar_kwh",
+    "charge_plan_grid_kwh",
+    "charge_plan_expected_surplus_kwh",
+    "charge_plan_first_grid_slot",
+    "charge_plan_forecast_source",
+    "charge_time_to_target_min",
+)
+
+# Planen mot avresan, också som attribut på styrningslägessensorn.
+DEADLINE_ATTRIBUTE_KEYS = (
+    "deadline_time",
+    "deadline_remaining_kwh",
+    "deadline_required_min",
+    "deadline_next_slot",
+    "deadline_escalated",
+)
+
+# Kommandon till laddaren och uppladdat laddschema, också som attribut på
+# styrningslägessensorn.
+CHARGE_SCHEDULE_ATTRIBUTE_KEYS = (
+    "charger_commands_today",
+    "charge_schedule_window",
+)
+
+# Uppföljning av kommandona till laddaren, också som attribut på
+# styrningslägessensorn.
+COMMAND_ACK_ATTRIBUTE_KEYS = (
+    "command_pending",
+    "command_retries",
+    "command_last_ack_latency_s",
+    "command_ack_latency",
+    "charger_status_predicted",
+    "charger_state_contradictions",
+)
+
+# Nycklar i koordinatorns data som visas som attribut på effekttoppssensorn.
+PEAK_SHAVING_ATTRIBUTE_KEYS = (
+    "peak_shaving_threshold_w",
+    "peak_shaving_max_charging_power_w",
+    "peak_shaving_peaks_w",
+)
+
+# Nycklar i koordinatorns data som visas som attribut på besparingssensorn.
+OPPORTUNITY_ATTRIBUTE_KEYS = (
+    "opportunity_sell_surplus",
+    "opportunity_export_price_kr",
+    "opportunity_best_grid_cost_kr",
+    "opportunity_best_grid_start",
+    "opportunity_departure",
+    "opportunity_savings_kr_per_kwh",
+)
+
+# Nycklar i koordinatorns data som visas som attribut på SoC-sensorn.
+SOC_ESTIMATE_ATTRIBUTE_KEYS = (
+    "soc_estimate_confidence",
+    "soc_last_reading_percent",
+    "soc_last_reading_time",
+    "soc_energy_since_reading_kwh",
+)
+
+# Nycklar i koordinatorns data som visas som attribut på avresesensorn.
+DEPARTURE_ATTRIBUTE_KEYS = (
+    "departure_source",
+    "departure_learned",
+)
+
+# Nycklar i koordinatorns data som visas som attribut på kretsbrytarsensorn.
+SERVICE_BREAKER_ATTRIBUTE_KEYS = (
+    "service_breakers",
+    "service_calls_in_flight",
+)
+
+# Nycklar i koordinatorns data som visas som attribut på huslastsensorn.
+HOUSE_LOAD_ATTRIBUTE_KEYS = (
+    "house_power_max_w",
+    "phase_current_mean_a",
+    "phase_current_max_a",
+    "meter_samples_per_second",
+    "phase_house_load_a",
+    "phase_charging",
+    "phase_most_loaded",
+    "phase_max_charging_current_a",
+)
+
+# OCPP-laddpunktens värden: (nyckel, attribut på laddpunkten, namn, enhet,
+# enhetsklass, tillståndsklass).
+OCPP_SENSOR_TYPES: tuple[
+    tuple[
+        str,
+        str,
+        str,
+        str | None,
+        SensorDeviceClass | None,
+        SensorStateClass | None,
+    ],
+    ...,
+] = (
+    ("status", "status", "Status", None, None, None),
+    (
+        "current_offered",
+        "current_offered_a",
+        "Erbjuden ström",
+        UnitOfElectricCurrent.AMPERE,
+        SensorDeviceClass.CURRENT,
+        SensorStateClass.MEASUREMENT,
+    ),
+    (
+        "current_import",
+        "current_import_a",
+        "Laddström",
+        UnitOfElectricCurrent.AMPERE,
+        SensorDeviceClass.CURRENT,
+        SensorStateClass.MEASUREMENT,
+    ),
+    (
+        "power",
+        "power_w",
+        "Effekt",
+        UnitOfPower.WATT,
+        SensorDeviceClass.POWER,
+        SensorStateClass.MEASUREMENT,
+    ),
+    (
+        "energy",
+        "energy_kwh",
+        "Energi",
+        UnitOfEnergy.KILO_WATT_HOUR,
+        SensorDeviceClass.ENERGY,
+        SensorStateClass.TOTAL_INCREASING,
+    ),
+)
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -45,8 +208,24 @@ async def async_setup_entry(
 
     entities_to_add = [
         ActiveControlModeSensor(config_entry, coordinator),
+        ServiceBreakerSensor(config_entry, coordinator),
         # SessionEnergySensor och SessionCostSensor tas bort
     ]
+    if coordinator.peak_shaving is not None:
+        entities_to_add.append(PeakShavingSensor(config_entry, coordinator))
+    if coordinator.opportunity is not None:
+        entities_to_add.append(OpportunitySensor(config_entry, coordinator))
+    if coordinator.soc_estimator is not None:
+        entities_to_add.append(SocEstimateSensor(config_entry, coordinator))
+    if coordinator.departure_learner is not None:
+        entities_to_add.append(DepartureSensor(config_entry, coordinator))
+    if coordinator.meter_ingest is not None:
+        entities_to_add.append(HouseLoadSensor(config_entry, coordinator))
+    if coordinator.ocpp is not None:
+        entities_to_add.extend(
+            OcppChargePointSensor(config_entry, coordinator, *sensor_type)
+            for sensor_type in OCPP_SENSOR_TYPES
+        )
     async_add_entities(entities_to_add)
     _LOGGER.debug("SENSOR PLATFORM: %s entiteter tillagda.", len(entities_to_add))
 
@@ -101,6 +280,7 @@ class ActiveControlModeSensor(SmartChargingBaseSensor):
         )
         self._attr_name = f"{DEFAULT_NAME} Aktivt Styrningsläge"
         self._attr_native_value: str = STATE_UNKNOWN  # Initialt värde
+        self._attr_extra_state_attributes: dict[str, Any] = {}
         _LOGGER.info("%s initialiserad", self.name)
         # Uppdatera initialt värde vid start
         self._handle_coordinator_update()
@@ -112,8 +292,22 @@ class ActiveControlModeSensor(SmartChargingBaseSensor):
             new_value = str(
                 self.coordinator.data.get("active_control_mode", STATE_UNKNOWN)
             )
-            if self._attr_native_value != new_value:
+            # Sessionens energiuppdelning (sol/nät) exponeras som attribut.
+            new_attributes = {
+                key: self.coordinator.data.get(key)
+                for key in SESSION_ATTRIBUTE_KEYS
+                + CHARGE_PLAN_ATTRIBUTE_KEYS
+                + DEADLINE_ATTRIBUTE_KEYS
+                + CHARGE_SCHEDULE_ATTRIBUTE_KEYS
+                + COMMAND_ACK_ATTRIBUTE_KEYS
+                if key in self.coordinator.data
+            }
+            if (
+                self._attr_native_value != new_value
+                or self._attr_extra_state_attributes != new_attributes
+            ):
                 self._attr_native_value = new_value
+                self._attr_extra_state_attributes = new_attributes
                 _LOGGER.debug("%s uppdaterad: Värde=%s", self.name, new_value)
                 if self.hass:  # Säkerställ att hass är tillgängligt (ska vara det efter added_to_hass)
                     self.async_write_ha_state()
@@ -124,3 +318,266 @@ class ActiveControlModeSensor(SmartChargingBaseSensor):
             _LOGGER.debug("%s uppdaterad: Data saknas, Värde=Okänd", self.name)
             if self.hass:
                 self.async_write_ha_state()
+
+
+class PeakShavingSensor(SmartChargingBaseSensor):
+    """Sensor som visar prognosen för innevarande timmes medeleffekt."""
+
+    _attr_icon = "mdi:chart-bell-curve-cumulative"
+    _attr_device_class = SensorDeviceClass.POWER
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfPower.WATT
+
+    def __init__(
+        self, config_entry: ConfigEntry, coordinator: SmartEVChargingCoordinator
+    ) -> None:
+        """Initialisera sensorn för effekttoppsbegränsning."""
+        super().__init__(config_entry, coordinator, ENTITY_ID_SUFFIX_PEAK_SHAVING_SENSOR)
+        self._attr_name = f"{DEFAULT_NAME} Prognos Timmedeleffekt"
+        self._attr_native_value: float | None = None
+        self._attr_extra_state_attributes: dict[str, Any] = {}
+        self._handle_coordinator_update()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Hanterar datauppdateringar från koordinatorn."""
+        data = self.coordinator.data or {}
+        self._attr_native_value = data.get("peak_shaving_projected_hour_w")
+        self._attr_extra_state_attributes = {
+            key: data.get(key) for key in PEAK_SHAVING_ATTRIBUTE_KEYS if key in data
+        }
+        if self.hass:
+            self.async_write_ha_state()
+
+
+class OpportunitySensor(SmartChargingBaseSensor):
+    """Sensor som visar dagens beräknade besparing av att sälja solöverskott."""
+
+    _attr_icon = "mdi:cash-plus"
+    _attr_native_unit_of_measurement = "kr"
+
+    def __init__(
+        self, config_entry: ConfigEntry, coordinator: SmartEVChargingCoordinator
+    ) -> None:
+        """Initialisera sensorn för alternativkostnad."""
+        super().__init__(config_entry, coordinator, ENTITY_ID_SUFFIX_OPPORTUNITY_SENSOR)
+        self._attr_name = f"{DEFAULT_NAME} Besparing Sålt Solöverskott"
+        self._attr_native_value: float | None = None
+        self._attr_extra_state_attributes: dict[str, Any] = {}
+        self._handle_coordinator_update()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Hanterar datauppdateringar från koordinatorn."""
+        data = self.coordinator.data or {}
+        self._attr_native_value = data.get("opportunity_projected_savings_kr")
+        self._attr_extra_state_attributes = {
+            key: data.get(key) for key in OPPORTUNITY_ATTRIBUTE_KEYS if key in data
+        }
+        if self.hass:
+            self.async_write_ha_state()
+
+
+class SocEstimateSensor(SmartChargingBaseSensor):
+    """Sensor som visar bilens uppskattade SoC mellan avläsningarna."""
+
+    _attr_icon = "mdi:battery-charging"
+    _attr_device_class = SensorDeviceClass.BATTERY
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = PERCENTAGE
+
+    def __init__(
+        self, config_entry: ConfigEntry, coordinator: SmartEVChargingCoordinator
+    ) -> None:
+        """Initialisera sensorn för uppskattad SoC."""
+        super().__init__(config_entry, coordinator, ENTITY_ID_SUFFIX_SOC_ESTIMATE_SENSOR)
+        self._attr_name = f"{DEFAULT_NAME} Uppskattad SoC"
+        self._attr_native_value: float | None = None
+        self._attr_extra_state_attributes: dict[str, Any] = {}
+        self._handle_coordinator_update()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Hanterar datauppdateringar från koordinatorn."""
+        data = self.coordinator.data or {}
+        self._attr_native_value = data.get("soc_estimate_percent")
+        self._attr_extra_state_attributes = {
+            key: data.get(key) for key in SOC_ESTIMATE_ATTRIBUTE_KEYS if key in data
+        }
+        if self.hass:
+            self.async_write_ha_state()
+
+
+class DepartureSensor(SmartChargingBaseSensor):
+    """Sensor som visar nästa förväntade avresa, inlärd eller från override."""
+
+    _attr_icon = "mdi:car-clock"
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+
+    def __init__(
+        self, config_entry: ConfigEntry, coordinator: SmartEVChargingCoordinator
+    ) -> None:
+        """Initialisera sensorn för förväntad avresa."""
+        super().__init__(config_entry, coordinator, ENTITY_ID_SUFFIX_DEPARTURE_SENSOR)
+        self._attr_name = f"{DEFAULT_NAME} Förväntad Avresa"
+        self._attr_native_value: datetime | None = None
+        self._attr_extra_state_attributes: dict[str, Any] = {}
+        self._handle_coordinator_update()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Hanterar datauppdateringar från koordinatorn."""
+        data = self.coordinator.data or {}
+        departure = data.get("departure_expected")
+        self._attr_native_value = (
+            dt_util.parse_datetime(departure) if departure else None
+        )
+        self._attr_extra_state_attributes = {
+            key: data.get(key) for key in DEPARTURE_ATTRIBUTE_KEYS if key in data
+        }
+        if self.hass:
+            self.async_write_ha_state()
+
+
+class ServiceBreakerSensor(SmartChargingBaseSensor):
+    """Diagnostiksensor med kretsbrytarnas tillstånd för laddarens tjänster."""
+
+    _attr_icon = "mdi:electric-switch"
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(
+        self, config_entry: ConfigEntry, coordinator: SmartEVChargingCoordinator
+    ) -> None:
+        """Initialisera kretsbrytarsensorn."""
+        super().__init__(
+            config_entry, coordinator, ENTITY_ID_SUFFIX_SERVICE_BREAKER_SENSOR
+        )
+        self._attr_name = f"{DEFAULT_NAME} Kretsbrytare Laddartjänster"
+        self._attr_native_value: str | None = None
+        self._attr_extra_state_attributes: dict[str, Any] = {}
+        self._handle_coordinator_update()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Hanterar datauppdateringar från koordinatorn."""
+        data = self.coordinator.data or {}
+        self._attr_native_value = data.get("service_breaker_state")
+        self._attr_extra_state_attributes = {
+            key: data.get(key) for key in SERVICE_BREAKER_ATTRIBUTE_KEYS if key in data
+        }
+        if self.hass:
+            self.async_write_ha_state()
+
+
+class HouseLoadSensor(SmartChargingBaseSensor):
+    """Sensor med husets medeleffekt och fasströmmar från elmätaren."""
+
+    _attr_icon = "mdi:home-lightning-bolt"
+    _attr_device_class = SensorDeviceClass.POWER
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfPower.WATT
+
+    def __init__(
+        self, config_entry: ConfigEntry, coordinator: SmartEVChargingCoordinator
+    ) -> None:
+        """Initialisera huslastsensorn."""
+        super().__init__(config_entry, coordinator, ENTITY_ID_SUFFIX_HOUSE_LOAD_SENSOR)
+        self._attr_name = f"{DEFAULT_NAME} Huslast Medel"
+        self._attr_native_value: float | None = None
+        self._attr_extra_state_attributes: dict[str, Any] = {}
+        self._handle_coordinator_update()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Hanterar datauppdateringar från koordinatorn."""
+        data = self.coordinator.data or {}
+        self._attr_native_value = data.get("house_power_mean_w")
+        self._attr_extra_state_attributes = {
+            key: data.get(key) for key in HOUSE_LOAD_ATTRIBUTE_KEYS if key in data
+        }
+        if self.hass:
+            self.async_write_ha_state()
+
+
+class OcppChargePointSensor(SmartChargingBaseSensor):
+    """
+    Sensor med ett värde som OCPP-laddpunkten rapporterar. Värdet uppdateras
+    direkt när laddpunkten rapporterar, inte vid koordinatorns uppdatering.
+    Status- och strömsensorn väljs som laddarens status- och strömsensor.
+    """
+
+    _attr_icon = "mdi:ev-station"
+
+    def __init__(
+        self,
+        config_entry: ConfigEntry,
+        coordinator: SmartEVChargingCoordinator,
+        key: str,
+        attribute: str,
+        name: str,
+        unit: str | None,
+        device_class: SensorDeviceClass | None,
+        state_class: SensorStateClass | None,
+    ) -> None:
+        """Initialisera sensorn för ett av laddpunktens värden."""
+        super().__init__(
+            config_entry,
+            coordinator,
+            f"{ENTITY_ID_SUFFIX_OCPP_SENSOR_PREFIX}_{key}",
+        )
+        self._attr_name = f"{DEFAULT_NAME} OCPP {name}"
+        self._attr_native_unit_of_measurement = unit
+        self._attr_device_class = device_class
+        self._attr_state_class = state_class
+        self._key = key
+        self._attribute = attribute
+        self._charge_point_id = coordinator.config.get(CONF_OCPP_CHARGE_POINT_ID)
+        self._attr_native_value: Any = None
+        self._attr_extra_state_attributes: dict[str, Any] = {}
+        self._update_from_charge_point()
+
+    @property
+    def available(self) -> bool:
+        """Sensorn är tillgänglig så länge centralsystemet körs."""
+        return True
+
+    async def async_added_to_hass(self) -> None:
+        """Börjar lyssna på laddpunktens rapporter."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.ocpp.async_add_listener(self._handle_charge_point)
+        )
+        self._update_from_charge_point()
+        self.async_write_ha_state()
+
+    @callback
+    def _handle_charge_point(self, charge_point: ChargePoint) -> None:
+        if self._charge_point_id and charge_point.id != self._charge_point_id:
+            return
+        self._update_from_charge_point()
+        if self.hass:
+            self.async_write_ha_state()
+
+    def _update_from_charge_point(self) -> None:
+        # Utan angivet id visas den första anslutna laddpunkten.
+        charge_point = self.coordinator.ocpp.charge_point(self._charge_point_id)
+        if charge_point is None:
+            self._attr_native_value = (
+                STATUS_UNAVAILABLE if self._key == "status" else None
+            )
+            self._attr_extra_state_attributes = {}
+            return
+        self._attr_native_value = getattr(charge_point, self._attribute)
+        if self._key == "status":
+            self._attr_extra_state_attributes = {
+                "charge_point_id": charge_point.id,
+                "vendor": charge_point.vendor,
+                "model": charge_point.model,
+                "error_code": charge_point.error_code,
+                "transaction_id": charge_point.transaction_id,
+                "limit_a": charge_point.limit_a,
+            }
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Värdet kommer från laddpunkten, inte från koordinatorn."""
@@ -0,0 +1,124 @@
+# File version: 2025-06-05 0.2.0
+"""Beständig lagring av laddningssessioner för Smart EV Charging.
+
+Avslutade sessioner läggs till i en lista som aldrig skrivs om (append-only).
+Skrivningar till disk samlas ihop via Store.async_delay_save så att flera
+ändringar inom fördröjningsfönstret blir en skrivning. Sessioner äldre än
+SESSION_RETENTION komprimeras till månadssummor så att flera års historik tar
+lite plats.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+import homeassistant.util.dt as dt_util
+
+from .const import DOMAIN, STORAGE_VERSION
+
+_LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
+
+SAVE_DELAY_SECONDS = 60
+# Hur länge enskilda sessioner sparas innan de komprimeras till månadssummor.
+SESSION_RETENTION = timedelta(days=90)
+# Summerade fält i månadsaggregaten.
+AGGREGATE_KEYS = ("energy_kwh", "solar_energy_kwh", "grid_energy_kwh", "cost_kr")
+
+
+def build_session_record(
+    start: datetime,
+    end: datetime,
+    modes: list[str],
+    solar_energy_kwh: float,
+    grid_energy_kwh: float,
+    cost_kr: float | None,
+) -> dict[str, Any]:
+    """Skapar en sessionspost i det format som sparas på disk."""
+    energy_kwh = solar_energy_kwh + grid_energy_kwh
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "modes": list(modes),
+        "energy_kwh": round(energy_kwh, 3),
+        "solar_energy_kwh": round(solar_energy_kwh, 3),
+        "grid_energy_kwh": round(grid_energy_kwh, 3),
+        "cost_kr": round(cost_kr, 2) if cost_kr is not None else None,
+        "average_price_kr": round(cost_kr / energy_kwh, 4)
+        if cost_kr is not None and energy_kwh > 0
+        else None,
+    }
+
+
+class SessionStore:
+    """Håller avslutade laddningssessioner och månadssummor på disk."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialisera sessionslagringen."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.sessions"
+        )
+        self._sessions: list[dict[str, Any]] = []
+        self._monthly: dict[str, dict[str, Any]] = {}
+
+    async def async_load(self) -> None:
+        """Läser in sparade sessioner."""
+        data = await self._store.async_load()
+        if not data:
+            return
+        self._sessions = list(data.get("sessions", []))
+        self._monthly = dict(data.get("monthly", {}))
+        _LOGGER.debug(
+            "Inläst sessionshistorik: %s sessioner, %s månader.",
+            len(self._sessions),
+            len(self._monthly),
+        )
+
+    async def async_save(self) -> None:
+        """Skriver historiken direkt, t.ex. vid avlastning."""
+        await self._store.async_save(self._data_to_save())
+
+    def _data_to_save(self) -> dict[str, Any]:
+        return {"sessions": self._sessions, "monthly": self._monthly}
+
+    @property
+    def sessions(self) -> list[dict[str, Any]]:
+        """Sessioner som ännu inte komprimerats, äldst först."""
+        return self._sessions
+
+    @property
+    def monthly(self) -> dict[str, dict[str, Any]]:
+        """Månadssummor för komprimerade sessioner, nyckel "ÅÅÅÅ-MM"."""
+        return self._monthly
+
+    @property
+    def last_session(self) -> dict[str, Any] | None:
+        """Den senast avslutade sessionen."""
+        return self._sessions[-1] if self._sessions else None
+
+    def add_session(self, record: dict[str, Any]) -> None:
+        """Lägger till en avslutad session och schemalägger en samlad skrivning."""
+        self._sessions.append(record)
+        self._compact(dt_util.utcnow())
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY_SECONDS)
+
+    def _compact(self, now: datetime) -> None:
+        """Flyttar sessioner äldre än SESSION_RETENTION till månadssummorna."""
+        cutoff = now - SESSION_RETENTION
+        keep_from = 0
+        for record in self._sessions:
+            end = dt_util.parse_datetime(record.get("end") or "")
+            if end is None or end >= cutoff:
+                break
+            month = dt_util.as_local(end).strftime("%Y-%m")
+            aggregate = self._monthly.setdefault(
+                month, {"sessions": 0, **{key: 0.0 for key in AGGREGATE_KEYS}}
+            )
+            aggregate["sessions"] += 1
+            for key in AGGREGATE_KEYS:
+                aggregate[key] = round(aggregate[key] + (record.get(key) or 0.0), 3)
+            keep_from += 1
+        if keep_from:
+            _LOGGER.debug("Komprimerar %s sessioner till månadssummor.", keep_from)
+            del self._sessions[:keep_from]
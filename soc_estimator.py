@@ -0,0 +1,151 @@
+# File version: 2025-06-05 0.2.0
+"""Uppskattning av bilens laddningsnivå (SoC) mellan avläsningar.
+
+Bilarnas molnintegrationer uppdaterar SoC sällan, och en tvingad uppdatering
+väcker ofta bilen. Det är långsamt, begränsas av tillverkarens API och laddar
+ur 12 V-batteriet. I stället integreras den energi som laddaren levererat
+sedan den senaste avläsningen, och SoC uppskattas som
+
+    avläst SoC + levererad energi * verkningsgrad / batterikapacitet.
+
+En ny avläsning (sensorns last_updated ändras) nollställer integrationen.
+Osäkerheten växer med den uppskattade ökningen (verkningsgraden är inte exakt)
+och med avläsningens ålder. En uppdatering av sensorn begärs bara när
+uppskattningen, inklusive osäkerheten, närmar sig SoC-gränsen.
+"""
+
+import logging
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+from typing import Any
+
+from .const import (
+    DOMAIN,
+    CONF_EV_SOC_SENSOR,
+    CONF_EV_BATTERY_CAPACITY_KWH,
+    CONF_CHARGING_EFFICIENCY_PERCENT,
+    DEFAULT_CHARGING_EFFICIENCY_PERCENT,
+)
+from .power_integrator import PowerIntegrator
+
+_LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
+
+# Äldre avläsningar än så här används inte som grund för en uppskattning.
+MAX_READING_AGE = timedelta(hours=24)
+# Osäkerhet i procentenheter: andel av den uppskattade ökningen, plus drift per
+# timme sedan avläsningen (t.ex. förbrukning i bilen medan den står still).
+EFFICIENCY_UNCERTAINTY = 0.1
+DRIFT_PERCENT_PER_HOUR = 0.25
+# Vid så stor osäkerhet (procentenheter) är tilltron till uppskattningen noll.
+ZERO_CONFIDENCE_UNCERTAINTY = 10.0
+# En uppdatering begärs när uppskattningen plus osäkerheten är inom så många
+# procentenheter från gränsen, och högst så ofta.
+REFRESH_MARGIN_PERCENT = 1.0
+MIN_REFRESH_INTERVAL = timedelta(minutes=30)
+
+
+class SocEstimator:
+    """Uppskattar SoC från senaste avläsningen och energin levererad sedan dess."""
+
+    def __init__(self, capacity_kwh: float, efficiency: float) -> None:
+        """Initialisera uppskattningen med batterikapacitet och verkningsgrad (0-1)."""
+        self.capacity_kwh = capacity_kwh
+        self.efficiency = efficiency
+        self.reading_percent: float | None = None
+        self.reading_time: datetime | None = None
+        self.energy_since_reading_kwh = 0.0
+        self.last_refresh_request: datetime | None = None
+        self._power = PowerIntegrator()
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> "SocEstimator | None":
+        """Skapar uppskattningen, eller None om SoC-sensor eller kapacitet saknas."""
+        capacity_kwh = config.get(CONF_EV_BATTERY_CAPACITY_KWH)
+        if not config.get(CONF_EV_SOC_SENSOR) or not capacity_kwh:
+            return None
+        efficiency = config.get(CONF_CHARGING_EFFICIENCY_PERCENT)
+        if efficiency is None:
+            efficiency = DEFAULT_CHARGING_EFFICIENCY_PERCENT
+        return cls(float(capacity_kwh), float(efficiency) / 100.0)
+
+    def add_reading(self, reading_time: datetime, soc_percent: float) -> bool:
+        """
+        Registrerar en avläsning från SoC-sensorn. Bara en nyare avläsning än den
+        senaste nollställer integrationen. Returnerar True för en ny avläsning.
+        """
+        if self.reading_time is not None and reading_time <= self.reading_time:
+            return False
+        self.reading_percent = soc_percent
+        self.reading_time = reading_time
+        self.energy_since_reading_kwh = 0.0
+        return True
+
+    def record_power(self, now: datetime, power_w: float) -> None:
+        """
+        Integrerar laddeffekten. Effekten gäller fram till nästa anrop, på samma
+        sätt som sessionens energiintegration.
+        """
+        energy_kwh = self._power.add_energy_kwh(now, power_w, self.reading_time)
+        if self.reading_time is not None:
+            self.energy_since_reading_kwh += energy_kwh
+
+    def _added_percent(self) -> float:
+        return (
+            self.energy_since_reading_kwh * self.efficiency / self.capacity_kwh * 100.0
+        )
+
+    def estimate(self, now: datetime) -> float | None:
+        """Uppskattad SoC i procent, eller None utan tillräckligt färsk avläsning."""
+        if self.reading_percent is None or self.reading_time is None:
+            return None
+        if now - self.reading_time > MAX_READING_AGE:
+            return None
+        return min(100.0, self.reading_percent + self._added_percent())
+
+    def uncertainty_percent(self, now: datetime) -> float | None:
+        """Uppskattningens osäkerhet i procentenheter."""
+        if self.reading_time is None:
+            return None
+        age_hours = max(0.0, (now - self.reading_time).total_seconds() / 3600.0)
+        return (
+            self._added_percent() * EFFICIENCY_UNCERTAINTY
+            + age_hours * DRIFT_PERCENT_PER_HOUR
+        )
+
+    def confidence(self, now: datetime) -> float | None:
+        """Tilltro till uppskattningen, från 1.0 (nyss avläst) till 0.0."""
+        if self.estimate(now) is None:
+            return None
+        uncertainty = self.uncertainty_percent(now) or 0.0
+        return max(0.0, 1.0 - uncertainty / ZERO_CONFIDENCE_UNCERTAINTY)
+
+    def should_refresh(self, now: datetime, target_percent: float | None) -> bool:
+        """
+        Om en uppdatering av SoC-sensorn bör begäras: uppskattningen har ändrats
+        sedan avläsningen och kan, med osäkerheten, ha nått nära gränsen.
+        Registrerar begäran så att den inte upprepas för ofta.
+        """
+        estimate = self.estimate(now)
+        if (
+            target_percent is None
+            or estimate is None
+            or self.reading_time is None
+            or self.energy_since_reading_kwh <= 0
+        ):
+            return False
+        if estimate + (self.uncertainty_percent(now) or 0.0) < (
+            target_percent - REFRESH_MARGIN_PERCENT
+        ):
+            return False
+        if (
+            self.last_refresh_request is not None
+            and now - self.last_refresh_request < MIN_REFRESH_INTERVAL
+        ):
+            return False
+        self.last_refresh_request = now
+        _LOGGER.debug(
+            "Uppskattad SoC %.1f %% är nära gränsen %.0f %%. Begär ny avläsning.",
+            estimate,
+            target_percent,
+        )
+        return True
@@ -0,0 +1,151 @@
+# File version: 2025-06-05 0.2.0
+"""Timvis solprognos från prognossensorernas attribut.
+
+Stöder attributen från de vanligaste prognosintegrationerna:
+- Solcast: detailedForecast (halvtimmar) eller detailedHourly, listor med
+  period_start och pv_estimate (kW).
+- Forecast.Solar: watts ({tidpunkt: W}) eller wh_period ({periodstart: Wh}).
+
+Prognoserna från alla konfigurerade sensorer (t.ex. en för idag och en för
+imorgon, eller en per takyta) summeras till energi per timme i kWh. Attributen
+tolkas bara om när någon av sensorernas tillstånd har ändrats.
+"""
+
+import logging
+from collections.abc import Iterable, Mapping
+from datetime import datetime, timedelta
+from typing import Any
+
+from homeassistant.core import State
+import homeassistant.util.dt as dt_util
+
+from .const import DOMAIN
+from .price_cache import parse_utc_datetime
+
+_LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
+
+# Solcast-attribut i prioritetsordning (finast upplösning först).
+SOLCAST_ATTRIBUTES = ("detailedForecast", "detailedHourly")
+ONE_HOUR = timedelta(hours=1)
+
+
+def _hour_start(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _add_energy(
+    hourly_kwh: dict[datetime, float], start: datetime, end: datetime, kwh: float
+) -> None:
+    """Fördelar periodens energi jämnt över de timmar perioden täcker."""
+    duration_s = (end - start).total_seconds()
+    if duration_s <= 0 or kwh <= 0:
+        return
+    moment = start
+    while moment < end:
+        hour = _hour_start(moment)
+        part_end = min(end, hour + ONE_HOUR)
+        share = (part_end - moment).total_seconds() / duration_s
+        hourly_kwh[hour] = hourly_kwh.get(hour, 0.0) + kwh * share
+        moment = part_end
+
+
+def _timed_values(items: Iterable[tuple[Any, Any]]) -> list[tuple[datetime, float]]:
+    """Tolkar (tidpunkt, värde) och sorterar på tid. Ogiltiga poster hoppas över."""
+    values = []
+    for moment, value in items:
+        moment = parse_utc_datetime(moment)
+        if moment is None:
+            continue
+        try:
+            values.append((moment, float(value)))
+        except (TypeError, ValueError):
+            continue
+    return sorted(values)
+
+
+def _periods(
+    values: list[tuple[datetime, float]],
+) -> Iterable[tuple[datetime, datetime, float]]:
+    """(start, slut, värde) där perioden slutar vid nästa tidpunkt."""
+    for index, (start, value) in enumerate(values):
+        if index + 1 < len(values):
+            end = values[index + 1][0]
+        elif index > 0:
+            end = start + (start - values[index - 1][0])
+        else:
+            end = start + ONE_HOUR
+        yield start, end, value
+
+
+def parse_forecast_attributes(attributes: Mapping[str, Any]) -> dict[datetime, float]:
+    """Tolkar en prognossensors attribut till kWh per timme (timstart i UTC)."""
+    hourly_kwh: dict[datetime, float] = {}
+    for key in SOLCAST_ATTRIBUTES:
+        entries = attributes.get(key)
+        if not entries:
+            continue
+        values = _timed_values(
+            (entry.get("period_start"), entry.get("pv_estimate"))
+            for entry in entries
+            if isinstance(entry, Mapping)
+        )
+        for start, end, power_kw in _periods(values):
+            hours = (end - start).total_seconds() / 3600.0
+            _add_energy(hourly_kwh, start, end, power_kw * hours)
+        return hourly_kwh
+    if isinstance(watts := attributes.get("watts"), Mapping):
+        for start, end, power_w in _periods(_timed_values(watts.items())):
+            hours = (end - start).total_seconds() / 3600.0
+            _add_energy(hourly_kwh, start, end, power_w / 1000.0 * hours)
+    elif isinstance(wh_period := attributes.get("wh_period"), Mapping):
+        for start, end, energy_wh in _periods(_timed_values(wh_period.items())):
+            _add_energy(hourly_kwh, start, end, energy_wh / 1000.0)
+    return hourly_kwh
+
+
+class SolarForecast:
+    """Sammanställd timprognos för solproduktionen från en eller flera sensorer."""
+
+    def __init__(self) -> None:
+        """Initialisera prognosen."""
+        self._states: tuple[State | None, ...] = ()
+        self.hourly_kwh: dict[datetime, float] = {}
+        # Räknas upp varje gång prognosen tolkas om, så att planen vet när den
+        # behöver räknas om.
+        self.version = 0
+
+    def update(self, states: Iterable[State | None]) -> bool:
+        """Tolkar om prognosen om någon sensors tillstånd har ändrats."""
+        states = tuple(states)
+        if len(states) == len(self._states) and all(
+            new is old for new, old in zip(states, self._states)
+        ):
+            return False
+        self._states = states
+        hourly_kwh: dict[datetime, float] = {}
+        for state in states:
+            if state is None:
+                continue
+            for hour, kwh in parse_forecast_attributes(state.attributes).items():
+                hourly_kwh[hour] = hourly_kwh.get(hour, 0.0) + kwh
+        self.hourly_kwh = hourly_kwh
+        self.version += 1
+        _LOGGER.debug(
+            "Solprognos inläst: %s timmar, totalt %.1f kWh.",
+            len(hourly_kwh),
+            sum(hourly_kwh.values()),
+        )
+        return True
+
+    def update_hourly(self, hourly_kwh: dict[datetime, float]) -> bool:
+        """Använder en färdig timprognos, t.ex. från den lokala solmodellen."""
+        if hourly_kwh is self.hourly_kwh:
+            return False
+        self.hourly_kwh = hourly_kwh
+        self.version += 1
+        return True
+
+    def surplus_kw(self, hour: datetime, base_load_w: float) -> float:
+        """Väntat överskott i kW under timmen efter husets typiska last."""
+        production_kw = self.hourly_kwh.get(_hour_start(dt_util.as_utc(hour)), 0.0)
+        return max(0.0, production_kw - base_load_w / 1000.0)
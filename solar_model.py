@@ -0,0 +1,338 @@
+# File version: 2025-06-05 0.2.0
+"""Lokal solproduktionsmodell tränad på recorder-historiken.
+
+Alla anläggningar har inte en prognosintegration, och utan nätverksåtkomst går
+det inte att hämta någon. Modellen byggs i stället av historiken för
+solproduktionssensorn:
+
+- Ett klarvädershölje per vecka på året och timme på dygnet: den högsta
+  timmedeleffekt som har observerats. Tabellen är alltid 53 x 24 värden,
+  oavsett hur länge modellen har tränats.
+- En persistensfaktor: hur stor andel av höljet de senaste dygnen faktiskt
+  producerade, med störst vikt på det senaste dygnet.
+
+Modellen tränas inkrementellt varje natt med de dygn som har tillkommit sedan
+förra gången. Historiken hämtas i recorderns executor och beräkningarna görs
+med NumPy i Home Assistants executor, så händelseloopen blockeras inte.
+Prognosen för idag och imorgon ges som kWh per timme (timstart i UTC), samma
+form som prognossensorerna ger, så att laddplanen kan använda den direkt.
+"""
+
+import logging
+from collections.abc import Iterable, Mapping
+from datetime import date, datetime, time, timedelta
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, State, callback
+from homeassistant.helpers.event import async_track_time_change
+from homeassistant.helpers.storage import Store
+import homeassistant.util.dt as dt_util
+
+from .const import (
+    DOMAIN,
+    STORAGE_VERSION,
+    CONF_SOLAR_PRODUCTION_SENSOR,
+    CONF_LOCAL_SOLAR_MODEL,
+)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy följer med Home Assistant
+    np = None
+
+_LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
+
+WEEKS = 53
+HOURS = 24
+# Veckor åt vardera hållet som höljet hämtas från. Täcker luckor i tabellen
+# det första året och jämnar ut enstaka mulna veckor.
+NEIGHBOUR_WEEKS = 2
+# Antal dygn som persistensfaktorn räknas över.
+RECENT_DAYS = 7
+# Så långt bakåt hämtas historik när modellen är ny eller har stått still.
+BACKFILL_DAYS = 14
+# Upplösning när sensorns tillstånd samplas om till timmedelvärden.
+SAMPLE_STEP_S = 300
+# Antal dygn (idag och imorgon) som prognosen täcker.
+PREDICTION_DAYS = 2
+# Lokal tid för den nattliga träningen.
+FIT_TIME = time(1, 5)
+
+
+def _week_index(day: date) -> int:
+    return min(WEEKS - 1, (day.timetuple().tm_yday - 1) // 7)
+
+
+def local_hours(day: date) -> tuple["np.ndarray", "np.ndarray"]:
+    """
+    Dygnets timgränser i epoksekunder (n + 1 värden) och lokal timme på dygnet
+    för varje timme (n värden). n är 23 eller 25 de dygn sommartiden slår om.
+    """
+    start = dt_util.as_utc(dt_util.start_of_local_day(day))
+    end = dt_util.as_utc(dt_util.start_of_local_day(day + timedelta(days=1)))
+    count = round((end - start).total_seconds() / 3600)
+    boundaries = start.timestamp() + 3600.0 * np.arange(count + 1)
+    hour_of_day = np.array(
+        [dt_util.as_local(start + timedelta(hours=i)).hour for i in range(count)]
+    )
+    return boundaries, hour_of_day
+
+
+def samples_kw(states: Iterable[State]) -> tuple["np.ndarray", "np.ndarray"]:
+    """Tidpunkter (epoksekunder) och effekt i kW. Okända värden blir NaN."""
+    times: list[float] = []
+    values: list[float] = []
+    for state in states:
+        try:
+            value = float(state.state)
+        except (TypeError, ValueError):
+            value = float("nan")
+        unit = str(state.attributes.get("unit_of_measurement", "")).lower()
+        if unit != "kw":
+            value /= 1000.0
+        times.append(state.last_changed.timestamp())
+        values.append(value)
+    return np.array(times, dtype=float), np.array(values, dtype=float)
+
+
+def hourly_mean_power_kw(
+    boundaries: "np.ndarray",
+    hour_of_day: "np.ndarray",
+    times: "np.ndarray",
+    values_kw: "np.ndarray",
+) -> "np.ndarray":
+    """
+    Medeleffekt per timme på dygnet. Sensorn antas hålla sitt värde till nästa
+    tillståndsändring. Timmar utan kända värden blir NaN.
+    """
+    grid = np.arange(boundaries[0], boundaries[-1], SAMPLE_STEP_S) + SAMPLE_STEP_S / 2
+    index = np.searchsorted(times, grid, side="right") - 1
+    power = np.where(index >= 0, values_kw[np.maximum(index, 0)], np.nan)
+    known = ~np.isnan(power)
+    hours = hour_of_day[np.searchsorted(boundaries, grid, side="right") - 1][known]
+    energy = np.bincount(hours, weights=np.maximum(power[known], 0.0), minlength=HOURS)
+    count = np.bincount(hours, minlength=HOURS)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, energy / count, np.nan)
+
+
+class SolarProductionModel:
+    """Säsongstabell med klarvädershölje och persistensfaktor."""
+
+    def __init__(self) -> None:
+        """Initialisera en tom modell."""
+        self.envelope = np.full((WEEKS, HOURS), np.nan)
+        # Senaste dygnens produktion som andel av höljet, äldst först.
+        self.recent_ratios = np.full(RECENT_DAYS, np.nan)
+        self.last_day: date | None = None
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "SolarProductionModel":
+        """Återskapar modellen från sparad data."""
+        model = cls()
+        envelope = np.array(data.get("envelope", []), dtype=float)
+        if envelope.shape == model.envelope.shape:
+            model.envelope = envelope
+        ratios = np.array(data.get("recent_ratios", []), dtype=float)
+        if ratios.shape == model.recent_ratios.shape:
+            model.recent_ratios = ratios
+        if last_day := data.get("last_day"):
+            model.last_day = date.fromisoformat(last_day)
+        return model
+
+    def as_dict(self) -> dict[str, Any]:
+        """Modellen i en form som kan sparas som JSON (NaN blir None)."""
+        return {
+            "envelope": np.where(
+                np.isnan(self.envelope), None, np.round(self.envelope, 3)
+            ).tolist(),
+            "recent_ratios": np.where(
+                np.isnan(self.recent_ratios), None, np.round(self.recent_ratios, 3)
+            ).tolist(),
+            "last_day": self.last_day.isoformat() if self.last_day else None,
+        }
+
+    def envelope_for(self, day: date) -> "np.ndarray":
+        """
+        Klarvädershöljet för dygnet i kW per timme. Grannveckorna tas med, så
+        att persistensen mäts mot samma hölje som prognosen sedan använder.
+        """
+        offsets = np.arange(-NEIGHBOUR_WEEKS, NEIGHBOUR_WEEKS + 1)
+        weeks = (_week_index(day) + offsets) % WEEKS
+        rows = self.envelope[weeks]
+        known = ~np.isnan(rows)
+        return np.where(known, rows, 0.0).max(axis=0, initial=0.0)
+
+    @property
+    def persistence(self) -> float:
+        """Viktat medel av de senaste dygnens andel av höljet. 1.0 utan underlag."""
+        known = ~np.isnan(self.recent_ratios)
+        if not known.any():
+            return 1.0
+        weights = np.arange(1, RECENT_DAYS + 1)[known]
+        return float(np.average(self.recent_ratios[known], weights=weights))
+
+    def fit_day(self, day: date, hourly_kw: "np.ndarray") -> None:
+        """Lägger till ett dygns timmedeleffekter i höljet och persistensen."""
+        self.last_day = day
+        known = ~np.isnan(hourly_kw)
+        if not known.any():
+            return
+        week = _week_index(day)
+        self.envelope[week] = np.fmax(self.envelope[week], hourly_kw)
+        envelope_kwh = self.envelope_for(day)[known].sum()
+        ratio = hourly_kw[known].sum() / envelope_kwh if envelope_kwh > 0 else np.nan
+        self.recent_ratios = np.roll(self.recent_ratios, -1)
+        self.recent_ratios[-1] = ratio
+
+    def predict_day_kw(self, day: date) -> "np.ndarray":
+        """Väntad medeleffekt per timme på dygnet i kW."""
+        return self.envelope_for(day) * self.persistence
+
+
+class LocalSolarModel:
+    """Tränar solmodellen nattligen från recordern och håller dess timprognos."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str, entity_id: str) -> None:
+        """Initialisera modellen för produktionssensorn."""
+        self._hass = hass
+        self.entity_id = entity_id
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.solar_model"
+        )
+        self.model = SolarProductionModel()
+        self.hourly_kwh: dict[datetime, float] = {}
+        self._unsub: CALLBACK_TYPE | None = None
+        self._fitting = False
+
+    @classmethod
+    def from_config(
+        cls, hass: HomeAssistant, entry_id: str, config: Mapping[str, Any]
+    ) -> "LocalSolarModel | None":
+        """Skapar modellen, eller None om den inte är aktiverad."""
+        entity_id = config.get(CONF_SOLAR_PRODUCTION_SENSOR)
+        if not config.get(CONF_LOCAL_SOLAR_MODEL) or not entity_id:
+            return None
+        if np is None:
+            _LOGGER.warning("NumPy saknas. Den lokala solmodellen är avstängd.")
+            return None
+        return cls(hass, entry_id, str(entity_id))
+
+    async def async_load(self) -> None:
+        """Läser in den sparade tabellen och räknar fram prognosen."""
+        data = await self._store.async_load()
+        if data:
+            try:
+                self.model = SolarProductionModel.from_dict(data)
+            except (TypeError, ValueError) as e:
+                _LOGGER.warning("Kunde inte läsa sparad solmodell: %s", e)
+                self.model = SolarProductionModel()
+        self.hourly_kwh = await self._hass.async_add_executor_job(
+            self._predict, dt_util.as_local(dt_util.utcnow()).date()
+        )
+
+    @callback
+    def async_start(self) -> None:
+        """Schemalägger den nattliga träningen och tränar ikapp direkt vid behov."""
+        self.async_stop()
+        self._unsub = async_track_time_change(
+            self._hass,
+            self._handle_fit_time,
+            hour=FIT_TIME.hour,
+            minute=FIT_TIME.minute,
+            second=0,
+        )
+        yesterday = dt_util.as_local(dt_util.utcnow()).date() - timedelta(days=1)
+        if self.model.last_day is None or self.model.last_day < yesterday:
+            self._hass.async_create_background_task(
+                self.async_fit(dt_util.utcnow()), f"{DOMAIN} solar model fit"
+            )
+
+    @callback
+    def async_stop(self) -> None:
+        """Avbryter den schemalagda träningen."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+
+    @callback
+    def _handle_fit_time(self, now: datetime) -> None:
+        self._hass.async_create_background_task(
+            self.async_fit(now), f"{DOMAIN} solar model fit"
+        )
+
+    async def async_fit(self, now: datetime) -> None:
+        """Tränar modellen på de hela dygn som har tillkommit sedan förra gången."""
+        if self._fitting:
+            return
+        self._fitting = True
+        try:
+            today = dt_util.as_local(now).date()
+            first_day = today - timedelta(days=BACKFILL_DAYS)
+            if self.model.last_day is not None:
+                first_day = max(first_day, self.model.last_day + timedelta(days=1))
+            if first_day < today:
+                states = await self._async_fetch_history(
+                    dt_util.as_utc(dt_util.start_of_local_day(first_day)),
+                    dt_util.as_utc(dt_util.start_of_local_day(today)),
+                )
+                await self._hass.async_add_executor_job(
+                    self._fit_days, first_day, today, states
+                )
+                await self._store.async_save(self.model.as_dict())
+            self.hourly_kwh = await self._hass.async_add_executor_job(
+                self._predict, today
+            )
+            _LOGGER.debug(
+                "Lokal solmodell tränad t.o.m. %s, persistens %.2f, prognos %.1f kWh.",
+                self.model.last_day,
+                self.model.persistence,
+                sum(self.hourly_kwh.values()),
+            )
+        except Exception as e:
+            # Ett fel i träningen får aldrig påverka laddstyrningen.
+            _LOGGER.warning("Kunde inte träna den lokala solmodellen: %s", e)
+        finally:
+            self._fitting = False
+
+    async def _async_fetch_history(
+        self, start: datetime, end: datetime
+    ) -> list[State]:
+        """Produktionssensorns tillstånd under perioden, från recorderns executor."""
+        # Importeras här så att modulen kan laddas utan recordern.
+        from homeassistant.components.recorder import get_instance, history
+
+        result = await get_instance(self._hass).async_add_executor_job(
+            history.state_changes_during_period,
+            self._hass,
+            start,
+            end,
+            self.entity_id,
+        )
+        return list(result.get(self.entity_id, []))
+
+    def _fit_days(self, first_day: date, today: date, states: list[State]) -> None:
+        """Körs i executorn."""
+        times, values = samples_kw(states)
+        if not len(times):
+            return
+        day = first_day
+        while day < today:
+            boundaries, hour_of_day = local_hours(day)
+            self.model.fit_day(
+                day, hourly_mean_power_kw(boundaries, hour_of_day, times, values)
+            )
+            day += timedelta(days=1)
+
+    def _predict(self, today: date) -> dict[datetime, float]:
+        """Prognos i kWh per timme för idag och imorgon. Körs i executorn."""
+        hourly_kwh: dict[datetime, float] = {}
+        for offset in range(PREDICTION_DAYS):
+            day = today + timedelta(days=offset)
+            boundaries, hour_of_day = local_hours(day)
+            power_kw = self.model.predict_day_kw(day)
+            for start, hour in zip(boundaries[:-1], hour_of_day):
+                if power_kw[hour] > 0:
+                    moment = datetime.fromtimestamp(start, dt_util.UTC)
+                    hourly_kwh[moment] = float(power_kw[hour])
+        return hourly_kwh
@@ -13,8 +13,10 @@ from homeassistant.const import STATE_ON, STATE_OFF
 from .const import (
     DOMAIN, DEFAULT_NAME,
     ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
-    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+    ENTITY_ID_SUFFIX_ENABLE_HYBRID_CHARGING_SWITCH
 )
+from .coordinator import SmartEVChargingCoordinator
 
 _LOGGER = logging.getLogger(f"custom_components.{DOMAIN}") # Använd komponent-specifik logger
 
@@ -25,14 +27,23 @@ async def async_setup_entry(
 ) -> None:
     """Set up the switch platform for Smart EV Charging."""
     _LOGGER.debug("SWITCH PLATFORM: async_setup_entry startar.")
+    coordinator: SmartEVChargingCoordinator | None = (
+        hass.data.get(DOMAIN, {}).get(config_entry.entry_id, {}).get("coordinator")
+    )
+    if not coordinator:
+        _LOGGER.error("SWITCH PLATFORM: Koordinator saknas för %s.", config_entry.entry_id)
+        return
     try:
-        smart_switch = SmartChargingEnableSwitch(config_entry)
+        smart_switch = SmartChargingEnableSwitch(config_entry, coordinator)
         _LOGGER.debug("SWITCH PLATFORM: SmartChargingEnableSwitch skapad: %s", smart_switch.name)
 
-        solar_switch = EnableSolarSurplusChargingSwitch(config_entry)
+        solar_switch = EnableSolarSurplusChargingSwitch(config_entry, coordinator)
         _LOGGER.debug("SWITCH PLATFORM: EnableSolarSurplusChargingSwitch skapad: %s", solar_switch.name)
 
-        entities_to_add = [smart_switch, solar_switch]
+        hybrid_switch = EnableHybridChargingSwitch(config_entry, coordinator)
+        _LOGGER.debug("SWITCH PLATFORM: EnableHybridChargingSwitch skapad: %s", hybrid_switch.name)
+
+        entities_to_add = [smart_switch, solar_switch, hybrid_switch]
         async_add_entities(entities_to_add, True) # True för att återställa tillstånd
         _LOGGER.debug("SWITCH PLATFORM: async_add_entities har anropats för %s entiteter.", len(entities_to_add))
     except Exception as e:
@@ -43,9 +54,11 @@ class SmartChargingBaseSwitch(SwitchEntity, RestoreEntity):
     """Base class for restorable switches in this integration."""
     _attr_should_poll = False # Vi förlitar oss på att HA anropar turn_on/off och återställning
 
-    def __init__(self, config_entry: ConfigEntry, entity_id_suffix: str, name_suffix: str, default_icon: str | None = None, default_state_on: bool = False) -> None:
+    def __init__(self, config_entry: ConfigEntry, coordinator: SmartEVChargingCoordinator, entity_id_suffix: str, name_suffix: str, default_icon: str | None = None, default_state_on: bool = False) -> None:
         """Initialize the base switch."""
         self._config_entry = config_entry
+        self._coordinator = coordinator
+        self._entity_id_suffix = entity_id_suffix # Nyckel för värdet i koordinatorn
         self._attr_is_on = default_state_on # Standard PÅ/AV-läge vid första start utan sparat tillstånd
 
         self._attr_unique_id = f"{config_entry.entry_id}_{entity_id_suffix}"
@@ -84,6 +97,7 @@ class SmartChargingBaseSwitch(SwitchEntity, RestoreEntity):
             _LOGGER.debug("Inget giltigt sparat tillstånd hittades för %s (%s), använder default: %s",
                             self.name, self.unique_id, self._attr_is_on)
         # Ingen async_write_ha_state() här, det sköts av HA när den läser initialt tillstånd
+        await self._coordinator.async_set_control_value(self._entity_id_suffix, self._attr_is_on)
 
     @property
     def is_on(self) -> bool | None:
@@ -96,6 +110,7 @@ class SmartChargingBaseSwitch(SwitchEntity, RestoreEntity):
             self._attr_is_on = True
             self.async_write_ha_state() # Meddela HA om ändringen
             _LOGGER.info("%s ställd till PÅ", self.name)
+            await self._coordinator.async_set_control_value(self._entity_id_suffix, True)
         else:
             _LOGGER.debug("%s var redan PÅ, ingen åtgärd.", self.name)
 
@@ -106,15 +121,17 @@ class SmartChargingBaseSwitch(SwitchEntity, RestoreEntity):
             self._attr_is_on = False
             self.async_write_ha_state() # Meddela HA om ändringen
             _LOGGER.info("%s ställd till AV", self.name)
+            await self._coordinator.async_set_control_value(self._entity_id_suffix, False)
         else:
             _LOGGER.debug("%s var redan AV, ingen åtgärd.", self.name)
 
 
 class SmartChargingEnableSwitch(SmartChargingBaseSwitch):
     """Switch to enable/disable general smart charging (price/time based)."""
-    def __init__(self, config_entry: ConfigEntry) -> None:
+    def __init__(self, config_entry: ConfigEntry, coordinator: SmartEVChargingCoordinator) -> None:
         super().__init__(
             config_entry,
+            coordinator,
             ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
             "Smart Laddning Aktiv", # Tydligare namn
             "mdi:auto-mode",
@@ -123,11 +140,24 @@ class SmartChargingEnableSwitch(SmartChargingBaseSwitch):
 
 class EnableSolarSurplusChargingSwitch(SmartChargingBaseSwitch):
     """Switch to enable/disable solar surplus charging mode."""
-    def __init__(self, config_entry: ConfigEntry) -> None:
+    def __init__(self, config_entry: ConfigEntry, coordinator: SmartEVChargingCoordinator) -> None:
         super().__init__(
             config_entry,
+            coordinator,
             ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
             "Aktivera Solenergiladdning", # Tydligare namn
             "mdi:solar-panel-large",
             default_state_on=False # Standard AV
+        )
+
+class EnableHybridChargingSwitch(SmartChargingBaseSwitch):
+    """Switch to enable/disable blended solar + cheap grid charging."""
+    def __init__(self, config_entry: ConfigEntry, coordinator: SmartEVChargingCoordinator) -> None:
+        super().__init__(
+            config_entry,
+            coordinator,
+            ENTITY_ID_SUFFIX_ENABLE_HYBRID_CHARGING_SWITCH,
+            "Aktivera Hybridladdning",
+            "mdi:solar-power-variant",
+            default_state_on=False # Standard AV
         )
\ No newline at end of file
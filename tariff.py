@@ -0,0 +1,150 @@
+# File version: 2025-06-05 0.2.0
+"""Tariffmodell för totalkostnaden per kWh.
+
+Det som faktiskt betalas per kWh är spotpriset plus nätbolagets överföringsavgift
+(ofta olika för höglast- och låglasttid) och energiskatt, med moms på allt.
+Överföringsavgiften per kvart under veckan kompileras till en tabell när
+modellen skapas, så att kostnaden för ett prisintervall är ett uppslag.
+
+Tidsfönster för överföringsavgiften anges som text, flera fönster separerade
+med semikolon, t.ex. "mån-fre 06-22=0.53; lör-sön 00-24=0.20". Utanför
+fönstren gäller den fasta överföringsavgiften. Senare fönster har företräde.
+"""
+
+import re
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any
+
+import homeassistant.util.dt as dt_util
+
+from .const import (
+    CONF_TARIFF_ENERGY_TAX,
+    CONF_TARIFF_GRID_FEE,
+    CONF_TARIFF_VAT_PERCENT,
+    CONF_TARIFF_TIME_OF_USE,
+)
+
+SLOTS_PER_DAY = 24 * 4  # Kvartar
+WEEKDAY_NAMES = (
+    ("mån", "mon"),
+    ("tis", "tue"),
+    ("ons", "wed"),
+    ("tor", "thu"),
+    ("fre", "fri"),
+    ("lör", "sat"),
+    ("sön", "sun"),
+)
+_WEEKDAY_INDEX = {
+    name: index for index, names in enumerate(WEEKDAY_NAMES) for name in names
+}
+_WINDOW_PATTERN = re.compile(
+    r"^\s*(?P<days>[^\s]+)\s+(?P<start>\d{1,2}(?::\d{2})?)\s*-\s*"
+    r"(?P<end>\d{1,2}(?::\d{2})?)\s*=\s*(?P<fee>\d+(?:[.,]\d+)?)\s*$"
+)
+
+
+def _parse_days(text: str) -> list[int]:
+    """Tolkar t.ex. "mån-fre", "lör,sön" eller "alla" till veckodagsindex."""
+    if text.lower() in ("alla", "all"):
+        return list(range(7))
+    days: list[int] = []
+    for part in text.lower().split(","):
+        first, _, last = part.partition("-")
+        start = _WEEKDAY_INDEX[first]
+        end = _WEEKDAY_INDEX[last] if last else start
+        if end < start:  # T.ex. "lör-mån" går över veckoskiftet.
+            end += 7
+        days.extend(day % 7 for day in range(start, end + 1))
+    return days
+
+
+def _parse_quarter(text: str) -> int:
+    """Tolkar "HH" eller "HH:MM" till antal kvartar från midnatt."""
+    hours, _, minutes = text.partition(":")
+    quarter, remainder = divmod(int(hours) * 60 + int(minutes or 0), 15)
+    if remainder or not 0 <= quarter <= SLOTS_PER_DAY:
+        raise ValueError(f"Ogiltig tid '{text}', ange hel kvart mellan 00 och 24.")
+    return quarter
+
+
+def parse_time_of_use_windows(
+    text: str | None,
+) -> list[tuple[list[int], int, int, float]]:
+    """
+    Tolkar tidsfönstren för överföringsavgiften till (veckodagar, första kvart,
+    kvart efter sista, avgift i kr/kWh). Kastar ValueError vid ogiltig text.
+    """
+    windows: list[tuple[list[int], int, int, float]] = []
+    for entry in (text or "").split(";"):
+        if not entry.strip():
+            continue
+        match = _WINDOW_PATTERN.match(entry)
+        if match is None:
+            raise ValueError(f"Ogiltigt tidsfönster '{entry.strip()}'.")
+        try:
+            days = _parse_days(match["days"])
+        except KeyError as e:
+            raise ValueError(f"Okänd veckodag {e} i '{entry.strip()}'.") from e
+        start, end = _parse_quarter(match["start"]), _parse_quarter(match["end"])
+        if end <= start:
+            raise ValueError(f"Tidsfönstret '{entry.strip()}' slutar före start.")
+        windows.append((days, start, end, float(match["fee"].replace(",", "."))))
+    return windows
+
+
+class TariffModel:
+    """Räknar om spotpris till totalkostnad inklusive avgifter, skatt och moms."""
+
+    def __init__(
+        self,
+        energy_tax_kr: float = 0.0,
+        grid_fee_kr: float = 0.0,
+        vat_percent: float = 0.0,
+        time_of_use: str | None = None,
+    ) -> None:
+        """Initialisera modellen och kompilera veckotabellen för avgiften."""
+        self.energy_tax_kr = energy_tax_kr
+        self.grid_fee_kr = grid_fee_kr
+        self.vat_factor = 1.0 + vat_percent / 100.0
+        self._weekly_grid_fee: list[float] = [grid_fee_kr] * (7 * SLOTS_PER_DAY)
+        for days, start, end, fee in parse_time_of_use_windows(time_of_use):
+            for day in days:
+                offset = day * SLOTS_PER_DAY
+                self._weekly_grid_fee[offset + start : offset + end] = [fee] * (
+                    end - start
+                )
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> "TariffModel | None":
+        """Skapar modellen från konfigurationen, eller None om tariff saknas."""
+        values = [
+            config.get(key)
+            for key in (
+                CONF_TARIFF_ENERGY_TAX,
+                CONF_TARIFF_GRID_FEE,
+                CONF_TARIFF_VAT_PERCENT,
+                CONF_TARIFF_TIME_OF_USE,
+            )
+        ]
+        if all(value in (None, "") for value in values):
+            return None
+        energy_tax, grid_fee, vat_percent, time_of_use = values
+        return cls(
+            energy_tax_kr=float(energy_tax or 0.0),
+            grid_fee_kr=float(grid_fee or 0.0),
+            vat_percent=float(vat_percent or 0.0),
+            time_of_use=time_of_use or None,
+        )
+
+    def grid_fee_at(self, moment: datetime) -> float:
+        """Överföringsavgift i kr/kWh (exkl. moms) vid tidpunkten."""
+        local = dt_util.as_local(moment)
+        quarter = (local.hour * 60 + local.minute) // 15
+        return self._weekly_grid_fee[local.weekday() * SLOTS_PER_DAY + quarter]
+
+    def total_cost(self, moment: datetime, spot_price_kr: float) -> float:
+        """Totalkostnad i kr/kWh för ett spotpris vid tidpunkten."""
+        return (
+            spot_price_kr + self.grid_fee_at(moment) + self.energy_tax_kr
+        ) * self.vat_factor
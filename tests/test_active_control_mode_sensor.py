@@ -9,7 +9,7 @@ import logging
 from datetime import timedelta
 
 from homeassistant.core import HomeAssistant
-from homeassistant.const import STATE_ON, STATE_OFF, UnitOfPower
+from homeassistant.const import STATE_ON, UnitOfPower
 from homeassistant.util import dt as dt_util
 
 from pytest_homeassistant_custom_component.common import (
@@ -103,26 +103,6 @@ async def test_active_control_mode_sensor_updates(hass: HomeAssistant, freezer):
     )
     assert coordinator is not None
 
-    # Manuell tilldelning av interna entitets-ID:n.
-    smart_switch_id_dyn = (
-        f"switch.{DOMAIN}_{entry_id_for_test}_{ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH}"
-    )
-    max_price_id_dyn = (
-        f"number.{DOMAIN}_{entry_id_for_test}_{ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER}"
-    )
-    solar_switch_id_dyn = f"switch.{DOMAIN}_{entry_id_for_test}_{ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH}"
-    solar_buffer_id_dyn = (
-        f"number.{DOMAIN}_{entry_id_for_test}_{ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER}"
-    )
-    min_solar_current_id_dyn = f"number.{DOMAIN}_{entry_id_for_test}_{ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER}"
-
-    coordinator.smart_enable_switch_entity_id = smart_switch_id_dyn
-    coordinator.max_price_entity_id = max_price_id_dyn
-    coordinator.solar_enable_switch_entity_id = solar_switch_id_dyn
-    coordinator.solar_buffer_entity_id = solar_buffer_id_dyn
-    coordinator.min_solar_charge_current_entity_id = min_solar_current_id_dyn
-    coordinator._internal_entities_resolved = True
-
     # Mocka externa sensorer och tjänsteanrop.
     hass.states.async_set(MOCK_CHARGER_MAX_LIMIT_ID, "16")
     hass.states.async_set(MOCK_MAIN_POWER_SWITCH_ID, STATE_ON)
@@ -140,10 +120,10 @@ async def test_active_control_mode_sensor_updates(hass: HomeAssistant, freezer):
     # FÖRUTSÄTTNINGAR: Laddare redo, lågt pris, maxpris högre, smart-switch PÅ, schema PÅ, sol-switch AV.
     hass.states.async_set(MOCK_STATUS_SENSOR_ID, EASEE_STATUS_READY_TO_CHARGE[0])
     hass.states.async_set(MOCK_PRICE_SENSOR_ID, "0.50")
-    hass.states.async_set(max_price_id_dyn, "1.00")
-    hass.states.async_set(smart_switch_id_dyn, STATE_ON)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 1.00)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
     hass.states.async_set(MOCK_SCHEDULE_ID, STATE_ON)
-    hass.states.async_set(solar_switch_id_dyn, STATE_OFF)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
 
     # UTFÖRANDE: Kör en uppdatering.
     await coordinator.async_refresh()
@@ -165,17 +145,17 @@ async def test_active_control_mode_sensor_updates(hass: HomeAssistant, freezer):
     # FÖRUTSÄTTNINGAR: Högt pris (för att P/T inte ska vara aktivt), sol-switch PÅ, P/T-switch AV,
     #                 god solproduktion, låg husförbrukning, buffer och minsta ström satta.
     hass.states.async_set(MOCK_PRICE_SENSOR_ID, "2.00")
-    hass.states.async_set(solar_switch_id_dyn, STATE_ON)
-    hass.states.async_set(smart_switch_id_dyn, STATE_OFF)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, False)
     hass.states.async_set(
         MOCK_SOLAR_PROD_SENSOR_ID, "7000", {"unit_of_measurement": UnitOfPower.WATT}
     )
     hass.states.async_set(
         MOCK_HOUSE_POWER_SENSOR_ID, "500", {"unit_of_measurement": UnitOfPower.WATT}
     )
-    hass.states.async_set(solar_buffer_id_dyn, "300")
-    hass.states.async_set(
-        min_solar_current_id_dyn, str(MIN_CHARGE_CURRENT_A)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER, 300)
+    coordinator.set_control_value(
+        ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER, MIN_CHARGE_CURRENT_A
     )  # Använd konstanten
     hass.states.async_set(
         MOCK_STATUS_SENSOR_ID, EASEE_STATUS_READY_TO_CHARGE[0]
@@ -198,8 +178,8 @@ async def test_active_control_mode_sensor_updates(hass: HomeAssistant, freezer):
     # SYFTE: Verifiera att sensorn visar AV när inga smarta lägen är aktiva.
     print("\nTESTSTEG 3: Verifierar AV (Manuell)-läge")
     # FÖRUTSÄTTNINGAR: Både P/T-switch och sol-switch ställs till AV.
-    hass.states.async_set(smart_switch_id_dyn, STATE_OFF)
-    hass.states.async_set(solar_switch_id_dyn, STATE_OFF)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, False)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
 
     # UTFÖRANDE: Kör en uppdatering.
     await coordinator.async_refresh()
@@ -0,0 +1,197 @@
+# tests/test_alternativkostnad.py
+"""
+Testar alternativkostnaden för solöverskott: exportersättningen nu jämförs med
+det billigaste nätpriset före avresa, och överskottet säljs när det lönar sig.
+"""
+
+import pytest
+import logging
+from unittest.mock import patch
+from datetime import datetime, time, timedelta
+
+from homeassistant.core import HomeAssistant
+from homeassistant.const import STATE_ON
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_mock_service,
+)
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_SOLAR_PRODUCTION_SENSOR,
+    CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
+    CONF_DEBUG_LOGGING,
+    CONF_EXPORT_PRICE_SENSOR,
+    CONF_DEPARTURE_TIME,
+    EASEE_STATUS_READY_TO_CHARGE,
+    CONTROL_MODE_MANUAL,
+    CONTROL_MODE_SOLAR_SURPLUS,
+    MIN_CHARGE_CURRENT_A,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+    ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER,
+    ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+from custom_components.smart_ev_charging.opportunity import (
+    OpportunityEvaluator,
+    next_departure,
+)
+from custom_components.smart_ev_charging.price_cache import PriceSeries
+
+STATUS_SENSOR_ID = "sensor.easee_status_opportunity"
+POWER_SWITCH_ID = "switch.easee_power_opportunity"
+PRICE_SENSOR_ID = "sensor.nordpool_price_opportunity"
+EXPORT_PRICE_SENSOR_ID = "sensor.export_price_opportunity"
+SOLAR_PROD_SENSOR_ID = "sensor.solar_production_opportunity"
+MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_opportunity"
+
+# Timpriser i kr/kWh från midnatt och 32 timmar framåt. Billigast före dagens
+# avresa (07:00) är timme 3, och före morgondagens avresa timme 30 (06:00).
+PRICES = [0.80] * 32
+PRICES[3] = 0.05
+PRICES[26] = 0.30
+PRICES[30] = 0.25
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+def _day_start() -> datetime:
+    """Midnatt i testets lokala tidszon."""
+    return dt_util.as_utc(
+        dt_util.start_of_local_day(datetime(2025, 6, 2, 12, 0, tzinfo=dt_util.UTC))
+    )
+
+
+def _price_attributes(day_start: datetime) -> dict:
+    return {
+        "unit_of_measurement": "SEK/kWh",
+        "raw_today": [
+            {
+                "start": day_start + timedelta(hours=i),
+                "end": day_start + timedelta(hours=i + 1),
+                "value": price,
+            }
+            for i, price in enumerate(PRICES)
+        ],
+    }
+
+
+def test_cheapest_grid_price_before_departure():
+    """
+    SYFTE: Verifiera uppslaget av billigaste nätpris före avresa och beslutet
+    att sälja överskottet, med exportpris enligt formel (spotpris * 1.0 + 0).
+    FÖRUTSÄTTNINGAR: Avresa 07:00. Prisserie enligt PRICES.
+    FÖRVÄNTAT RESULTAT: Kl. 02 är timme 3 billigast och överskottet säljs. Kl. 03
+    är intervallet självt billigast och överskottet laddas. Kl. 12 är timme 30
+    billigast och överskottet säljs med 0.55 kr/kWh i vinst. Efter avresan
+    räknas nästa dygns avresa. Besparingen integreras över tid.
+    """
+    day_start = _day_start()
+    series = PriceSeries.from_attributes(_price_attributes(day_start))
+    evaluator = OpportunityEvaluator(time(7, 0), export_factor=1.0)
+
+    assert next_departure(day_start + timedelta(hours=7), time(7, 0)) == (
+        day_start + timedelta(hours=31)
+    )
+
+    assert evaluator.should_sell_surplus(series, day_start + timedelta(hours=2))
+    assert evaluator.best_grid_start == day_start + timedelta(hours=3)
+    assert not evaluator.should_sell_surplus(series, day_start + timedelta(hours=3))
+
+    noon = day_start + timedelta(hours=12, minutes=10)
+    assert evaluator.should_sell_surplus(series, noon)
+    assert evaluator.best_grid_start == day_start + timedelta(hours=30)
+    assert evaluator.departure_utc == day_start + timedelta(hours=31)
+    assert evaluator.savings_kr_per_kwh == pytest.approx(0.55)
+
+    evaluator.record_sold_surplus(noon, 4000)
+    evaluator.record_sold_surplus(noon + timedelta(minutes=15), 0)
+    assert evaluator.projected_savings_kr == pytest.approx(0.55)
+
+    # Efter morgondagens avresa finns inget billigare intervall kvar i serien.
+    assert not evaluator.should_sell_surplus(series, day_start + timedelta(hours=31))
+    assert evaluator.best_grid_start == day_start + timedelta(hours=31)
+
+
+async def test_solar_surplus_sold_when_export_beats_grid(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att solenergiladdningen stängs av när exportpriset från
+    sensorn överstiger det billigaste nätpriset före avresa.
+    FÖRUTSÄTTNINGAR: 6000 W solöverskott kl. 12. Billigaste nätpris före
+    avresa är 0.25 kr/kWh. Exportsensorn anger först 80 öre, sedan 10 öre.
+    FÖRVÄNTAT RESULTAT: Vid 80 öre säljs överskottet och ingen laddning sker.
+    Vid 10 öre laddas bilen med solöverskottet.
+    """
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "easee_opportunity_test",
+            CONF_STATUS_SENSOR: STATUS_SENSOR_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_SOLAR_PRODUCTION_SENSOR: SOLAR_PROD_SENSOR_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_DEBUG_LOGGING: True,
+        },
+        options={
+            CONF_EXPORT_PRICE_SENSOR: EXPORT_PRICE_SENSOR_ID,
+            CONF_DEPARTURE_TIME: "07:00:00",
+        },
+        entry_id="test_opportunity_entry",
+    )
+    entry.add_to_hass(hass)
+    day_start = _day_start()
+    coordinator = SmartEVChargingCoordinator(hass, entry, 30)
+    async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    async_mock_service(hass, "easee", "action_command")
+
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_READY_TO_CHARGE[0])
+    hass.states.async_set(SOLAR_PROD_SENSOR_ID, "6000")
+    hass.states.async_set(PRICE_SENSOR_ID, "0.80", _price_attributes(day_start))
+    hass.states.async_set(
+        EXPORT_PRICE_SENSOR_ID, "80", {"unit_of_measurement": "öre/kWh"}
+    )
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, False)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 0.10)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER, 0)
+    coordinator.set_control_value(
+        ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER, MIN_CHARGE_CURRENT_A
+    )
+
+    noon = day_start + timedelta(hours=12)
+    for minutes in (0, 10):
+        with patch.object(
+            dt_util, "utcnow", return_value=noon + timedelta(minutes=minutes)
+        ):
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+    assert coordinator.active_control_mode == CONTROL_MODE_MANUAL
+    assert "Solöverskottet säljs" in coordinator.data["should_charge_reason"]
+    assert coordinator.data["opportunity_savings_kr_per_kwh"] == pytest.approx(0.55)
+    # 6 kW i 10 minuter = 1 kWh, med 0.55 kr i vinst per kWh.
+    assert coordinator.data["opportunity_projected_savings_kr"] == pytest.approx(
+        0.55
+    )
+
+    hass.states.async_set(
+        EXPORT_PRICE_SENSOR_ID, "10", {"unit_of_measurement": "öre/kWh"}
+    )
+    with patch.object(dt_util, "utcnow", return_value=noon + timedelta(minutes=20)):
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+    assert coordinator.active_control_mode == CONTROL_MODE_SOLAR_SURPLUS
+    assert coordinator.data["opportunity_sell_surplus"] is False
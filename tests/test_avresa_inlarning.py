@@ -0,0 +1,227 @@
+# tests/test_avresa_inlarning.py
+"""
+Testar den inlärda avresetiden: urkopplingar registreras per veckodag, den
+förväntade avresan är en försiktig kvantil av historiken och en override-entitet
+har företräde. Andra laddares status översätts innan urkopplingen känns igen.
+"""
+
+import pytest
+import logging
+from unittest.mock import patch
+from datetime import date, datetime, time, timedelta
+
+from homeassistant.core import HomeAssistant
+from homeassistant.const import STATE_ON
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_mock_service,
+)
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
+    CONF_DEBUG_LOGGING,
+    CONF_DEPARTURE_TIME,
+    CONF_DEPARTURE_OVERRIDE_ENTITY,
+    EASEE_STATUS_CHARGING,
+    EASEE_STATUS_DISCONNECTED,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+from custom_components.smart_ev_charging.charger_backend import GenericEntityBackend
+from custom_components.smart_ev_charging.circuit_breaker import ServiceCallRunner
+from custom_components.smart_ev_charging.departure import (
+    BINS,
+    DepartureLearner,
+    SOURCE_CONFIGURED,
+    SOURCE_LEARNED,
+    SOURCE_OVERRIDE,
+)
+
+STATUS_SENSOR_ID = "sensor.easee_status_departure"
+POWER_SWITCH_ID = "switch.easee_power_departure"
+PRICE_SENSOR_ID = "sensor.nordpool_price_departure"
+MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_departure"
+OVERRIDE_ENTITY_ID = "input_datetime.departure_override"
+
+# En måndag.
+MONDAY = date(2025, 6, 2)
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+def _local(day: date, hour: int, minute: int = 0) -> datetime:
+    """Lokal tidpunkt i testets tidszon, i UTC."""
+    return dt_util.as_utc(
+        datetime.combine(day, time(hour, minute), tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    )
+
+
+async def test_learned_departure_per_weekday(hass: HomeAssistant, hass_storage):
+    """
+    SYFTE: Verifiera histogrammet per veckodag, den försiktiga kvantilen,
+    nedskrivningen av gamla avresor, override och att tabellen sparas.
+    FÖRUTSÄTTNINGAR: Måndagsavresor 07:40, 07:40, 06:50 och 07:40. Därefter
+    20 måndagar till med avresa 07:40. Konfigurerad avresetid 07:00.
+    FÖRVÄNTAT RESULTAT: Efter två avresor räcker inte historiken. Efter fyra är
+    den förväntade avresan 06:45 (kvarten med den tidiga avresan), och tisdagar
+    använder den konfigurerade tiden. När den tidiga avresan har skrivits ned
+    blir den förväntade avresan 07:30. En override-tid har företräde.
+    """
+    learner = DepartureLearner(hass, "test_departure_entry", STATUS_SENSOR_ID, time(7))
+
+    assert learner.record_departure(_local(MONDAY, 7, 40))
+    assert learner.record_departure(_local(MONDAY + timedelta(days=7), 7, 40))
+    assert learner.learned(MONDAY.weekday()) is None
+    assert learner.record_departure(_local(MONDAY + timedelta(days=14), 6, 50))
+    assert learner.record_departure(_local(MONDAY + timedelta(days=21), 7, 40))
+    # Bara dygnets första urkoppling är en avresa.
+    assert not learner.record_departure(_local(MONDAY + timedelta(days=21), 18))
+    assert learner.learned(MONDAY.weekday()) == time(6, 45)
+
+    next_monday = MONDAY + timedelta(days=28)
+    assert learner.next_departure(_local(next_monday, 5)) == (
+        _local(next_monday, 6, 45),
+        SOURCE_LEARNED,
+    )
+    assert learner.next_departure(_local(next_monday, 8)) == (
+        _local(next_monday + timedelta(days=1), 7),
+        SOURCE_CONFIGURED,
+    )
+
+    for week in range(4, 24):
+        learner.record_departure(_local(MONDAY + timedelta(weeks=week), 7, 40))
+    assert learner.learned(MONDAY.weekday()) == time(7, 30)
+    assert len(learner.histogram) == 7
+    assert all(len(row) == BINS for row in learner.histogram)
+
+    learner.set_override(time(6, 0))
+    assert learner.next_departure(_local(next_monday, 5)) == (
+        _local(next_monday, 6),
+        SOURCE_OVERRIDE,
+    )
+    learner.set_override(_local(next_monday, 9))
+    assert learner.next_departure(_local(next_monday, 5)) == (
+        _local(next_monday, 9),
+        SOURCE_OVERRIDE,
+    )
+
+    await learner.async_save()
+    assert f"{DOMAIN}.test_departure_entry.departures" in hass_storage
+    restored = DepartureLearner(
+        hass, "test_departure_entry", STATUS_SENSOR_ID, time(7)
+    )
+    await restored.async_load()
+    assert restored.learned(MONDAY.weekday()) == time(7, 30)
+    assert restored.last_recorded_day == learner.last_recorded_day
+
+
+async def test_departure_recorded_on_disconnect(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att en urkoppling registreras från laddarens status och att
+    avresan visas i koordinatorns data, med override-entiteten före den
+    konfigurerade tiden.
+    FÖRUTSÄTTNINGAR: Status går från laddar till frånkopplad. Därefter blir
+    statusen otillgänglig och frånkopplad igen. Avresetid 07:00.
+    FÖRVÄNTAT RESULTAT: En avresa registreras. Utan historik och override är
+    källan den konfigurerade tiden. Med override-tiden 06:15 är källan override.
+    """
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "easee_departure_test",
+            CONF_STATUS_SENSOR: STATUS_SENSOR_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_DEBUG_LOGGING: True,
+        },
+        options={
+            CONF_DEPARTURE_TIME: "07:00:00",
+            CONF_DEPARTURE_OVERRIDE_ENTITY: OVERRIDE_ENTITY_ID,
+        },
+        entry_id="test_departure_entry",
+    )
+    entry.add_to_hass(hass)
+    coordinator = SmartEVChargingCoordinator(hass, entry, 30)
+    learner = coordinator.departure_learner
+    assert learner is not None
+    await coordinator.async_load_persisted_state()
+    async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    async_mock_service(hass, "easee", "action_command")
+
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(PRICE_SENSOR_ID, "0.10")
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_CHARGING)
+    await hass.async_block_till_done()
+    assert learner.last_recorded_day is None
+
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_DISCONNECTED[0])
+    await hass.async_block_till_done()
+    assert learner.last_recorded_day == dt_util.as_local(dt_util.utcnow()).date()
+    assert sum(map(sum, learner.histogram)) == pytest.approx(1.0)
+
+    hass.states.async_set(STATUS_SENSOR_ID, "unavailable")
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_DISCONNECTED[0])
+    await hass.async_block_till_done()
+    assert sum(map(sum, learner.histogram)) == pytest.approx(1.0)
+
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 0.50)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
+    now = _local(MONDAY, 5)
+    with patch.object(dt_util, "utcnow", return_value=now):
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+    assert coordinator.data["departure_source"] == SOURCE_CONFIGURED
+    assert coordinator.data["departure_expected"] == _local(MONDAY, 7).isoformat()
+
+    hass.states.async_set(OVERRIDE_ENTITY_ID, "06:15:00")
+    with patch.object(dt_util, "utcnow", return_value=now):
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+    assert coordinator.data["departure_source"] == SOURCE_OVERRIDE
+    assert coordinator.data["departure_expected"] == _local(MONDAY, 6, 15).isoformat()
+    await coordinator.cleanup()
+
+
+async def test_departure_from_mapped_status(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att urkopplingen känns igen från en annan laddares status.
+    FÖRUTSÄTTNINGAR: Generisk laddare med OCPP:s statusvärden. Statusen går
+    från 'Charging' till 'Available'.
+    FÖRVÄNTAT RESULTAT: 'Available' översätts till frånkopplad och en avresa
+    registreras. Från 'Faulted' till 'Available' registreras ingen ny avresa
+    samma dygn.
+    """
+    backend = GenericEntityBackend(ServiceCallRunner(hass), None, None)
+    learner = DepartureLearner(
+        hass,
+        "test_departure_mapped_entry",
+        "sensor.ocpp_status",
+        time(7),
+        map_status=backend.map_status,
+    )
+    learner.async_start()
+    hass.states.async_set("sensor.ocpp_status", "Charging")
+    hass.states.async_set("sensor.ocpp_status", "Available")
+    await hass.async_block_till_done()
+    assert learner.last_recorded_day == dt_util.as_local(dt_util.utcnow()).date()
+
+    hass.states.async_set("sensor.ocpp_status", "Faulted")
+    hass.states.async_set("sensor.ocpp_status", "Available")
+    await hass.async_block_till_done()
+    assert sum(map(sum, learner.histogram)) == pytest.approx(1.0)
+    learner.async_stop()
@@ -10,7 +10,6 @@ import logging
 from homeassistant.core import HomeAssistant
 from homeassistant.const import (
     STATE_ON,
-    STATE_OFF,
     STATE_UNAVAILABLE,
 )  # STATE_UNAVAILABLE används
 # from homeassistant.config_entries import ConfigEntryState # Tas bort om ej använd
@@ -38,8 +37,6 @@ from custom_components.smart_ev_charging.const import (
     ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
     ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
     ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
-    ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER,
-    ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER,
     CONTROL_MODE_PRICE_TIME,
     CONTROL_MODE_MANUAL,
 )
@@ -84,22 +81,10 @@ async def setup_coordinator_conn_override(hass: HomeAssistant):
     ]
     assert coordinator is not None
 
-    coordinator.smart_enable_switch_entity_id = (
-        f"switch.{DOMAIN}_{entry.entry_id}_{ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH}"
-    )
-    coordinator.max_price_entity_id = (
-        f"number.{DOMAIN}_{entry.entry_id}_{ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER}"
-    )
-    coordinator.solar_enable_switch_entity_id = f"switch.{DOMAIN}_{entry.entry_id}_{ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH}"
-    coordinator.solar_buffer_entity_id = (
-        f"number.{DOMAIN}_{entry.entry_id}_{ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER}"
-    )
-    coordinator.min_solar_charge_current_entity_id = f"number.{DOMAIN}_{entry.entry_id}_{ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER}"
-    coordinator._internal_entities_resolved = True
 
-    hass.states.async_set(coordinator.smart_enable_switch_entity_id, STATE_ON)
-    hass.states.async_set(coordinator.max_price_entity_id, "0.50")
-    hass.states.async_set(coordinator.solar_enable_switch_entity_id, STATE_OFF)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 0.50)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
 
     return coordinator
 
@@ -42,8 +42,6 @@ from custom_components.smart_ev_charging.const import (
     ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
     ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
     ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
-    ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER,
-    ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER,
 )
 from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
 
@@ -80,24 +78,10 @@ async def setup_coordinator(hass: HomeAssistant):
     await hass.async_block_till_done()
 
     coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
-    coordinator.smart_enable_switch_entity_id = (
-        f"switch.{DOMAIN}_{entry_id}_{ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH}"
-    )
-    coordinator.max_price_entity_id = (
-        f"number.{DOMAIN}_{entry_id}_{ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER}"
-    )
-    coordinator.solar_enable_switch_entity_id = (
-        f"switch.{DOMAIN}_{entry_id}_{ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH}"
-    )
-    coordinator.solar_buffer_entity_id = (
-        f"number.{DOMAIN}_{entry_id}_{ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER}"
-    )
-    coordinator.min_solar_charge_current_entity_id = f"number.{DOMAIN}_{entry_id}_{ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER}"
-    coordinator._internal_entities_resolved = True
 
-    hass.states.async_set(coordinator.smart_enable_switch_entity_id, STATE_ON)
-    hass.states.async_set(coordinator.max_price_entity_id, "1.0")
-    hass.states.async_set(coordinator.solar_enable_switch_entity_id, STATE_OFF)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 1.0)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
     hass.states.async_set("sensor.charger_max_current_coord_test", "16")
     return coordinator
 
@@ -128,26 +112,12 @@ async def setup_coordinator_with_soc(hass: HomeAssistant):
     await hass.async_block_till_done()
 
     coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
-    coordinator.smart_enable_switch_entity_id = (
-        f"switch.{DOMAIN}_{entry_id}_{ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH}"
-    )
-    coordinator.max_price_entity_id = (
-        f"number.{DOMAIN}_{entry_id}_{ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER}"
-    )
-    coordinator.solar_enable_switch_entity_id = (
-        f"switch.{DOMAIN}_{entry_id}_{ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH}"
-    )
-    coordinator.solar_buffer_entity_id = (
-        f"number.{DOMAIN}_{entry_id}_{ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER}"
-    )
-    coordinator.min_solar_charge_current_entity_id = f"number.{DOMAIN}_{entry_id}_{ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER}"
-    coordinator._internal_entities_resolved = True
 
-    hass.states.async_set(coordinator.smart_enable_switch_entity_id, STATE_ON)
-    hass.states.async_set(
-        coordinator.max_price_entity_id, "1.0"
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(
+        ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 1.0
     )  # Maxpris satt i fixturen
-    hass.states.async_set(coordinator.solar_enable_switch_entity_id, STATE_OFF)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
     hass.states.async_set("sensor.charger_max_current_soc_test", "16")
     return coordinator
 
@@ -349,9 +319,10 @@ async def test_full_day_price_time_simulation(
     start_time = dt_util.now().replace(hour=0, minute=0, second=0, microsecond=0)
     freezer.move_to(start_time)
 
-    max_price_state = hass.states.get(coordinator.max_price_entity_id)
-    assert max_price_state is not None
-    max_price_from_entity = float(max_price_state.state)
+    max_price_from_entity = coordinator.control_values[
+        ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER
+    ]
+    assert max_price_from_entity is not None
 
     for hour in range(24):
         current_time = start_time + timedelta(hours=hour)
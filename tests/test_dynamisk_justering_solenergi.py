@@ -16,7 +16,7 @@ from pytest_homeassistant_custom_component.common import (
 )
 
 from homeassistant.core import HomeAssistant
-from homeassistant.const import STATE_ON, STATE_OFF
+from homeassistant.const import STATE_ON
 from homeassistant.util.dt import (
     UTC,
     as_utc,
@@ -35,7 +35,10 @@ from custom_components.smart_ev_charging.const import (
     EASEE_STATUS_CHARGING,  # Lade till denna för att använda i testet
     EASEE_SERVICE_SET_DYNAMIC_CURRENT,
     SOLAR_SURPLUS_DELAY_SECONDS,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
     ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER,
+    ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER,
 )
 from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
 
@@ -45,10 +48,6 @@ MOCK_HOUSE_POWER_SENSOR_ID = "sensor.test_house_power_dynamic_solar"
 MOCK_STATUS_SENSOR_ID = "sensor.test_charger_status_dynamic_solar"
 MOCK_MAIN_POWER_SWITCH_ID_SOLAR = "switch.mock_charger_power_dynamic_solar"
 
-ACTUAL_SOLAR_BUFFER_ID = (
-    f"number.{DOMAIN}_test_dynamic_solar_entry_{ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER}"
-)
-
 MOCK_CONFIG_SOLAR_DATA = {
     CONF_CHARGER_DEVICE: "mock_device_dynamic_solar",
     CONF_STATUS_SENSOR: MOCK_STATUS_SENSOR_ID,
@@ -75,28 +74,11 @@ async def setup_solar_charging_test(hass: HomeAssistant):
         "coordinator"
     ]
     assert coordinator is not None
-    from custom_components.smart_ev_charging.const import (
-        ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
-        ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
-        ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
-        ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER,
-    )
 
-    coordinator.smart_enable_switch_entity_id = (
-        f"switch.{DOMAIN}_{entry.entry_id}_{ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH}"
-    )
-    coordinator.max_price_entity_id = (
-        f"number.{DOMAIN}_{entry.entry_id}_{ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER}"
-    )
-    coordinator.solar_enable_switch_entity_id = f"switch.{DOMAIN}_{entry.entry_id}_{ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH}"
-    coordinator.solar_buffer_entity_id = ACTUAL_SOLAR_BUFFER_ID
-    coordinator.min_solar_charge_current_entity_id = f"number.{DOMAIN}_{entry.entry_id}_{ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER}"
-    coordinator._internal_entities_resolved = True
-
-    hass.states.async_set(coordinator.solar_enable_switch_entity_id, STATE_ON)
-    hass.states.async_set(coordinator.smart_enable_switch_entity_id, STATE_OFF)
-    hass.states.async_set(ACTUAL_SOLAR_BUFFER_ID, "500")
-    hass.states.async_set(coordinator.min_solar_charge_current_entity_id, "6")
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, False)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER, 500)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER, 6)
     return coordinator
 
 
@@ -118,7 +100,7 @@ async def test_dynamic_current_adjustment_for_solar_charging(
         - Steg 1: Ett stort solöverskott skapas.
             - Solproduktion: 7000 W
             - Husförbrukning: 500 W
-            - Buffert: 500 W (inställt i testet via ACTUAL_SOLAR_BUFFER_ID)
+            - Buffert: 500 W (inställt i testet via koordinatorns styrvärden)
             - Förväntat överskott för laddning: 7000-500-500 = 6000 W.
             - Förväntad ström: floor(6000W / 690) = 8 A.
         - Steg 2: Husets förbrukning ökar, vilket minskar överskottet.
@@ -177,7 +159,7 @@ async def test_dynamic_current_adjustment_for_solar_charging(
 
     # --- ARRANGE & ACT - Steg 3: Buffert ändras ---
     hass.states.async_set(MOCK_STATUS_SENSOR_ID, EASEE_STATUS_CHARGING)
-    hass.states.async_set(ACTUAL_SOLAR_BUFFER_ID, "1500")
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER, 1500)
 
     await coordinator.async_refresh()
     await hass.async_block_till_done()
@@ -0,0 +1,182 @@
+# tests/test_effekttoppsbegransning.py
+"""
+Testar effekttoppsbegränsningen: registrering av månadens timtoppar,
+begränsning av laddströmmen i innevarande timme och sparat tillstånd.
+"""
+
+import pytest
+import logging
+from unittest.mock import patch
+from datetime import datetime, timedelta, timezone
+
+from homeassistant.core import HomeAssistant
+from homeassistant.const import STATE_ON
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_mock_service,
+)
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_HOUSE_POWER_SENSOR,
+    CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
+    CONF_CHARGER_DYNAMIC_CURRENT_SENSOR,
+    CONF_DEBUG_LOGGING,
+    CONF_PEAK_SHAVING_ENABLED,
+    CONF_PEAK_SHAVING_TOP_N,
+    CONF_PEAK_SHAVING_CEILING_KW,
+    EASEE_STATUS_READY_TO_CHARGE,
+    CONTROL_MODE_PRICE_TIME,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+from custom_components.smart_ev_charging.peak_shaving import PeakShavingTracker
+
+STATUS_SENSOR_ID = "sensor.easee_status_peak"
+POWER_SWITCH_ID = "switch.easee_power_peak"
+PRICE_SENSOR_ID = "sensor.nordpool_price_peak"
+HOUSE_POWER_SENSOR_ID = "sensor.house_power_peak"
+MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_peak"
+DYN_CURRENT_SENSOR_ID = "sensor.charger_dynamic_current_peak"
+
+START_TIME_UTC = datetime(2025, 6, 1, 10, 0, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+def _feed_hours(tracker: PeakShavingTracker, start: datetime, powers_w: list[float]):
+    """Matar spåraren med konstant effekt under en timme per värde i listan."""
+    for hour, power_w in enumerate(powers_w):
+        for minute in range(0, 60, 5):
+            tracker.add_sample(start + timedelta(hours=hour, minutes=minute), power_w)
+    tracker.add_sample(start + timedelta(hours=len(powers_w)), 0.0)
+
+
+async def _create_coordinator(
+    hass: HomeAssistant, ceiling_kw: float | None
+) -> SmartEVChargingCoordinator:
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "easee_peak_test",
+            CONF_STATUS_SENSOR: STATUS_SENSOR_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_HOUSE_POWER_SENSOR: HOUSE_POWER_SENSOR_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_CHARGER_DYNAMIC_CURRENT_SENSOR: DYN_CURRENT_SENSOR_ID,
+        },
+        options={
+            CONF_DEBUG_LOGGING: True,
+            CONF_PEAK_SHAVING_ENABLED: True,
+            CONF_PEAK_SHAVING_TOP_N: 3,
+            CONF_PEAK_SHAVING_CEILING_KW: ceiling_kw,
+        },
+        entry_id="test_peak_entry",
+    )
+    entry.add_to_hass(hass)
+
+    coordinator = SmartEVChargingCoordinator(hass, entry, 30)
+
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(DYN_CURRENT_SENSOR_ID, "0")
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_READY_TO_CHARGE[0])
+    hass.states.async_set(PRICE_SENSOR_ID, "0.40")
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 1.00)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
+    return coordinator
+
+
+def test_tracker_keeps_top_n_hours_and_resets_on_new_month(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att spåraren håller månadens N högsta timmedeleffekter,
+    att tröskeln är den N:te toppen och att topparna nollställs vid månadsskifte.
+    """
+    tracker = PeakShavingTracker(hass, "test_tracker", top_n=3)
+    assert tracker.threshold_w is None
+
+    _feed_hours(tracker, START_TIME_UTC, [2000, 5000, 1000, 4000, 3000])
+
+    assert tracker.peaks_w == pytest.approx([5000, 4000, 3000])
+    assert tracker.threshold_w == pytest.approx(3000)
+
+    # Ny månad: topparna nollställs och ingen tröskel finns förrän N timmar registrerats.
+    tracker.add_sample(datetime(2025, 7, 1, 12, 0, 0, tzinfo=timezone.utc), 1000)
+    assert tracker.peaks_w == []
+    assert tracker.threshold_w is None
+
+
+async def test_price_time_current_limited_by_peak_ceiling(hass: HomeAssistant):
+    """
+    SYFTE: Pris/Tid-laddning ska begränsas så att timmens medeleffekt ryms
+    under effekttaket.
+    FÖRUTSÄTTNINGAR: Effekttak 6 kW, husets effekt 1000 W i början av timmen.
+    FÖRVÄNTAT RESULTAT: (6000 - 1000) W / 690 V = 7A i stället för HW max 16A,
+    och startkommandot skickas.
+    """
+    coordinator = await _create_coordinator(hass, ceiling_kw=6)
+    set_current_calls = async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    action_command_calls = async_mock_service(hass, "easee", "action_command")
+    hass.states.async_set(
+        HOUSE_POWER_SENSOR_ID, "1000", {"unit_of_measurement": "W"}
+    )
+
+    with patch.object(dt_util, "utcnow", return_value=START_TIME_UTC):
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+    assert coordinator.active_control_mode == CONTROL_MODE_PRICE_TIME
+    assert coordinator.target_charge_current_a == 7
+    assert set_current_calls[-1].data["current"] == 7
+    assert len(action_command_calls) == 1
+    assert coordinator.data["peak_shaving_threshold_w"] == 6000
+    assert coordinator.data["peak_shaving_max_charging_power_w"] == 5000
+
+
+async def test_charging_paused_when_budget_below_minimum_current(
+    hass: HomeAssistant,
+):
+    """
+    SYFTE: Ryms inte minimiströmmen inom effekttaket ska laddningen pausas med 0A
+    och inget startkommando skickas.
+    """
+    coordinator = await _create_coordinator(hass, ceiling_kw=3)
+    set_current_calls = async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    action_command_calls = async_mock_service(hass, "easee", "action_command")
+    hass.states.async_set(HOUSE_POWER_SENSOR_ID, "2", {"unit_of_measurement": "kW"})
+
+    with patch.object(dt_util, "utcnow", return_value=START_TIME_UTC):
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+    assert coordinator.target_charge_current_a == 0
+    assert set_current_calls[-1].data["current"] == 0
+    assert len(action_command_calls) == 0
+
+
+async def test_peaks_survive_restart(hass: HomeAssistant, hass_storage):
+    """
+    SYFTE: Månadens toppar ska sparas på disk och läsas in igen efter omstart.
+    """
+    tracker = PeakShavingTracker(hass, "test_persist", top_n=2)
+    _feed_hours(tracker, START_TIME_UTC, [1500, 2500, 500])
+    await tracker.async_save()
+
+    restored = PeakShavingTracker(hass, "test_persist", top_n=2)
+    await restored.async_load()
+
+    assert restored.peaks_w == pytest.approx([2500, 1500])
+    assert restored.threshold_w == pytest.approx(1500)
@@ -0,0 +1,252 @@
+# tests/test_elmatare_hogfrekvent.py
+"""
+Testar inläsningen av den högfrekventa elmätaren: glidande medel och max i
+ringbufferten, P1-telegram, underlag i kontrollerad takt till koordinatorn och
+att 10 Hz per fas klaras med konstant minne.
+"""
+
+import logging
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from homeassistant.core import Context, HomeAssistant
+from homeassistant.const import UnitOfPower
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_HOUSE_POWER_SENSOR,
+    CONF_METER_INGEST,
+    CONF_METER_PHASE_SENSORS,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+from custom_components.smart_ev_charging.meter_ingest import (
+    MeterIngest,
+    WindowedRing,
+    parse_p1_telegram,
+)
+
+HOUSE_POWER_ID = "sensor.han_power"
+PHASE_IDS = ["sensor.han_current_l1", "sensor.han_current_l2", "sensor.han_power_l3"]
+
+START = datetime(2025, 6, 2, 12, 0, tzinfo=dt_util.UTC)
+
+TELEGRAM = """/ELL5\\253833635_A
+
+0-0:1.0.0(250602120000S)
+1-0:1.8.0(00006678.394*kWh)
+1-0:1.7.0(0003.450*kW)
+1-0:2.7.0(0000.250*kW)
+1-0:21.7.0(0002.300*kW)
+1-0:41.7.0(0000.690*kW)
+1-0:62.7.0(0000.100*kW)
+1-0:61.7.0(0000.560*kW)
+1-0:31.7.0(010.1*A)
+1-0:51.7.0(003.0*A)
+1-0:71.7.0(002.0*A)
+!7945
+"""
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+def test_ring_matches_full_recalculation():
+    """
+    SYFTE: Verifiera att det inkrementella medlet och max stämmer.
+    FÖRUTSÄTTNINGAR: Slumpvisa värden med ojämna tidssteg i ett 5 s-fönster, och
+    en buffert som rymmer 20 värden.
+    FÖRVÄNTAT RESULTAT: Medel och max är desamma som en omräkning av värdena i
+    fönstret efter varje nytt värde. När bufferten är full faller det äldsta
+    värdet bort.
+    """
+    rng = random.Random(4)
+    ring = WindowedRing(capacity=20, window_s=5.0)
+    samples: list[tuple[float, float]] = []
+    now = 0.0
+    for _ in range(2000):
+        now += rng.choice((0.05, 0.3, 1.0, 2.5))
+        value = rng.uniform(-3000.0, 11000.0)
+        ring.add(now, value)
+        samples.append((now, value))
+        window = [v for t, v in samples if t >= now - 5.0][-20:]
+        assert len(ring) == len(window)
+        assert ring.mean() == pytest.approx(sum(window) / len(window), abs=1e-6)
+        assert ring.max() == max(window)
+
+    ring.expire(now + 10.0)
+    assert len(ring) == 0 and ring.mean() is None and ring.max() is None
+
+
+def test_p1_telegram(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera tolkningen av ett P1-telegram.
+    FÖRUTSÄTTNINGAR: Telegrammet har import och export totalt och per fas samt
+    ström per fas.
+    FÖRVÄNTAT RESULTAT: Nettoeffekten är import minus export. Fasströmmen räknas
+    från fasens nettoeffekt när den finns.
+    """
+    values = parse_p1_telegram(TELEGRAM)
+    assert values["1-0:1.7.0"] == 3.45
+    assert values["1-0:31.7.0"] == 10.1
+    assert "0-0:1.0.0" not in values
+
+    ingest = MeterIngest(hass, None, [])
+    ingest.add_telegram(TELEGRAM, 0.0)
+    snapshot = ingest.snapshot(0.0)
+    assert snapshot["house_power_mean_w"] == 3200
+    assert snapshot["phase_current_max_a"] == [10.0, 3.0, 2.0]
+
+
+async def test_state_events_are_downsampled(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att sensorvärden i hög takt ger underlag i kontrollerad
+    takt och att koordinatorn bara omvärderar vid märkbar ändring.
+    FÖRUTSÄTTNINGAR: Hussensorn (kW) och tre fassensorer (A, A och W)
+    uppdateras 10 gånger per sekund i 12 s. Efter 20 s slås värmepumpen på
+    L1 på och syns i nästa underlag.
+    FÖRVÄNTAT RESULTAT: Underlaget lämnas var femte sekund. Husets effekt är
+    medlet i fönstret och L3 räknas om till ström. Små variationer ger ingen
+    omvärdering, men värmepumpen gör det. Elmätarens sensorer ger ingen
+    omvärdering per värde, inte heller när den periodiska uppdateringen är
+    pausad.
+    """
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "easee_meter_test",
+            CONF_STATUS_SENSOR: "sensor.charger_status_meter",
+            CONF_CHARGER_ENABLED_SWITCH_ID: "switch.charger_power_meter",
+            CONF_PRICE_SENSOR: "sensor.price_meter",
+            CONF_HOUSE_POWER_SENSOR: HOUSE_POWER_ID,
+            CONF_METER_INGEST: True,
+            CONF_METER_PHASE_SENSORS: PHASE_IDS,
+        },
+        entry_id="test_meter_entry",
+    )
+    entry.add_to_hass(hass)
+    coordinator = SmartEVChargingCoordinator(hass, entry, 30)
+    ingest = coordinator.meter_ingest
+    snapshots: list[dict] = []
+    ingest.async_add_listener(snapshots.append)
+    await coordinator.async_load_persisted_state()
+    # Koordinatorn väcks annars av bevakade entiteter när den inte uppdateras.
+    coordinator.update_interval = None
+
+    def publish(seconds: float, house_kw: float, l1_a: float, l3_w: int) -> None:
+        with patch.object(
+            dt_util, "utcnow", return_value=START + timedelta(seconds=seconds)
+        ):
+            hass.states.async_set(
+                HOUSE_POWER_ID,
+                str(house_kw),
+                {"unit_of_measurement": UnitOfPower.KILO_WATT},
+                context=Context(),
+            )
+            hass.states.async_set(
+                PHASE_IDS[0], str(l1_a), {"unit_of_measurement": "A"}, context=Context()
+            )
+            hass.states.async_set(
+                PHASE_IDS[1],
+                str(l1_a - 4),
+                {"unit_of_measurement": "A"},
+                context=Context(),
+            )
+            hass.states.async_set(
+                PHASE_IDS[2],
+                str(l3_w),
+                {"unit_of_measurement": UnitOfPower.WATT},
+                context=Context(),
+            )
+
+    request_refresh = AsyncMock()
+    try:
+        with patch.object(coordinator, "async_request_refresh", request_refresh):
+            for tick in range(120):
+                odd = tick % 2
+                publish(tick / 10, 2.0 + odd * 0.1, 8.0 + odd * 0.5, 460 - odd * 230)
+            await hass.async_block_till_done()
+            assert len(snapshots) == 3
+            assert ingest.samples == 480
+            assert snapshots[-1]["meter_samples_per_second"] == pytest.approx(40, 0.1)
+            assert snapshots[-1]["phase_current_max_a"] == [8.5, 4.5, 2.0]
+
+            now = START + timedelta(seconds=11.9)
+            with patch.object(dt_util, "utcnow", return_value=now):
+                house_w = await coordinator._get_power_value(CONF_HOUSE_POWER_SENSOR)
+            assert house_w == pytest.approx(2050.0)
+            assert ingest.phase_currents_a(now) == [8.5, 4.5, 2.0]
+            # Utvärderingen bygger på det senaste underlaget.
+            coordinator._meter_evaluated = coordinator._meter_snapshot
+            request_refresh.assert_not_called()
+
+            publish(15.0, 2.0, 8.0, 460)
+            await hass.async_block_till_done()
+            request_refresh.assert_not_called()
+
+            publish(20.0, 5.0, 21.0, 460)
+            publish(25.0, 5.0, 21.5, 460)
+            await hass.async_block_till_done()
+            request_refresh.assert_called_once()
+            assert coordinator._meter_snapshot["phase_current_max_a"][0] == 21.5
+    finally:
+        await coordinator.cleanup()
+
+
+def test_sustains_10_hz_per_phase_with_flat_memory(hass: HomeAssistant):
+    """
+    SYFTE: Belastningstest av inläsningen.
+    FÖRUTSÄTTNINGAR: Total effekt och tre faser med 10 värden per sekund var,
+    under en simulerad timme (144 000 värden).
+    FÖRVÄNTAT RESULTAT: Buffertarna växer inte och minnet är konstant efter
+    den första minuten. Inläsningen klarar långt mer än realtid.
+    """
+    ingest = MeterIngest(hass, HOUSE_POWER_ID, PHASE_IDS)
+    emitted: list[dict] = []
+
+    def keep_latest(snapshot: dict) -> None:
+        nonlocal emit_count
+        emit_count += 1
+        emitted[:] = [snapshot]
+
+    emit_count = 0
+    ingest.async_add_listener(keep_latest)
+    buffer_sizes = [ring._values.buffer_info()[1] for ring in ingest.phases]
+
+    def feed(start_tick: int, ticks: int) -> None:
+        for tick in range(start_tick, start_tick + ticks):
+            timestamp = tick / 10
+            ingest.add_power(timestamp, 3000.0 + tick % 50)
+            for phase in range(3):
+                ingest.add_phase_current(phase, timestamp, 5.0 + phase + tick % 7)
+
+    feed(0, 600)
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    feed(600, 35400)
+    elapsed = time.perf_counter() - started
+    growth = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    assert ingest.samples == 144000
+    assert [ring._values.buffer_info()[1] for ring in ingest.phases] == buffer_sizes
+    assert len(ingest.total) == 301
+    assert growth < 50_000
+    assert emit_count == 720
+    assert emitted[-1]["phase_current_max_a"] == [11.0, 12.0, 13.0]
+    # Simulerad timme på långt under en minut.
+    assert elapsed < 60
@@ -0,0 +1,242 @@
+# tests/test_fasbalansering.py
+"""
+Testar fasbalanseringen mot huvudsäkringen: gränsen efter den mest belastade
+fasen med flera laddare, tilldelning av fas för 1-fasbilar och begränsningen
+av målströmmen i koordinatorn.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from homeassistant.core import Context, HomeAssistant
+from homeassistant.const import STATE_ON
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
+    CONF_CHARGER_DYNAMIC_CURRENT_SENSOR,
+    CONF_METER_INGEST,
+    CONF_METER_PHASE_SENSORS,
+    CONF_MAIN_FUSE_A,
+    CONF_CHARGER_PHASE_MAPPING,
+    CONF_EV_CHARGING_PHASES,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+from custom_components.smart_ev_charging.charger_backend import FakeChargerBackend
+from custom_components.smart_ev_charging.phase_balancer import (
+    PHASE_BALANCER,
+    ChargerPhases,
+    PhaseBalancer,
+    parse_phase_mapping,
+)
+
+STATUS_SENSOR_ID = "sensor.charger_status_phase"
+POWER_SWITCH_ID = "switch.charger_power_phase"
+PRICE_SENSOR_ID = "sensor.nordpool_price_phase"
+MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_phase"
+DYNAMIC_CURRENT_SENSOR_ID = "sensor.charger_dynamic_current_phase"
+PHASE_IDS = ["sensor.han_current_l1", "sensor.han_current_l2", "sensor.han_current_l3"]
+
+START = datetime(2025, 6, 2, 1, 0, tzinfo=dt_util.UTC)
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+def _at(seconds: float) -> datetime:
+    return START + timedelta(seconds=seconds)
+
+
+def test_limit_follows_most_loaded_phase():
+    """
+    SYFTE: Verifiera gränsen per fas med två laddare på samma säkring.
+    FÖRUTSÄTTNINGAR: Huvudsäkring 35 A. Laddare A laddar en 3-fasbil med 10 A.
+    Laddare B är kopplad L2,L3,L1 och laddar en 1-fasbil med 16 A på L2.
+    Elmätaren visar 30, 40 och 15 A.
+    FÖRVÄNTAT RESULTAT: Husets last är mätvärdet minus laddarna. Varje laddare
+    begränsas av den mest belastade av sina faser, räknat med huset och den
+    andra laddaren.
+    """
+    assert parse_phase_mapping(" l2, L3 ,L1") == (1, 2, 0)
+    for invalid in ("", "L4", "L1,L1", "L1,L2,L3,L1"):
+        with pytest.raises(ValueError):
+            parse_phase_mapping(invalid)
+
+    balancer = PhaseBalancer()
+    three_phase = ChargerPhases("a", 35.0)
+    one_phase = ChargerPhases("b", 35.0, parse_phase_mapping("L2,L3,L1"), 1)
+    three_phase.draw_a, one_phase.draw_a = 10.0, 16.0
+    balancer.add(three_phase)
+    balancer.add(one_phase)
+    measured = [30.0, 40.0, 15.0]
+
+    assert one_phase.phases == (1,)
+    assert balancer.house_loads_a(measured) == [20.0, 14.0, 5.0]
+    assert balancer.loads_a(three_phase, measured) == [20.0, 30.0, 5.0]
+    assert balancer.max_current_a(three_phase, measured) == (5.0, 1)
+    assert balancer.max_current_a(one_phase, measured) == (11.0, 1)
+    # Faser utan mätvärde hoppas över.
+    assert balancer.max_current_a(three_phase, [30.0, None, 15.0]) == (15.0, 0)
+
+    # En borttagen laddares ström räknas som husets last.
+    balancer.remove(one_phase)
+    assert balancer.house_loads_a(measured) == [20.0, 30.0, 5.0]
+    assert balancer.max_current_a(three_phase, measured) == (5.0, 1)
+
+
+def test_rotation_assigns_least_loaded_phase():
+    """
+    SYFTE: Verifiera tilldelningen av fas för en 1-fasbil.
+    FÖRUTSÄTTNINGAR: Laddaren kan välja fas och bilen laddar på en fas.
+    FÖRVÄNTAT RESULTAT: Ingen fas väljs förrän alla faser har värden. Bilen
+    tilldelas den minst belastade fasen och flyttas bara när en annan fas är
+    minst 2 A mindre belastad. Bilens egen ström räknas inte som last. En
+    laddare utan fasrotation tilldelas ingen fas.
+    """
+    balancer = PhaseBalancer()
+    charger = ChargerPhases("b", 25.0, car_phases=1, supports_rotation=True)
+    balancer.add(charger)
+
+    assert not balancer.assign_phase(charger, [20.0, None, None])
+    assert charger.phases == (0,)
+
+    assert balancer.assign_phase(charger, [20.0, 8.0, 12.0])
+    assert charger.phases == (1,)
+
+    assert not balancer.assign_phase(charger, [20.0, 9.5, 8.5])
+    assert charger.assigned_phase == 1
+
+    # Bilens 16 A syns på L2. Utan den är L2 fortfarande minst belastad.
+    charger.draw_a = 16.0
+    assert not balancer.assign_phase(charger, [20.0, 24.0, 12.0])
+
+    assert balancer.assign_phase(charger, [20.0, 30.0, 12.0])
+    assert charger.phases == (2,) and charger.draw_a == 0.0
+
+    fixed = ChargerPhases("c", 25.0, car_phases=1)
+    balancer.add(fixed)
+    assert not balancer.assign_phase(fixed, [20.0, 30.0, 1.0])
+    assert fixed.phases == (0,)
+
+
+async def test_coordinator_limits_and_rotates(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera fasbalanseringen i koordinatorn med en annan laddare på
+    samma säkring.
+    FÖRUTSÄTTNINGAR: Huvudsäkring 25 A och en 1-fasbil på en laddare som kan
+    välja fas. Värmepumpen belastar L1 och L3 är också belastad. En annan
+    laddare laddar en 1-fasbil med 10 A på L2.
+    FÖRVÄNTAT RESULTAT: Bilen tilldelas L2 och laddar med 16 A. När den andra
+    laddaren startar på L2 begränsas strömmen till det som ryms på L2. När L2
+    belastas ytterligare flyttas bilen till L3 och en ny utvärdering begärs.
+    """
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "fake_phase_charger",
+            CONF_STATUS_SENSOR: STATUS_SENSOR_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_CHARGER_DYNAMIC_CURRENT_SENSOR: DYNAMIC_CURRENT_SENSOR_ID,
+            CONF_METER_INGEST: True,
+            CONF_METER_PHASE_SENSORS: PHASE_IDS,
+            CONF_MAIN_FUSE_A: 25,
+            CONF_CHARGER_PHASE_MAPPING: "L1,L2,L3",
+            CONF_EV_CHARGING_PHASES: 1,
+        },
+        entry_id="test_phase_balance_entry",
+    )
+    entry.add_to_hass(hass)
+    coordinator = SmartEVChargingCoordinator(hass, entry, 30)
+    fake = FakeChargerBackend(hass, STATUS_SENSOR_ID, DYNAMIC_CURRENT_SENSOR_ID)
+    coordinator.charger_backend = fake
+    charger_phases = coordinator.charger_phases
+    assert charger_phases is not None and charger_phases.car_phases == 1
+    charger_phases.supports_rotation = fake.supports_phase_rotation
+    other = ChargerPhases("other_charger", 25.0, parse_phase_mapping("L2"))
+
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(DYNAMIC_CURRENT_SENSOR_ID, "0")
+    hass.states.async_set(PRICE_SENSOR_ID, "0.10")
+    hass.states.async_set(STATUS_SENSOR_ID, "awaiting_start")
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 0.50)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
+
+    def meter(seconds: float, **phases: float) -> None:
+        with patch.object(dt_util, "utcnow", return_value=_at(seconds)):
+            for name, current in phases.items():
+                hass.states.async_set(
+                    PHASE_IDS[int(name[1]) - 1],
+                    str(current),
+                    {"unit_of_measurement": "A"},
+                    context=Context(),
+                )
+
+    async def refresh(seconds: float) -> None:
+        with patch.object(dt_util, "utcnow", return_value=_at(seconds)):
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+
+    request_refresh = AsyncMock()
+    await coordinator.async_load_persisted_state()
+    try:
+        with patch.object(coordinator, "async_request_refresh", request_refresh):
+            meter(0, l1=20.0, l2=4.0, l3=13.0)
+            meter(5, l1=20.5)
+            await hass.async_block_till_done()
+            assert fake.commands == [("phase", "L2")]
+            request_refresh.assert_called_once()
+
+            await refresh(6)
+            assert fake.commands[1:] == [("current", 16.0), ("start", True)]
+            await refresh(7)
+            assert charger_phases.draw_a == 16.0
+
+            # Den andra laddaren startar med 10 A på L2. L3 är bara 1 A mindre
+            # belastad, så bilen stannar på L2.
+            other.draw_a = 10.0
+            PHASE_BALANCER.add(other)
+            meter(10, l2=30.0)
+            meter(15, l1=20.0)
+            await hass.async_block_till_done()
+            await refresh(16)
+            assert coordinator.target_charge_current_a == 11.0
+            assert fake.commands[-1] == ("current", 11.0)
+            assert "fasbalansering (L2 har 11.0A kvar" in (
+                coordinator.data["should_charge_reason"]
+            )
+            assert coordinator.data["phase_house_load_a"] == [20.5, 4.0, 13.0]
+            assert coordinator.data["phase_charging"] == "L2"
+            assert coordinator.data["phase_most_loaded"] == "L2"
+            assert coordinator.data["phase_max_charging_current_a"] == 11
+
+            request_refresh.reset_mock()
+            meter(20, l2=36.0)
+            await hass.async_block_till_done()
+            assert fake.commands[-1] == ("phase", "L3")
+            request_refresh.assert_called_once()
+            await refresh(21)
+            assert coordinator.data["phase_charging"] == "L3"
+            assert coordinator.target_charge_current_a == 12.0
+    finally:
+        PHASE_BALANCER.remove(other)
+        await coordinator.cleanup()
+    assert charger_phases not in PHASE_BALANCER._chargers.values()
@@ -40,6 +40,11 @@ from custom_components.smart_ev_charging.const import (
     EASEE_STATUS_CHARGING,
     CONTROL_MODE_MANUAL,
     CONTROL_MODE_PRICE_TIME,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+    ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER,
+    ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER,
 )
 from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
 
@@ -52,13 +57,6 @@ MOCK_MAIN_POWER_SWITCH_ID = "switch.mock_charger_power_main_switch"
 
 # Faktiska entitets-ID:n som Home Assistant kommer att skapa baserat på namngivning.
 ACTUAL_CONTROL_MODE_SENSOR_ID = "sensor.avancerad_elbilsladdning_aktivt_styrningslage"
-ACTUAL_SMART_SWITCH_ID = "switch.avancerad_elbilsladdning_smart_laddning_aktiv"
-ACTUAL_SOLAR_SWITCH_ID = "switch.avancerad_elbilsladdning_aktivera_solenergiladdning"
-ACTUAL_MAX_PRICE_ID = "number.avancerad_elbilsladdning_max_elpris"
-ACTUAL_SOLAR_BUFFER_ID = "number.avancerad_elbilsladdning_solenergi_buffer"
-ACTUAL_MIN_SOLAR_CURRENT_ID = (
-    "number.avancerad_elbilsladdning_minsta_laddstrom_solenergi"
-)
 
 
 @pytest.fixture(autouse=True)
@@ -97,22 +95,12 @@ async def setup_coordinator(hass: HomeAssistant):
     ]
     assert coordinator is not None
 
-    # Manuell tilldelning av de FAKTISKA interna entitets-ID:na till koordinatorn.
-    coordinator.smart_enable_switch_entity_id = ACTUAL_SMART_SWITCH_ID
-    coordinator.max_price_entity_id = ACTUAL_MAX_PRICE_ID
-    coordinator.solar_enable_switch_entity_id = ACTUAL_SOLAR_SWITCH_ID
-    coordinator.solar_buffer_entity_id = ACTUAL_SOLAR_BUFFER_ID
-    coordinator.min_solar_charge_current_entity_id = ACTUAL_MIN_SOLAR_CURRENT_ID
-    coordinator._internal_entities_resolved = (
-        True  # Markera att ID:n är "manuellt lösta"
-    )
-
-    # Sätt grundläggande tillstånd för de FAKTISKA interna entiteterna
-    hass.states.async_set(ACTUAL_SMART_SWITCH_ID, STATE_ON)
-    hass.states.async_set(ACTUAL_SOLAR_SWITCH_ID, STATE_OFF)
-    hass.states.async_set(ACTUAL_MAX_PRICE_ID, "1.00")
-    hass.states.async_set(ACTUAL_SOLAR_BUFFER_ID, "200")
-    hass.states.async_set(ACTUAL_MIN_SOLAR_CURRENT_ID, "6")
+    # Sätt grundläggande värden för de interna entiteterna direkt i koordinatorn.
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 1.00)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER, 200)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER, 6)
     hass.states.async_set(ACTUAL_CONTROL_MODE_SENSOR_ID, CONTROL_MODE_MANUAL)
 
     return coordinator
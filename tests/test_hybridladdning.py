@@ -0,0 +1,210 @@
+# tests/test_hybridladdning.py
+"""
+Testar hybridläget där solöverskott blandas med billig nätel, samt att
+sessionens energi delas upp i sol- och nätenergi.
+"""
+
+import pytest
+import logging
+from unittest.mock import patch
+from datetime import datetime, timedelta, timezone
+
+from homeassistant.core import HomeAssistant
+from homeassistant.const import STATE_ON, STATE_OFF
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_mock_service,
+)
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_SOLAR_PRODUCTION_SENSOR,
+    CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
+    CONF_CHARGER_DYNAMIC_CURRENT_SENSOR,
+    CONF_DEBUG_LOGGING,
+    EASEE_STATUS_CHARGING,
+    EASEE_STATUS_READY_TO_CHARGE,
+    CONTROL_MODE_HYBRID,
+    CONTROL_MODE_PRICE_TIME,
+    CONTROL_MODE_MANUAL,
+    MIN_CHARGE_CURRENT_A,
+    ENTITY_ID_SUFFIX_ENABLE_HYBRID_CHARGING_SWITCH,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+    ENTITY_ID_SUFFIX_HYBRID_MAX_GRID_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_HYBRID_TARGET_POWER_NUMBER,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+
+STATUS_SENSOR_ID = "sensor.easee_status_hybrid"
+POWER_SWITCH_ID = "switch.easee_power_hybrid"
+PRICE_SENSOR_ID = "sensor.nordpool_price_hybrid"
+SOLAR_PROD_SENSOR_ID = "sensor.solar_production_hybrid"
+MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_hybrid"
+DYN_CURRENT_SENSOR_ID = "sensor.charger_dynamic_current_hybrid"
+
+START_TIME_UTC = datetime(2025, 6, 1, 10, 0, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+@pytest.fixture
+async def hybrid_coordinator(hass: HomeAssistant):
+    """Skapar en koordinator med Pris/Tid, Solenergi och Hybrid konfigurerade."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "easee_hybrid_test",
+            CONF_STATUS_SENSOR: STATUS_SENSOR_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_SOLAR_PRODUCTION_SENSOR: SOLAR_PROD_SENSOR_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_CHARGER_DYNAMIC_CURRENT_SENSOR: DYN_CURRENT_SENSOR_ID,
+            CONF_DEBUG_LOGGING: True,
+        },
+        entry_id="test_hybrid_entry",
+    )
+    entry.add_to_hass(hass)
+
+    coordinator = SmartEVChargingCoordinator(hass, entry, 30)
+
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(DYN_CURRENT_SENSOR_ID, "0")
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_READY_TO_CHARGE[0])
+    # 3000 W överskott räcker bara till 4 A på tre faser.
+    hass.states.async_set(SOLAR_PROD_SENSOR_ID, "3000")
+    # Spotpriset ligger över Pris/Tid-gränsen men under hybridgränsen.
+    hass.states.async_set(PRICE_SENSOR_ID, "0.80")
+
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 0.50)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER, 0)
+    coordinator.set_control_value(
+        ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER, MIN_CHARGE_CURRENT_A
+    )
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_HYBRID_CHARGING_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_HYBRID_MAX_GRID_PRICE_NUMBER, 1.00)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_HYBRID_TARGET_POWER_NUMBER, 0)
+    return coordinator
+
+
+async def _refresh_at(hass: HomeAssistant, coordinator, when: datetime) -> None:
+    with patch.object(dt_util, "utcnow", return_value=when):
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+
+async def test_hybrid_tops_up_to_minimum_current(
+    hass: HomeAssistant, hybrid_coordinator: SmartEVChargingCoordinator
+):
+    """
+    SYFTE: Solöverskottet räcker inte till minimiströmmen, men nätpriset är
+    under hybridgränsen. Hybridläget ska fylla upp med nätel till 6 A.
+    """
+    coordinator = hybrid_coordinator
+    set_current_calls = async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    action_command_calls = async_mock_service(hass, "easee", "action_command")
+
+    await _refresh_at(hass, coordinator, START_TIME_UTC)
+
+    assert coordinator.active_control_mode == CONTROL_MODE_HYBRID
+    assert coordinator.target_charge_current_a == MIN_CHARGE_CURRENT_A
+    assert len(set_current_calls) == 1
+    assert set_current_calls[0].data["current"] == MIN_CHARGE_CURRENT_A
+    assert len(action_command_calls) == 0, "Hybridläget ska inte skicka start."
+
+
+async def test_hybrid_tops_up_to_target_power(
+    hass: HomeAssistant, hybrid_coordinator: SmartEVChargingCoordinator
+):
+    """SYFTE: Med en måleffekt på 5520 W ska nätel fylla upp till 8 A."""
+    coordinator = hybrid_coordinator
+    set_current_calls = async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_HYBRID_TARGET_POWER_NUMBER, 5520)
+
+    await _refresh_at(hass, coordinator, START_TIME_UTC)
+
+    assert coordinator.active_control_mode == CONTROL_MODE_HYBRID
+    assert set_current_calls[-1].data["current"] == 8
+
+
+async def test_hybrid_falls_back_to_solar_when_grid_price_rises(
+    hass: HomeAssistant, hybrid_coordinator: SmartEVChargingCoordinator
+):
+    """
+    SYFTE: När nätpriset stiger över hybridgränsen får ingen nätel användas.
+    Den påbörjade solsessionen ska då pausas med 0 A i stället för att avbrytas.
+    """
+    coordinator = hybrid_coordinator
+    set_current_calls = async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+
+    await _refresh_at(hass, coordinator, START_TIME_UTC)
+    assert coordinator.active_control_mode == CONTROL_MODE_HYBRID
+
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_CHARGING)
+    hass.states.async_set(DYN_CURRENT_SENSOR_ID, "6")
+    hass.states.async_set(PRICE_SENSOR_ID, "1.50")
+    set_current_calls.clear()
+
+    # Easee tillåter högst en ändring av strömgränsen per minut under laddning.
+    await _refresh_at(hass, coordinator, START_TIME_UTC + timedelta(seconds=60))
+
+    assert coordinator.active_control_mode == CONTROL_MODE_MANUAL
+    assert coordinator._solar_session_active
+    assert len(set_current_calls) == 1
+    assert set_current_calls[0].data["current"] == 0
+
+
+async def test_session_energy_split_solar_and_grid(
+    hass: HomeAssistant, hybrid_coordinator: SmartEVChargingCoordinator
+):
+    """
+    SYFTE: Verifiera att levererad energi delas upp per cykel i sol- och nätenergi,
+    både i hybridläget och när Pris/Tid tar över (solöverskottet ska fortfarande
+    krediteras).
+    """
+    coordinator = hybrid_coordinator
+    async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    async_mock_service(hass, "easee", "action_command")
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_CHARGING)
+    hass.states.async_set(DYN_CURRENT_SENSOR_ID, "6")
+
+    # Hybrid: 6 A * 690 V = 4140 W, varav 3000 W sol, i 30 sekunder.
+    await _refresh_at(hass, coordinator, START_TIME_UTC)
+    await _refresh_at(hass, coordinator, START_TIME_UTC + timedelta(seconds=30))
+    assert coordinator.session_solar_energy_kwh == pytest.approx(3000 * 30 / 3600 / 1000)
+    assert coordinator.session_grid_energy_kwh == pytest.approx(1140 * 30 / 3600 / 1000)
+    assert coordinator.data["session_solar_energy_kwh"] == round(
+        3000 * 30 / 3600 / 1000, 3
+    )
+
+    # Pris/Tid tar över. Sessionen startas om, men solöverskottet krediteras ändå.
+    hass.states.async_set(PRICE_SENSOR_ID, "0.40")
+    await _refresh_at(hass, coordinator, START_TIME_UTC + timedelta(seconds=60))
+    assert coordinator.active_control_mode == CONTROL_MODE_PRICE_TIME
+    solar_before = coordinator.session_solar_energy_kwh
+    grid_before = coordinator.session_grid_energy_kwh
+
+    await _refresh_at(hass, coordinator, START_TIME_UTC + timedelta(seconds=90))
+    # 16 A * 690 V = 11040 W, varav 3000 W sol.
+    assert coordinator.session_solar_energy_kwh - solar_before == pytest.approx(
+        3000 * 30 / 3600 / 1000
+    )
+    assert coordinator.session_grid_energy_kwh - grid_before == pytest.approx(
+        8040 * 30 / 3600 / 1000
+    )
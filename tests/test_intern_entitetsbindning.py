@@ -0,0 +1,132 @@
+# tests/test_intern_entitetsbindning.py
+"""
+Testar att integrationens egna switch- och nummer-entiteter skriver sina
+värden direkt till koordinatorn och att en ändring omvärderas direkt, utan
+att vänta på nästa uppdateringsintervall.
+"""
+
+import pytest
+import logging
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant
+from homeassistant.const import STATE_ON, ATTR_ENTITY_ID
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+    async_mock_service,
+)
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
+    CONF_DEBUG_LOGGING,
+    EASEE_STATUS_READY_TO_CHARGE,
+    EASEE_STATUS_CHARGING,
+    CONTROL_MODE_PRICE_TIME,
+    CONTROL_MODE_MANUAL,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+
+STATUS_SENSOR_ID = "sensor.easee_status_binding"
+POWER_SWITCH_ID = "switch.easee_power_binding"
+PRICE_SENSOR_ID = "sensor.nordpool_price_binding"
+MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_binding"
+
+# Entitets-ID:n som Home Assistant skapar utifrån entiteternas namn.
+SMART_SWITCH_ID = "switch.avancerad_elbilsladdning_smart_laddning_aktiv"
+MAX_PRICE_ID = "number.avancerad_elbilsladdning_max_elpris"
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+async def _wait_for_cooldown(hass: HomeAssistant) -> None:
+    """Låter koordinatorns debouncer svalna så att nästa begäran körs direkt."""
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=15))
+    await hass.async_block_till_done()
+
+
+async def test_entities_push_values_and_trigger_immediate_refresh(
+    hass: HomeAssistant,
+):
+    """
+    SYFTE: Verifiera att switch- och nummer-entiteterna skriver typade värden
+    direkt till koordinatorn och att en ändring ger en omedelbar omvärdering.
+    FÖRUTSÄTTNINGAR: Laddaren är redo, spotpriset är 0.50 kr/kWh och maxpriset
+    har sitt standardvärde 1.5 kr/kWh.
+    FÖRVÄNTAT RESULTAT: När smart laddning slås på startar laddningen direkt.
+    När maxpriset sänks under spotpriset pausas den direkt.
+    """
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "easee_binding_test",
+            CONF_STATUS_SENSOR: STATUS_SENSOR_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_DEBUG_LOGGING: True,
+        },
+        entry_id="test_binding_entry",
+    )
+    entry.add_to_hass(hass)
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_READY_TO_CHARGE[0])
+    hass.states.async_set(PRICE_SENSOR_ID, "0.50")
+    set_current_calls = async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    action_command_calls = async_mock_service(hass, "easee", "action_command")
+
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator: SmartEVChargingCoordinator = hass.data[DOMAIN][entry.entry_id][
+        "coordinator"
+    ]
+
+    # Entiteterna har skrivit sina återställda standardvärden till koordinatorn.
+    values = coordinator.control_values
+    assert coordinator.control_values_ready
+    assert values[ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH] is False
+    assert values[ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH] is False
+    assert values[ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER] == 1.5
+    assert coordinator.data["active_control_mode"] == CONTROL_MODE_MANUAL
+    assert len(action_command_calls) == 0
+
+    # Smart laddning slås på: omvärderingen sker direkt utan async_refresh.
+    await _wait_for_cooldown(hass)
+    await hass.services.async_call(
+        "switch", "turn_on", {ATTR_ENTITY_ID: SMART_SWITCH_ID}, blocking=True
+    )
+    await hass.async_block_till_done()
+
+    assert values[ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH] is True
+    assert coordinator.data["active_control_mode"] == CONTROL_MODE_PRICE_TIME
+    assert set_current_calls[-1].data["current"] == 16
+    assert action_command_calls[-1].data["action_command"] == "start"
+
+    # Maxpriset sänks under spotpriset: laddningen pausas direkt.
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_CHARGING)
+    await _wait_for_cooldown(hass)
+    await hass.services.async_call(
+        "number",
+        "set_value",
+        {ATTR_ENTITY_ID: MAX_PRICE_ID, "value": 0.3},
+        blocking=True,
+    )
+    await hass.async_block_till_done()
+
+    assert values[ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER] == 0.3
+    assert coordinator.data["active_control_mode"] == CONTROL_MODE_MANUAL
+    assert action_command_calls[-1].data["action_command"] == "pause"
@@ -0,0 +1,170 @@
+# tests/test_kommandobekraftelse.py
+"""
+Testar uppföljningen av kommandon till laddaren: ett kommando skickas inte igen
+medan bekräftelsen väntas, skickas om med växande tidsgräns när effekten
+uteblir och tiden till bekräftelse samlas i ett histogram.
+"""
+
+import pytest
+import logging
+from unittest.mock import patch
+from datetime import datetime, timedelta
+
+from homeassistant.core import HomeAssistant
+from homeassistant.const import STATE_ON
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_mock_service,
+)
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
+    CONF_CHARGER_DYNAMIC_CURRENT_SENSOR,
+    CONF_DEBUG_LOGGING,
+    EASEE_STATUS_AWAITING_START,
+    EASEE_STATUS_CHARGING,
+    EASEE_STATUS_PAUSED,
+    CONTROL_MODE_PRICE_TIME,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+from custom_components.smart_ev_charging.command_tracker import (
+    COMMAND_CURRENT,
+    COMMAND_PAUSE,
+    COMMAND_START,
+    CommandTracker,
+)
+
+STATUS_SENSOR_ID = "sensor.easee_status_ack"
+POWER_SWITCH_ID = "switch.easee_power_ack"
+PRICE_SENSOR_ID = "sensor.nordpool_price_ack"
+MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_ack"
+DYNAMIC_CURRENT_SENSOR_ID = "sensor.charger_dynamic_current_ack"
+
+START = datetime(2025, 6, 2, 1, 0, tzinfo=dt_util.UTC)
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+def _at(seconds: float) -> datetime:
+    return START + timedelta(seconds=seconds)
+
+
+async def test_backoff_and_latency_histogram(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera spärren medan bekräftelsen väntas, den fördubblade
+    tidsgränsen vid omsändning, bekräftelsen och histogrammet.
+    FÖRUTSÄTTNINGAR: Utan slumpmässig spridning är första tidsgränsen 20 s.
+    Strömsensorn visar 6A när 16A skickas.
+    FÖRVÄNTAT RESULTAT: Efter 10 s skickas 16A inte igen, men 10A skickas.
+    Efter 21 s skickas 16A om, och nästa tidsgräns är 40 s senare. När sensorn
+    visar 16A efter 70 s är kommandot bekräftat i intervallet upp till 120 s.
+    Paus ersätter ett väntande startkommando.
+    """
+    hass.states.async_set(DYNAMIC_CURRENT_SENSOR_ID, "6")
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_AWAITING_START)
+    tracker = CommandTracker(
+        hass, STATUS_SENSOR_ID, DYNAMIC_CURRENT_SENSOR_ID, jitter=0.0
+    )
+
+    assert tracker.should_send(COMMAND_CURRENT, 16.0, _at(0))
+    tracker.record_sent(COMMAND_CURRENT, 16.0, _at(0))
+    assert not tracker.should_send(COMMAND_CURRENT, 16.0, _at(10))
+    assert tracker.should_send(COMMAND_CURRENT, 10.0, _at(10))
+
+    assert tracker.should_send(COMMAND_CURRENT, 16.0, _at(21))
+    tracker.record_sent(COMMAND_CURRENT, 16.0, _at(21))
+    assert tracker.retries == 1
+    assert tracker.pending[COMMAND_CURRENT].deadline == _at(61)
+    assert not tracker.should_send(COMMAND_CURRENT, 16.0, _at(50))
+
+    hass.states.async_set(DYNAMIC_CURRENT_SENSOR_ID, "16.0")
+    tracker.confirm(_at(70))
+    assert not tracker.pending
+    assert tracker.last_ack_latency_s == pytest.approx(70.0)
+    assert tracker.histogram_data()[COMMAND_CURRENT]["<=120s"] == 1
+
+    tracker.record_sent(COMMAND_START, True, _at(80))
+    tracker.record_sent(COMMAND_PAUSE, True, _at(81))
+    assert list(tracker.pending) == [COMMAND_PAUSE]
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_PAUSED)
+    tracker.confirm(_at(83))
+    assert tracker.histogram_data()[COMMAND_PAUSE]["<=2s"] == 1
+
+
+async def test_dropped_command_resent_after_timeout(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att koordinatorn inte skickar samma kommandon varje cykel
+    medan bekräftelsen väntas, men skickar om dem när effekten uteblir.
+    FÖRUTSÄTTNINGAR: Pris/Tid laddar. Laddaren står kvar i 'awaiting_start'
+    med 6A, som om molnet tappat start- och strömkommandot.
+    FÖRVÄNTAT RESULTAT: Start och ström skickas en gång, inte igen efter 10 s,
+    men igen efter 25 s. När laddaren laddar med 16A är inget kommando kvar att
+    bekräfta och startkommandot finns i histogrammet.
+    """
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "easee_ack_test",
+            CONF_STATUS_SENSOR: STATUS_SENSOR_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_CHARGER_DYNAMIC_CURRENT_SENSOR: DYNAMIC_CURRENT_SENSOR_ID,
+            CONF_DEBUG_LOGGING: True,
+        },
+        entry_id="test_ack_entry",
+    )
+    entry.add_to_hass(hass)
+    coordinator = SmartEVChargingCoordinator(hass, entry, 30)
+    set_current_calls = async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    action_calls = async_mock_service(hass, "easee", "action_command")
+
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(DYNAMIC_CURRENT_SENSOR_ID, "6")
+    hass.states.async_set(PRICE_SENSOR_ID, "0.10")
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_AWAITING_START)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 0.50)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
+
+    async def refresh(seconds: float) -> None:
+        with patch.object(dt_util, "utcnow", return_value=_at(seconds)):
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+
+    await refresh(0)
+    assert coordinator.active_control_mode == CONTROL_MODE_PRICE_TIME
+    assert len(action_calls) == 1 and len(set_current_calls) == 1
+    assert coordinator.data["command_pending"] == [COMMAND_CURRENT, COMMAND_START]
+
+    await refresh(10)
+    assert len(action_calls) == 1 and len(set_current_calls) == 1
+
+    await refresh(25)
+    assert [call.data["action_command"] for call in action_calls] == [
+        "start",
+        "start",
+    ]
+    assert len(set_current_calls) == 2
+    assert coordinator.data["command_retries"] == 2
+
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_CHARGING)
+    hass.states.async_set(DYNAMIC_CURRENT_SENSOR_ID, "16")
+    await refresh(30)
+    assert len(action_calls) == 2 and len(set_current_calls) == 2
+    assert coordinator.data["command_pending"] == []
+    assert coordinator.data["command_ack_latency"][COMMAND_START]["<=30s"] == 1
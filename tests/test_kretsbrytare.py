@@ -0,0 +1,246 @@
+# tests/test_kretsbrytare.py
+"""
+Testar kretsbrytaren för laddarens tjänster: brytaren öppnas efter upprepade
+fel, släpper igenom ett provanrop efter vilotiden och långsamma anrop körs i
+bakgrunden med tidsgräns.
+"""
+
+import asyncio
+import pytest
+import logging
+from unittest.mock import patch
+from datetime import datetime, timedelta
+
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.const import STATE_ON
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_mock_service,
+)
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
+    CONF_DEBUG_LOGGING,
+    CONF_BREAKER_FAILURE_THRESHOLD,
+    CONF_BREAKER_RESET_SECONDS,
+    EASEE_STATUS_AWAITING_START,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+from custom_components.smart_ev_charging.circuit_breaker import (
+    CircuitBreaker,
+    ServiceCallRunner,
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+)
+
+STATUS_SENSOR_ID = "sensor.easee_status_breaker"
+POWER_SWITCH_ID = "switch.easee_power_breaker"
+PRICE_SENSOR_ID = "sensor.nordpool_price_breaker"
+MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_breaker"
+
+START = datetime(2025, 6, 2, 1, 0, tzinfo=dt_util.UTC)
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+def _at(seconds: float) -> datetime:
+    return START + timedelta(seconds=seconds)
+
+
+async def test_breaker_states_and_call_timeout(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera brytarens tillstånd och att anropen körs i bakgrunden med
+    tidsgräns.
+    FÖRUTSÄTTNINGAR: Tröskel 2 fel och vilotid 60 s. En tjänst som aldrig svarar
+    och en som misslyckas tills den lagas.
+    FÖRVÄNTAT RESULTAT: Två fel öppnar brytaren. Efter vilotiden släpps ett
+    provanrop igenom, men inte två. Ett misslyckat provanrop öppnar brytaren
+    igen och ett lyckat stänger den. Det långsamma anropet blockerar inte och
+    räknas som fel efter tidsgränsen.
+    """
+    breaker = CircuitBreaker(2, timedelta(seconds=60))
+    assert breaker.allow(_at(0))
+    breaker.record_failure(_at(0), "fel")
+    assert breaker.state == STATE_CLOSED
+    breaker.record_failure(_at(1), "fel")
+    assert breaker.state == STATE_OPEN
+    assert not breaker.allow(_at(30))
+    assert breaker.allow(_at(61))
+    assert breaker.state == STATE_HALF_OPEN
+    assert not breaker.allow(_at(62))
+    breaker.record_failure(_at(63), "fel igen")
+    assert breaker.state == STATE_OPEN and breaker.opened_at == _at(63)
+    assert breaker.allow(_at(124))
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED and breaker.failures == 0
+
+    broken = True
+    calls: list[ServiceCall] = []
+
+    async def flaky(call: ServiceCall) -> None:
+        calls.append(call)
+        if broken:
+            raise HomeAssistantError("Easee otillgänglig")
+
+    async def hanging(call: ServiceCall) -> None:
+        await asyncio.sleep(10)
+
+    hass.services.async_register("easee", "action_command", flaky)
+    hass.services.async_register("easee", "set_charger_dynamic_limit", hanging)
+    runner = ServiceCallRunner(hass, 2, timedelta(seconds=60), call_timeout=0.05)
+    results: list[bool] = []
+
+    with patch.object(dt_util, "utcnow", return_value=_at(0)):
+        assert runner.async_call("easee", "action_command", {}, results.append)
+        await hass.async_block_till_done()
+        assert runner.async_call("easee", "action_command", {}, results.append)
+        await hass.async_block_till_done()
+        assert runner.overall_state() == STATE_OPEN
+        assert not runner.async_call("easee", "action_command", {})
+    assert results == [False, False]
+    assert len(calls) == 2
+    assert runner.breakers["easee.action_command"].last_error == "Easee otillgänglig"
+
+    broken = False
+    with patch.object(dt_util, "utcnow", return_value=_at(61)):
+        assert runner.async_call("easee", "action_command", {}, results.append)
+        await hass.async_block_till_done()
+    assert results[-1] is True
+    assert runner.overall_state() == STATE_CLOSED
+
+    assert runner.async_call("easee", "set_charger_dynamic_limit", {})
+    assert runner.in_flight == 1
+    await asyncio.sleep(0.1)
+    await hass.async_block_till_done()
+    assert runner.in_flight == 0
+    assert runner.breakers["easee.set_charger_dynamic_limit"].failures == 1
+
+
+async def test_half_open_trial_with_unexpected_error(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att ett oväntat fel i ett provanrop inte låser brytaren.
+    FÖRUTSÄTTNINGAR: Tröskel 1 fel och vilotid 60 s. Tjänsten kastar ett
+    oväntat fel (ValueError). Ett senare provanrop hänger och avbryts.
+    FÖRVÄNTAT RESULTAT: Det oväntade felet räknas som fel och rapporteras som
+    misslyckat. Provanropet öppnar brytaren igen, och efter vilotiden släpps ett
+    nytt provanrop igenom. Ett avbrutet provanrop släpper brytaren.
+    """
+    hang = False
+
+    async def broken(call: ServiceCall) -> None:
+        if hang:
+            await asyncio.sleep(10)
+        raise ValueError("oväntat svar")
+
+    hass.services.async_register("easee", "action_command", broken)
+    runner = ServiceCallRunner(hass, 1, timedelta(seconds=60))
+    breaker = runner.breaker("easee", "action_command")
+    results: list[bool] = []
+
+    with patch.object(dt_util, "utcnow", return_value=_at(0)):
+        assert runner.async_call("easee", "action_command", {}, results.append)
+        await hass.async_block_till_done()
+    assert breaker.state == STATE_OPEN
+
+    with patch.object(dt_util, "utcnow", return_value=_at(61)):
+        assert runner.async_call("easee", "action_command", {}, results.append)
+        await hass.async_block_till_done()
+    assert results == [False, False]
+    assert breaker.state == STATE_OPEN and breaker.opened_at == _at(61)
+    assert breaker.last_error == "oväntat svar"
+    assert runner.in_flight == 0
+
+    hang = True
+    with patch.object(dt_util, "utcnow", return_value=_at(122)):
+        assert runner.async_call("easee", "action_command", {}, results.append)
+        await asyncio.sleep(0)
+        assert breaker.state == STATE_HALF_OPEN
+        assert not runner.async_call("easee", "action_command", {})
+        runner.async_cancel()
+        await asyncio.sleep(0)
+        assert breaker.allow(_at(122))
+    assert len(results) == 2
+
+
+async def test_coordinator_stops_calling_unavailable_service(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att koordinatorn slutar anropa en tjänst som misslyckas
+    och att brytarens tillstånd visas i diagnostikdata.
+    FÖRUTSÄTTNINGAR: Tröskel 2 fel och vilotid 120 s. Startkommandot misslyckas
+    varje gång. Laddaren står kvar i 'awaiting_start'.
+    FÖRVÄNTAT RESULTAT: Efter två misslyckade startkommandon är brytaren öppen
+    och fler startkommandon skickas inte under vilotiden. Efter vilotiden görs
+    ett provanrop.
+    """
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "easee_breaker_test",
+            CONF_STATUS_SENSOR: STATUS_SENSOR_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_DEBUG_LOGGING: True,
+        },
+        options={
+            CONF_BREAKER_FAILURE_THRESHOLD: 2,
+            CONF_BREAKER_RESET_SECONDS: 120,
+        },
+        entry_id="test_breaker_entry",
+    )
+    entry.add_to_hass(hass)
+    coordinator = SmartEVChargingCoordinator(hass, entry, 30)
+    async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    start_calls: list[ServiceCall] = []
+
+    async def failing(call: ServiceCall) -> None:
+        start_calls.append(call)
+        raise HomeAssistantError("Easee otillgänglig")
+
+    hass.services.async_register("easee", "action_command", failing)
+
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(PRICE_SENSOR_ID, "0.10")
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_AWAITING_START)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 0.50)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
+
+    async def refresh(seconds: float) -> None:
+        with patch.object(dt_util, "utcnow", return_value=_at(seconds)):
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+
+    # Startkommandot skickas om när bekräftelsen uteblir (efter ca 20 s).
+    for seconds in (0, 30, 60, 90):
+        await refresh(seconds)
+    assert len(start_calls) == 2
+    assert coordinator.data["service_breaker_state"] == STATE_OPEN
+    breaker_data = coordinator.data["service_breakers"]["easee.action_command"]
+    assert breaker_data["failures"] == 2
+    assert breaker_data["last_error"] == "Easee otillgänglig"
+    assert (
+        coordinator.data["service_breakers"]["easee.set_charger_dynamic_limit"]["state"]
+        == STATE_CLOSED
+    )
+
+    # Provanropet misslyckas i bakgrunden efter cykeln och öppnar brytaren igen.
+    await refresh(160)
+    assert len(start_calls) == 3
+    assert coordinator.service_runner.overall_state() == STATE_OPEN
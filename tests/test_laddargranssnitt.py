@@ -0,0 +1,273 @@
+# tests/test_laddargranssnitt.py
+"""
+Testar laddarens gränssnitt: Easees och den generiska laddarens tjänsteanrop,
+översättningen av status, styrning med den fejkade laddaren och begränsningen
+av hur ofta strömgränsen ändras.
+"""
+
+import pytest
+import logging
+from unittest.mock import AsyncMock, patch
+from datetime import datetime, timedelta
+
+from homeassistant.core import Context, HomeAssistant
+from homeassistant.const import STATE_ON
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_mock_service,
+)
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
+    CONF_CHARGER_DYNAMIC_CURRENT_SENSOR,
+    CONF_CHARGER_BACKEND,
+    CONF_GENERIC_CURRENT_NUMBER,
+    CONF_GENERIC_CHARGE_SWITCH,
+    CONF_GENERIC_PHASE_SWITCH,
+    CONF_DEBUG_LOGGING,
+    CONF_METER_INGEST,
+    CONF_METER_PHASE_SENSORS,
+    CONF_MAIN_FUSE_A,
+    CHARGER_BACKEND_GENERIC,
+    EASEE_STATUS_AWAITING_START,
+    EASEE_STATUS_CHARGING,
+    EASEE_STATUS_ERROR,
+    EASEE_STATUS_PAUSED,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+from custom_components.smart_ev_charging.charger_backend import (
+    EaseeBackend,
+    FakeChargerBackend,
+    GenericEntityBackend,
+    create_backend,
+)
+from custom_components.smart_ev_charging.circuit_breaker import ServiceCallRunner
+
+STATUS_SENSOR_ID = "sensor.charger_status_backend"
+POWER_SWITCH_ID = "switch.charger_power_backend"
+PRICE_SENSOR_ID = "sensor.nordpool_price_backend"
+MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_backend"
+DYNAMIC_CURRENT_SENSOR_ID = "sensor.charger_dynamic_current_backend"
+CURRENT_NUMBER_ID = "number.charger_current_backend"
+CHARGE_SWITCH_ID = "switch.charger_charging_backend"
+PHASE_SWITCH_ID = "switch.charger_three_phase_backend"
+PHASE_IDS = [
+    "sensor.han_current_l1_backend",
+    "sensor.han_current_l2_backend",
+    "sensor.han_current_l3_backend",
+]
+
+START = datetime(2025, 6, 2, 1, 0, tzinfo=dt_util.UTC)
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+def _at(seconds: float) -> datetime:
+    return START + timedelta(seconds=seconds)
+
+
+async def test_backend_service_calls_and_status_mapping(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera tjänsteanropen och statusöversättningen för Easee och den
+    generiska laddaren.
+    FÖRUTSÄTTNINGAR: Tjänsterna är ersatta med attrappar. Den generiska
+    laddaren har entiteter för strömgräns, start/paus och 3-fas.
+    FÖRVÄNTAT RESULTAT: Easee får strömgräns och start via sina tjänster. Den
+    generiska laddaren får number.set_value och switch-anrop, och OCPP:s
+    statusar översätts till Easees. Utan generisk laddartyp skapas Easee.
+    """
+    easee_current = async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    easee_action = async_mock_service(hass, "easee", "action_command")
+    set_value = async_mock_service(hass, "number", "set_value")
+    turn_on = async_mock_service(hass, "switch", "turn_on")
+    turn_off = async_mock_service(hass, "switch", "turn_off")
+    runner = ServiceCallRunner(hass)
+
+    easee = EaseeBackend(runner, "easee_device")
+    assert easee.set_current(10.0) and easee.start()
+    await hass.async_block_till_done()
+    assert easee_current[0].data == {"device_id": "easee_device", "current": 10.0}
+    assert easee_action[0].data["action_command"] == "start"
+    assert easee.map_status("Charging") == EASEE_STATUS_CHARGING
+    assert not easee.supports_phase_switching and not easee.set_phases(1)
+
+    backend = create_backend(
+        runner,
+        {
+            CONF_CHARGER_BACKEND: CHARGER_BACKEND_GENERIC,
+            CONF_GENERIC_CURRENT_NUMBER: CURRENT_NUMBER_ID,
+            CONF_GENERIC_CHARGE_SWITCH: CHARGE_SWITCH_ID,
+            CONF_GENERIC_PHASE_SWITCH: PHASE_SWITCH_ID,
+        },
+    )
+    assert isinstance(backend, GenericEntityBackend)
+    assert backend.supports_phase_switching
+    assert not backend.supports_charge_schedule
+    assert backend.set_current(8.0)
+    assert backend.pause()
+    assert backend.set_phases(1)
+    await hass.async_block_till_done()
+    assert set_value[0].data == {"entity_id": CURRENT_NUMBER_ID, "value": 8.0}
+    assert [call.data["entity_id"] for call in turn_off] == [
+        CHARGE_SWITCH_ID,
+        PHASE_SWITCH_ID,
+    ]
+    assert not turn_on
+    assert backend.map_status("SuspendedEV") == EASEE_STATUS_PAUSED
+    assert backend.map_status("Preparing") == EASEE_STATUS_AWAITING_START
+    assert backend.map_status("Faulted") == EASEE_STATUS_ERROR
+    assert backend.map_status("charging") == EASEE_STATUS_CHARGING
+
+    assert isinstance(
+        create_backend(runner, {CONF_CHARGER_DEVICE: "x"}), EaseeBackend
+    )
+
+
+async def test_coordinator_with_fake_backend(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att koordinatorn styr laddaren genom gränssnittet och att
+    ett gränssnitts begränsning av strömändringar följs.
+    FÖRUTSÄTTNINGAR: Pris/Tid laddar med den fejkade laddaren, som uppdaterar
+    status och ström direkt. Laddaren tillåter högst en ändring per 60 s.
+    Efter 10 s sänks laddboxens maxström till 10A och efter 20 s höjs den
+    till 16A igen.
+    FÖRVÄNTAT RESULTAT: Strömgräns och start skickas till den fejkade laddaren
+    och inga Easee-tjänster anropas. Sänkningen skickas direkt. Höjningen
+    skickas först 60 s efter förra ändringen.
+    """
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "fake_backend_test",
+            CONF_STATUS_SENSOR: STATUS_SENSOR_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_CHARGER_DYNAMIC_CURRENT_SENSOR: DYNAMIC_CURRENT_SENSOR_ID,
+            CONF_DEBUG_LOGGING: True,
+        },
+        entry_id="test_fake_backend_entry",
+    )
+    entry.add_to_hass(hass)
+    coordinator = SmartEVChargingCoordinator(hass, entry, 30)
+    fake = FakeChargerBackend(hass, STATUS_SENSOR_ID, DYNAMIC_CURRENT_SENSOR_ID)
+    fake.min_current_interval = timedelta(seconds=60)
+    coordinator.charger_backend = fake
+    easee_calls = async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(DYNAMIC_CURRENT_SENSOR_ID, "6")
+    hass.states.async_set(PRICE_SENSOR_ID, "0.10")
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_AWAITING_START)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 0.50)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
+
+    async def refresh(seconds: float) -> None:
+        with patch.object(dt_util, "utcnow", return_value=_at(seconds)):
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+
+    await refresh(0)
+    assert fake.commands == [("current", 16.0), ("start", True)]
+    assert hass.states.get(STATUS_SENSOR_ID).state == EASEE_STATUS_CHARGING
+    assert not easee_calls
+
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "10")
+    await refresh(10)
+    assert fake.commands[-1] == ("current", 10.0)
+
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    await refresh(20)
+    assert len(fake.commands) == 3
+
+    await refresh(71)
+    assert fake.commands[-1] == ("current", 16.0)
+
+
+async def test_phase_limit_reduction_bypasses_interval(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att en sänkning av strömmen för huvudsäkringen skickas
+    direkt trots laddarens begränsning av strömändringar.
+    FÖRUTSÄTTNINGAR: Laddaren tillåter högst en ändring per 60 s och laddar en
+    3-fasbil med 16A. Huvudsäkringen är 25A. Efter 20 s belastar huset L1 med
+    15A.
+    FÖRVÄNTAT RESULTAT: Strömmen sänks till 10A i nästa cykel, 20 s efter förra
+    ändringen.
+    """
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "fake_backend_fuse_test",
+            CONF_STATUS_SENSOR: STATUS_SENSOR_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_CHARGER_DYNAMIC_CURRENT_SENSOR: DYNAMIC_CURRENT_SENSOR_ID,
+            CONF_METER_INGEST: True,
+            CONF_METER_PHASE_SENSORS: PHASE_IDS,
+            CONF_MAIN_FUSE_A: 25,
+        },
+        entry_id="test_fake_backend_fuse_entry",
+    )
+    entry.add_to_hass(hass)
+    coordinator = SmartEVChargingCoordinator(hass, entry, 30)
+    fake = FakeChargerBackend(hass, STATUS_SENSOR_ID, DYNAMIC_CURRENT_SENSOR_ID)
+    fake.min_current_interval = timedelta(seconds=60)
+    coordinator.charger_backend = fake
+
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(DYNAMIC_CURRENT_SENSOR_ID, "0")
+    hass.states.async_set(PRICE_SENSOR_ID, "0.10")
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_AWAITING_START)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 0.50)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
+
+    def meter(seconds: float, l1: float, l2: float, l3: float) -> None:
+        with patch.object(dt_util, "utcnow", return_value=_at(seconds)):
+            for entity_id, current in zip(PHASE_IDS, (l1, l2, l3)):
+                hass.states.async_set(
+                    entity_id,
+                    str(current),
+                    {"unit_of_measurement": "A"},
+                    context=Context(),
+                )
+
+    async def refresh(seconds: float) -> None:
+        with patch.object(dt_util, "utcnow", return_value=_at(seconds)):
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+
+    await coordinator.async_load_persisted_state()
+    try:
+        with patch.object(coordinator, "async_request_refresh", AsyncMock()):
+            meter(0, 2.0, 2.0, 2.0)
+            meter(5, 2.0, 2.0, 2.0)
+            await refresh(6)
+            assert fake.commands == [("current", 16.0), ("start", True)]
+            await refresh(7)
+
+            meter(15, 31.0, 18.0, 18.0)
+            meter(20, 31.0, 18.0, 18.0)
+            await hass.async_block_till_done()
+            await refresh(26)
+            assert coordinator.target_charge_current_a == 10.0
+            assert fake.commands[-1] == ("current", 10.0)
+    finally:
+        await coordinator.cleanup()
@@ -0,0 +1,163 @@
+# tests/test_laddkurva.py
+"""
+Testar den inlärda laddkurvan: bilens effekt per SoC-intervall lärs in från
+sessionens prover, och tiden till målet, laddplanens nätintervall och
+laddningen mot avresan räknas med kurvan i stället för med konstant effekt.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from custom_components.smart_ev_charging.charge_curve import ChargeCurve
+from custom_components.smart_ev_charging.deadline import DeadlinePlanner
+from custom_components.smart_ev_charging.planner import ChargePlanner
+from custom_components.smart_ev_charging.price_cache import PriceSeries
+from custom_components.smart_ev_charging.solar_forecast import SolarForecast
+
+# Timpriser i kr/kWh från midnatt. Billigast är timme 2, sedan 3 och 1.
+PRICES = [0.30, 0.20, 0.10, 0.15] + [0.90] * 20
+
+
+def _day_start() -> datetime:
+    """Midnatt i testets lokala tidszon."""
+    return dt_util.as_utc(
+        dt_util.start_of_local_day(datetime(2025, 6, 2, 12, 0, tzinfo=dt_util.UTC))
+    )
+
+
+def _learned_curve(hass: HomeAssistant) -> ChargeCurve:
+    """Kurva från en session med 11 kW upp till 80 %, 7 kW till 90 % och 3 kW över."""
+    curve = ChargeCurve(hass, "test_charge_curve_entry")
+    for soc in range(40, 100):
+        power_w = 11000 if soc < 80 else 7000 if soc < 90 else 3000
+        curve.add_sample(soc + 0.5, power_w, offered_w=11000)
+    assert curve.end_session()
+    return curve
+
+
+async def test_curve_learned_from_session(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera inlärningen, uppslagen och att tabellen sparas.
+    FÖRUTSÄTTNINGAR: En session där bilen tog hela den erbjudna effekten
+    (11 kW) upp till 80 % och därefter 7 kW respektive 3 kW. En andra session
+    tar 5 kW vid 84 %.
+    FÖRVÄNTAT RESULTAT: Ingen gräns under 80 %, 7 kW vid 85 %. Från 70 % till
+    90 % tar 6 kWh / 11 kW + 6 kWh / 7 kW. Den andra sessionen flyttar gränsen
+    30 % mot 5 kW i intervallet 84-86 %. Tabellen läses in igen efter sparning.
+    """
+    curve = _learned_curve(hass)
+    assert curve.power_kw(50, 11.0) == 11.0
+    assert curve.power_kw(85, 11.0) == pytest.approx(7.0)
+    assert curve.power_kw(95, 3.7) == pytest.approx(3.0)
+    assert curve.hours_to_charge(70, 90, 11.0, 60.0) == pytest.approx(
+        6 / 11 + 6 / 7
+    )
+
+    curve.add_sample(84.5, 5000, offered_w=11000)
+    curve.end_session()
+    assert curve.power_kw(84.5, 11.0) == pytest.approx(7.0 + 0.3 * (5.0 - 7.0))
+    assert curve.power_kw(86, 11.0) == pytest.approx(7.0)
+
+    await curve.async_save()
+    restored = ChargeCurve(hass, "test_charge_curve_entry")
+    await restored.async_load()
+    assert restored.limit_kw == [
+        round(limit, 2) if limit is not None else None for limit in curve.limit_kw
+    ]
+
+
+async def test_plan_reserves_taper_time(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att laddplanen väljer fler billiga intervall när bilen
+    laddar långsammare nära full SoC.
+    FÖRUTSÄTTNINGAR: 10 kWh nätel från 80 % SoC med 60 kWh batteri och 11 kW
+    laddeffekt. Ingen solprognos.
+    FÖRVÄNTAT RESULTAT: Med konstant effekt räcker timme 2. Med laddkurvan
+    (7 kW till 90 %, 3 kW över) behövs drygt 2 timmar, och timme 1-3 väljs.
+    En laddkurva utan inlärda intervall ger samma plan som ingen laddkurva,
+    även med verkningsgrad.
+    """
+    day_start = _day_start()
+    series = PriceSeries.from_attributes(
+        {
+            "unit_of_measurement": "SEK/kWh",
+            "raw_today": [
+                {
+                    "start": day_start + timedelta(hours=i),
+                    "end": day_start + timedelta(hours=i + 1),
+                    "value": price,
+                }
+                for i, price in enumerate(PRICES)
+            ],
+        }
+    )
+    now = day_start + timedelta(minutes=30)
+
+    def grid_hours(planner: ChargePlanner) -> list[int]:
+        planner.update(now, series, SolarForecast(), 10.0, 11.0, 4.1, 80.0)
+        return [
+            h
+            for h in range(24)
+            if planner.grid_charge_allowed(day_start + timedelta(hours=h, minutes=45))
+        ]
+
+    assert grid_hours(ChargePlanner(base_load_w=500)) == [2]
+    planner = ChargePlanner(
+        base_load_w=500, charge_curve=_learned_curve(hass), capacity_kwh=60.0
+    )
+    assert grid_hours(planner) == [1, 2, 3]
+
+    # 10 kWh med 50 % verkningsgrad tar drygt 1,8 timmar med 11 kW.
+    without_curve = grid_hours(ChargePlanner(base_load_w=500, efficiency=0.5))
+    empty_curve = ChargePlanner(
+        base_load_w=500,
+        charge_curve=ChargeCurve(hass, "test_empty_charge_curve_entry"),
+        capacity_kwh=60.0,
+        efficiency=0.5,
+    )
+    assert len(without_curve) == 2
+    assert grid_hours(empty_curve) == without_curve
+
+
+async def test_deadline_reserves_taper_time(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att laddningen mot avresan räknar laddtiden mot SoC-målet
+    med laddkurvan.
+    FÖRUTSÄTTNINGAR: SoC 80 %, mål 100 %, 60 kWh batteri och 11 kW laddeffekt.
+    Avresa kl. 06.
+    FÖRVÄNTAT RESULTAT: Med konstant effekt tar 12 kWh drygt en timme. Med
+    laddkurvan tar 80-90 % 6 kWh / 7 kW och 90-100 % 6 kWh / 3 kW, och fler
+    billiga intervall väljs.
+    """
+    day_start = _day_start()
+    series = PriceSeries.from_attributes(
+        {
+            "unit_of_measurement": "SEK/kWh",
+            "raw_today": [
+                {
+                    "start": day_start + timedelta(hours=i),
+                    "end": day_start + timedelta(hours=i + 1),
+                    "value": price,
+                }
+                for i, price in enumerate(PRICES)
+            ],
+        }
+    )
+    now = day_start + timedelta(minutes=30)
+    deadline = day_start + timedelta(hours=6)
+
+    planner = DeadlinePlanner(100.0, None)
+    planner.update(now, series, deadline, 11.0, 80.0, 60.0)
+    assert planner.required_hours == pytest.approx(12 / 11)
+
+    planner.charge_curve = _learned_curve(hass)
+    planner.update(now, series, deadline, 11.0, 80.0, 60.0)
+    assert planner.required_hours == pytest.approx(6 / 7 + 6 / 3)
+    assert [
+        h
+        for h in range(6)
+        if planner.charge_now(day_start + timedelta(hours=h, minutes=45))
+    ] == [1, 2, 3]
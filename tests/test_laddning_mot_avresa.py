@@ -0,0 +1,211 @@
+# tests/test_laddning_mot_avresa.py
+"""
+Testar laddning mot avresan: de billigaste intervallen före avresan väljs så
+att behovet täcks, planen räknas om bara vid ny information och laddningen
+eskaleras när tiden inte längre räcker.
+"""
+
+import pytest
+import logging
+from unittest.mock import patch
+from datetime import datetime, timedelta
+
+from homeassistant.core import HomeAssistant
+from homeassistant.const import STATE_ON
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_mock_service,
+)
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
+    CONF_EV_SOC_SENSOR,
+    CONF_TARGET_SOC_LIMIT,
+    CONF_DEBUG_LOGGING,
+    CONF_EV_BATTERY_CAPACITY_KWH,
+    CONF_CHARGING_EFFICIENCY_PERCENT,
+    CONF_DEPARTURE_TIME,
+    CONF_DEADLINE_SOC_PERCENT,
+    EASEE_STATUS_READY_TO_CHARGE,
+    CONTROL_MODE_MANUAL,
+    CONTROL_MODE_DEADLINE,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+from custom_components.smart_ev_charging.deadline import DeadlinePlanner
+from custom_components.smart_ev_charging.price_cache import PriceSeries
+
+STATUS_SENSOR_ID = "sensor.easee_status_deadline"
+POWER_SWITCH_ID = "switch.easee_power_deadline"
+PRICE_SENSOR_ID = "sensor.nordpool_price_deadline"
+SOC_SENSOR_ID = "sensor.ev_soc_deadline"
+MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_deadline"
+
+START = datetime(2025, 6, 2, 0, 0, tzinfo=dt_util.UTC)
+DEADLINE = START + timedelta(hours=7)
+# Timpriser i kr/kWh från START. Kl. 07 är billigast men efter avresan.
+SERIES_PRICES = [0.5, 0.6, 0.1, 0.15, 0.9, 0.2, 0.9, 0.05] + [0.9] * 16
+# Timpriser från lokal midnatt för koordinatortestet.
+PRICES = [0.30, 0.20, 0.10, 0.15] + [0.90] * 20
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+def _series() -> PriceSeries:
+    return PriceSeries(
+        [
+            (START + timedelta(hours=i), START + timedelta(hours=i + 1), price)
+            for i, price in enumerate(SERIES_PRICES)
+        ]
+    )
+
+
+def _at(hours: float) -> datetime:
+    return START + timedelta(hours=hours)
+
+
+def test_cheapest_slots_before_deadline():
+    """
+    SYFTE: Verifiera valet av intervall, att planen bara räknas om vid behov,
+    att energin räknas mot målet och att laddningen eskaleras.
+    FÖRUTSÄTTNINGAR: 22 kWh ska laddas med 11 kW före kl. 07, dvs. 2 timmar.
+    Billigast före avresan är kl. 02 och 03, därefter kl. 05.
+    FÖRVÄNTAT RESULTAT: Kl. 02 och 03 väljs. En ny cykel utan ny information
+    räknar inte om planen. Laddar bilen inte kl. 02 väljs kl. 03 och 05 i
+    stället. Kl. 05:30 hinns behovet inte med och laddningen eskaleras. Efter
+    avresan börjar en ny period.
+    """
+    planner = DeadlinePlanner(None, 22.0)
+    series = _series()
+
+    planner.update(_at(0.5), series, DEADLINE, 11.0)
+    assert planner.required_hours == pytest.approx(2.0)
+    assert not planner.charge_now(_at(0.5))
+    assert planner.charge_now(_at(2.5)) and planner.charge_now(_at(3.5))
+    assert not planner.charge_now(_at(5.5))
+    assert planner.next_slot(_at(0.5)) == _at(2)
+
+    with patch.object(planner, "_plan", wraps=planner._plan) as plan:
+        planner.update(_at(0.75), series, DEADLINE, 11.0)
+        plan.assert_not_called()
+        # Bilen laddade inte kl. 02: de valda intervallen räcker inte längre.
+        planner.update(_at(3), series, DEADLINE, 11.0)
+        plan.assert_called_once()
+    assert planner.charge_now(_at(3.5)) and planner.charge_now(_at(5.5))
+    assert not planner.escalated
+
+    planner.record_power(_at(3), 11000)
+    planner.record_power(_at(3.25), 0)
+    planner.update(_at(5.5), series, DEADLINE, 11.0)
+    assert planner.remaining_kwh == pytest.approx(22.0 - 2.75)
+    assert planner.escalated
+    assert planner.charge_now(_at(6.5))
+
+    planner.update(_at(7.5), series, DEADLINE + timedelta(days=1), 11.0)
+    assert planner.delivered_kwh == 0.0
+    assert not planner.escalated
+
+
+def _day_start() -> datetime:
+    """Midnatt i testets lokala tidszon."""
+    return dt_util.as_utc(
+        dt_util.start_of_local_day(datetime(2025, 6, 2, 12, 0, tzinfo=dt_util.UTC))
+    )
+
+
+def _price_attributes(day_start: datetime) -> dict:
+    return {
+        "unit_of_measurement": "SEK/kWh",
+        "raw_today": [
+            {
+                "start": day_start + timedelta(hours=i),
+                "end": day_start + timedelta(hours=i + 1),
+                "value": price,
+            }
+            for i, price in enumerate(PRICES)
+        ],
+    }
+
+
+async def test_deadline_charging_above_max_price(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att laddning mot avresan laddar i det billigaste
+    intervallet före avresan trots att priset överstiger maxpriset.
+    FÖRUTSÄTTNINGAR: SoC 60 %, mål 80 % före avresan 07:00, 50 kWh batteri och
+    100 % verkningsgrad ger 10 kWh, knappt en timme med 16A. Maxpriset 0.05 kr
+    understiger alla priser. Billigast före avresan är kl. 02.
+    FÖRVÄNTAT RESULTAT: Kl. 00:10 laddas inte och nästa valda intervall är
+    kl. 02. Kl. 02:10 laddas med full ström i läget AVRESA.
+    """
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "easee_deadline_test",
+            CONF_STATUS_SENSOR: STATUS_SENSOR_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_EV_SOC_SENSOR: SOC_SENSOR_ID,
+            CONF_TARGET_SOC_LIMIT: 90,
+            CONF_DEBUG_LOGGING: True,
+        },
+        options={
+            CONF_EV_BATTERY_CAPACITY_KWH: 50,
+            CONF_CHARGING_EFFICIENCY_PERCENT: 100,
+            CONF_DEPARTURE_TIME: "07:00:00",
+            CONF_DEADLINE_SOC_PERCENT: 80,
+        },
+        entry_id="test_deadline_entry",
+    )
+    entry.add_to_hass(hass)
+    coordinator = SmartEVChargingCoordinator(hass, entry, 30)
+    assert coordinator.deadline_planner is not None
+    set_current_calls = async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    async_mock_service(hass, "easee", "action_command")
+
+    day_start = _day_start()
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_READY_TO_CHARGE[0])
+    hass.states.async_set(SOC_SENSOR_ID, "60")
+    hass.states.async_set(PRICE_SENSOR_ID, "0.30", _price_attributes(day_start))
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 0.05)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
+
+    with patch.object(
+        dt_util, "utcnow", return_value=day_start + timedelta(minutes=10)
+    ):
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+    assert coordinator.active_control_mode == CONTROL_MODE_MANUAL
+    assert coordinator.data["deadline_remaining_kwh"] == pytest.approx(10.0)
+    assert coordinator.data["deadline_next_slot"] == (
+        (day_start + timedelta(hours=2)).isoformat()
+    )
+    assert coordinator.data["deadline_time"] == (
+        (day_start + timedelta(hours=7)).isoformat()
+    )
+
+    hass.states.async_set(PRICE_SENSOR_ID, "0.10", _price_attributes(day_start))
+    with patch.object(
+        dt_util, "utcnow", return_value=day_start + timedelta(hours=2, minutes=10)
+    ):
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+    assert coordinator.active_control_mode == CONTROL_MODE_DEADLINE
+    assert coordinator.should_charge_flag
+    assert "avresa 07:00" in coordinator.data["should_charge_reason"]
+    assert set_current_calls[-1].data["current"] == 16
@@ -0,0 +1,262 @@
+# tests/test_laddschema_easee.py
+"""
+Testar laddschema i laddaren: Pris/Tid-fönstret skickas som laddarens egen
+laddplan när det ändras, koordinatorn låter laddaren starta och sluta själv och
+styr direkt först när laddaren inte följer schemat. Schemat tas bort när ingen
+längre följer upp det.
+"""
+
+import pytest
+import logging
+from unittest.mock import patch
+from datetime import datetime, timedelta
+
+from homeassistant.core import Context, HomeAssistant
+from homeassistant.const import STATE_ON
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_mock_service,
+)
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
+    CONF_CHARGER_DYNAMIC_CURRENT_SENSOR,
+    CONF_DEBUG_LOGGING,
+    CONF_EASEE_SCHEDULE_UPLOAD,
+    EASEE_STATUS_CHARGING,
+    EASEE_STATUS_READY_TO_CHARGE,
+    CONTROL_MODE_PRICE_TIME,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+
+STATUS_SENSOR_ID = "sensor.easee_status_schedule"
+POWER_SWITCH_ID = "switch.easee_power_schedule"
+PRICE_SENSOR_ID = "sensor.nordpool_price_schedule"
+MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_schedule"
+DYNAMIC_CURRENT_SENSOR_ID = "sensor.charger_dynamic_current_schedule"
+
+# Timpriser i kr/kWh från lokal midnatt. Kl. 01-03 understiger maxpriset.
+PRICES = [0.90, 0.10, 0.10] + [0.90] * 21
+MAX_PRICE = 0.50
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+def _day_start() -> datetime:
+    """Midnatt i testets lokala tidszon."""
+    return dt_util.as_utc(
+        dt_util.start_of_local_day(datetime(2025, 6, 2, 12, 0, tzinfo=dt_util.UTC))
+    )
+
+
+def _price_attributes(day_start: datetime) -> dict:
+    return {
+        "unit_of_measurement": "SEK/kWh",
+        "raw_today": [
+            {
+                "start": day_start + timedelta(hours=i),
+                "end": day_start + timedelta(hours=i + 1),
+                "value": price,
+            }
+            for i, price in enumerate(PRICES)
+        ],
+    }
+
+
+async def _setup(hass: HomeAssistant, schedule: bool, entry_id: str | None = None):
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "easee_schedule_test",
+            CONF_STATUS_SENSOR: STATUS_SENSOR_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_CHARGER_DYNAMIC_CURRENT_SENSOR: DYNAMIC_CURRENT_SENSOR_ID,
+            CONF_DEBUG_LOGGING: True,
+        },
+        options={CONF_EASEE_SCHEDULE_UPLOAD: schedule},
+        entry_id=entry_id or f"test_schedule_entry_{schedule}",
+    )
+    entry.add_to_hass(hass)
+    coordinator = SmartEVChargingCoordinator(hass, entry, 30)
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(DYNAMIC_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(PRICE_SENSOR_ID, "0.90", _price_attributes(_day_start()))
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, MAX_PRICE)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
+    return coordinator
+
+
+def _set_status(hass: HomeAssistant, status: str, moment: datetime) -> None:
+    """Sätter laddarens status med tidpunkten som senaste ändring."""
+    with patch.object(dt_util, "utcnow", return_value=moment):
+        hass.states.async_set(STATUS_SENSOR_ID, status, context=Context())
+
+
+async def _refresh(hass: HomeAssistant, coordinator, moment: datetime) -> None:
+    with patch.object(dt_util, "utcnow", return_value=moment):
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+
+async def _run_night(hass: HomeAssistant, schedule: bool) -> int:
+    """Kör en natt där laddaren laddar i det billiga fönstret kl. 01-03."""
+    coordinator = await _setup(hass, schedule)
+    day_start = _day_start()
+    _set_status(hass, EASEE_STATUS_READY_TO_CHARGE[0], day_start)
+    await _refresh(hass, coordinator, day_start + timedelta(minutes=10))
+    await _refresh(hass, coordinator, day_start + timedelta(hours=1))
+    assert coordinator.active_control_mode == CONTROL_MODE_PRICE_TIME
+    # Laddaren startar, av kommandot eller av sitt eget schema.
+    _set_status(hass, EASEE_STATUS_CHARGING, day_start + timedelta(hours=1, minutes=1))
+    await _refresh(hass, coordinator, day_start + timedelta(hours=1, minutes=10))
+    await _refresh(hass, coordinator, day_start + timedelta(hours=3))
+    _set_status(
+        hass, EASEE_STATUS_READY_TO_CHARGE[0], day_start + timedelta(hours=3, minutes=1)
+    )
+    await _refresh(hass, coordinator, day_start + timedelta(hours=3, minutes=10))
+    return coordinator.data["charger_commands_today"]
+
+
+async def test_schedule_upload_sends_fewer_commands(hass: HomeAssistant):
+    """
+    SYFTE: Jämföra antalet kommandon till laddaren under en natt med direkt
+    styrning och med laddschema i laddaren.
+    FÖRUTSÄTTNINGAR: Priset understiger maxpriset kl. 01-03. Laddaren startar
+    kl. 01 och slutar kl. 03.
+    FÖRVÄNTAT RESULTAT: Direkt styrning skickar ström, start och paus. Med
+    laddschema skickas bara fönstret, en gång, och inget start-, ström- eller
+    pauskommando.
+    """
+    set_current_calls = async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    action_calls = async_mock_service(hass, "easee", "action_command")
+    set_plan_calls = async_mock_service(hass, "easee", "set_charger_basic_charge_plan")
+    delete_plan_calls = async_mock_service(
+        hass, "easee", "delete_charger_basic_charge_plan"
+    )
+
+    assert await _run_night(hass, schedule=False) == 3
+    assert [call.data["action_command"] for call in action_calls] == [
+        "start",
+        "pause",
+    ]
+    assert len(set_current_calls) == 1
+    assert not set_plan_calls
+
+    set_current_calls.clear()
+    action_calls.clear()
+    assert await _run_night(hass, schedule=True) == 1
+    assert not set_current_calls and not action_calls and not delete_plan_calls
+    assert len(set_plan_calls) == 1
+
+
+async def test_schedule_window_and_direct_fallback(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera det uppladdade fönstret, att det bara skickas vid ändring,
+    att det tas bort när Pris/Tid inte längre laddar och att laddaren styrs
+    direkt när den inte startar själv.
+    FÖRUTSÄTTNINGAR: Priset understiger maxpriset kl. 01-03. Bilen är redo sedan
+    midnatt men laddaren startar inte kl. 01.
+    FÖRVÄNTAT RESULTAT: Fönstret 01:00-03:00 (lokal tid) skickas en gång.
+    Kl. 01:02 inväntas laddaren, kl. 01:04 skickas start och ström. Ett sänkt
+    maxpris tar bort schemat.
+    """
+    set_current_calls = async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    action_calls = async_mock_service(hass, "easee", "action_command")
+    set_plan_calls = async_mock_service(hass, "easee", "set_charger_basic_charge_plan")
+    delete_plan_calls = async_mock_service(
+        hass, "easee", "delete_charger_basic_charge_plan"
+    )
+    coordinator = await _setup(hass, schedule=True)
+    day_start = _day_start()
+    _set_status(hass, EASEE_STATUS_READY_TO_CHARGE[0], day_start)
+
+    await _refresh(hass, coordinator, day_start + timedelta(minutes=10))
+    await _refresh(hass, coordinator, day_start + timedelta(minutes=20))
+    assert len(set_plan_calls) == 1
+    assert set_plan_calls[0].data == {
+        "device_id": "easee_schedule_test",
+        "charge_start_time": "01:00:00",
+        "charge_stop_time": "03:00:00",
+        "repeat": False,
+    }
+    assert coordinator.data["charge_schedule_window"] == (
+        f"{(day_start + timedelta(hours=1)).isoformat()}/"
+        f"{(day_start + timedelta(hours=3)).isoformat()}"
+    )
+
+    await _refresh(hass, coordinator, day_start + timedelta(hours=1, minutes=2))
+    assert coordinator.should_charge_flag
+    assert not action_calls and not set_current_calls
+
+    await _refresh(hass, coordinator, day_start + timedelta(hours=1, minutes=4))
+    assert [call.data["action_command"] for call in action_calls] == ["start"]
+    assert set_current_calls[-1].data["current"] == 16
+    assert len(set_plan_calls) == 1
+
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 0.05)
+    await _refresh(hass, coordinator, day_start + timedelta(hours=1, minutes=10))
+    assert len(delete_plan_calls) == 1
+    assert coordinator.data["charge_schedule_window"] is None
+
+
+async def test_schedule_removed_on_unload_and_when_disabled(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att ett uppladdat schema inte blir kvar i laddaren när
+    ingen längre följer upp det.
+    FÖRUTSÄTTNINGAR: Fönstret 01:00-03:00 har skickats till laddaren. Först
+    avlastas integrationen. Sedan skickas fönstret igen, Home Assistant startas
+    om och uppladdningen stängs av.
+    FÖRVÄNTAT RESULTAT: Schemat tas bort vid avlastningen. Efter omstarten med
+    avstängd uppladdning tas det kvarvarande schemat bort vid inläsningen.
+    """
+    set_plan_calls = async_mock_service(hass, "easee", "set_charger_basic_charge_plan")
+    delete_plan_calls = async_mock_service(
+        hass, "easee", "delete_charger_basic_charge_plan"
+    )
+    day_start = _day_start()
+    _set_status(hass, EASEE_STATUS_READY_TO_CHARGE[0], day_start)
+
+    coordinator = await _setup(hass, schedule=True)
+    await _refresh(hass, coordinator, day_start + timedelta(minutes=10))
+    assert len(set_plan_calls) == 1
+    with patch.object(
+        dt_util, "utcnow", return_value=day_start + timedelta(minutes=20)
+    ):
+        await coordinator.cleanup()
+    assert len(delete_plan_calls) == 1
+
+    coordinator = await _setup(hass, True, "test_schedule_entry_restart")
+    await _refresh(hass, coordinator, day_start + timedelta(minutes=30))
+    assert len(set_plan_calls) == 2
+    await coordinator.async_save_persisted_state()
+
+    entry = coordinator.entry
+    hass.config_entries.async_update_entry(
+        entry, options={CONF_EASEE_SCHEDULE_UPLOAD: False}
+    )
+    restarted = SmartEVChargingCoordinator(hass, entry, 30)
+    assert restarted.charge_schedule is None
+    with patch.object(
+        dt_util, "utcnow", return_value=day_start + timedelta(minutes=40)
+    ):
+        await restarted.async_load_persisted_state()
+        await hass.async_block_till_done()
+    assert len(delete_plan_calls) == 2
+    assert delete_plan_calls[-1].data == {"device_id": "easee_schedule_test"}
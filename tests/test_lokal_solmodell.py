@@ -0,0 +1,226 @@
+# tests/test_lokal_solmodell.py
+"""
+Testar den lokala solmodellen: sensorhistoriken samplas om till
+timmedeleffekter, klarvädershöljet och persistensfaktorn ger prognosen, och
+laddplanen använder modellens prognos när ingen prognossensor finns.
+"""
+
+import json
+import pytest
+import logging
+from unittest.mock import patch
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from homeassistant.core import HomeAssistant, State
+from homeassistant.const import STATE_ON
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_mock_service,
+)
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_SOLAR_PRODUCTION_SENSOR,
+    CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
+    CONF_EV_SOC_SENSOR,
+    CONF_TARGET_SOC_LIMIT,
+    CONF_DEBUG_LOGGING,
+    CONF_HOUSE_BASE_LOAD_W,
+    CONF_EV_BATTERY_CAPACITY_KWH,
+    CONF_DEPARTURE_TIME,
+    CONF_LOCAL_SOLAR_MODEL,
+    EASEE_STATUS_READY_TO_CHARGE,
+    CONTROL_MODE_MANUAL,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+from custom_components.smart_ev_charging.solar_model import (
+    SolarProductionModel,
+    hourly_mean_power_kw,
+    local_hours,
+    samples_kw,
+)
+
+STATUS_SENSOR_ID = "sensor.easee_status_solar_model"
+POWER_SWITCH_ID = "switch.easee_power_solar_model"
+PRICE_SENSOR_ID = "sensor.nordpool_price_solar_model"
+SOC_SENSOR_ID = "sensor.ev_soc_solar_model"
+SOLAR_PROD_SENSOR_ID = "sensor.solar_production_solar_model"
+MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_solar_model"
+
+# Timpriser i kr/kWh från midnatt. Natten är billig, dagen dyrare.
+PRICES = [0.30, 0.20, 0.10, 0.15] + [0.90] * 20
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+def _day_start() -> datetime:
+    """Midnatt i testets lokala tidszon."""
+    return dt_util.as_utc(
+        dt_util.start_of_local_day(datetime(2025, 6, 2, 12, 0, tzinfo=dt_util.UTC))
+    )
+
+
+def _price_attributes(day_start: datetime) -> dict:
+    return {
+        "unit_of_measurement": "SEK/kWh",
+        "raw_today": [
+            {
+                "start": day_start + timedelta(hours=i),
+                "end": day_start + timedelta(hours=i + 1),
+                "value": price,
+            }
+            for i, price in enumerate(PRICES)
+        ],
+    }
+
+
+def _clear_day_kw(power_kw: float) -> np.ndarray:
+    """Timmedeleffekt med given effekt mellan 10 och 16, annars 0."""
+    hourly = np.zeros(24)
+    hourly[10:16] = power_kw
+    return hourly
+
+
+def test_hourly_mean_power_from_state_history():
+    """
+    SYFTE: Verifiera att sensorns tillstånd samplas om till medeleffekt per
+    timme, med W eller kW som enhet och okända värden bortsedda.
+    FÖRUTSÄTTNINGAR: 0 W från midnatt, 4000 W 10:00-10:30, 2 kW 10:30-12:00,
+    otillgänglig 12:00-13:00, därefter 0 W.
+    FÖRVÄNTAT RESULTAT: 3 kW kl. 10, 2 kW kl. 11, okänt kl. 12 och 0 kW i
+    övrigt.
+    """
+    day_start = _day_start()
+    day = dt_util.as_local(day_start).date()
+
+    def state(value: str, unit: str, hours: float) -> State:
+        return State(
+            SOLAR_PROD_SENSOR_ID,
+            value,
+            {"unit_of_measurement": unit},
+            last_changed=day_start + timedelta(hours=hours),
+        )
+
+    times, values = samples_kw(
+        [
+            state("0", "W", 0),
+            state("4000", "W", 10),
+            state("2", "kW", 10.5),
+            state("unavailable", "W", 12),
+            state("0", "W", 13),
+        ]
+    )
+    hourly = hourly_mean_power_kw(*local_hours(day), times, values)
+    assert hourly[10] == pytest.approx(3.0)
+    assert hourly[11] == pytest.approx(2.0)
+    assert np.isnan(hourly[12])
+    assert hourly[9] == 0.0 and hourly[13] == 0.0
+
+
+def test_envelope_and_persistence_prediction():
+    """
+    SYFTE: Verifiera klarvädershöljet, persistensfaktorn och att tabellen kan
+    sparas och läsas in.
+    FÖRUTSÄTTNINGAR: En klar dag med 6 kW och därefter en halvmulen dag med
+    3 kW mellan 10 och 16.
+    FÖRVÄNTAT RESULTAT: Höljet behåller 6 kW. Persistensen är det viktade
+    medlet (6 * 1.0 + 7 * 0.5) / 13, där dygn 7 av 7 är det senaste. Prognosen
+    är höljet gånger persistensen.
+    """
+    day = dt_util.as_local(_day_start()).date()
+    model = SolarProductionModel()
+    assert model.persistence == 1.0
+    assert not model.predict_day_kw(day).any()
+
+    model.fit_day(day - timedelta(days=2), _clear_day_kw(6.0))
+    model.fit_day(day - timedelta(days=1), _clear_day_kw(3.0))
+    assert model.envelope_for(day)[12] == pytest.approx(6.0)
+    assert model.persistence == pytest.approx(9.5 / 13.0)
+    assert model.predict_day_kw(day)[12] == pytest.approx(6.0 * 9.5 / 13.0)
+    assert model.predict_day_kw(day)[20] == 0.0
+
+    restored = SolarProductionModel.from_dict(json.loads(json.dumps(model.as_dict())))
+    assert restored.last_day == day - timedelta(days=1)
+    assert restored.predict_day_kw(day)[12] == pytest.approx(
+        model.predict_day_kw(day)[12], abs=0.01
+    )
+
+
+async def test_charge_plan_uses_local_model(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att laddplanen använder den lokala solmodellens prognos
+    när ingen prognossensor är konfigurerad.
+    FÖRUTSÄTTNINGAR: Modellen har tränats på en klar dag med 6 kW mellan 10 och
+    16. SoC 50 %, mål 80 % och 60 kWh batteri ger 18 kWh behov. Kl. 02 är
+    priset 0.10 kr, under maxpriset 0.50 kr. Avresa kl. 18.
+    FÖRVÄNTAT RESULTAT: Med 33 kWh väntat överskott väntar Pris/Tid-laddningen
+    på solen, och planen anger den lokala modellen som källa.
+    """
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "easee_solar_model_test",
+            CONF_STATUS_SENSOR: STATUS_SENSOR_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_SOLAR_PRODUCTION_SENSOR: SOLAR_PROD_SENSOR_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_EV_SOC_SENSOR: SOC_SENSOR_ID,
+            CONF_TARGET_SOC_LIMIT: 80,
+            CONF_DEBUG_LOGGING: True,
+        },
+        options={
+            CONF_LOCAL_SOLAR_MODEL: True,
+            CONF_HOUSE_BASE_LOAD_W: 500,
+            CONF_EV_BATTERY_CAPACITY_KWH: 60,
+            CONF_DEPARTURE_TIME: "18:00:00",
+        },
+        entry_id="test_solar_model_entry",
+    )
+    entry.add_to_hass(hass)
+    day_start = _day_start()
+    today = dt_util.as_local(day_start).date()
+    coordinator = SmartEVChargingCoordinator(hass, entry, 30)
+    assert coordinator.solar_model is not None
+    assert coordinator.charge_planner is not None
+    async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    async_mock_service(hass, "easee", "action_command")
+
+    coordinator.solar_model.model.fit_day(today - timedelta(days=1), _clear_day_kw(6.0))
+    coordinator.solar_model.hourly_kwh = await hass.async_add_executor_job(
+        coordinator.solar_model._predict, today
+    )
+
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_READY_TO_CHARGE[0])
+    hass.states.async_set(SOC_SENSOR_ID, "50")
+    hass.states.async_set(SOLAR_PROD_SENSOR_ID, "0")
+    hass.states.async_set(PRICE_SENSOR_ID, "0.10", _price_attributes(day_start))
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 0.50)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
+
+    with patch.object(
+        dt_util, "utcnow", return_value=day_start + timedelta(hours=2, minutes=10)
+    ):
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+    assert coordinator.active_control_mode == CONTROL_MODE_MANUAL
+    assert coordinator.data["charge_plan_expected_surplus_kwh"] == pytest.approx(33.0)
+    assert coordinator.data["charge_plan_grid_kwh"] == 0.0
+    assert coordinator.data["charge_plan_forecast_source"] == "local_model"
@@ -0,0 +1,347 @@
+# tests/test_modbus_avlasning.py
+"""
+Testar den snabba avläsningen via Modbus TCP mot en lokal Modbus-simulator:
+registerformatet, sammanslagna läsanrop, tecken och skala, återanslutning
+och att koordinatorn använder värdena i stället för sensorerna.
+"""
+
+import asyncio
+import logging
+import struct
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+from homeassistant.const import STATE_ON, UnitOfPower
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_mock_service,
+)
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_SOLAR_PRODUCTION_SENSOR,
+    CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
+    CONF_MODBUS_HOST,
+    CONF_MODBUS_PORT,
+    CONF_MODBUS_SOLAR_REGISTER,
+    CONF_MODBUS_GRID_REGISTER,
+    EASEE_STATUS_READY_TO_CHARGE,
+    CONTROL_MODE_SOLAR_SURPLUS,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+    ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER,
+    ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+from custom_components.smart_ev_charging.modbus_reader import (
+    SOURCE_GRID,
+    SOURCE_SOLAR,
+    ModbusError,
+    ModbusPowerReader,
+    ModbusTcpClient,
+    build_read_blocks,
+    parse_register,
+)
+
+STATUS_SENSOR_ID = "sensor.charger_status_modbus"
+POWER_SWITCH_ID = "switch.charger_power_modbus"
+PRICE_SENSOR_ID = "sensor.nordpool_price_modbus"
+SOLAR_SENSOR_ID = "sensor.solar_production_modbus"
+MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_modbus"
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+class ModbusSimulator:
+    """Modbus TCP-server som svarar på läsning av holding- och input-register."""
+
+    def __init__(self) -> None:
+        # (enhet, adress) -> 16-bitarsord
+        self.registers: dict[tuple[int, int], int] = {}
+        self.requests: list[tuple[int, int, int, int]] = []
+        self.connections = 0
+        # Längden i svarens MBAP-huvud, None för korrekta svar.
+        self.response_length: int | None = None
+        self._writers: list[asyncio.StreamWriter] = []
+        self._server: asyncio.Server | None = None
+        self.port = 0
+
+    def set_int32(self, unit_id: int, address: int, value: int) -> None:
+        raw = value & 0xFFFFFFFF
+        self.registers[(unit_id, address)] = raw >> 16
+        self.registers[(unit_id, address + 1)] = raw & 0xFFFF
+
+    def set_int16(self, unit_id: int, address: int, value: int) -> None:
+        self.registers[(unit_id, address)] = value & 0xFFFF
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self.drop_connections()
+        self._server.close()
+        await self._server.wait_closed()
+
+    def drop_connections(self) -> None:
+        for writer in self._writers:
+            writer.close()
+        self._writers.clear()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.connections += 1
+        self._writers.append(writer)
+        try:
+            while True:
+                header = await reader.readexactly(7)
+                transaction_id, _, length, unit_id = struct.unpack(">HHHB", header)
+                function, address, count = struct.unpack(
+                    ">BHH", await reader.readexactly(length - 1)
+                )
+                self.requests.append((unit_id, function, address, count))
+                if self.response_length is not None:
+                    writer.write(
+                        struct.pack(
+                            ">HHHB", transaction_id, 0, self.response_length, unit_id
+                        )
+                    )
+                    await writer.drain()
+                    continue
+                words = [
+                    self.registers.get((unit_id, address + i))
+                    for i in range(count)
+                ]
+                if None in words:
+                    pdu = struct.pack(">BB", function | 0x80, 2)
+                else:
+                    pdu = struct.pack(f">BB{count}H", function, 2 * count, *words)
+                writer.write(
+                    struct.pack(">HHHB", transaction_id, 0, len(pdu) + 1, unit_id)
+                    + pdu
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def test_register_format_and_read_blocks():
+    """
+    SYFTE: Verifiera tolkningen av registren och grupperingen i läsanrop.
+    FÖRUTSÄTTNINGAR: Tre register, två intill varandra på enhet 1 och ett på
+    enhet 2.
+    FÖRVÄNTAT RESULTAT: Typ, skala och enhet tolkas. Registren intill varandra
+    läses i ett anrop och enhet 2 i ett eget. Ogiltiga register avvisas.
+    """
+    solar = parse_register("100:int32")
+    grid = parse_register("102 : int16 : -1")
+    meter = parse_register("40087:uint16:0,1@2")
+    assert (solar.address, solar.count, solar.signed) == (100, 2, True)
+    assert grid.scale == -1.0
+    assert (meter.unit_id, meter.scale, meter.signed) == (2, 0.1, False)
+
+    blocks = build_read_blocks({"solar": solar, "grid": grid, "meter": meter})
+    assert [(unit, start, count) for unit, start, count, _ in blocks] == [
+        (1, 100, 3),
+        (2, 40087, 1),
+    ]
+    assert [name for name, _ in blocks[0][3]] == ["solar", "grid"]
+
+    for invalid in ("100", "100:float32", "100:int16:0", "65535:int32", "1:int16@300"):
+        with pytest.raises(ValueError):
+            parse_register(invalid)
+
+
+@pytest.mark.usefixtures("socket_enabled")
+async def test_reader_against_simulator(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera avläsningen mot simulatorn.
+    FÖRUTSÄTTNINGAR: Solproduktionen är ett int32 på 100-101 och nätets effekt
+    ett int16 på 102 med skalan -1 (mätaren visar export som positiv).
+    FÖRVÄNTAT RESULTAT: Båda värdena läses med ett anrop per avläsning över
+    samma anslutning. Ett Modbus-undantag och en bruten anslutning ger en
+    misslyckad avläsning och nästa avläsning ansluter igen. Gamla värden
+    används inte.
+    """
+    simulator = ModbusSimulator()
+    await simulator.start()
+    simulator.set_int32(1, 100, 70000)
+    simulator.set_int16(1, 102, 1200)
+    reader = ModbusPowerReader.from_config(
+        hass,
+        {
+            CONF_MODBUS_HOST: "127.0.0.1",
+            CONF_MODBUS_PORT: simulator.port,
+            CONF_MODBUS_SOLAR_REGISTER: "100:int32",
+            CONF_MODBUS_GRID_REGISTER: "102:int16:-1",
+        },
+    )
+    received: list[dict[str, float]] = []
+    reader.async_add_listener(received.append)
+    try:
+        assert await reader.async_poll()
+        assert reader.values == {SOURCE_SOLAR: 70000.0, SOURCE_GRID: -1200.0}
+        simulator.set_int16(1, 102, -300)
+        assert await reader.async_poll()
+        assert reader.values[SOURCE_GRID] == 300.0
+        assert simulator.requests == [(1, 3, 100, 3), (1, 3, 100, 3)]
+        assert simulator.connections == 1 and reader.read_requests == 2
+        assert len(received) == 2
+
+        del simulator.registers[(1, 102)]
+        assert not await reader.async_poll()
+        assert reader.failures == 1
+        simulator.set_int16(1, 102, 0)
+
+        simulator.drop_connections()
+        await asyncio.sleep(0)
+        assert not await reader.async_poll()
+        assert await reader.async_poll()
+        assert reader.failures == 0
+        assert simulator.connections == 2
+
+        now = reader.updated_at
+        assert reader.power_w(SOURCE_SOLAR, now + timedelta(seconds=5)) == 70000.0
+        assert reader.power_w(SOURCE_SOLAR, now + timedelta(seconds=11)) is None
+    finally:
+        await reader.async_stop()
+        await simulator.stop()
+
+
+@pytest.mark.usefixtures("socket_enabled")
+async def test_invalid_length_and_unexpected_errors(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att felaktiga svar och oväntade fel inte stoppar
+    avläsningen.
+    FÖRUTSÄTTNINGAR: Enheten svarar med längden 0 och 1 i MBAP-huvudet. Den
+    första lyssnaren på värdena kastar ett fel i avläsningsloopen.
+    FÖRVÄNTAT RESULTAT: De felaktiga svaren ger ModbusError och anslutningen
+    öppnas på nytt. Loopen loggar det oväntade felet och fortsätter läsa.
+    """
+    simulator = ModbusSimulator()
+    await simulator.start()
+    simulator.set_int32(1, 100, 5000)
+    client = ModbusTcpClient("127.0.0.1", simulator.port)
+    reader = ModbusPowerReader(
+        hass,
+        "127.0.0.1",
+        simulator.port,
+        {SOURCE_SOLAR: parse_register("100:int32")},
+        interval_s=0.01,
+    )
+    calls = 0
+
+    def fail_once(values: dict[str, float]) -> None:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("lyssnaren")
+
+    reader.async_add_listener(fail_once)
+    try:
+        for length in (0, 1):
+            simulator.response_length = length
+            with pytest.raises(ModbusError, match=f"Ogiltig längd {length}"):
+                await client.async_read_registers(1, 3, 100, 2)
+        simulator.response_length = None
+        assert await client.async_read_registers(1, 3, 100, 2) == [0, 5000]
+        assert simulator.connections == 3
+
+        reader.async_start()
+        async with asyncio.timeout(5):
+            while calls < 3:
+                await asyncio.sleep(0.01)
+        assert reader.failures == 0
+        assert reader.values == {SOURCE_SOLAR: 5000.0}
+    finally:
+        client.close()
+        await reader.async_stop()
+        await simulator.stop()
+
+
+@pytest.mark.usefixtures("socket_enabled")
+async def test_coordinator_uses_modbus_values(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att solöverskottet beräknas från Modbus-värdena och att
+    en stor ändring ger en omedelbar omvärdering.
+    FÖRUTSÄTTNINGAR: Solenergiladdning är aktiv med 500 W buffert och minst 6A.
+    Solproduktionssensorn visar 0 W, men växelriktaren rapporterar 8000 W via
+    Modbus.
+    FÖRVÄNTAT RESULTAT: Laddningen startar med 10A, beräknat från Modbus-värdet.
+    När produktionen sjunker till 4000 W begärs en omvärdering direkt. När
+    Modbus-värdet är för gammalt används sensorn igen.
+    """
+    simulator = ModbusSimulator()
+    await simulator.start()
+    simulator.set_int32(1, 100, 8000)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "easee_modbus_test",
+            CONF_STATUS_SENSOR: STATUS_SENSOR_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_SOLAR_PRODUCTION_SENSOR: SOLAR_SENSOR_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_MODBUS_HOST: "127.0.0.1",
+            CONF_MODBUS_PORT: simulator.port,
+            CONF_MODBUS_SOLAR_REGISTER: "100:int32",
+        },
+        entry_id="test_modbus_entry",
+    )
+    entry.add_to_hass(hass)
+    coordinator = SmartEVChargingCoordinator(hass, entry, 30)
+    set_current_calls = async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    async_mock_service(hass, "easee", "action_command")
+
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(PRICE_SENSOR_ID, "1.0")
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_READY_TO_CHARGE[0])
+    hass.states.async_set(
+        SOLAR_SENSOR_ID, "0", {"unit_of_measurement": UnitOfPower.WATT}
+    )
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, False)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 0.8)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER, 500)
+    coordinator.set_control_value(
+        ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER, 6
+    )
+    try:
+        assert await coordinator.modbus.async_poll()
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+        assert coordinator.active_control_mode == CONTROL_MODE_SOLAR_SURPLUS
+        assert set_current_calls[-1].data["current"] == 10
+
+        simulator.set_int32(1, 100, 4000)
+        with patch.object(
+            coordinator, "async_request_refresh", AsyncMock()
+        ) as request_refresh:
+            assert await coordinator.modbus.async_poll()
+            await hass.async_block_till_done()
+        request_refresh.assert_called_once()
+
+        stale = coordinator.modbus.updated_at + timedelta(seconds=11)
+        with patch.object(dt_util, "utcnow", return_value=stale):
+            assert await coordinator._get_power_value(CONF_SOLAR_PRODUCTION_SENSOR) == 0
+    finally:
+        await coordinator.modbus.async_stop()
+        await simulator.stop()
@@ -0,0 +1,370 @@
+# tests/test_ocpp_centralsystem.py
+"""
+Testar det lokala OCPP 1.6J-centralsystemet mot simulerade laddpunkter som
+ansluter över WebSocket: flera laddpunkter på samma server, MeterValues,
+laddprofiler för strömgräns och paus samt styrning från koordinatorn.
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from datetime import timedelta
+from typing import Any
+
+import aiohttp
+import pytest
+
+from homeassistant.core import HomeAssistant
+from homeassistant.const import STATE_ON
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
+    CONF_CHARGER_DYNAMIC_CURRENT_SENSOR,
+    CONF_CHARGER_BACKEND,
+    CONF_OCPP_PORT,
+    CONF_OCPP_CHARGE_POINT_ID,
+    CONF_DEBUG_LOGGING,
+    CHARGER_BACKEND_OCPP,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+from custom_components.smart_ev_charging.charger_backend import OcppBackend
+from custom_components.smart_ev_charging.circuit_breaker import (
+    STATE_OPEN,
+    ServiceCallRunner,
+)
+from custom_components.smart_ev_charging.ocpp_central import (
+    DATA_OCPP_CENTRAL,
+    OcppCentralSystem,
+)
+
+POWER_SWITCH_ID = "switch.charger_power_ocpp"
+PRICE_SENSOR_ID = "sensor.nordpool_price_ocpp"
+MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_ocpp"
+
+# Entitets-ID:n som Home Assistant skapar utifrån OCPP-sensorernas namn.
+OCPP_STATUS_ID = "sensor.avancerad_elbilsladdning_ocpp_status"
+OCPP_OFFERED_ID = "sensor.avancerad_elbilsladdning_ocpp_erbjuden_strom"
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+class SimulatedChargePoint:
+    """Laddpunkt som ansluter till centralsystemet och accepterar alla anrop."""
+
+    def __init__(self, session: aiohttp.ClientSession, charge_point_id: str):
+        self.session = session
+        self.id = charge_point_id
+        self.received: list[tuple[str, dict[str, Any]]] = []
+        self._ws: aiohttp.ClientWebSocketResponse | None = None
+        self._reader: asyncio.Task | None = None
+        self._pending: dict[str, asyncio.Future] = {}
+        # Svaret på centralsystemets anrop.
+        self.reply: Any = {"status": "Accepted"}
+
+    async def connect(self, port: int) -> None:
+        self._ws = await self.session.ws_connect(
+            f"ws://127.0.0.1:{port}/ocpp/{self.id}", protocols=("ocpp1.6",)
+        )
+        assert self._ws.protocol == "ocpp1.6"
+        self._reader = asyncio.create_task(self._read())
+
+    async def _read(self) -> None:
+        async for msg in self._ws:
+            message = json.loads(msg.data)
+            if message[0] == 2:
+                self.received.append((message[2], message[3]))
+                await self._ws.send_str(json.dumps([3, message[1], self.reply]))
+            elif message[1] in self._pending:
+                self._pending.pop(message[1]).set_result(message)
+
+    async def call(self, action: str, payload: dict[str, Any]) -> list[Any]:
+        """Skickar ett anrop och returnerar hela svarsmeddelandet."""
+        unique_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self._pending[unique_id] = future
+        await self._ws.send_str(json.dumps([2, unique_id, action, payload]))
+        async with asyncio.timeout(5):
+            return await future
+
+    async def wait_for_calls(self, count: int) -> None:
+        async with asyncio.timeout(5):
+            while len(self.received) < count:
+                await asyncio.sleep(0.01)
+
+    async def close(self) -> None:
+        await self._ws.close()
+        await self._reader
+
+
+async def _boot(charge_point: SimulatedChargePoint, status: str) -> None:
+    await charge_point.call(
+        "BootNotification",
+        {"chargePointVendor": "Simulator", "chargePointModel": "SIM-1"},
+    )
+    await charge_point.call(
+        "StatusNotification",
+        {"connectorId": 1, "errorCode": "NoError", "status": status},
+    )
+
+
+@pytest.mark.usefixtures("socket_enabled")
+async def test_charge_points_meter_values_and_profiles(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att centralsystemet hanterar flera laddpunkter, tolkar
+    MeterValues och styr strömmen med laddprofiler.
+    FÖRUTSÄTTNINGAR: Två simulerade laddpunkter ansluter till samma server.
+    CP_1 startar en transaktion och rapporterar ström per fas, effekt och
+    energi. OCPP-gränssnittet styr CP_1.
+    FÖRVÄNTAT RESULTAT: Båda laddpunkterna är anslutna. Strömmen är den högsta
+    fasens, effekten i W och energin i kWh. Strömgränsen skickas som en
+    TxProfile för transaktionen, endast till CP_1, och paus är gränsen 0A.
+    Ett okänt anrop besvaras med CALLERROR. Efter frånkoppling är CP_1
+    otillgänglig och kommandon skickas inte.
+    """
+    central = OcppCentralSystem(host="127.0.0.1", port=0)
+    await central.async_start()
+    session = aiohttp.ClientSession()
+    cp1 = SimulatedChargePoint(session, "CP_1")
+    cp2 = SimulatedChargePoint(session, "CP_2")
+    try:
+        await cp1.connect(central.port)
+        await cp2.connect(central.port)
+        await _boot(cp1, "Preparing")
+        await _boot(cp2, "Available")
+        assert set(central.charge_points) == {"CP_1", "CP_2"}
+        charge_point = central.charge_point("CP_1")
+        assert charge_point.status == "Preparing"
+        assert charge_point.vendor == "Simulator"
+
+        result = await cp1.call(
+            "StartTransaction",
+            {"connectorId": 1, "idTag": "tag", "meterStart": 0, "timestamp": "x"},
+        )
+        transaction_id = result[2]["transactionId"]
+        assert charge_point.transaction_id == transaction_id
+        await cp1.call(
+            "MeterValues",
+            {
+                "connectorId": 1,
+                "transactionId": transaction_id,
+                "meterValue": [
+                    {
+                        "timestamp": "x",
+                        "sampledValue": [
+                            {
+                                "value": "15.8",
+                                "measurand": "Current.Import",
+                                "phase": "L1",
+                                "unit": "A",
+                            },
+                            {
+                                "value": "16.1",
+                                "measurand": "Current.Import",
+                                "phase": "L2",
+                                "unit": "A",
+                            },
+                            {
+                                "value": "11.0",
+                                "measurand": "Power.Active.Import",
+                                "unit": "kW",
+                            },
+                            {"value": "2500", "unit": "Wh"},
+                        ],
+                    }
+                ],
+            },
+        )
+        assert charge_point.current_import_a == 16.1
+        assert charge_point.power_w == 11000.0
+        assert charge_point.energy_kwh == 2.5
+
+        result = await cp1.call("DataTransfer", {"vendorId": "x"})
+        assert result[0] == 4 and result[2] == "NotImplemented"
+
+        backend = OcppBackend(ServiceCallRunner(hass), central, "CP_1")
+        assert backend.map_status("SuspendedEV") == "paused"
+        assert backend.set_current(10.0)
+        await hass.async_block_till_done()
+        action, payload = cp1.received[-1]
+        profile = payload["csChargingProfiles"]
+        assert action == "SetChargingProfile"
+        assert profile["chargingProfilePurpose"] == "TxProfile"
+        assert profile["transactionId"] == transaction_id
+        assert profile["chargingSchedule"]["chargingSchedulePeriod"][0]["limit"] == 10
+        assert charge_point.limit_a == 10.0
+        assert not cp2.received
+
+        assert backend.pause()
+        await hass.async_block_till_done()
+        period = cp1.received[-1][1]["csChargingProfiles"]["chargingSchedule"][
+            "chargingSchedulePeriod"
+        ][0]
+        assert period["limit"] == 0
+        # Start återupptar den pausade transaktionen med den senaste gränsen.
+        assert backend.start()
+        await hass.async_block_till_done()
+        assert charge_point.limit_a == 10.0
+        assert [action for action, _ in cp1.received] == ["SetChargingProfile"] * 3
+
+        await cp1.close()
+        await hass.async_block_till_done()
+        assert charge_point.status == "Unavailable"
+        assert central.charge_point("CP_1") is None
+        assert not backend.set_current(8.0)
+    finally:
+        await cp2.close()
+        await session.close()
+        await central.async_stop()
+
+
+@pytest.mark.usefixtures("socket_enabled")
+async def test_coordinator_controls_ocpp_charge_point(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera styrningen från koordinatorn till en laddpunkt via det
+    lokala centralsystemet, hela vägen genom OCPP-sensorerna.
+    FÖRUTSÄTTNINGAR: Laddartypen är OCPP och OCPP-sensorerna är valda som
+    status- och strömsensor. CP_1 ansluter och rapporterar 'Preparing'.
+    Pris/Tid är aktivt och priset är under maxpriset.
+    FÖRVÄNTAT RESULTAT: Statussensorn visar 'Preparing', som tolkas som att
+    laddaren väntar på start. Koordinatorn skickar en TxDefaultProfile på 16A
+    och RemoteStartTransaction. Servern stoppas när posten laddas ur.
+    """
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "ocpp_test",
+            CONF_CHARGER_BACKEND: CHARGER_BACKEND_OCPP,
+            CONF_OCPP_PORT: 0,
+            CONF_OCPP_CHARGE_POINT_ID: "CP_1",
+            CONF_STATUS_SENSOR: OCPP_STATUS_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_CHARGER_DYNAMIC_CURRENT_SENSOR: OCPP_OFFERED_ID,
+            CONF_DEBUG_LOGGING: True,
+        },
+        entry_id="test_ocpp_entry",
+    )
+    entry.add_to_hass(hass)
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(PRICE_SENSOR_ID, "0.10")
+
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator: SmartEVChargingCoordinator = hass.data[DOMAIN][entry.entry_id][
+        "coordinator"
+    ]
+    assert isinstance(coordinator.charger_backend, OcppBackend)
+    assert hass.states.get(OCPP_STATUS_ID).state == "Unavailable"
+
+    session = aiohttp.ClientSession()
+    cp1 = SimulatedChargePoint(session, "CP_1")
+    try:
+        await cp1.connect(coordinator.ocpp.port)
+        await _boot(cp1, "Preparing")
+        await hass.async_block_till_done()
+        assert hass.states.get(OCPP_STATUS_ID).state == "Preparing"
+        assert hass.states.get(OCPP_STATUS_ID).attributes["model"] == "SIM-1"
+
+        coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+        coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 0.50)
+        coordinator.set_control_value(
+            ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False
+        )
+        await coordinator.async_refresh()
+        await cp1.wait_for_calls(2)
+        await hass.async_block_till_done()
+
+        calls = dict(cp1.received)
+        profile = calls["SetChargingProfile"]["csChargingProfiles"]
+        assert profile["chargingProfilePurpose"] == "TxDefaultProfile"
+        assert profile["chargingSchedule"]["chargingSchedulePeriod"][0]["limit"] == 16
+        assert calls["RemoteStartTransaction"]["connectorId"] == 1
+        assert float(hass.states.get(OCPP_OFFERED_ID).state) == 16.0
+    finally:
+        await session.close()
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+    assert coordinator.ocpp._runner is None
+    assert DATA_OCPP_CENTRAL not in hass.data.get(DOMAIN, {})
+
+
+@pytest.mark.usefixtures("socket_enabled")
+async def test_shared_central_system_and_invalid_result(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att posterna delar centralsystemet och att ett ogiltigt
+    svar från laddpunkten räknas som ett misslyckat kommando.
+    FÖRUTSÄTTNINGAR: Två OCPP-poster styr CP_1 respektive CP_2 på samma
+    server. CP_1 svarar på SetChargingProfile med en sträng i stället för ett
+    objekt. Kretsbrytaren öppnas efter ett fel.
+    FÖRVÄNTAT RESULTAT: Posterna får samma server, som bara startas en gång.
+    Utan laddpunktens id väljs ingen laddpunkt så länge två poster delar
+    servern. Det ogiltiga svaret rapporteras som misslyckat, öppnar
+    kretsbrytaren och ändrar inte gränsen. Servern stoppas först när den
+    sista posten släpper den.
+    """
+    config = {CONF_CHARGER_BACKEND: CHARGER_BACKEND_OCPP, CONF_OCPP_PORT: 0}
+    central = OcppCentralSystem.acquire(
+        hass, "entry_1", config | {CONF_OCPP_CHARGE_POINT_ID: "CP_1"}
+    )
+    assert central is not None
+    assert (
+        OcppCentralSystem.acquire(
+            hass, "entry_2", config | {CONF_OCPP_CHARGE_POINT_ID: "CP_2"}
+        )
+        is central
+    )
+    assert hass.data[DOMAIN][DATA_OCPP_CENTRAL] is central
+    assert OcppCentralSystem.acquire(hass, "entry_3", {}) is None
+    await central.async_start()
+    port = central.port
+    await central.async_start()
+    assert central.port == port
+
+    session = aiohttp.ClientSession()
+    cp1 = SimulatedChargePoint(session, "CP_1")
+    cp1.reply = "Accepted"
+    try:
+        await cp1.connect(port)
+        await _boot(cp1, "Charging")
+        assert central.charge_point(None) is None
+
+        runner = ServiceCallRunner(hass, 1, timedelta(seconds=60))
+        results: list[bool] = []
+        backend = OcppBackend(runner, central, "CP_1")
+        assert backend.set_current(10.0, results.append)
+        await hass.async_block_till_done()
+        assert results == [False]
+        breaker = runner.breakers["ocpp.set_current"]
+        assert breaker.state == STATE_OPEN
+        assert "FormationViolation" in breaker.last_error
+        assert central.charge_point("CP_1").limit_a is None
+        assert not backend.set_current(10.0)
+
+        await central.async_release(hass, "entry_1")
+        assert central._runner is not None
+        # Med en enda post används den första anslutna laddpunkten.
+        assert central.charge_point(None) is central.charge_point("CP_1")
+        await central.async_release(hass, "entry_2")
+        assert central._runner is None
+        assert DATA_OCPP_CENTRAL not in hass.data[DOMAIN]
+        await central.async_release(hass, "entry_2")
+    finally:
+        await cp1.close()
+        await session.close()
+        await central.async_stop()
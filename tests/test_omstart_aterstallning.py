@@ -0,0 +1,184 @@
+# tests/test_omstart_aterstallning.py
+"""
+Testar att koordinatorns sessionstillstånd sparas och återställs efter en
+omstart av Home Assistant, så att en pågående laddning inte störs.
+"""
+
+import pytest
+import logging
+from unittest.mock import patch
+from datetime import datetime, timedelta, timezone
+
+from homeassistant.core import HomeAssistant
+from homeassistant.const import STATE_ON, STATE_OFF
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_mock_service,
+)
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_SOLAR_PRODUCTION_SENSOR,
+    CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
+    CONF_DEBUG_LOGGING,
+    EASEE_STATUS_CHARGING,
+    EASEE_STATUS_DISCONNECTED,
+    EASEE_STATUS_READY_TO_CHARGE,
+    CONTROL_MODE_SOLAR_SURPLUS,
+    MIN_CHARGE_CURRENT_A,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+
+STATUS_SENSOR_ID = "sensor.easee_status_restart"
+POWER_SWITCH_ID = "switch.easee_power_restart"
+PRICE_SENSOR_ID = "sensor.nordpool_price_restart"
+SOLAR_PROD_SENSOR_ID = "sensor.solar_production_restart"
+MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_restart"
+
+START_TIME_UTC = datetime(2025, 6, 1, 11, 0, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+@pytest.fixture
+def restart_entry(hass: HomeAssistant) -> MockConfigEntry:
+    """Config entry utan sensor för dynamisk ström, med solenergiladdning."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "easee_restart_test",
+            CONF_STATUS_SENSOR: STATUS_SENSOR_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_SOLAR_PRODUCTION_SENSOR: SOLAR_PROD_SENSOR_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_DEBUG_LOGGING: True,
+        },
+        entry_id="test_restart_entry",
+    )
+    entry.add_to_hass(hass)
+
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_READY_TO_CHARGE[0])
+    # 6000 W överskott ger 8A på tre faser.
+    hass.states.async_set(SOLAR_PROD_SENSOR_ID, "6000")
+    hass.states.async_set(PRICE_SENSOR_ID, "2.00")
+    return entry
+
+
+async def _start_coordinator(
+    hass: HomeAssistant, entry: MockConfigEntry
+) -> SmartEVChargingCoordinator:
+    """Skapar en koordinator som vid uppstart läser in sparat tillstånd."""
+    coordinator = SmartEVChargingCoordinator(hass, entry, 30)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 0.50)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER, 0)
+    coordinator.set_control_value(
+        ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER, MIN_CHARGE_CURRENT_A
+    )
+    with patch.object(dt_util, "utcnow", return_value=START_TIME_UTC):
+        await coordinator.async_load_persisted_state()
+    return coordinator
+
+
+async def _run_first_minute(
+    hass: HomeAssistant, coordinator: SmartEVChargingCoordinator, start: datetime
+) -> None:
+    for seconds in (0, 30, 60):
+        with patch.object(
+            dt_util, "utcnow", return_value=start + timedelta(seconds=seconds)
+        ):
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+
+
+async def test_no_commands_in_first_minute_after_restart(
+    hass: HomeAssistant, hass_storage, restart_entry: MockConfigEntry
+):
+    """
+    SYFTE: Mät antalet kommandon till laddaren under första minuten efter en
+    omstart mitt i en solenergisession.
+    FÖRUTSÄTTNINGAR: Laddaren laddar med 8A och saknar sensor för dynamisk ström.
+    FÖRVÄNTAT RESULTAT: Med återställt tillstånd skickas inga kommandon. Utan
+    sparat tillstånd skickas strömmen på nytt varje cykel.
+    """
+    set_current_calls = async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    action_command_calls = async_mock_service(hass, "easee", "action_command")
+
+    # Före omstart: solenergisessionen startar och laddaren börjar ladda.
+    before_restart = await _start_coordinator(hass, restart_entry)
+    await _run_first_minute(hass, before_restart, START_TIME_UTC)
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_CHARGING)
+    with patch.object(
+        dt_util, "utcnow", return_value=START_TIME_UTC + timedelta(seconds=90)
+    ):
+        await before_restart.async_refresh()
+        await hass.async_block_till_done()
+        await before_restart.async_save_persisted_state()
+    session_start = before_restart.session_start_time_utc
+    assert before_restart._solar_session_active
+    assert set_current_calls[-1].data["current"] == 8
+
+    # Omstart: ny koordinator som läser in det sparade tillståndet.
+    set_current_calls.clear()
+    action_command_calls.clear()
+    restart_time = START_TIME_UTC + timedelta(minutes=5)
+    after_restart = await _start_coordinator(hass, restart_entry)
+    assert after_restart._solar_session_active
+    assert after_restart.session_start_time_utc == session_start
+
+    await _run_first_minute(hass, after_restart, restart_time)
+
+    assert after_restart.active_control_mode == CONTROL_MODE_SOLAR_SURPLUS
+    assert after_restart.session_start_time_utc == session_start
+    assert len(set_current_calls) + len(action_command_calls) == 0
+
+    # Jämförelse: utan sparat tillstånd skickas 8A i varje cykel.
+    hass_storage.pop(f"{DOMAIN}.test_restart_entry.state")
+    without_state = await _start_coordinator(hass, restart_entry)
+    await _run_first_minute(hass, without_state, restart_time)
+    assert len(set_current_calls) == 3
+
+
+async def test_saved_session_discarded_when_disconnected(
+    hass: HomeAssistant, hass_storage, restart_entry: MockConfigEntry
+):
+    """
+    SYFTE: Är bilen urkopplad vid uppstart ska den sparade sessionen inte återställas.
+    """
+    hass_storage[f"{DOMAIN}.test_restart_entry.state"] = {
+        "version": 1,
+        "minor_version": 1,
+        "key": f"{DOMAIN}.test_restart_entry.state",
+        "data": {
+            "active_control_mode": CONTROL_MODE_SOLAR_SURPLUS,
+            "solar_session_active": True,
+            "price_time_eligible_for_charging": False,
+            "session_start_time_utc": START_TIME_UTC.isoformat(),
+            "last_commanded_current_a": 8,
+            "saved_at": START_TIME_UTC.isoformat(),
+        },
+    }
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_DISCONNECTED[0])
+
+    coordinator = await _start_coordinator(hass, restart_entry)
+
+    assert not coordinator._solar_session_active
+    assert coordinator.session_start_time_utc is None
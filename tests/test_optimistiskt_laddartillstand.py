@@ -0,0 +1,177 @@
+# tests/test_optimistiskt_laddartillstand.py
+"""
+Testar det förväntade laddartillståndet: direkt efter ett kommando fattas
+besluten på den förväntade statusen och strömgränsen tills sensorn bekräftar
+eller motsäger dem, eller tidsgränsen för bekräftelse passeras.
+"""
+
+import pytest
+import logging
+from unittest.mock import patch
+from datetime import datetime, timedelta
+
+from homeassistant.core import Context, HomeAssistant
+from homeassistant.const import STATE_ON
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_mock_service,
+)
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
+    CONF_CHARGER_DYNAMIC_CURRENT_SENSOR,
+    CONF_DEBUG_LOGGING,
+    EASEE_STATUS_AWAITING_START,
+    EASEE_STATUS_CHARGING,
+    EASEE_STATUS_PAUSED,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+from custom_components.smart_ev_charging.charger_state import ChargerStateModel
+from custom_components.smart_ev_charging.command_tracker import (
+    COMMAND_CURRENT,
+    COMMAND_START,
+    CommandTracker,
+)
+
+STATUS_SENSOR_ID = "sensor.easee_status_predict"
+POWER_SWITCH_ID = "switch.easee_power_predict"
+PRICE_SENSOR_ID = "sensor.nordpool_price_predict"
+MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_predict"
+DYNAMIC_CURRENT_SENSOR_ID = "sensor.charger_dynamic_current_predict"
+
+START = datetime(2025, 6, 2, 1, 0, tzinfo=dt_util.UTC)
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+def _at(seconds: float) -> datetime:
+    return START + timedelta(seconds=seconds)
+
+
+def _set_state(hass: HomeAssistant, entity_id: str, state: str, seconds: float):
+    """Sätter ett tillstånd med last_changed vid den angivna tidpunkten."""
+    with patch.object(dt_util, "utcnow", return_value=_at(seconds)):
+        hass.states.async_set(entity_id, state, context=Context())
+
+
+async def test_prediction_confirmed_contradicted_and_expired(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera när den förväntade statusen och strömgränsen används.
+    FÖRUTSÄTTNINGAR: Utan slumpmässig spridning är tidsgränsen 20 s. Laddaren
+    visar 'awaiting_start' och 6A när start och 16A skickas.
+    FÖRVÄNTAT RESULTAT: Efter 5 s används 'charging' och 16A trots sensorerna.
+    När statusen ändras till 'paused' efter kommandot motsägs förväntningen och
+    den rapporterade statusen används. Efter tidsgränsen används sensorns ström.
+    """
+    _set_state(hass, STATUS_SENSOR_ID, EASEE_STATUS_AWAITING_START, -5)
+    _set_state(hass, DYNAMIC_CURRENT_SENSOR_ID, "6", -5)
+    tracker = CommandTracker(
+        hass, STATUS_SENSOR_ID, DYNAMIC_CURRENT_SENSOR_ID, jitter=0.0
+    )
+    model = ChargerStateModel(tracker)
+    tracker.record_sent(COMMAND_START, True, _at(0))
+    tracker.record_sent(COMMAND_CURRENT, 16.0, _at(0))
+
+    status_changed = hass.states.get(STATUS_SENSOR_ID).last_changed
+    current_changed = hass.states.get(DYNAMIC_CURRENT_SENSOR_ID).last_changed
+    assert (
+        model.status(EASEE_STATUS_AWAITING_START, status_changed, _at(5))
+        == EASEE_STATUS_CHARGING
+    )
+    assert model.predicted_status == EASEE_STATUS_CHARGING
+    assert model.current(6.0, current_changed, _at(5)) == 16.0
+
+    _set_state(hass, STATUS_SENSOR_ID, EASEE_STATUS_PAUSED, 8)
+    status_changed = hass.states.get(STATUS_SENSOR_ID).last_changed
+    assert model.status(EASEE_STATUS_PAUSED, status_changed, _at(9)) == (
+        EASEE_STATUS_PAUSED
+    )
+    assert model.contradictions == 1
+    assert model.predicted_status is None
+    # Förväntningen gäller inte igen förrän kommandot skickas om.
+    assert model.status(EASEE_STATUS_PAUSED, status_changed, _at(10)) == (
+        EASEE_STATUS_PAUSED
+    )
+    assert model.contradictions == 1
+
+    assert model.current(6.0, current_changed, _at(20)) == 6.0
+    assert model.predicted_current is None
+
+
+async def test_pause_follows_start_before_status_updates(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att koordinatorn beslutar på det förväntade tillståndet
+    medan molnets status släpar efter.
+    FÖRUTSÄTTNINGAR: Pris/Tid startar laddningen. Laddaren visar 'awaiting_start'
+    hela testet. Efter 15 s stiger priset över maxpriset.
+    FÖRVÄNTAT RESULTAT: Efter 10 s förväntas laddaren ladda och inget kommando
+    skickas igen. När priset stiger skickas paus direkt, trots att sensorn inte
+    visar laddning. Sensorns 'awaiting_start' bekräftar pausen, varefter
+    sensorns status används och inget mer skickas.
+    """
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "easee_predict_test",
+            CONF_STATUS_SENSOR: STATUS_SENSOR_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_CHARGER_DYNAMIC_CURRENT_SENSOR: DYNAMIC_CURRENT_SENSOR_ID,
+            CONF_DEBUG_LOGGING: True,
+        },
+        entry_id="test_predict_entry",
+    )
+    entry.add_to_hass(hass)
+    coordinator = SmartEVChargingCoordinator(hass, entry, 30)
+    set_current_calls = async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    action_calls = async_mock_service(hass, "easee", "action_command")
+
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(PRICE_SENSOR_ID, "0.10")
+    _set_state(hass, DYNAMIC_CURRENT_SENSOR_ID, "6", -60)
+    _set_state(hass, STATUS_SENSOR_ID, EASEE_STATUS_AWAITING_START, -60)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 0.50)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
+
+    async def refresh(seconds: float) -> None:
+        with patch.object(dt_util, "utcnow", return_value=_at(seconds)):
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+
+    await refresh(0)
+    assert [call.data["action_command"] for call in action_calls] == ["start"]
+    assert len(set_current_calls) == 1
+
+    await refresh(10)
+    assert coordinator.data["charger_status_predicted"] == EASEE_STATUS_CHARGING
+    assert len(action_calls) == 1 and len(set_current_calls) == 1
+
+    hass.states.async_set(PRICE_SENSOR_ID, "1.00")
+    await refresh(15)
+    assert [call.data["action_command"] for call in action_calls] == [
+        "start",
+        "pause",
+    ]
+
+    # 'awaiting_start' bekräftar pausen, så sensorns status gäller igen.
+    await refresh(20)
+    assert coordinator.data["charger_status_predicted"] is None
+    assert coordinator.data["command_pending"] == [COMMAND_CURRENT]
+    assert coordinator.data["charger_state_contradictions"] == 0
+    assert len(action_calls) == 2 and len(set_current_calls) == 1
@@ -0,0 +1,95 @@
+# tests/test_priscache.py
+"""
+Testar priscachen: tolkning av prissensorns prisintervall, normalisering av
+enheten, uppslag med bisect och dygnets rang och kvantiler.
+"""
+
+from datetime import datetime, timedelta
+
+from homeassistant.core import State
+from homeassistant.util import dt as dt_util
+
+from custom_components.smart_ev_charging.price_cache import PriceCache
+
+PRICE_SENSOR_ID = "sensor.nordpool_price_cache"
+
+
+def _hour_slots(start: datetime, prices: list[float]) -> list[dict]:
+    """Timvisa prisintervall i samma format som Nordpool-sensorns raw_today."""
+    return [
+        {
+            "start": start + timedelta(hours=i),
+            "end": start + timedelta(hours=i + 1),
+            "value": price,
+        }
+        for i, price in enumerate(prices)
+    ]
+
+
+def test_price_series_lookup_rank_and_boundaries():
+    """
+    SYFTE: Verifiera att prisserien tolkas en gång per tillstånd och att uppslag,
+    rang och kvantiler räknas i kr/kWh.
+    FÖRUTSÄTTNINGAR: Sensorn anger åtta timpriser i öre/kWh, dygnet börjar vid
+    lokal midnatt.
+    FÖRVÄNTAT RESULTAT: Aktuellt pris tas från intervallet, de två billigaste
+    timmarna hör till dygnets billigaste 25 % och nästa gräns är nästa timme.
+    """
+    day_start = dt_util.as_utc(
+        dt_util.start_of_local_day(datetime(2025, 6, 1, 12, 0, tzinfo=dt_util.UTC))
+    )
+    prices_ore = [80, 60, 20, 10, 40, 90, 120, 150]
+    state = State(
+        PRICE_SENSOR_ID,
+        "80",
+        {
+            "unit_of_measurement": "öre/kWh",
+            "raw_today": [
+                {**slot, "start": slot["start"].isoformat()}
+                for slot in _hour_slots(day_start, prices_ore)
+            ],
+        },
+    )
+    cache = PriceCache()
+    cache.update(state)
+    series = cache.series
+    assert len(series) == 8
+
+    # Samma tillståndsobjekt tolkas inte om.
+    cache.update(state)
+    assert cache.series is series
+
+    now = day_start + timedelta(hours=3, minutes=20)
+    assert cache.current_price(now) == 0.10
+    assert cache.is_cheapest_fraction(now, 0.25) is True
+    assert cache.is_cheapest_fraction(day_start, 0.25) is False
+    assert series.rank_at(day_start + timedelta(hours=7)) == 7 / 8
+    assert series.daily_quantile(dt_util.as_local(now).date(), 0.0) == 0.10
+    assert series.daily_quantile(dt_util.as_local(now).date(), 1.0) == 1.50
+    assert [price for _, price in series.future_slots(now)] == [
+        0.10,
+        0.40,
+        0.90,
+        1.20,
+        1.50,
+    ]
+    assert cache.next_boundary(now) == day_start + timedelta(hours=4)
+
+    # Efter seriens sista intervall används sensorns tillstånd och nästa hela timme.
+    after = day_start + timedelta(hours=8, minutes=30)
+    assert cache.current_price(after) == 0.80
+    assert cache.next_boundary(after) == day_start + timedelta(hours=9)
+
+
+def test_price_cache_without_series():
+    """
+    SYFTE: En prissensor utan prisintervall ska ge sensorns eget pris och nästa
+    hela timme som gräns.
+    """
+    now = datetime(2025, 6, 1, 22, 20, tzinfo=dt_util.UTC)
+    cache = PriceCache()
+    cache.update(State(PRICE_SENSOR_ID, "450", {"unit_of_measurement": "SEK/MWh"}))
+
+    assert cache.current_price(now) == 0.45
+    assert cache.is_cheapest_fraction(now, 0.25) is None
+    assert cache.next_boundary(now) == datetime(2025, 6, 1, 23, 0, tzinfo=dt_util.UTC)
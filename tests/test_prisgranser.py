@@ -0,0 +1,168 @@
+# tests/test_prisgranser.py
+"""
+Testar att Pris/Tid-vägen omvärderas vid prisintervallens och schemanas gränser
+i stället för vid varje uppdateringsintervall.
+"""
+
+import pytest
+import logging
+from unittest.mock import patch
+from datetime import datetime, timedelta
+
+from homeassistant.core import HomeAssistant
+from homeassistant.const import STATE_ON, STATE_OFF
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+    async_mock_service,
+)
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_TIME_SCHEDULE_ENTITY,
+    CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
+    CONF_DEBUG_LOGGING,
+    EASEE_STATUS_READY_TO_CHARGE,
+    EASEE_STATUS_DISCONNECTED,
+    CONTROL_MODE_MANUAL,
+    CONTROL_MODE_PRICE_TIME,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+
+STATUS_SENSOR_ID = "sensor.easee_status_boundary"
+POWER_SWITCH_ID = "switch.easee_power_boundary"
+PRICE_SENSOR_ID = "sensor.nordpool_price_boundary"
+TIME_SCHEDULE_ID = "schedule.charging_boundary"
+MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_boundary"
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+def _quarter_slots(start: datetime, prices: list[float]) -> list[dict]:
+    """Prisintervall om 15 minuter i samma format som Nordpool-sensorns raw_today."""
+    return [
+        {
+            "start": start + timedelta(minutes=15 * i),
+            "end": start + timedelta(minutes=15 * (i + 1)),
+            "value": price,
+        }
+        for i, price in enumerate(prices)
+    ]
+
+
+async def test_price_path_runs_only_at_boundaries(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att Pris/Tid-vägen omvärderas exakt vid nästa prisintervall
+    eller schemaomslag och att inga cykler körs medan bilen är urkopplad.
+    FÖRUTSÄTTNINGAR: Laddaren är redo, spotpriset (2.00 kr) överstiger maxpriset
+    (1.00 kr). Nästa prisintervall börjar om 10 minuter och schemat slår om om
+    5 minuter.
+    FÖRVÄNTAT RESULTAT: Den periodiska uppdateringen pausas. Vid schemaomslaget
+    och vid prisgränsen körs en omvärdering. När bilen kopplas ur tas timern
+    bort och inga fler cykler körs. När bilen kopplas in igen vid ett billigt
+    pris ger statusändringen en cykel och laddningen startar.
+    """
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "easee_boundary_test",
+            CONF_STATUS_SENSOR: STATUS_SENSOR_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_TIME_SCHEDULE_ENTITY: TIME_SCHEDULE_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_DEBUG_LOGGING: True,
+        },
+        entry_id="test_boundary_entry",
+    )
+    entry.add_to_hass(hass)
+    coordinator = SmartEVChargingCoordinator(hass, entry, 30)
+    unsub_listener = coordinator.async_add_listener(lambda: None)
+    await coordinator.async_load_persisted_state()
+    async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    action_command_calls = async_mock_service(hass, "easee", "action_command")
+
+    now = dt_util.utcnow()
+    schedule_switch = now + timedelta(minutes=5)
+    slot_start = now + timedelta(minutes=10) - timedelta(minutes=15)
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_READY_TO_CHARGE[0])
+    hass.states.async_set(
+        PRICE_SENSOR_ID,
+        "2.00",
+        {"raw_today": _quarter_slots(slot_start, [2.00, 0.50, 0.50])},
+    )
+    hass.states.async_set(TIME_SCHEDULE_ID, STATE_OFF, {"next_event": schedule_switch})
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 1.00)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
+
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert coordinator.active_control_mode == CONTROL_MODE_MANUAL
+    assert coordinator.update_interval is None
+    assert coordinator.price_scheduler.next_refresh == schedule_switch
+
+    # Schemat slår om. Nästa gräns blir prisintervallet.
+    last_update = coordinator.last_update_time
+    hass.states.async_set(TIME_SCHEDULE_ID, STATE_ON, {"next_event": None})
+    async_fire_time_changed(hass, schedule_switch)
+    await hass.async_block_till_done()
+    assert coordinator.last_update_time > last_update
+    assert coordinator.price_scheduler.next_refresh == slot_start + timedelta(
+        minutes=15
+    )
+    assert coordinator.active_control_mode == CONTROL_MODE_MANUAL
+
+    # Prisintervallet byts och laddningen startar vid gränsen, även om sensorns
+    # tillstånd ännu inte har uppdaterats.
+    boundary = slot_start + timedelta(minutes=15)
+    with patch.object(dt_util, "utcnow", return_value=boundary):
+        async_fire_time_changed(hass, boundary)
+        await hass.async_block_till_done()
+    assert coordinator.active_control_mode == CONTROL_MODE_PRICE_TIME
+    assert action_command_calls[-1].data["action_command"] == "start"
+    assert coordinator.update_interval == timedelta(seconds=30)
+
+    # Bilen kopplas ur: ingen timer och inga fler cykler.
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_DISCONNECTED[0])
+    async_fire_time_changed(hass, slot_start + timedelta(minutes=16))
+    await hass.async_block_till_done()
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert coordinator.update_interval is None
+    assert coordinator.price_scheduler.next_refresh is None
+    last_update = coordinator.last_update_time
+    async_fire_time_changed(hass, slot_start + timedelta(hours=3))
+    await hass.async_block_till_done()
+    assert coordinator.last_update_time == last_update
+
+    # Priset sjunker medan bilen är urkopplad och bilen kopplas sedan in igen.
+    hass.states.async_set(PRICE_SENSOR_ID, "0.50")
+    await hass.async_block_till_done()
+    assert coordinator.update_interval is None
+    async_fire_time_changed(hass, slot_start + timedelta(hours=3, seconds=15))
+    await hass.async_block_till_done()
+    last_update = coordinator.last_update_time
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_READY_TO_CHARGE[0])
+    await hass.async_block_till_done()
+    assert coordinator.last_update_time > last_update
+    assert coordinator.active_control_mode == CONTROL_MODE_PRICE_TIME
+    assert action_command_calls[-1].data["action_command"] == "start"
+    assert coordinator.update_interval == timedelta(seconds=30)
+
+    unsub_listener()
+    await coordinator.cleanup()
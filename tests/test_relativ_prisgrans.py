@@ -0,0 +1,165 @@
+# tests/test_relativ_prisgrans.py
+"""
+Testar relativ prisgräns för Pris/Tid-laddning: billigaste N timmarna i
+planeringsfönstret, eller under en percentil av dygnets priser.
+"""
+
+import pytest
+import logging
+from unittest.mock import patch
+from datetime import datetime, timedelta
+
+from homeassistant.core import HomeAssistant, State
+from homeassistant.const import STATE_ON
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_mock_service,
+)
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
+    CONF_DEBUG_LOGGING,
+    CONF_PRICE_THRESHOLD_MODE,
+    PRICE_THRESHOLD_MODE_CHEAPEST_HOURS,
+    PRICE_THRESHOLD_MODE_PERCENTILE,
+    EASEE_STATUS_READY_TO_CHARGE,
+    CONTROL_MODE_MANUAL,
+    CONTROL_MODE_PRICE_TIME,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+    ENTITY_ID_SUFFIX_RELATIVE_PRICE_THRESHOLD_NUMBER,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+from custom_components.smart_ev_charging.price_cache import PriceCache
+
+STATUS_SENSOR_ID = "sensor.easee_status_relative"
+POWER_SWITCH_ID = "switch.easee_power_relative"
+PRICE_SENSOR_ID = "sensor.nordpool_price_relative"
+MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_relative"
+
+# Dygnets timpriser i kr/kWh. De två billigaste är timme 3 och 4.
+PRICES = [0.80, 0.60, 0.50, 0.10, 0.20, 0.90, 1.20, 1.50]
+DAY_START = dt_util.as_utc(
+    dt_util.start_of_local_day(datetime(2025, 11, 10, 12, 0, tzinfo=dt_util.UTC))
+)
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+def _price_attributes() -> dict:
+    return {
+        "unit_of_measurement": "SEK/kWh",
+        "raw_today": [
+            {
+                "start": DAY_START + timedelta(hours=i),
+                "end": DAY_START + timedelta(hours=i + 1),
+                "value": price,
+            }
+            for i, price in enumerate(PRICES)
+        ],
+    }
+
+
+def test_cheapest_hours_selected_once_per_price_update():
+    """
+    SYFTE: Urvalet av billigaste timmar ska göras i planeringsfönstret som gällde
+    när prislistan kom, och ligga fast när bara sensorns tillstånd ändras.
+    FÖRUTSÄTTNINGAR: Prislistan läses in 01:30, då timme 0 redan har passerat.
+    FÖRVÄNTAT RESULTAT: De två billigaste timmarna är timme 3 och 4. Ett nytt
+    tillstånd med samma prislista tolkas inte om.
+    """
+    cache = PriceCache()
+    attributes = _price_attributes()
+    cache.update(
+        State(PRICE_SENSOR_ID, "0.60", attributes), DAY_START + timedelta(hours=1.5)
+    )
+    series = cache.series
+
+    selected = [
+        cache.in_cheapest_hours(DAY_START + timedelta(hours=i, minutes=30), 2)
+        for i in range(len(PRICES))
+    ]
+    assert selected == [False, False, False, True, True, False, False, False]
+
+    # Sensorn byter pris vid timskiftet men prislistan är densamma.
+    cache.update(
+        State(PRICE_SENSOR_ID, "0.50", attributes), DAY_START + timedelta(hours=2)
+    )
+    assert cache.series is series
+    assert cache.current_price(DAY_START + timedelta(hours=2, minutes=5)) == 0.50
+    assert cache.in_cheapest_hours(DAY_START + timedelta(hours=4, minutes=5), 2)
+
+
+@pytest.mark.parametrize(
+    ("mode", "threshold", "reason_text"),
+    [
+        (PRICE_THRESHOLD_MODE_CHEAPEST_HOURS, 2, "bland de 2 billigaste timmarna"),
+        (PRICE_THRESHOLD_MODE_PERCENTILE, 25, "under dygnets 25:e percentil"),
+    ],
+)
+async def test_relative_threshold_controls_price_time(
+    hass: HomeAssistant, mode: str, threshold: float, reason_text: str
+):
+    """
+    SYFTE: Verifiera att Pris/Tid-laddningen följer den relativa prisgränsen i
+    stället för enbart maxpriset.
+    FÖRUTSÄTTNINGAR: Maxpriset (1.00 kr) släpper igenom de flesta timmarna.
+    Relativ prisgräns: de två billigaste timmarna, eller under 25:e percentilen.
+    FÖRVÄNTAT RESULTAT: Laddning sker timme 3 (0.10 kr) men inte timme 2
+    (0.50 kr), trots att båda ligger under maxpriset.
+    """
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "easee_relative_test",
+            CONF_STATUS_SENSOR: STATUS_SENSOR_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_DEBUG_LOGGING: True,
+        },
+        options={CONF_PRICE_THRESHOLD_MODE: mode},
+        entry_id="test_relative_entry",
+    )
+    entry.add_to_hass(hass)
+    coordinator = SmartEVChargingCoordinator(hass, entry, 30)
+    async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    async_mock_service(hass, "easee", "action_command")
+
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_READY_TO_CHARGE[0])
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 1.00)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
+    coordinator.set_control_value(
+        ENTITY_ID_SUFFIX_RELATIVE_PRICE_THRESHOLD_NUMBER, threshold
+    )
+
+    hass.states.async_set(PRICE_SENSOR_ID, "0.50", _price_attributes())
+    with patch.object(
+        dt_util, "utcnow", return_value=DAY_START + timedelta(hours=2, minutes=10)
+    ):
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+    assert coordinator.active_control_mode == CONTROL_MODE_MANUAL
+
+    hass.states.async_set(PRICE_SENSOR_ID, "0.10", _price_attributes())
+    with patch.object(
+        dt_util, "utcnow", return_value=DAY_START + timedelta(hours=3, minutes=10)
+    ):
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+    assert coordinator.active_control_mode == CONTROL_MODE_PRICE_TIME
+    assert reason_text in coordinator.data["should_charge_reason"]
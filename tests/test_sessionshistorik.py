@@ -0,0 +1,165 @@
+# tests/test_sessionshistorik.py
+"""
+Testar sessionshistoriken: energi och kostnad per session, fördröjd skrivning
+till disk och komprimering av gamla sessioner till månadssummor.
+"""
+
+import pytest
+import logging
+from unittest.mock import patch
+from datetime import datetime, timedelta, timezone
+
+from homeassistant.core import HomeAssistant
+from homeassistant.const import STATE_ON
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+    async_mock_service,
+)
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
+    CONF_CHARGER_DYNAMIC_CURRENT_SENSOR,
+    CONF_CHARGER_POWER_SENSOR,
+    CONF_DEBUG_LOGGING,
+    EASEE_STATUS_CHARGING,
+    EASEE_STATUS_DISCONNECTED,
+    CONTROL_MODE_PRICE_TIME,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+from custom_components.smart_ev_charging.session_store import (
+    SessionStore,
+    build_session_record,
+)
+
+STATUS_SENSOR_ID = "sensor.easee_status_session"
+POWER_SWITCH_ID = "switch.easee_power_session"
+PRICE_SENSOR_ID = "sensor.nordpool_price_session"
+MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_session"
+DYN_CURRENT_SENSOR_ID = "sensor.charger_dynamic_current_session"
+CHARGER_POWER_SENSOR_ID = "sensor.charger_power_session"
+
+START_TIME_UTC = datetime(2025, 6, 1, 22, 0, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+async def test_session_recorded_with_energy_and_cost(
+    hass: HomeAssistant, hass_storage
+):
+    """
+    SYFTE: En Pris/Tid-session ska sparas med energi från laddarens effektsensor,
+    kostnad och snittpris när bilen kopplas ur.
+    FÖRUTSÄTTNINGAR: Laddeffekt 7000 W i 60 sekunder till 0.40 kr/kWh.
+    FÖRVÄNTAT RESULTAT: Sessionen sparas i historiken, men skrivs till disk först
+    efter fördröjningen.
+    """
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "easee_session_test",
+            CONF_STATUS_SENSOR: STATUS_SENSOR_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_CHARGER_DYNAMIC_CURRENT_SENSOR: DYN_CURRENT_SENSOR_ID,
+            CONF_CHARGER_POWER_SENSOR: CHARGER_POWER_SENSOR_ID,
+            CONF_DEBUG_LOGGING: True,
+        },
+        entry_id="test_session_entry",
+    )
+    entry.add_to_hass(hass)
+    coordinator = SmartEVChargingCoordinator(hass, entry, 30)
+    await coordinator.async_load_persisted_state()
+
+    async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    async_mock_service(hass, "easee", "action_command")
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(DYN_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_CHARGING)
+    hass.states.async_set(PRICE_SENSOR_ID, "0.40")
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 1.00)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
+    hass.states.async_set(
+        CHARGER_POWER_SENSOR_ID, "7000", {"unit_of_measurement": "W"}
+    )
+
+    for seconds in (0, 30):
+        with patch.object(
+            dt_util, "utcnow", return_value=START_TIME_UTC + timedelta(seconds=seconds)
+        ):
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+    assert coordinator.active_control_mode == CONTROL_MODE_PRICE_TIME
+
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_DISCONNECTED[0])
+    with patch.object(
+        dt_util, "utcnow", return_value=START_TIME_UTC + timedelta(seconds=60)
+    ):
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+
+    expected_energy_kwh = 7000 * 60 / 3600 / 1000
+    session = coordinator.session_store.last_session
+    assert session is not None
+    assert session["energy_kwh"] == round(expected_energy_kwh, 3)
+    assert session["grid_energy_kwh"] == round(expected_energy_kwh, 3)
+    assert session["cost_kr"] == round(expected_energy_kwh * 0.40, 2)
+    assert session["average_price_kr"] == pytest.approx(0.40, abs=0.01)
+    assert session["modes"] == [CONTROL_MODE_PRICE_TIME]
+    assert coordinator.session_start_time_utc is None
+
+    storage_key = f"{DOMAIN}.test_session_entry.sessions"
+    assert storage_key not in hass_storage, "Skrivningen ska vara fördröjd."
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=61))
+    await hass.async_block_till_done()
+    assert hass_storage[storage_key]["data"]["sessions"] == [session]
+
+
+async def test_old_sessions_compacted_to_monthly_totals(
+    hass: HomeAssistant, hass_storage
+):
+    """
+    SYFTE: Sessioner äldre än lagringstiden ska slås ihop till månadssummor,
+    medan nya sessioner sparas individuellt.
+    """
+    now = dt_util.utcnow()
+    store = SessionStore(hass, "test_compaction")
+    for days_ago, energy in ((200, 10.0), (199, 5.0), (1, 8.0)):
+        end = now - timedelta(days=days_ago)
+        store.add_session(
+            build_session_record(
+                start=end - timedelta(hours=2),
+                end=end,
+                modes=[CONTROL_MODE_PRICE_TIME],
+                solar_energy_kwh=0.0,
+                grid_energy_kwh=energy,
+                cost_kr=energy * 0.5,
+            )
+        )
+
+    assert [s["energy_kwh"] for s in store.sessions] == [8.0]
+    assert sum(m["sessions"] for m in store.monthly.values()) == 2
+    assert sum(m["energy_kwh"] for m in store.monthly.values()) == pytest.approx(15.0)
+    assert sum(m["cost_kr"] for m in store.monthly.values()) == pytest.approx(7.5)
+
+    await store.async_save()
+    restored = SessionStore(hass, "test_compaction")
+    await restored.async_load()
+    assert restored.sessions == store.sessions
+    assert restored.monthly == store.monthly
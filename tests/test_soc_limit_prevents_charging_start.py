@@ -8,7 +8,7 @@ import logging
 from unittest.mock import patch
 
 from homeassistant.core import HomeAssistant
-from homeassistant.const import STATE_ON, STATE_OFF
+from homeassistant.const import STATE_ON
 
 from pytest_homeassistant_custom_component.common import (
     MockConfigEntry,
@@ -110,43 +110,26 @@ async def test_charging_is_prevented_by_soc_limit(hass: HomeAssistant, caplog):
     ]
     assert coordinator is not None
 
-    # Manuell tilldelning av interna entitets-ID:n
-    smart_switch_id_dyn = (
-        f"switch.{DOMAIN}_{entry_id_for_test}_{ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH}"
-    )
-    max_price_id_dyn = (
-        f"number.{DOMAIN}_{entry_id_for_test}_{ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER}"
-    )
-    solar_switch_id_dyn = f"switch.{DOMAIN}_{entry_id_for_test}_{ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH}"
-    solar_buffer_id_dyn = (
-        f"number.{DOMAIN}_{entry_id_for_test}_{ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER}"
-    )
-    min_solar_current_id_dyn = f"number.{DOMAIN}_{entry_id_for_test}_{ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER}"
-
-    coordinator.smart_enable_switch_entity_id = smart_switch_id_dyn
-    coordinator.max_price_entity_id = max_price_id_dyn
-    coordinator.solar_enable_switch_entity_id = solar_switch_id_dyn
-    coordinator.solar_buffer_entity_id = solar_buffer_id_dyn
-    coordinator.min_solar_charge_current_entity_id = min_solar_current_id_dyn
-
-    coordinator._internal_entities_resolved = True
-
     # Sätt upp förutsättningar för att Pris/Tid SKULLE ha startat
     hass.states.async_set(
         MOCK_STATUS_SENSOR_ID, EASEE_STATUS_READY_TO_CHARGE[0]
     )  # Laddaren är redo
-    hass.states.async_set(smart_switch_id_dyn, STATE_ON)  # Smart laddning PÅ
-    hass.states.async_set(
-        solar_switch_id_dyn, STATE_OFF
+    coordinator.set_control_value(
+        ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True
+    )  # Smart laddning PÅ
+    coordinator.set_control_value(
+        ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False
     )  # Solenergi AV för att isolera
     hass.states.async_set(MOCK_PRICE_SENSOR_ID, "0.50")  # Lågt pris
-    hass.states.async_set(max_price_id_dyn, "1.00")  # Maxpris är högre
+    coordinator.set_control_value(
+        ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 1.00
+    )  # Maxpris är högre
     hass.states.async_set(MOCK_SCHEDULE_ID, STATE_ON)  # Schemat är aktivt
     hass.states.async_set(MOCK_MAIN_POWER_SWITCH_ID, STATE_ON)  # Huvudbrytare är PÅ
 
     # Mocka de interna entiteter som lades till ovan så att de har ett värde
-    hass.states.async_set(solar_buffer_id_dyn, "200")
-    hass.states.async_set(min_solar_current_id_dyn, "6")
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER, 200)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER, 6)
 
     # Den kritiska förutsättningen: SoC är redan över gränsen
     hass.states.async_set(MOCK_SOC_SENSOR_ID, str(actual_soc))
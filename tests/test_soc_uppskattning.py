@@ -0,0 +1,167 @@
+# tests/test_soc_uppskattning.py
+"""
+Testar uppskattningen av SoC mellan avläsningar: levererad energi integreras
+sedan senaste avläsningen, och en ny avläsning begärs bara nära SoC-gränsen.
+"""
+
+import pytest
+import logging
+from unittest.mock import patch
+from datetime import datetime, timedelta
+
+from homeassistant.core import HomeAssistant
+from homeassistant.const import STATE_ON
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_mock_service,
+)
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
+    CONF_CHARGER_POWER_SENSOR,
+    CONF_EV_SOC_SENSOR,
+    CONF_TARGET_SOC_LIMIT,
+    CONF_DEBUG_LOGGING,
+    CONF_EV_BATTERY_CAPACITY_KWH,
+    CONF_EV_SOC_REFRESH_ENTITY,
+    EASEE_STATUS_CHARGING,
+    CONTROL_MODE_MANUAL,
+    CONTROL_MODE_PRICE_TIME,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+from custom_components.smart_ev_charging.soc_estimator import SocEstimator
+
+STATUS_SENSOR_ID = "sensor.easee_status_soc_estimate"
+POWER_SWITCH_ID = "switch.easee_power_soc_estimate"
+PRICE_SENSOR_ID = "sensor.nordpool_price_soc_estimate"
+CHARGER_POWER_SENSOR_ID = "sensor.easee_power_soc_estimate"
+SOC_SENSOR_ID = "sensor.ev_soc_soc_estimate"
+SOC_REFRESH_BUTTON_ID = "button.ev_force_update_soc_estimate"
+MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_soc_estimate"
+
+START = datetime(2025, 6, 2, 0, 0, tzinfo=dt_util.UTC)
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+def test_estimate_from_delivered_energy():
+    """
+    SYFTE: Verifiera uppskattningen, tilltron och när en ny avläsning begärs.
+    FÖRUTSÄTTNINGAR: 60 kWh batteri, 90 % verkningsgrad. Avläst SoC 50 %.
+    Laddning med 11 kW i 30 minuter. SoC-gräns 60 %.
+    FÖRVÄNTAT RESULTAT: 5.5 kWh * 0.9 / 60 kWh = 8.25 procentenheter, och
+    osäkerheten 0.825 + 0.125 ger tilltron 0.905. Uppskattningen plus
+    osäkerheten når 59 % och en ny avläsning begärs, men inte igen direkt. En
+    ny avläsning nollställer integrationen.
+    """
+    estimator = SocEstimator(capacity_kwh=60.0, efficiency=0.9)
+    assert estimator.estimate(START) is None
+
+    estimator.add_reading(START, 50.0)
+    estimator.record_power(START, 11000)
+    estimator.record_power(START + timedelta(minutes=15), 11000)
+    now = START + timedelta(minutes=30)
+    estimator.record_power(now, 0)
+    assert estimator.estimate(now) == pytest.approx(58.25)
+    assert estimator.confidence(now) == pytest.approx(0.905)
+
+    assert estimator.should_refresh(now, 60.0)
+    assert not estimator.should_refresh(now + timedelta(minutes=29), 60.0)
+    assert not estimator.should_refresh(now, 80.0)
+
+    # En äldre avläsning ignoreras, en nyare ersätter uppskattningen.
+    assert not estimator.add_reading(START, 40.0)
+    assert estimator.add_reading(now, 57.0)
+    assert estimator.estimate(now + timedelta(minutes=5)) == 57.0
+    assert estimator.estimate(now + timedelta(hours=25)) is None
+
+
+async def test_soc_limit_reached_on_estimate(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att SoC-gränsen nås på uppskattningen när SoC-sensorn inte
+    uppdateras, och att en ny avläsning begärs nära gränsen.
+    FÖRUTSÄTTNINGAR: SoC-sensorn visar 70 % och uppdateras inte. Mål 80 %,
+    60 kWh batteri, laddning med 11 kW i Pris/Tid-läge. Uppdatering var 15:e
+    minut.
+    FÖRVÄNTAT RESULTAT: Efter 30 minuter är uppskattningen 78.25 % och knappen
+    för ny avläsning trycks. Efter 45 minuter är uppskattningen 82.4 % (utan
+    ny knapptryckning inom 30 minuter), och nästa cykel stoppas laddningen av
+    SoC-gränsen.
+    """
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "easee_soc_estimate_test",
+            CONF_STATUS_SENSOR: STATUS_SENSOR_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_CHARGER_POWER_SENSOR: CHARGER_POWER_SENSOR_ID,
+            CONF_EV_SOC_SENSOR: SOC_SENSOR_ID,
+            CONF_TARGET_SOC_LIMIT: 80,
+            CONF_DEBUG_LOGGING: True,
+        },
+        options={
+            CONF_EV_BATTERY_CAPACITY_KWH: 60,
+            CONF_EV_SOC_REFRESH_ENTITY: SOC_REFRESH_BUTTON_ID,
+        },
+        entry_id="test_soc_estimate_entry",
+    )
+    entry.add_to_hass(hass)
+    coordinator = SmartEVChargingCoordinator(hass, entry, 30)
+    assert coordinator.soc_estimator is not None
+    async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    async_mock_service(hass, "easee", "action_command")
+    button_presses = async_mock_service(hass, "button", "press")
+
+    # Tillståndens last_updated sätts från den riktiga klockan, så cyklerna
+    # räknas från den.
+    start = dt_util.utcnow()
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_CHARGING)
+    hass.states.async_set(PRICE_SENSOR_ID, "0.10")
+    hass.states.async_set(
+        CHARGER_POWER_SENSOR_ID, "11000", {"unit_of_measurement": "W"}
+    )
+    hass.states.async_set(SOC_SENSOR_ID, "70", {"unit_of_measurement": "%"})
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 0.50)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
+
+    for minutes in (0, 15, 30):
+        with patch.object(
+            dt_util, "utcnow", return_value=start + timedelta(minutes=minutes)
+        ):
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+    assert coordinator.active_control_mode == CONTROL_MODE_PRICE_TIME
+    assert coordinator.data["soc_estimate_percent"] == pytest.approx(78.2, abs=0.1)
+    assert coordinator.data["soc_last_reading_percent"] == 70.0
+    assert len(button_presses) == 1
+    assert button_presses[0].data["entity_id"] == SOC_REFRESH_BUTTON_ID
+
+    with patch.object(dt_util, "utcnow", return_value=start + timedelta(minutes=45)):
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+    assert coordinator.data["soc_estimate_percent"] == pytest.approx(82.4, abs=0.1)
+    assert len(button_presses) == 1
+
+    with patch.object(dt_util, "utcnow", return_value=start + timedelta(minutes=50)):
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+    assert coordinator.active_control_mode == CONTROL_MODE_MANUAL
+    assert "har nått målet" in coordinator.data["should_charge_reason"]
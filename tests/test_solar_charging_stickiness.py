@@ -9,7 +9,7 @@ import math
 from datetime import timedelta
 
 from homeassistant.core import HomeAssistant
-from homeassistant.const import STATE_ON, STATE_OFF
+from homeassistant.const import STATE_ON
 from pytest_homeassistant_custom_component.common import (
     MockConfigEntry,
     async_mock_service,
@@ -52,27 +52,16 @@ async def setup_coordinator_for_solar_test(hass: HomeAssistant):
 
     coordinator: SmartEVChargingCoordinator = hass.data[DOMAIN][entry_id]["coordinator"]
 
-    # Manuell tilldelning av interna entitets-ID:n
-    coordinator.smart_enable_switch_entity_id = (
-        f"switch.{DOMAIN}_{entry_id}_{ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH}"
-    )
-    coordinator.solar_enable_switch_entity_id = (
-        f"switch.{DOMAIN}_{entry_id}_{ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH}"
-    )
-    coordinator.min_solar_charge_current_entity_id = f"number.{DOMAIN}_{entry_id}_{ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER}"
-    coordinator.solar_buffer_entity_id = (
-        f"number.{DOMAIN}_{entry_id}_{ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER}"
-    )
-    coordinator._internal_entities_resolved = True
-
     # Grundinställningar för testet
-    hass.states.async_set(coordinator.solar_enable_switch_entity_id, STATE_ON)
-    hass.states.async_set(
-        coordinator.smart_enable_switch_entity_id, STATE_OFF
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, True)
+    coordinator.set_control_value(
+        ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, False
     )  # Isolera solenergilogik
-    hass.states.async_set(coordinator.solar_buffer_entity_id, "200")  # 200W buffer
-    hass.states.async_set(
-        coordinator.min_solar_charge_current_entity_id, "6"
+    coordinator.set_control_value(
+        ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER, 200
+    )  # 200W buffer
+    coordinator.set_control_value(
+        ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER, 6
     )  # Starttröskel 6A
     hass.states.async_set(MOCK_MAIN_POWER_SWITCH_ID, STATE_ON)
 
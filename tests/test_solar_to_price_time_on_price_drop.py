@@ -58,21 +58,6 @@ HOUSE_POWER_SENSOR_ID = "sensor.house_power_price_drop"
 MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_price_drop"
 DYN_CURRENT_SENSOR_ID = "sensor.charger_dynamic_current_price_drop"
 
-# Interna entitets-ID:n
-SMART_ENABLE_SWITCH_ID = (
-    f"switch.{DOMAIN}_test_price_drop_{ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH}"
-)
-MAX_PRICE_NUMBER_ID = (
-    f"number.{DOMAIN}_test_price_drop_{ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER}"
-)
-SOLAR_ENABLE_SWITCH_ID = (
-    f"switch.{DOMAIN}_test_price_drop_{ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH}"
-)
-SOLAR_BUFFER_NUMBER_ID = (
-    f"number.{DOMAIN}_test_price_drop_{ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER}"
-)
-MIN_SOLAR_CURRENT_NUMBER_ID = f"number.{DOMAIN}_test_price_drop_{ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER}"
-
 
 @pytest.fixture(autouse=True)
 def enable_debug_logging():
@@ -117,24 +102,11 @@ async def test_solar_to_price_time_on_price_drop(hass: HomeAssistant, caplog):
     )
     entry.add_to_hass(hass)
 
-    with (
-        patch(
-            "custom_components.smart_ev_charging.coordinator.SmartEVChargingCoordinator._setup_listeners"
-        ),
-        patch(
-            "custom_components.smart_ev_charging.coordinator.SmartEVChargingCoordinator._resolve_internal_entities",
-            return_value=True,
-        ),
+    with patch(
+        "custom_components.smart_ev_charging.coordinator.SmartEVChargingCoordinator._setup_listeners"
     ):
         coordinator = SmartEVChargingCoordinator(hass, entry, 30)  # 30s scan interval
 
-        coordinator.smart_enable_switch_entity_id = SMART_ENABLE_SWITCH_ID
-        coordinator.max_price_entity_id = MAX_PRICE_NUMBER_ID
-        coordinator.solar_enable_switch_entity_id = SOLAR_ENABLE_SWITCH_ID
-        coordinator.solar_buffer_entity_id = SOLAR_BUFFER_NUMBER_ID
-        coordinator.min_solar_charge_current_entity_id = MIN_SOLAR_CURRENT_NUMBER_ID
-        coordinator._internal_entities_resolved = True
-
         # Externa sensorer
         hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
         hass.states.async_set(PRICE_SENSOR_ID, "1.0")  # Initialt högt pris
@@ -148,12 +120,20 @@ async def test_solar_to_price_time_on_price_drop(hass: HomeAssistant, caplog):
         )  # Initialt, kan vara vad som helst
 
         # Interna entiteter
-        hass.states.async_set(SMART_ENABLE_SWITCH_ID, STATE_ON)  # Pris/Tid PÅ
-        hass.states.async_set(MAX_PRICE_NUMBER_ID, "0.6")  # Max acceptabelt pris
-        hass.states.async_set(SOLAR_ENABLE_SWITCH_ID, STATE_ON)  # Solenergi PÅ
-        hass.states.async_set(SOLAR_BUFFER_NUMBER_ID, "0")  # Ingen buffert
-        hass.states.async_set(
-            MIN_SOLAR_CURRENT_NUMBER_ID, str(MIN_CHARGE_CURRENT_A)
+        coordinator.set_control_value(
+            ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True
+        )  # Pris/Tid PÅ
+        coordinator.set_control_value(
+            ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 0.6
+        )  # Max acceptabelt pris
+        coordinator.set_control_value(
+            ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, True
+        )  # Solenergi PÅ
+        coordinator.set_control_value(
+            ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER, 0
+        )  # Ingen buffert
+        coordinator.set_control_value(
+            ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER, MIN_CHARGE_CURRENT_A
         )  # 6A
 
         start_time_utc = datetime(2025, 6, 1, 10, 0, 0, tzinfo=timezone.utc)
@@ -65,21 +65,6 @@ DYN_CURRENT_SENSOR_ID = (
     "sensor.charger_dynamic_current_sol_to_price"  # Sensor för nuvarande dynamisk gräns
 )
 
-# Hårdkodade ID:n för interna entiteter (för enkelhetens skull i testet)
-SMART_ENABLE_SWITCH_ID = (
-    f"switch.{DOMAIN}_test_sol_to_price_{ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH}"
-)
-MAX_PRICE_NUMBER_ID = (
-    f"number.{DOMAIN}_test_sol_to_price_{ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER}"
-)
-SOLAR_ENABLE_SWITCH_ID = (
-    f"switch.{DOMAIN}_test_sol_to_price_{ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH}"
-)
-SOLAR_BUFFER_NUMBER_ID = (
-    f"number.{DOMAIN}_test_sol_to_price_{ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER}"
-)
-MIN_SOLAR_CURRENT_NUMBER_ID = f"number.{DOMAIN}_test_sol_to_price_{ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER}"
-
 
 @pytest.fixture(autouse=True)
 def enable_debug_logging():
@@ -143,28 +128,13 @@ async def test_solar_to_price_time_transition(hass: HomeAssistant, caplog):
     entry.add_to_hass(hass)
 
     # Patcha _setup_listeners för att undvika problem med externa lyssnare i testmiljön.
-    # Patcha även _resolve_internal_entities för att kunna sätta ID:n manuellt.
-    with (
-        patch(
-            "custom_components.smart_ev_charging.coordinator.SmartEVChargingCoordinator._setup_listeners"
-        ),
-        patch(
-            "custom_components.smart_ev_charging.coordinator.SmartEVChargingCoordinator._resolve_internal_entities",
-            return_value=True,  # Låtsas att de är lösta
-        ),
+    with patch(
+        "custom_components.smart_ev_charging.coordinator.SmartEVChargingCoordinator._setup_listeners"
     ):
         # Skapa koordinatorn
         # Använd en kortare scan interval för snabbare testkörning om nödvändigt, men 30s är ok.
         coordinator = SmartEVChargingCoordinator(hass, entry, 30)
 
-        # Manuell tilldelning av interna entitets-ID:n eftersom _resolve_internal_entities är patchad
-        coordinator.smart_enable_switch_entity_id = SMART_ENABLE_SWITCH_ID
-        coordinator.max_price_entity_id = MAX_PRICE_NUMBER_ID
-        coordinator.solar_enable_switch_entity_id = SOLAR_ENABLE_SWITCH_ID
-        coordinator.solar_buffer_entity_id = SOLAR_BUFFER_NUMBER_ID
-        coordinator.min_solar_charge_current_entity_id = MIN_SOLAR_CURRENT_NUMBER_ID
-        coordinator._internal_entities_resolved = True  # Markera som lösta
-
         # Sätt initiala tillstånd för externa sensorer och interna entiteter
         hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
         hass.states.async_set(PRICE_SENSOR_ID, "0.20")  # Lågt pris
@@ -178,14 +148,20 @@ async def test_solar_to_price_time_transition(hass: HomeAssistant, caplog):
         )  # Initial dynamisk gräns satt av "solen"
 
         # Interna switchar och nummer-entiteter (som om användaren satt dem i UI)
-        hass.states.async_set(SMART_ENABLE_SWITCH_ID, STATE_ON)  # Pris/Tid är aktiverat
-        hass.states.async_set(MAX_PRICE_NUMBER_ID, "0.50")  # Maxpris för Pris/Tid
-        hass.states.async_set(
-            SOLAR_ENABLE_SWITCH_ID, STATE_ON
+        coordinator.set_control_value(
+            ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True
+        )  # Pris/Tid är aktiverat
+        coordinator.set_control_value(
+            ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 0.50
+        )  # Maxpris för Pris/Tid
+        coordinator.set_control_value(
+            ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, True
         )  # Solenergiladdning är aktiverat
-        hass.states.async_set(SOLAR_BUFFER_NUMBER_ID, "300")  # Solenergi buffert (W)
-        hass.states.async_set(
-            MIN_SOLAR_CURRENT_NUMBER_ID, str(MIN_CHARGE_CURRENT_A)
+        coordinator.set_control_value(
+            ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER, 300
+        )  # Solenergi buffert (W)
+        coordinator.set_control_value(
+            ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER, MIN_CHARGE_CURRENT_A
         )  # Minsta laddström sol (6A)
 
         # Scheman: Pris/Tid är AV, Sol är PÅ (genom att inte ha ett schema och switchen är PÅ)
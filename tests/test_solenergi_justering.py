@@ -8,10 +8,11 @@ justeringen av laddström vid solenergiladdning.
 import pytest
 import logging
 import math
+from datetime import timedelta
 from unittest.mock import patch
 
 from homeassistant.core import HomeAssistant
-from homeassistant.const import STATE_ON, STATE_OFF, UnitOfPower
+from homeassistant.const import STATE_ON, UnitOfPower
 
 from pytest_homeassistant_custom_component.common import (
     MockConfigEntry,
@@ -43,7 +44,7 @@ _LOGGER = logging.getLogger(f"custom_components.{DOMAIN}")
 _LOGGER.setLevel(logging.DEBUG)
 
 
-async def test_dynamisk_justering_vid_solenergiladdning(hass: HomeAssistant):
+async def test_dynamisk_justering_vid_solenergiladdning(hass: HomeAssistant, freezer):
     """
     Testar hela flödet: start, minskning av solproduktion och ökning av solproduktion.
     Detta test är designat för att driva fram en specifik logik i koordinatorn.
@@ -83,7 +84,7 @@ async def test_dynamisk_justering_vid_solenergiladdning(hass: HomeAssistant):
     ]
     assert coordinator is not None, "Koordinatorn kunde inte initialiseras."
 
-    # Importerar suffix för de interna entiteterna som skapas av integrationen.
+    # Importerar suffix för de interna entiteterna (nycklar för styrvärdena).
     from custom_components.smart_ev_charging.const import (
         ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
         ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
@@ -92,29 +93,6 @@ async def test_dynamisk_justering_vid_solenergiladdning(hass: HomeAssistant):
         ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER,
     )
 
-    # Eftersom testerna körs isolerat måste vi manuellt tilldela de fullständiga entity_id
-    # för de interna switchar och nummer-entiteter som koordinatorn förväntar sig hitta.
-    smart_switch_id = (
-        f"switch.{DOMAIN}_{entry_id}_{ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH}"
-    )
-    max_price_id = f"number.{DOMAIN}_{entry_id}_{ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER}"
-    solar_switch_id = (
-        f"switch.{DOMAIN}_{entry_id}_{ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH}"
-    )
-    solar_buffer_id = (
-        f"number.{DOMAIN}_{entry_id}_{ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER}"
-    )
-    min_solar_current_id = f"number.{DOMAIN}_{entry_id}_{ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER}"
-
-    # Sätter de manuellt skapade ID:na på koordinator-objektet.
-    coordinator.smart_enable_switch_entity_id = smart_switch_id
-    coordinator.max_price_entity_id = max_price_id
-    coordinator.solar_enable_switch_entity_id = solar_switch_id
-    coordinator.solar_buffer_entity_id = solar_buffer_id
-    coordinator.min_solar_charge_current_entity_id = min_solar_current_id
-    # Markerar att de interna entiteterna nu är "lösta" så att koordinatorn kan fortsätta.
-    coordinator._internal_entities_resolved = True
-
     # Mockar tjänsteanropen till Easee-integrationen. Detta fångar upp alla anrop
     # så att vi kan verifiera att de görs korrekt (eller inte görs alls).
     action_command_calls = async_mock_service(hass, "easee", "action_command")
@@ -128,16 +106,24 @@ async def test_dynamisk_justering_vid_solenergiladdning(hass: HomeAssistant):
     _LOGGER.debug("--- START TEST 1: Start av solenergiladdning ---")
 
     # Sätter upp förutsättningarna enligt specifikationen.
-    hass.states.async_set(smart_switch_id, STATE_OFF)  # Pris/Tid är AV.
-    hass.states.async_set(solar_switch_id, STATE_ON)  # Solenergi är PÅ.
+    coordinator.set_control_value(
+        ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, False
+    )  # Pris/Tid är AV.
+    coordinator.set_control_value(
+        ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, True
+    )  # Solenergi är PÅ.
     hass.states.async_set(
         "sensor.test_price_sol_justering", "1.0"
     )  # Elpris satt till 1 kr.
-    hass.states.async_set(
-        max_price_id, "0.8"
+    coordinator.set_control_value(
+        ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 0.8
     )  # Maxpris satt under spotpris för att säkerställa att Pris/Tid är inaktivt.
-    hass.states.async_set(solar_buffer_id, "500")  # Solenergi-buffert satt till 500W.
-    hass.states.async_set(min_solar_current_id, "6")  # Minsta laddström satt till 6A.
+    coordinator.set_control_value(
+        ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER, 500
+    )  # Solenergi-buffert satt till 500W.
+    coordinator.set_control_value(
+        ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER, 6
+    )  # Minsta laddström satt till 6A.
     hass.states.async_set(
         "switch.mock_charger_power_sol_justering", STATE_ON
     )  # Huvudströmbrytaren är PÅ.
@@ -243,6 +229,8 @@ async def test_dynamisk_justering_vid_solenergiladdning(hass: HomeAssistant):
     # Ström = floor(8600 / 690) = floor(12.46) = 12 A.
     forvantad_strom_test3 = 13
 
+    # Easee tillåter högst en höjning av strömgränsen per minut under laddning.
+    freezer.tick(timedelta(seconds=60))
     # Kör en sista uppdatering.
     await coordinator.async_refresh()
     await hass.async_block_till_done()
@@ -16,7 +16,7 @@ from datetime import timedelta
 import math
 
 from homeassistant.core import HomeAssistant
-from homeassistant.const import STATE_ON, STATE_OFF, UnitOfPower
+from homeassistant.const import STATE_ON, UnitOfPower
 from homeassistant.util import dt as dt_util
 
 from pytest_homeassistant_custom_component.common import (
@@ -92,20 +92,6 @@ async def test_solar_charging_full_lifecycle(hass: HomeAssistant, freezer):
     ]
     assert coordinator is not None
 
-    # Manuell tilldelning av interna entitets-ID:n för att kringgå väntan på entity registry
-    coordinator.smart_enable_switch_entity_id = (
-        f"switch.{DOMAIN}_{entry_id_for_test}_{ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH}"
-    )
-    coordinator.max_price_entity_id = (
-        f"number.{DOMAIN}_{entry_id_for_test}_{ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER}"
-    )
-    coordinator.solar_enable_switch_entity_id = f"switch.{DOMAIN}_{entry_id_for_test}_{ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH}"
-    coordinator.solar_buffer_entity_id = (
-        f"number.{DOMAIN}_{entry_id_for_test}_{ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER}"
-    )
-    coordinator.min_solar_charge_current_entity_id = f"number.{DOMAIN}_{entry_id_for_test}_{ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER}"
-    coordinator._internal_entities_resolved = True
-
     # Mocka tjänsteanrop till Easee-integrationen
     action_command_calls = async_mock_service(
         hass, "easee", "action_command"
@@ -124,13 +110,13 @@ async def test_solar_charging_full_lifecycle(hass: HomeAssistant, freezer):
     # - Minsta laddström för solenergi är 6A.
     # - Solenergi-bufferten är 200W.
     # - Maxpris (för Pris/Tid, inte relevant här men sätts för fullständighet) är 10.0 kr.
-    hass.states.async_set(coordinator.solar_enable_switch_entity_id, STATE_ON)
-    hass.states.async_set(coordinator.smart_enable_switch_entity_id, STATE_OFF)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, False)
     hass.states.async_set(MOCK_STATUS_SENSOR_ID, EASEE_STATUS_READY_TO_CHARGE[0])
     hass.states.async_set(MOCK_MAIN_POWER_SWITCH_ID, STATE_ON)
-    hass.states.async_set(coordinator.min_solar_charge_current_entity_id, "6")
-    hass.states.async_set(coordinator.solar_buffer_entity_id, "200")
-    hass.states.async_set(coordinator.max_price_entity_id, "10.0")
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MIN_SOLAR_CHARGE_CURRENT_A_NUMBER, 6)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SOLAR_BUFFER_NUMBER, 200)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 10.0)
 
     # --- 2. Teststeg: Inget överskott ---
     # SYFTE: Verifiera att ingen laddning startar om solproduktionen är lägre än husets förbrukning + buffer.
@@ -252,6 +238,8 @@ async def test_solar_charging_full_lifecycle(hass: HomeAssistant, freezer):
     set_current_calls.clear()
 
     print("\nTESTSTEG 5: Laddströmmen justeras dynamiskt UPPÅT")
+    # Easee tillåter högst en höjning av strömgränsen per minut under laddning.
+    freezer.tick(timedelta(seconds=60))
     # FÖRUTSÄTTNINGAR: Produktionen ökar för att ge 10A överskott.
     # (10A * 3 * 230V) + 1000W (hus) + 200W (buffer) = 6900W + 1200W = 8100W.
     hass.states.async_set(MOCK_STATUS_SENSOR_ID, EASEE_STATUS_CHARGING)
@@ -0,0 +1,232 @@
+# tests/test_solprognos_planering.py
+"""
+Testar laddplanen med solprognos: prognossensorernas attribut tolkas till
+timvis energi, och Pris/Tid-laddningen skjuts upp när väntat solöverskott
+täcker bilens energibehov.
+"""
+
+import pytest
+import logging
+from unittest.mock import patch
+from datetime import datetime, timedelta
+
+from homeassistant.core import HomeAssistant, State
+from homeassistant.const import STATE_ON
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_mock_service,
+)
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
+    CONF_EV_SOC_SENSOR,
+    CONF_TARGET_SOC_LIMIT,
+    CONF_DEBUG_LOGGING,
+    CONF_SOLAR_FORECAST_SENSORS,
+    CONF_HOUSE_BASE_LOAD_W,
+    CONF_EV_BATTERY_CAPACITY_KWH,
+    CONF_DEPARTURE_TIME,
+    EASEE_STATUS_READY_TO_CHARGE,
+    CONTROL_MODE_MANUAL,
+    CONTROL_MODE_PRICE_TIME,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+from custom_components.smart_ev_charging.planner import ChargePlanner
+from custom_components.smart_ev_charging.price_cache import PriceSeries
+from custom_components.smart_ev_charging.solar_forecast import (
+    SolarForecast,
+    parse_forecast_attributes,
+)
+
+STATUS_SENSOR_ID = "sensor.easee_status_forecast"
+POWER_SWITCH_ID = "switch.easee_power_forecast"
+PRICE_SENSOR_ID = "sensor.nordpool_price_forecast"
+SOC_SENSOR_ID = "sensor.ev_soc_forecast"
+FORECAST_SENSOR_ID = "sensor.solcast_forecast_today"
+MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_forecast"
+
+# Timpriser i kr/kWh från midnatt. Natten är billig, dagen dyrare.
+PRICES = [0.30, 0.20, 0.10, 0.15] + [0.90] * 20
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+def _day_start() -> datetime:
+    """Midnatt i testets lokala tidszon."""
+    return dt_util.as_utc(
+        dt_util.start_of_local_day(datetime(2025, 6, 2, 12, 0, tzinfo=dt_util.UTC))
+    )
+
+
+def _price_attributes(day_start: datetime) -> dict:
+    return {
+        "unit_of_measurement": "SEK/kWh",
+        "raw_today": [
+            {
+                "start": day_start + timedelta(hours=i),
+                "end": day_start + timedelta(hours=i + 1),
+                "value": price,
+            }
+            for i, price in enumerate(PRICES)
+        ],
+    }
+
+
+def _solcast_attributes(day_start: datetime, power_kw: float) -> dict:
+    """Solcast-prognos i halvtimmar med given effekt mellan 10 och 16."""
+    return {
+        "detailedForecast": [
+            {
+                "period_start": (day_start + timedelta(minutes=30 * i)).isoformat(),
+                "pv_estimate": power_kw if 20 <= i < 32 else 0.0,
+            }
+            for i in range(48)
+        ]
+    }
+
+
+def test_forecast_attributes_to_hourly_energy():
+    """
+    SYFTE: Verifiera att Solcast- och Forecast.Solar-attribut tolkas till kWh
+    per timme och att flera sensorer summeras.
+    FÖRUTSÄTTNINGAR: Solcast anger 6 kW i halvtimmar 10-16. Forecast.Solar
+    anger 2000 W kl. 12:00 och 0 W kl. 13:00.
+    FÖRVÄNTAT RESULTAT: 6 kWh per timme 10-16, och 8 kWh kl. 12 med båda.
+    """
+    day_start = _day_start()
+    hourly = parse_forecast_attributes(_solcast_attributes(day_start, 6.0))
+    assert hourly[day_start + timedelta(hours=10)] == pytest.approx(6.0)
+    assert sum(hourly.values()) == pytest.approx(36.0)
+
+    forecast_solar = {
+        "watts": {
+            (day_start + timedelta(hours=12)).isoformat(): 2000,
+            (day_start + timedelta(hours=13)).isoformat(): 0,
+        }
+    }
+    forecast = SolarForecast()
+    states = [
+        State("sensor.solcast", "36", _solcast_attributes(day_start, 6.0)),
+        State("sensor.forecast_solar", "2", forecast_solar),
+    ]
+    assert forecast.update(states)
+    assert not forecast.update(states)
+    assert forecast.hourly_kwh[day_start + timedelta(hours=12)] == pytest.approx(8.0)
+
+
+def test_plan_defers_need_covered_by_solar_surplus():
+    """
+    SYFTE: Verifiera fördelningen mellan solöverskott och nätel.
+    FÖRUTSÄTTNINGAR: 6 kW prognos 10-16 och 500 W hushållslast ger 33 kWh
+    överskott. Laddeffekt 11 kW.
+    FÖRVÄNTAT RESULTAT: Ett behov på 20 kWh täcks helt av solen. Ett behov på
+    40 kWh ger 7 kWh nätel i nattens billigaste timme (02-03). Med avresa
+    02:30 räknas inget solöverskott och bara timmarna före avresan används.
+    """
+    day_start = _day_start()
+    series = PriceSeries.from_attributes(_price_attributes(day_start))
+    forecast = SolarForecast()
+    attributes = _solcast_attributes(day_start, 6.0)
+    forecast.update([State(FORECAST_SENSOR_ID, "36", attributes)])
+    planner = ChargePlanner(base_load_w=500)
+    now = day_start + timedelta(minutes=30)
+
+    planner.update(now, series, forecast, 20.0, 11.0, 4.1)
+    assert planner.expected_surplus_kwh == pytest.approx(33.0)
+    assert planner.grid_kwh == 0.0
+    assert not any(
+        planner.grid_charge_allowed(day_start + timedelta(hours=h)) for h in range(24)
+    )
+
+    planner.update(now, series, forecast, 40.0, 11.0, 4.1)
+    assert planner.grid_kwh == pytest.approx(7.0)
+    assert planner.first_grid_slot == day_start + timedelta(hours=2)
+    assert planner.grid_charge_allowed(day_start + timedelta(hours=2, minutes=5))
+    assert not planner.grid_charge_allowed(day_start + timedelta(hours=1))
+
+    # Halva timmen 02-03 räcker inte, så även 01 och 00 behövs.
+    departure = day_start + timedelta(hours=2, minutes=30)
+    planner.update(now, series, forecast, 20.0, 11.0, 4.1, departure=departure)
+    assert planner.expected_surplus_kwh == 0.0
+    assert planner.grid_kwh == pytest.approx(20.0)
+    assert [
+        planner.grid_charge_allowed(day_start + timedelta(hours=h)) for h in range(4)
+    ] == [True, True, True, False]
+
+
+async def test_price_time_waits_for_sunny_day(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att Pris/Tid inte laddar från nätet natten före en dag då
+    solöverskottet täcker behovet, men laddar när prognosen blir mulen.
+    FÖRUTSÄTTNINGAR: SoC 50 %, mål 80 % och 60 kWh batteri ger 18 kWh behov.
+    Kl. 02 är priset 0.10 kr, under maxpriset 0.50 kr. Avresa kl. 18.
+    FÖRVÄNTAT RESULTAT: Med 33 kWh väntat överskott väntar laddningen. När
+    prognosen ändras till mulet startar Pris/Tid-laddningen.
+    """
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "easee_forecast_test",
+            CONF_STATUS_SENSOR: STATUS_SENSOR_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_EV_SOC_SENSOR: SOC_SENSOR_ID,
+            CONF_TARGET_SOC_LIMIT: 80,
+            CONF_DEBUG_LOGGING: True,
+        },
+        options={
+            CONF_SOLAR_FORECAST_SENSORS: [FORECAST_SENSOR_ID],
+            CONF_HOUSE_BASE_LOAD_W: 500,
+            CONF_EV_BATTERY_CAPACITY_KWH: 60,
+            CONF_DEPARTURE_TIME: "18:00:00",
+        },
+        entry_id="test_forecast_entry",
+    )
+    entry.add_to_hass(hass)
+    day_start = _day_start()
+    coordinator = SmartEVChargingCoordinator(hass, entry, 30)
+    async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    async_mock_service(hass, "easee", "action_command")
+
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_READY_TO_CHARGE[0])
+    hass.states.async_set(SOC_SENSOR_ID, "50")
+    hass.states.async_set(PRICE_SENSOR_ID, "0.10", _price_attributes(day_start))
+    hass.states.async_set(
+        FORECAST_SENSOR_ID, "36", _solcast_attributes(day_start, 6.0)
+    )
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 0.50)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
+
+    night = day_start + timedelta(hours=2, minutes=10)
+    with patch.object(dt_util, "utcnow", return_value=night):
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+    assert coordinator.active_control_mode == CONTROL_MODE_MANUAL
+    assert "solprognosen täcker 18.0 kWh" in coordinator.data["should_charge_reason"]
+    assert coordinator.data["charge_plan_grid_kwh"] == 0.0
+
+    hass.states.async_set(
+        FORECAST_SENSOR_ID, "0", _solcast_attributes(day_start, 0.0)
+    )
+    with patch.object(dt_util, "utcnow", return_value=night + timedelta(minutes=1)):
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+    assert coordinator.active_control_mode == CONTROL_MODE_PRICE_TIME
+    assert coordinator.data["charge_plan_grid_kwh"] == pytest.approx(18.0)
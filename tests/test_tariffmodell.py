@@ -0,0 +1,189 @@
+# tests/test_tariffmodell.py
+"""
+Testar tariffmodellen: tidsfönster för överföringsavgiften, totalkostnad per
+kWh och att Pris/Tid-laddningen jämför totalkostnaden mot maxpriset.
+"""
+
+import pytest
+import logging
+from unittest.mock import patch
+from datetime import datetime, timedelta
+
+from homeassistant.core import HomeAssistant, State
+from homeassistant.const import STATE_ON
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_mock_service,
+)
+
+from custom_components.smart_ev_charging.const import (
+    DOMAIN,
+    CONF_CHARGER_DEVICE,
+    CONF_STATUS_SENSOR,
+    CONF_CHARGER_ENABLED_SWITCH_ID,
+    CONF_PRICE_SENSOR,
+    CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR,
+    CONF_DEBUG_LOGGING,
+    CONF_TARIFF_ENERGY_TAX,
+    CONF_TARIFF_GRID_FEE,
+    CONF_TARIFF_VAT_PERCENT,
+    CONF_TARIFF_TIME_OF_USE,
+    EASEE_STATUS_READY_TO_CHARGE,
+    CONTROL_MODE_MANUAL,
+    CONTROL_MODE_PRICE_TIME,
+    ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH,
+    ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER,
+    ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH,
+)
+from custom_components.smart_ev_charging.coordinator import SmartEVChargingCoordinator
+from custom_components.smart_ev_charging.price_cache import PriceCache
+from custom_components.smart_ev_charging.tariff import (
+    TariffModel,
+    parse_time_of_use_windows,
+)
+
+STATUS_SENSOR_ID = "sensor.easee_status_tariff"
+POWER_SWITCH_ID = "switch.easee_power_tariff"
+PRICE_SENSOR_ID = "sensor.nordpool_price_tariff"
+MAX_CURRENT_SENSOR_ID = "sensor.charger_max_current_tariff"
+
+TIME_OF_USE = "mån-fre 06-22=0.50; lör-sön 00-24=0.10"
+PRICES = [0.30, 0.30, 0.30, 0.30, 0.30, 0.20, 0.20, 0.30]
+
+
+@pytest.fixture(autouse=True)
+def enable_debug_logging():
+    logging.getLogger(f"custom_components.{DOMAIN}").setLevel(logging.DEBUG)
+
+
+def _day_start() -> datetime:
+    """Midnatt en måndag i testets lokala tidszon."""
+    return dt_util.as_utc(
+        dt_util.start_of_local_day(datetime(2025, 11, 10, 12, 0, tzinfo=dt_util.UTC))
+    )
+
+
+def _price_attributes(day_start: datetime) -> dict:
+    return {
+        "unit_of_measurement": "SEK/kWh",
+        "raw_today": [
+            {
+                "start": day_start + timedelta(hours=i),
+                "end": day_start + timedelta(hours=i + 1),
+                "value": price,
+            }
+            for i, price in enumerate(PRICES)
+        ],
+    }
+
+
+def test_time_of_use_windows_and_total_cost():
+    """
+    SYFTE: Verifiera tolkningen av tidsfönster och beräkningen av totalkostnad.
+    FÖRUTSÄTTNINGAR: Fast överföringsavgift 0.20 kr, höglast vardagar 06-22
+    (0.50 kr), helger 0.10 kr, energiskatt 0.40 kr och 25 % moms.
+    FÖRVÄNTAT RESULTAT: Rätt avgift vid vardagsnatt, vardagsdag och helg, och
+    totalkostnaden (spot + avgift + skatt) × 1.25. Ogiltig text ger ValueError.
+    """
+    day_start = _day_start()
+    tariff = TariffModel(
+        energy_tax_kr=0.40, grid_fee_kr=0.20, vat_percent=25, time_of_use=TIME_OF_USE
+    )
+    monday_night = day_start + timedelta(hours=5, minutes=45)
+    monday_day = day_start + timedelta(hours=6)
+    saturday = day_start + timedelta(days=5, hours=12)
+
+    assert tariff.grid_fee_at(monday_night) == 0.20
+    assert tariff.grid_fee_at(monday_day) == 0.50
+    assert tariff.grid_fee_at(day_start + timedelta(hours=22)) == 0.20
+    assert tariff.grid_fee_at(saturday) == 0.10
+    assert tariff.total_cost(monday_day, 1.00) == pytest.approx(2.375)
+
+    assert parse_time_of_use_windows("") == []
+    assert parse_time_of_use_windows("lör-mån 22:15-24=0.1")[0][0] == [5, 6, 0]
+    for invalid in ("mån 06-22", "xyz 06-22=0.5", "mån 22-06=0.5", "mån 06:10-22=1"):
+        with pytest.raises(ValueError):
+            parse_time_of_use_windows(invalid)
+
+    assert TariffModel.from_config({CONF_TARIFF_TIME_OF_USE: ""}) is None
+
+
+def test_tariff_changes_cheapest_hours():
+    """
+    SYFTE: Verifiera att billigaste timmar väljs efter totalkostnad.
+    FÖRUTSÄTTNINGAR: Timme 5 och 6 har lägst spotpris (0.20 kr), men timme 6
+    ligger i höglastfönstret.
+    FÖRVÄNTAT RESULTAT: Utan tariff väljs timme 5 och 6. Med tariff väljs
+    timme 5 och de billigaste låglasttimmarna före den.
+    """
+    day_start = _day_start()
+    state = State(PRICE_SENSOR_ID, "0.30", _price_attributes(day_start))
+    spot_only = PriceCache()
+    spot_only.update(state, day_start)
+    with_tariff = PriceCache(TariffModel(grid_fee_kr=0.20, time_of_use=TIME_OF_USE))
+    with_tariff.update(state, day_start)
+
+    hours = [day_start + timedelta(hours=i, minutes=30) for i in range(len(PRICES))]
+    expected_spot_only = [False] * 5 + [True, True, False]
+    expected_with_tariff = [True] + [False] * 4 + [True, False, False]
+    assert [spot_only.in_cheapest_hours(h, 2) for h in hours] == expected_spot_only
+    assert [with_tariff.in_cheapest_hours(h, 2) for h in hours] == expected_with_tariff
+    assert with_tariff.current_price(hours[6]) == 0.20
+    assert with_tariff.current_cost(hours[6]) == pytest.approx(0.70)
+
+
+async def test_price_time_uses_total_cost(hass: HomeAssistant):
+    """
+    SYFTE: Verifiera att Pris/Tid-laddningen jämför totalkostnaden mot maxpriset.
+    FÖRUTSÄTTNINGAR: Maxpris 0.90 kr. Spotpriset 0.20 kr ger 0.75 kr nattetid
+    och 1.125 kr dagtid med avgifter, skatt och moms.
+    FÖRVÄNTAT RESULTAT: Laddning timme 5 men inte timme 6, trots samma spotpris.
+    """
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_CHARGER_DEVICE: "easee_tariff_test",
+            CONF_STATUS_SENSOR: STATUS_SENSOR_ID,
+            CONF_CHARGER_ENABLED_SWITCH_ID: POWER_SWITCH_ID,
+            CONF_PRICE_SENSOR: PRICE_SENSOR_ID,
+            CONF_CHARGER_MAX_CURRENT_LIMIT_SENSOR: MAX_CURRENT_SENSOR_ID,
+            CONF_DEBUG_LOGGING: True,
+        },
+        options={
+            CONF_TARIFF_ENERGY_TAX: 0.20,
+            CONF_TARIFF_GRID_FEE: 0.20,
+            CONF_TARIFF_VAT_PERCENT: 25,
+            CONF_TARIFF_TIME_OF_USE: TIME_OF_USE,
+        },
+        entry_id="test_tariff_entry",
+    )
+    entry.add_to_hass(hass)
+    day_start = _day_start()
+    coordinator = SmartEVChargingCoordinator(hass, entry, 30)
+    async_mock_service(hass, "easee", "set_charger_dynamic_limit")
+    async_mock_service(hass, "easee", "action_command")
+
+    hass.states.async_set(POWER_SWITCH_ID, STATE_ON)
+    hass.states.async_set(MAX_CURRENT_SENSOR_ID, "16")
+    hass.states.async_set(STATUS_SENSOR_ID, EASEE_STATUS_READY_TO_CHARGE[0])
+    hass.states.async_set(PRICE_SENSOR_ID, "0.20", _price_attributes(day_start))
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_SMART_ENABLE_SWITCH, True)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_MAX_PRICE_NUMBER, 0.90)
+    coordinator.set_control_value(ENTITY_ID_SUFFIX_ENABLE_SOLAR_CHARGING_SWITCH, False)
+
+    with patch.object(
+        dt_util, "utcnow", return_value=day_start + timedelta(hours=5, minutes=10)
+    ):
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+    assert coordinator.active_control_mode == CONTROL_MODE_PRICE_TIME
+    assert "Pris: 0.75" in coordinator.data["should_charge_reason"]
+
+    with patch.object(
+        dt_util, "utcnow", return_value=day_start + timedelta(hours=6, minutes=10)
+    ):
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+    assert coordinator.active_control_mode == CONTROL_MODE_MANUAL